@@ -84,8 +84,14 @@ extensions = [
                "skbio/alignment/_lib/ssw.c"],
               extra_compile_args=ssw_extra_compile_args,
               include_dirs=[np.get_include()]),
+    Extension("skbio.alignment.__pairwise",
+              ["skbio/alignment/__pairwise" + ext],
+              include_dirs=[np.get_include()]),
     Extension("skbio.diversity._phylogenetic",
               ["skbio/diversity/_phylogenetic" + ext],
+              include_dirs=[np.get_include()]),
+    Extension("skbio.tree.__nj",
+              ["skbio/tree/__nj" + ext],
               include_dirs=[np.get_include()])
 ]
 
@@ -25,9 +25,10 @@ Optimized (i.e., production-ready) Alignment Algorithms
    StripedSmithWaterman
    AlignmentStructure
    local_pairwise_align_ssw
+   ssw_distances
 
-Slow (i.e., educational-purposes only) Alignment Algorithms
------------------------------------------------------------
+Dynamic Programming Alignment Algorithms
+----------------------------------------
 
 .. autosummary::
    :toctree: generated/
@@ -132,17 +133,18 @@ ACTAAGGCT---CTCTACCCCTCTCAGAGA
 >>> print(alignments[0].aligned_target_sequence)
 ACT-AGGCTCCCTTCTACCCCTCTCAGAGA
 
-Slow Alignment Algorithm Examples
----------------------------------
-scikit-bio also provides pure-Python implementations of Smith-Waterman and
-Needleman-Wunsch alignment. These are much slower than the methods described
-above, but serve as useful educational examples as they're simpler to
-experiment with. Functions are provided for local and global alignment of
-protein and nucleotide sequences. The ``global*`` and ``local*`` functions
-differ in the underlying algorithm that is applied (``global*`` uses Needleman-
-Wunsch while ``local*`` uses Smith-Waterman), and ``*protein`` and
-``*nucleotide`` differ in their default scoring of matches, mismatches, and
-gaps.
+Dynamic Programming Alignment Examples
+--------------------------------------
+scikit-bio also provides implementations of Smith-Waterman and
+Needleman-Wunsch alignment, which fill the full dynamic programming matrices
+in compiled code. These are slower than the methods described above, which
+use SIMD instructions, but they can align alignments (profiles) as well as
+sequences, and are simpler to experiment with. Functions are provided for
+local and global alignment of protein and nucleotide sequences. The
+``global*`` and ``local*`` functions differ in the underlying algorithm that
+is applied (``global*`` uses Needleman-Wunsch while ``local*`` uses
+Smith-Waterman), and ``*protein`` and ``*nucleotide`` differ in their default
+scoring of matches, mismatches, and gaps.
 
 Here we locally align a pair of protein sequences using gap open penalty
 of 11 and a gap extend penalty of 1 (in other words, it is much more
@@ -207,7 +209,8 @@ from ._pairwise import (
     local_pairwise_align_nucleotide, local_pairwise_align_protein,
     local_pairwise_align, global_pairwise_align_nucleotide,
     global_pairwise_align_protein, global_pairwise_align,
-    make_identity_substitution_matrix, local_pairwise_align_ssw
+    make_identity_substitution_matrix, local_pairwise_align_ssw,
+    ssw_distances
 )
 from skbio.alignment._ssw_wrapper import (
     StripedSmithWaterman, AlignmentStructure)
@@ -216,6 +219,7 @@ __all__ = ['TabularMSA', 'StripedSmithWaterman', 'AlignmentStructure',
            'local_pairwise_align_ssw', 'global_pairwise_align',
            'global_pairwise_align_nucleotide', 'global_pairwise_align_protein',
            'local_pairwise_align', 'local_pairwise_align_nucleotide',
-           'local_pairwise_align_protein', 'make_identity_substitution_matrix']
+           'local_pairwise_align_protein', 'make_identity_substitution_matrix',
+           'ssw_distances']
 
 test = TestRunner(__file__).test
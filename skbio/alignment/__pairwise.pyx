@@ -0,0 +1,561 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+cimport numpy as cnp
+cimport cython
+from libc.math cimport INFINITY
+
+
+# these values match skbio.alignment._pairwise._traceback_encoding
+cdef enum:
+    ALIGNMENT_END = 0
+    MATCH = 1
+    VERTICAL_GAP = 2
+    HORIZONTAL_GAP = 3
+
+# states of the affine-gap (Gotoh) alignment: the last column of the
+# alignment is a match, a gap in the second sequence (horizontal) or a gap in
+# the first sequence (vertical)
+cdef enum:
+    STATE_MATCH = 0
+    STATE_HORIZONTAL = 1
+    STATE_VERTICAL = 2
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _fill_matrices(cnp.intp_t[::1] seq1, cnp.intp_t[::1] seq2,
+                   double[:, ::1] substitution_matrix,
+                   double[:, ::1] score_matrix,
+                   cnp.int8_t[:, ::1] traceback_matrix,
+                   double gap_open_penalty, double gap_extend_penalty,
+                   double new_alignment_score, bint penalize_terminal_gaps):
+    """Fill initialized score and traceback matrices of a pairwise alignment.
+
+    Parameters
+    ----------
+    seq1, seq2 : 1D np.ndarray of np.intp
+        Codes of the positions of the horizontal and vertical sequences, as
+        indices into `substitution_matrix`.
+    substitution_matrix : 2D np.ndarray of float
+        Score of aligning each pair of codes.
+    score_matrix : 2D np.ndarray of float
+        Matrix of shape ``(len(seq2) + 1, len(seq1) + 1)`` whose first row
+        and column are initialized. It is filled in place.
+    traceback_matrix : 2D np.ndarray of np.int8
+        Matrix of the same shape, initialized and filled in the same way.
+    gap_open_penalty, gap_extend_penalty : float
+        Penalties for opening and extending a gap. A gap is extended when
+        the neighboring cell was reached by a gap in the same direction.
+    new_alignment_score : float
+        Score of starting a new alignment at a cell (``0`` for local
+        alignment, ``-inf`` for global alignment).
+    penalize_terminal_gaps : bool
+        Whether gaps after the end of either sequence are penalized.
+
+    Notes
+    -----
+    Ties are resolved in favor of starting a new alignment, then of a
+    horizontal gap, a match and a vertical gap. The matrices are filled
+    without holding the GIL.
+
+    """
+    cdef:
+        Py_ssize_t n1 = seq1.shape[0], n2 = seq2.shape[0], i, j
+        cnp.intp_t code2
+        double diag, up, left, best
+        cnp.int8_t direction
+
+    if (score_matrix.shape[0] != n2 + 1 or score_matrix.shape[1] != n1 + 1 or
+            traceback_matrix.shape[0] != n2 + 1 or
+            traceback_matrix.shape[1] != n1 + 1):
+        raise ValueError("Score and traceback matrices must have a shape of "
+                         "(%d, %d)." % (n2 + 1, n1 + 1))
+
+    with nogil:
+        for i in range(1, n2 + 1):
+            code2 = seq2[i - 1]
+            for j in range(1, n1 + 1):
+                diag = (score_matrix[i - 1, j - 1] +
+                        substitution_matrix[seq1[j - 1], code2])
+
+                # gaps in the first sequence, which are not penalized past its
+                # end unless terminal gaps are penalized
+                up = score_matrix[i - 1, j]
+                if penalize_terminal_gaps or j != n1:
+                    if traceback_matrix[i - 1, j] == VERTICAL_GAP:
+                        up -= gap_extend_penalty
+                    else:
+                        up -= gap_open_penalty
+
+                # gaps in the second sequence
+                left = score_matrix[i, j - 1]
+                if penalize_terminal_gaps or i != n2:
+                    if traceback_matrix[i, j - 1] == HORIZONTAL_GAP:
+                        left -= gap_extend_penalty
+                    else:
+                        left -= gap_open_penalty
+
+                best = new_alignment_score
+                direction = ALIGNMENT_END
+                if left > best:
+                    best = left
+                    direction = HORIZONTAL_GAP
+                if diag > best:
+                    best = diag
+                    direction = MATCH
+                if up > best:
+                    best = up
+                    direction = VERTICAL_GAP
+                score_matrix[i, j] = best
+                traceback_matrix[i, j] = direction
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _trace_path(cnp.int8_t[:, ::1] traceback_matrix, Py_ssize_t row,
+                Py_ssize_t col):
+    """Follow a traceback matrix from a cell to the end of the alignment.
+
+    Returns
+    -------
+    tuple
+        Positions of the first and second sequences in each column of the
+        alignment (``-1`` for gaps), in order, and the row and column where
+        the alignment ends.
+
+    """
+    cdef:
+        Py_ssize_t length = 0
+        cnp.int8_t direction
+        cnp.intp_t[::1] cols, rows
+
+    if not (0 <= row < traceback_matrix.shape[0] and
+            0 <= col < traceback_matrix.shape[1]):
+        raise IndexError("Cell (%d, %d) is out of bounds." % (row, col))
+
+    cols_array = np.empty(row + col, dtype=np.intp)
+    rows_array = np.empty(row + col, dtype=np.intp)
+    cols = cols_array
+    rows = rows_array
+    direction = traceback_matrix[row, col]
+    while direction != ALIGNMENT_END:
+        if direction == MATCH:
+            row -= 1
+            col -= 1
+        elif direction == VERTICAL_GAP:
+            row -= 1
+        elif direction == HORIZONTAL_GAP:
+            col -= 1
+        else:
+            raise ValueError(
+                "Invalid value in traceback matrix: %s" % direction)
+        if row < 0 or col < 0:
+            raise ValueError("Traceback matrix leads out of its bounds.")
+        cols[length] = -1 if direction == VERTICAL_GAP else col
+        rows[length] = -1 if direction == HORIZONTAL_GAP else row
+        length += 1
+        direction = traceback_matrix[row, col]
+
+    return (cols_array[length - 1::-1] if length else cols_array[:0],
+            rows_array[length - 1::-1] if length else rows_array[:0],
+            row, col)
+
+
+cdef inline double _best3(double a, double b, double c,
+                          cnp.uint8_t *state) nogil:
+    """Largest of three values, and the position of the first largest one."""
+    state[0] = 0
+    if b > a:
+        a = b
+        state[0] = 1
+    if c > a:
+        a = c
+        state[0] = 2
+    return a
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _gotoh_last_rows(cnp.intp_t[:] seq1, cnp.intp_t[:] seq2,
+                     double[:, ::1] substitution_matrix,
+                     double gap_open_penalty, double gap_extend_penalty,
+                     bint start_in_gap=False, bint free_leading_gaps=False):
+    """Scores of optimal affine-gap alignments ending on the last row/column.
+
+    Only two rows of scores are kept, so memory is linear in the length of
+    `seq1`.
+
+    Parameters
+    ----------
+    seq1, seq2 : 1D np.ndarray of np.intp
+        Codes of the horizontal and vertical sequences.
+    substitution_matrix : 2D np.ndarray of float
+        Score of aligning each pair of codes.
+    gap_open_penalty, gap_extend_penalty : float
+        A gap of length ``k`` costs ``gap_open_penalty + (k - 1) *
+        gap_extend_penalty``.
+    start_in_gap : bool, optional
+        Whether the alignment continues a vertical gap, so that a leading
+        vertical gap costs no opening penalty.
+    free_leading_gaps : bool, optional
+        Whether leading gaps in either sequence are free.
+
+    Returns
+    -------
+    score_row : np.ndarray of float
+        Best score of aligning all of `seq2` with each prefix of `seq1`.
+    vertical_row : np.ndarray of float
+        Same, for alignments ending with a vertical gap.
+    score_column : np.ndarray of float
+        Best score of aligning all of `seq1` with each prefix of `seq2`.
+
+    """
+    cdef:
+        Py_ssize_t n1 = seq1.shape[0], n2 = seq2.shape[0], i, j
+        double[::1] prev_m, prev_x, prev_v, cur_m, cur_x, cur_v, swap
+        double[::1] score_row, vertical_row, score_column
+        double open_ = gap_open_penalty, extend = gap_extend_penalty, m
+        cnp.uint8_t state
+
+    prev_m = np.empty(n1 + 1)
+    prev_x = np.empty(n1 + 1)
+    prev_v = np.empty(n1 + 1)
+    cur_m = np.empty(n1 + 1)
+    cur_x = np.empty(n1 + 1)
+    cur_v = np.empty(n1 + 1)
+    score_row_array = np.empty(n1 + 1)
+    vertical_row_array = np.empty(n1 + 1)
+    score_column_array = np.empty(n2 + 1)
+    score_row = score_row_array
+    vertical_row = vertical_row_array
+    score_column = score_column_array
+
+    with nogil:
+        prev_m[0] = 0.0
+        prev_x[0] = -INFINITY
+        prev_v[0] = 0.0 if start_in_gap else -INFINITY
+        # separate loops: GCC 12 miscompiles the fused loop at -O3
+        for j in range(1, n1 + 1):
+            prev_m[j] = -INFINITY
+            prev_v[j] = -INFINITY
+        for j in range(1, n1 + 1):
+            if free_leading_gaps:
+                prev_x[j] = 0.0
+            else:
+                prev_x[j] = _best3(prev_m[j - 1] - open_,
+                                   prev_x[j - 1] - extend,
+                                   prev_v[j - 1] - open_, &state)
+        score_column[0] = _best3(prev_m[n1], prev_x[n1], prev_v[n1], &state)
+
+        for i in range(1, n2 + 1):
+            cur_m[0] = -INFINITY
+            cur_x[0] = -INFINITY
+            if free_leading_gaps:
+                cur_v[0] = 0.0
+            else:
+                cur_v[0] = _best3(prev_m[0] - open_, prev_x[0] - open_,
+                                  prev_v[0] - extend, &state)
+            for j in range(1, n1 + 1):
+                m = _best3(prev_m[j - 1], prev_x[j - 1], prev_v[j - 1],
+                           &state)
+                cur_m[j] = m + substitution_matrix[seq1[j - 1], seq2[i - 1]]
+                cur_x[j] = _best3(cur_m[j - 1] - open_, cur_x[j - 1] - extend,
+                                  cur_v[j - 1] - open_, &state)
+                cur_v[j] = _best3(prev_m[j] - open_, prev_x[j] - open_,
+                                  prev_v[j] - extend, &state)
+            score_column[i] = _best3(cur_m[n1], cur_x[n1], cur_v[n1], &state)
+            swap = prev_m
+            prev_m = cur_m
+            cur_m = swap
+            swap = prev_x
+            prev_x = cur_x
+            cur_x = swap
+            swap = prev_v
+            prev_v = cur_v
+            cur_v = swap
+
+        for j in range(n1 + 1):
+            score_row[j] = _best3(prev_m[j], prev_x[j], prev_v[j], &state)
+            vertical_row[j] = prev_v[j]
+
+    return score_row_array, vertical_row_array, score_column_array
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _gotoh_align(cnp.intp_t[:] seq1, cnp.intp_t[:] seq2,
+                 double[:, ::1] substitution_matrix,
+                 double gap_open_penalty, double gap_extend_penalty,
+                 bint start_in_gap=False, bint end_in_gap=False):
+    """Optimal affine-gap global alignment with a full traceback matrix.
+
+    Scores are kept for two rows only, and the traceback matrix holds one
+    byte per cell, with the previous state of each of the three states.
+
+    Parameters
+    ----------
+    seq1, seq2, substitution_matrix, gap_open_penalty, gap_extend_penalty
+        As in ``_gotoh_last_rows``.
+    start_in_gap, end_in_gap : bool, optional
+        Whether the alignment continues a vertical gap at its start (end),
+        so that a leading (trailing) vertical gap costs no opening penalty.
+
+    Returns
+    -------
+    tuple
+        Positions of `seq1` and `seq2` in each column of the alignment
+        (``-1`` for gaps), and the score of the alignment.
+
+    Notes
+    -----
+    Ties are resolved as in ``_fill_matrices`` when choosing how the
+    alignment ends: horizontal gap, then match, then vertical gap.
+
+    """
+    cdef:
+        Py_ssize_t n1 = seq1.shape[0], n2 = seq2.shape[0], i, j, length = 0
+        double[::1] prev_m, prev_x, prev_v, cur_m, cur_x, cur_v, swap
+        cnp.uint8_t[:, ::1] traceback
+        cnp.intp_t[::1] cols, rows
+        double open_ = gap_open_penalty, extend = gap_extend_penalty, m
+        double score, end_vertical
+        cnp.uint8_t state, m_state, x_state, v_state
+
+    prev_m = np.empty(n1 + 1)
+    prev_x = np.empty(n1 + 1)
+    prev_v = np.empty(n1 + 1)
+    cur_m = np.empty(n1 + 1)
+    cur_x = np.empty(n1 + 1)
+    cur_v = np.empty(n1 + 1)
+    traceback = np.zeros((n2 + 1, n1 + 1), dtype=np.uint8)
+    cols_array = np.empty(n1 + n2, dtype=np.intp)
+    rows_array = np.empty(n1 + n2, dtype=np.intp)
+    cols = cols_array
+    rows = rows_array
+
+    with nogil:
+        prev_m[0] = 0.0
+        prev_x[0] = -INFINITY
+        prev_v[0] = 0.0 if start_in_gap else -INFINITY
+        # separate loops: GCC 12 miscompiles the fused loop at -O3
+        for j in range(1, n1 + 1):
+            prev_m[j] = -INFINITY
+            prev_v[j] = -INFINITY
+        for j in range(1, n1 + 1):
+            prev_x[j] = _best3(prev_m[j - 1] - open_, prev_x[j - 1] - extend,
+                               prev_v[j - 1] - open_, &x_state)
+            traceback[0, j] = x_state << 2
+
+        for i in range(1, n2 + 1):
+            cur_m[0] = -INFINITY
+            cur_x[0] = -INFINITY
+            cur_v[0] = _best3(prev_m[0] - open_, prev_x[0] - open_,
+                              prev_v[0] - extend, &v_state)
+            traceback[i, 0] = v_state << 4
+            for j in range(1, n1 + 1):
+                m = _best3(prev_m[j - 1], prev_x[j - 1], prev_v[j - 1],
+                           &m_state)
+                cur_m[j] = m + substitution_matrix[seq1[j - 1], seq2[i - 1]]
+                cur_x[j] = _best3(cur_m[j - 1] - open_, cur_x[j - 1] - extend,
+                                  cur_v[j - 1] - open_, &x_state)
+                cur_v[j] = _best3(prev_m[j] - open_, prev_x[j] - open_,
+                                  prev_v[j] - extend, &v_state)
+                traceback[i, j] = m_state | (x_state << 2) | (v_state << 4)
+            swap = prev_m
+            prev_m = cur_m
+            cur_m = swap
+            swap = prev_x
+            prev_x = cur_x
+            cur_x = swap
+            swap = prev_v
+            prev_v = cur_v
+            cur_v = swap
+
+        end_vertical = prev_v[n1]
+        if end_in_gap:
+            end_vertical += open_ - extend
+        score = _best3(prev_x[n1], prev_m[n1], end_vertical, &state)
+        # _best3 returned the position among (horizontal, match, vertical)
+        if state == 0:
+            state = STATE_HORIZONTAL
+        elif state == 1:
+            state = STATE_MATCH
+
+        i = n2
+        j = n1
+        while i > 0 or j > 0:
+            if state == STATE_MATCH:
+                state = traceback[i, j] & 3
+                i -= 1
+                j -= 1
+                cols[length] = j
+                rows[length] = i
+            elif state == STATE_HORIZONTAL:
+                state = (traceback[i, j] >> 2) & 3
+                j -= 1
+                cols[length] = j
+                rows[length] = -1
+            else:
+                state = (traceback[i, j] >> 4) & 3
+                i -= 1
+                cols[length] = -1
+                rows[length] = i
+            length += 1
+
+    return (cols_array[length - 1::-1] if length else cols_array[:0],
+            rows_array[length - 1::-1] if length else rows_array[:0],
+            score)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _fill_banded_matrices(cnp.intp_t[::1] seq1, cnp.intp_t[::1] seq2,
+                          double[:, ::1] substitution_matrix,
+                          double[:, ::1] score_matrix,
+                          cnp.int8_t[:, ::1] traceback_matrix,
+                          Py_ssize_t lower_diagonal,
+                          double gap_open_penalty, double gap_extend_penalty,
+                          double new_alignment_score,
+                          bint penalize_terminal_gaps):
+    """Fill initialized banded score and traceback matrices.
+
+    This is ``_fill_matrices`` restricted to the cells of a band of
+    diagonals: cell ``(i, j)`` of the full matrices is stored at
+    ``(i, j - i - lower_diagonal)``, and cells outside of the band are never
+    reached.
+
+    Parameters
+    ----------
+    seq1, seq2, substitution_matrix
+        As in ``_fill_matrices``.
+    score_matrix : 2D np.ndarray of float
+        Matrix of shape ``(len(seq2) + 1, band_width)`` whose cells in the
+        first row and column of the full matrix are initialized, and whose
+        cells outside of the full matrix are ``-inf``. It is filled in place.
+    traceback_matrix : 2D np.ndarray of np.int8
+        Matrix of the same shape, initialized in the same way (cells outside
+        of the full matrix are ``-1``).
+    lower_diagonal : int
+        Lowest diagonal (``j - i``) of the band.
+    gap_open_penalty, gap_extend_penalty, new_alignment_score,
+    penalize_terminal_gaps
+        As in ``_fill_matrices``.
+
+    """
+    cdef:
+        Py_ssize_t n1 = seq1.shape[0], n2 = seq2.shape[0]
+        Py_ssize_t width = score_matrix.shape[1], i, j, k, first, last
+        cnp.intp_t code2
+        double diag, up, left, best
+        cnp.int8_t direction
+
+    if (score_matrix.shape[0] != n2 + 1 or
+            traceback_matrix.shape[0] != n2 + 1 or
+            traceback_matrix.shape[1] != width or width < 1):
+        raise ValueError("Score and traceback matrices must have the same "
+                         "shape, with %d rows." % (n2 + 1))
+
+    with nogil:
+        for i in range(1, n2 + 1):
+            code2 = seq2[i - 1]
+            first = max(0, 1 - i - lower_diagonal)
+            last = min(width, n1 + 1 - i - lower_diagonal)
+            for k in range(first, last):
+                j = i + lower_diagonal + k
+                diag = (score_matrix[i - 1, k] +
+                        substitution_matrix[seq1[j - 1], code2])
+
+                up = -INFINITY
+                if k + 1 < width:
+                    up = score_matrix[i - 1, k + 1]
+                    if penalize_terminal_gaps or j != n1:
+                        if traceback_matrix[i - 1, k + 1] == VERTICAL_GAP:
+                            up -= gap_extend_penalty
+                        else:
+                            up -= gap_open_penalty
+
+                left = -INFINITY
+                if k > 0:
+                    left = score_matrix[i, k - 1]
+                    if penalize_terminal_gaps or i != n2:
+                        if traceback_matrix[i, k - 1] == HORIZONTAL_GAP:
+                            left -= gap_extend_penalty
+                        else:
+                            left -= gap_open_penalty
+
+                best = new_alignment_score
+                direction = ALIGNMENT_END
+                if left > best:
+                    best = left
+                    direction = HORIZONTAL_GAP
+                if diag > best:
+                    best = diag
+                    direction = MATCH
+                if up > best:
+                    best = up
+                    direction = VERTICAL_GAP
+                score_matrix[i, k] = best
+                traceback_matrix[i, k] = direction
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _trace_banded_path(cnp.int8_t[:, ::1] traceback_matrix,
+                       Py_ssize_t lower_diagonal, Py_ssize_t row,
+                       Py_ssize_t col):
+    """Follow a banded traceback matrix, as ``_trace_path``.
+
+    Returns
+    -------
+    tuple
+        As ``_trace_path``, followed by the lowest and highest diagonals
+        (``j - i``) visited by the alignment.
+
+    """
+    cdef:
+        Py_ssize_t length = 0, width = traceback_matrix.shape[1], k
+        Py_ssize_t low = col - row, high = col - row
+        cnp.int8_t direction
+        cnp.intp_t[::1] cols, rows
+
+    k = col - row - lower_diagonal
+    if not (0 <= row < traceback_matrix.shape[0] and 0 <= k < width):
+        raise IndexError("Cell (%d, %d) is out of the band." % (row, col))
+
+    cols_array = np.empty(row + col, dtype=np.intp)
+    rows_array = np.empty(row + col, dtype=np.intp)
+    cols = cols_array
+    rows = rows_array
+    direction = traceback_matrix[row, k]
+    while direction != ALIGNMENT_END:
+        if direction == MATCH:
+            row -= 1
+            col -= 1
+        elif direction == VERTICAL_GAP:
+            row -= 1
+            k += 1
+        elif direction == HORIZONTAL_GAP:
+            col -= 1
+            k -= 1
+        else:
+            raise ValueError(
+                "Invalid value in traceback matrix: %s" % direction)
+        if row < 0 or col < 0 or k < 0 or k >= width:
+            raise ValueError("Traceback matrix leads out of its bounds.")
+        cols[length] = -1 if direction == VERTICAL_GAP else col
+        rows[length] = -1 if direction == HORIZONTAL_GAP else row
+        length += 1
+        low = min(low, col - row)
+        high = max(high, col - row)
+        direction = traceback_matrix[row, k]
+
+    return (cols_array[length - 1::-1] if length else cols_array[:0],
+            rows_array[length - 1::-1] if length else rows_array[:0],
+            row, col, low, high)
@@ -6,21 +6,31 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from warnings import warn
-from itertools import product
 
 import numpy as np
+import pandas as pd
 
 from skbio.alignment import TabularMSA
 from skbio.alignment._ssw_wrapper import StripedSmithWaterman
+from skbio.alignment.__pairwise import (_fill_matrices, _trace_path,
+                                        _gotoh_last_rows, _gotoh_align,
+                                        _fill_banded_matrices,
+                                        _trace_banded_path)
 from skbio.sequence import DNA, RNA, Protein
 from skbio.sequence import GrammaredSequence
+from skbio.stats.distance import DistanceMatrix
+from skbio.stats.distance._base import _resolve_n_jobs
 from skbio.util import EfficiencyWarning
 from skbio.util._decorator import experimental, deprecated
 
 # This is temporary: blosum50 does not exist in skbio yet as per
 # issue 161. When the issue is resolved, this should be removed in favor
 # of an import.
+_CIGAR_OPERATION = re.compile(r'(\d+)([MID])')
+
 blosum50 = \
     {
         '*': {'*': 1, 'A': -5, 'C': -5, 'B': -5, 'E': -5, 'D': -5, 'G': -5,
@@ -125,7 +135,8 @@ blosum50 = \
 def local_pairwise_align_nucleotide(seq1, seq2, gap_open_penalty=5,
                                     gap_extend_penalty=2,
                                     match_score=2, mismatch_score=-3,
-                                    substitution_matrix=None):
+                                    substitution_matrix=None,
+                                    band_width=None):
     """Locally align exactly two nucleotide seqs with Smith-Waterman
 
     Parameters
@@ -151,6 +162,15 @@ def local_pairwise_align_nucleotide(seq1, seq2, gap_open_penalty=5,
         Lookup for substitution scores (these values are added to the
         previous best alignment score). If provided, this overrides
         ``match_score`` and ``mismatch_score``.
+    band_width : int or 'adaptive', optional
+        Only fill the cells of the dynamic programming matrices that are
+        within ``band_width`` diagonals of the diagonals from ``0`` to
+        ``len(seq1) - len(seq2)``, so that the cost of the alignment is
+        proportional to the length of the sequences times ``band_width``
+        instead of the product of their lengths. Alignments leaving the band
+        are not considered. With ``'adaptive'``, the band starts narrow and
+        is doubled until the alignment found does not touch its edges. By
+        default, the full matrices are filled.
 
     Returns
     -------
@@ -193,7 +213,8 @@ def local_pairwise_align_nucleotide(seq1, seq2, gap_open_penalty=5,
             make_identity_substitution_matrix(match_score, mismatch_score)
 
     return local_pairwise_align(seq1, seq2, gap_open_penalty,
-                                gap_extend_penalty, substitution_matrix)
+                                gap_extend_penalty, substitution_matrix,
+                                band_width=band_width)
 
 
 @experimental(as_of="0.4.0")
@@ -266,7 +287,8 @@ def local_pairwise_align_protein(seq1, seq2, gap_open_penalty=11,
 
 @experimental(as_of="0.4.0")
 def local_pairwise_align(seq1, seq2, gap_open_penalty,
-                         gap_extend_penalty, substitution_matrix):
+                         gap_extend_penalty, substitution_matrix,
+                         band_width=None):
     """Locally align exactly two seqs with Smith-Waterman
 
     Parameters
@@ -284,6 +306,15 @@ def local_pairwise_align(seq1, seq2, gap_open_penalty,
     substitution_matrix: 2D dict (or similar)
         Lookup for substitution scores (these values are added to the
         previous best alignment score).
+    band_width : int or 'adaptive', optional
+        Only fill the cells of the dynamic programming matrices that are
+        within ``band_width`` diagonals of the diagonals from ``0`` to
+        ``len(seq1) - len(seq2)``, so that the cost of the alignment is
+        proportional to the length of the sequences times ``band_width``
+        instead of the product of their lengths. Alignments leaving the band
+        are not considered. With ``'adaptive'``, the band starts narrow and
+        is doubled until the alignment found does not touch its edges. By
+        default, the full matrices are filled.
 
     Returns
     -------
@@ -315,10 +346,9 @@ def local_pairwise_align(seq1, seq2, gap_open_penalty,
     .. [2] http://www.ebi.ac.uk/Tools/psa/emboss_water/
 
     """
-    warn("You're using skbio's python implementation of Smith-Waterman "
-         "alignment. This will be very slow (e.g., thousands of times slower) "
-         "than skbio.alignment.local_pairwise_align_ssw.",
-         EfficiencyWarning)
+    warn("You're using skbio's implementation of Smith-Waterman alignment, "
+         "which does not use SIMD instructions. This will be slower than "
+         "skbio.alignment.local_pairwise_align_ssw.", EfficiencyWarning)
 
     for seq in seq1, seq2:
         if not isinstance(seq, GrammaredSequence):
@@ -334,6 +364,13 @@ def local_pairwise_align(seq1, seq2, gap_open_penalty,
     seq1 = _coerce_alignment_input_type(seq1)
     seq2 = _coerce_alignment_input_type(seq2)
 
+    if band_width is not None:
+        cols, rows, score, start_end_positions = _banded_align(
+            seq1, seq2, gap_open_penalty, gap_extend_penalty,
+            substitution_matrix, band_width, new_alignment_score=0.0)
+        aligned1, aligned2 = _aligned_sequences(seq1, seq2, cols, rows)
+        return TabularMSA(aligned1 + aligned2), score, start_end_positions
+
     score_matrix, traceback_matrix = _compute_score_and_traceback_matrices(
         seq1, seq2, gap_open_penalty, gap_extend_penalty,
         substitution_matrix, new_alignment_score=0.0,
@@ -358,7 +395,9 @@ def global_pairwise_align_nucleotide(seq1, seq2, gap_open_penalty=5,
                                      gap_extend_penalty=2,
                                      match_score=1, mismatch_score=-2,
                                      substitution_matrix=None,
-                                     penalize_terminal_gaps=False):
+                                     penalize_terminal_gaps=False,
+                                     memory='full', score_only=False,
+                                     band_width=None):
     """Globally align nucleotide seqs or alignments with Needleman-Wunsch
 
     Parameters
@@ -391,6 +430,24 @@ def global_pairwise_align_nucleotide(seq1, seq2, gap_open_penalty=5,
         the sequences being aligned are of different length. This is ``False``
         by default, which is very likely to be the behavior you want in all or
         nearly all cases.
+    memory : {'full', 'linear'}, optional
+        ``'full'`` fills the complete dynamic programming matrices.
+        ``'linear'`` computes an optimal alignment in memory proportional to
+        the length of the sequences (see ``global_pairwise_align``); it is
+        only available when aligning a pair of sequences, with
+        ``gap_extend_penalty`` not larger than ``gap_open_penalty``.
+    score_only : bool, optional
+        Only compute the alignment score, skipping the traceback. The
+        returned ``TabularMSA`` is ``None``.
+    band_width : int or 'adaptive', optional
+        Only fill the cells of the dynamic programming matrices that are
+        within ``band_width`` diagonals of the diagonals from ``0`` to
+        ``len(seq1) - len(seq2)``, so that the cost of the alignment is
+        proportional to the length of the sequences times ``band_width``
+        instead of the product of their lengths. Alignments leaving the band
+        are not considered. With ``'adaptive'``, the band starts narrow and
+        is doubled until the alignment found does not touch its edges. Only
+        available with ``memory='full'``.
 
     Returns
     -------
@@ -442,14 +499,17 @@ def global_pairwise_align_nucleotide(seq1, seq2, gap_open_penalty=5,
 
     return global_pairwise_align(seq1, seq2, gap_open_penalty,
                                  gap_extend_penalty, substitution_matrix,
-                                 penalize_terminal_gaps=penalize_terminal_gaps)
+                                 penalize_terminal_gaps=penalize_terminal_gaps,
+                                 memory=memory, score_only=score_only,
+                                 band_width=band_width)
 
 
 @experimental(as_of="0.4.0")
 def global_pairwise_align_protein(seq1, seq2, gap_open_penalty=11,
                                   gap_extend_penalty=1,
                                   substitution_matrix=None,
-                                  penalize_terminal_gaps=False):
+                                  penalize_terminal_gaps=False,
+                                  memory='full', score_only=False):
     """Globally align pair of protein seqs or alignments with Needleman-Wunsch
 
     Parameters
@@ -474,6 +534,15 @@ def global_pairwise_align_protein(seq1, seq2, gap_open_penalty=11,
         the sequences being aligned are of different length. This is ``False``
         by default, which is very likely to be the behavior you want in all or
         nearly all cases.
+    memory : {'full', 'linear'}, optional
+        ``'full'`` fills the complete dynamic programming matrices.
+        ``'linear'`` computes an optimal alignment in memory proportional to
+        the length of the sequences (see ``global_pairwise_align``); it is
+        only available when aligning a pair of sequences, with
+        ``gap_extend_penalty`` not larger than ``gap_open_penalty``.
+    score_only : bool, optional
+        Only compute the alignment score, skipping the traceback. The
+        returned ``TabularMSA`` is ``None``.
 
     Returns
     -------
@@ -526,12 +595,14 @@ def global_pairwise_align_protein(seq1, seq2, gap_open_penalty=11,
 
     return global_pairwise_align(seq1, seq2, gap_open_penalty,
                                  gap_extend_penalty, substitution_matrix,
-                                 penalize_terminal_gaps=penalize_terminal_gaps)
+                                 penalize_terminal_gaps=penalize_terminal_gaps,
+                                 memory=memory, score_only=score_only)
 
 
 @experimental(as_of="0.4.0")
 def global_pairwise_align(seq1, seq2, gap_open_penalty, gap_extend_penalty,
-                          substitution_matrix, penalize_terminal_gaps=False):
+                          substitution_matrix, penalize_terminal_gaps=False,
+                          memory='full', score_only=False, band_width=None):
     """Globally align a pair of seqs or alignments with Needleman-Wunsch
 
     Parameters
@@ -556,6 +627,24 @@ def global_pairwise_align(seq1, seq2, gap_open_penalty, gap_extend_penalty,
         the sequences being aligned are of different length. This is ``False``
         by default, which is very likely to be the behavior you want in all or
         nearly all cases.
+    memory : {'full', 'linear'}, optional
+        ``'full'`` fills the complete dynamic programming matrices.
+        ``'linear'`` computes an optimal alignment in memory proportional to
+        the length of the sequences, by divide and conquer; it is only
+        available when aligning a pair of sequences, with
+        ``gap_extend_penalty`` not larger than ``gap_open_penalty``.
+    score_only : bool, optional
+        Only compute the alignment score, skipping the traceback. The
+        returned ``TabularMSA`` is ``None``.
+    band_width : int or 'adaptive', optional
+        Only fill the cells of the dynamic programming matrices that are
+        within ``band_width`` diagonals of the diagonals from ``0`` to
+        ``len(seq1) - len(seq2)``, so that the cost of the alignment is
+        proportional to the length of the sequences times ``band_width``
+        instead of the product of their lengths. Alignments leaving the band
+        are not considered. With ``'adaptive'``, the band starts narrow and
+        is doubled until the alignment found does not touch its edges. Only
+        available with ``memory='full'``.
 
     Returns
     -------
@@ -583,6 +672,16 @@ def global_pairwise_align(seq1, seq2, gap_open_penalty, gap_extend_penalty,
     This function can be use to align either a pair of sequences, a pair of
     alignments, or a sequence and an alignment.
 
+    With ``memory='linear'``, the alignment is computed as described by Myers
+    and Miller [3]_: the middle row of the dynamic programming matrix is
+    scored from both ends, the best way to cross it splits the problem into
+    two halves, which are solved recursively, and subproblems small enough
+    are aligned with a traceback matrix. Only a few rows of scores are held
+    at a time. The resulting alignment has the optimal affine gap score,
+    which can be higher than the score found with ``memory='full'``, whose
+    recurrence only keeps the best score of each cell, so that the two modes
+    may return different alignments.
+
     References
     ----------
     .. [1] A general method applicable to the search for similarities in
@@ -590,14 +689,11 @@ def global_pairwise_align(seq1, seq2, gap_open_penalty, gap_extend_penalty,
        Needleman SB, Wunsch CD.
        J Mol Biol. 1970 Mar;48(3):443-53.
     .. [2] http://www.ebi.ac.uk/Tools/psa/emboss_needle/
+    .. [3] Optimal alignments in linear space.
+       Myers EW, Miller W.
+       Comput Appl Biosci. 1988 Mar;4(1):11-7.
 
     """
-    warn("You're using skbio's python implementation of Needleman-Wunsch "
-         "alignment. This is known to be very slow (e.g., thousands of times "
-         "slower than a native C implementation). We'll be adding a faster "
-         "version soon (see https://github.com/biocore/scikit-bio/issues/254 "
-         "to track progress on this).", EfficiencyWarning)
-
     for seq in seq1, seq2:
         # We don't need to check the case where `seq` is a `TabularMSA` with a
         # dtype that isn't a subclass of `GrammaredSequence`, this is
@@ -615,6 +711,48 @@ def global_pairwise_align(seq1, seq2, gap_open_penalty, gap_extend_penalty,
             "`seq1` and `seq2` must have the same dtype: %r != %r"
             % (seq1.dtype.__name__, seq2.dtype.__name__))
 
+    start_end_positions = [(0, seq1.shape.position - 1),
+                           (0, seq2.shape.position - 1)]
+
+    if band_width is not None and memory != 'full':
+        raise ValueError("`band_width` is only available with "
+                         "memory='full'.")
+
+    if memory == 'linear':
+        if seq1.shape.sequence != 1 or seq2.shape.sequence != 1:
+            raise ValueError(
+                "Linear memory alignment is only available for a pair of "
+                "sequences, not alignments.")
+        if gap_extend_penalty > gap_open_penalty:
+            raise ValueError(
+                "Linear memory alignment requires `gap_extend_penalty` to be "
+                "at most `gap_open_penalty`.")
+        codes1, codes2, substitution_matrix = _encode_alignment_inputs(
+            seq1, seq2, substitution_matrix)
+        if score_only:
+            score = _linear_global_score(
+                codes1, codes2, substitution_matrix, gap_open_penalty,
+                gap_extend_penalty, penalize_terminal_gaps)
+            return None, score, start_end_positions
+        cols, rows, score = _linear_global_align(
+            codes1, codes2, substitution_matrix, gap_open_penalty,
+            gap_extend_penalty, penalize_terminal_gaps)
+        aligned1, aligned2 = _aligned_sequences(seq1, seq2, cols, rows)
+        return TabularMSA(aligned1 + aligned2), score, start_end_positions
+    elif memory != 'full':
+        raise ValueError(
+            "`memory` must be 'full' or 'linear', not %r" % memory)
+
+    if band_width is not None:
+        cols, rows, score, start_end_positions = _banded_align(
+            seq1, seq2, gap_open_penalty, gap_extend_penalty,
+            substitution_matrix, band_width, new_alignment_score=-np.inf,
+            penalize_terminal_gaps=penalize_terminal_gaps)
+        if score_only:
+            return None, score, start_end_positions
+        aligned1, aligned2 = _aligned_sequences(seq1, seq2, cols, rows)
+        return TabularMSA(aligned1 + aligned2), score, start_end_positions
+
     if penalize_terminal_gaps:
         init_matrices_f = _init_matrices_nw
     else:
@@ -630,6 +768,10 @@ def global_pairwise_align(seq1, seq2, gap_open_penalty, gap_extend_penalty,
     end_row_position = traceback_matrix.shape[0] - 1
     end_col_position = traceback_matrix.shape[1] - 1
 
+    if score_only:
+        score = score_matrix[end_row_position, end_col_position]
+        return None, score, start_end_positions
+
     aligned1, aligned2, score, seq1_start_position, seq2_start_position = \
         _traceback(traceback_matrix, score_matrix, seq1, seq2,
                    end_row_position, end_col_position)
@@ -735,6 +877,288 @@ def local_pairwise_align_ssw(sequence1, sequence2, **kwargs):
     return msa, alignment.optimal_alignment_score, start_end
 
 
+@experimental(as_of="0.5.1")
+def ssw_distances(sequences, references=None, metric='identity', n_jobs=1,
+                  pool='thread', **kwargs):
+    """Compute distances between sequences with Striped Smith-Waterman.
+
+    Each sequence is used once as an SSW query: its profile is built a single
+    time and reused for every target it is compared to.
+
+    Parameters
+    ----------
+    sequences : iterable of DNA, RNA, or Protein
+        Unaligned sequences, all of the same type. Sequence IDs are taken from
+        ``metadata['id']`` when present and default to ``'0'``, ``'1'``, ...
+    references : iterable of DNA, RNA, or Protein, optional
+        Unaligned sequences to compare each of `sequences` against. If not
+        provided, all pairs of `sequences` are compared.
+    metric : {'identity', 'score'}, optional
+        ``'identity'`` uses one minus the fraction of identical positions in
+        the alignment columns of each optimal local alignment. ``'score'``
+        uses ``1 - S(a, b) / max(S(a, a), S(b, b))``, where ``S`` is the
+        optimal local alignment score; this does not compute alignments and
+        is considerably faster.
+    n_jobs : int, optional
+        Number of workers. If negative, ``cpu_count() + 1 + n_jobs`` workers
+        are used (e.g., -1 uses all CPUs).
+    pool : {'thread', 'process'}, optional
+        Kind of pool used when `n_jobs` is greater than one. Threads share the
+        sequences and write into the result directly, as the alignments
+        release the GIL.
+    kwargs : dict
+        Passed to ``skbio.alignment.StripedSmithWaterman``.
+
+    Returns
+    -------
+    DistanceMatrix or pd.DataFrame
+        The distances between all pairs of `sequences` if `references` is not
+        provided, otherwise a ``DataFrame`` of distances indexed by the IDs of
+        `sequences`, with the IDs of `references` as columns.
+
+    Raises
+    ------
+    TypeError
+        If the sequences are not all DNA, RNA, or Protein of the same type.
+    ValueError
+        If `metric` or `pool` is unknown, or if ``score_only`` is requested
+        with ``metric='identity'``.
+
+    Notes
+    -----
+    When comparing all pairs, the sequence appearing first in `sequences` is
+    used as the query of each pair.
+
+    Pairs without an alignment meeting the provided filters, or with an
+    alignment score of zero, are at distance 1. Score distances are clipped
+    at 0 for substitution matrices where ``S(a, b)`` can exceed both self
+    scores.
+
+    The following kwargs will not have any effect: `suppress_sequences`,
+    `zero_index`, and `protein`
+
+    See Also
+    --------
+    local_pairwise_align_ssw
+    skbio.alignment.StripedSmithWaterman.align_many
+
+    Examples
+    --------
+    >>> from skbio import DNA
+    >>> from skbio.alignment import ssw_distances
+    >>> seqs = [DNA('ACTAAGGCTCTCTACCC', metadata={'id': 'a'}),
+    ...         DNA('ACTAAGGCTCTCTACCC', metadata={'id': 'b'}),
+    ...         DNA('ACTATGGCTCTCTACCC', metadata={'id': 'c'})]
+    >>> dm = ssw_distances(seqs)
+    >>> dm.ids
+    ('a', 'b', 'c')
+    >>> print(round(dm['a', 'b'], 3), round(dm['a', 'c'], 3))
+    0.0 0.059
+
+    """
+    if metric not in ('identity', 'score'):
+        raise ValueError(
+            "`metric` must be 'identity' or 'score', not %r" % (metric,))
+    if pool not in ('thread', 'process'):
+        raise ValueError(
+            "`pool` must be 'thread' or 'process', not %r" % (pool,))
+    if metric == 'identity' and kwargs.get('score_only'):
+        raise ValueError(
+            "`score_only` cannot be used with metric='identity'.")
+    n_jobs = _resolve_n_jobs(n_jobs)
+
+    sequences = list(sequences)
+    seq_type = _check_ssw_distance_inputs(sequences, None)
+    queries = [str(seq) for seq in sequences]
+    ids = _ssw_distance_ids(sequences)
+    if references is None:
+        targets = queries
+    else:
+        references = list(references)
+        _check_ssw_distance_inputs(references, seq_type)
+        targets = [str(seq) for seq in references]
+
+    kwargs['suppress_sequences'] = True
+    kwargs['zero_index'] = True
+    kwargs['protein'] = seq_type is Protein
+    if metric == 'score':
+        kwargs['score_only'] = True
+
+    self_scores = None
+    if metric == 'score':
+        self_scores = _ssw_self_scores(queries, kwargs)
+        if references is not None:
+            self_scores = (self_scores, _ssw_self_scores(targets, kwargs))
+
+    n = len(queries)
+    if references is None:
+        # row i of the condensed matrix holds the distances of i to i + 1, ...
+        offsets = [i * n - i * (i + 1) // 2 for i in range(n + 1)]
+        target_starts = list(range(1, n + 1))
+        out = np.empty(offsets[-1], dtype=np.float64)
+    else:
+        offsets = [i * len(targets) for i in range(n + 1)]
+        target_starts = [0] * n
+        out = np.empty(offsets[-1], dtype=np.float64)
+
+    # a few chunks of rows per worker balance the shrinking all-pairs rows
+    # without sending the sequences to process workers too often
+    chunk = max(1, -(-n // (4 * n_jobs)))
+    bounds = [(start, min(start + chunk, n)) for start in range(0, n, chunk)]
+    if n_jobs == 1 or len(bounds) <= 1:
+        for start, stop in bounds:
+            _ssw_distance_rows(queries, targets, target_starts, start, stop,
+                               metric, self_scores, kwargs,
+                               out[offsets[start]:offsets[stop]])
+    elif pool == 'thread':
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(
+                _ssw_distance_rows, queries, targets, target_starts, start,
+                stop, metric, self_scores, kwargs,
+                out[offsets[start]:offsets[stop]])
+                for start, stop in bounds]
+            for future in futures:
+                future.result()
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            # send each worker only the sequences its rows need
+            futures = []
+            for start, stop in bounds:
+                base = start if references is None else 0
+                futures.append((start, stop, executor.submit(
+                    _ssw_distance_rows, queries[start:stop], targets[base:],
+                    [target_starts[i] - base for i in range(start, stop)],
+                    0, stop - start, metric,
+                    _ssw_self_score_slice(self_scores, start, stop, base),
+                    kwargs)))
+            for start, stop, future in futures:
+                out[offsets[start]:offsets[stop]] = future.result()
+
+    if references is None:
+        return DistanceMatrix(out, ids)
+    return pd.DataFrame(out.reshape(n, len(targets)), index=ids,
+                        columns=_ssw_distance_ids(references))
+
+
+def _check_ssw_distance_inputs(sequences, seq_type):
+    """Return the common type of `sequences`, which must be `seq_type`."""
+    for seq in sequences:
+        if not isinstance(seq, (DNA, RNA, Protein)):
+            raise TypeError(
+                "Sequences must be DNA, RNA, or Protein, not type %r"
+                % type(seq).__name__)
+        if seq_type is None:
+            seq_type = type(seq)
+        elif type(seq) is not seq_type:
+            raise TypeError(
+                "Sequences must be the same type: %r != %r"
+                % (seq_type.__name__, type(seq).__name__))
+    return seq_type
+
+
+def _ssw_distance_ids(sequences):
+    """Return the IDs of `sequences`, defaulting to their positions."""
+    return [str(seq.metadata['id'])
+            if seq.has_metadata() and 'id' in seq.metadata else str(i)
+            for i, seq in enumerate(sequences)]
+
+
+def _ssw_self_scores(sequences, kwargs):
+    """Return the optimal score of aligning each sequence to itself."""
+    return np.array(
+        [StripedSmithWaterman(seq, **kwargs)(seq).optimal_alignment_score
+         for seq in sequences], dtype=np.float64)
+
+
+def _ssw_self_score_slice(self_scores, start, stop, base):
+    """Return the self scores needed by query rows `start` to `stop`."""
+    if self_scores is None:
+        return None
+    if isinstance(self_scores, tuple):
+        return self_scores[0][start:stop], self_scores[1]
+    return self_scores[base:]
+
+
+def _ssw_distance_rows(queries, targets, target_starts, start, stop, metric,
+                       self_scores, kwargs, out=None):
+    """Compute the distances of queries `start` to `stop` into `out`.
+
+    Query ``i`` is compared to ``targets[target_starts[i]:]``, and its
+    distances are written consecutively. When `self_scores` is a single
+    array, queries and targets are both slices of it, as in the all-pairs
+    case, so that ``self_scores[k]`` is the self score of ``queries[k]``.
+
+    """
+    sizes = [len(targets) - target_starts[i] for i in range(start, stop)]
+    if out is None:
+        out = np.empty(sum(sizes), dtype=np.float64)
+    if isinstance(self_scores, tuple):
+        query_scores, target_scores = self_scores
+    else:
+        query_scores = target_scores = self_scores
+
+    position = 0
+    for i, size in zip(range(start, stop), sizes):
+        row = out[position:position + size]
+        position += size
+        if size == 0:
+            continue
+        row_targets = targets[target_starts[i]:]
+        aligner = StripedSmithWaterman(queries[i], **kwargs)
+        alignments = aligner.align_many(row_targets,
+                                        cigar=metric == 'identity')
+        if metric == 'score':
+            row_scores = target_scores[target_starts[i]:]
+            if query_scores is target_scores:
+                # all pairs: the query's self score precedes its targets'
+                self_score = query_scores[target_starts[i] - 1]
+            else:
+                self_score = query_scores[i]
+            _ssw_score_distances(alignments['optimal_alignment_score'],
+                                 self_score, row_scores, row)
+        else:
+            for k, alignment in enumerate(alignments):
+                row[k] = 1.0 - _cigar_identity(
+                    queries[i], row_targets[k], alignment['query_begin'],
+                    alignment['target_begin'], alignment['cigar'])
+    return out
+
+
+def _ssw_score_distances(scores, self_score, target_scores, out):
+    """Write ``1 - S(a, b) / max(S(a, a), S(b, b))`` into `out`."""
+    denominator = np.maximum(target_scores, self_score)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(scores, denominator, out=out)
+    out[denominator == 0] = 0.0
+    np.subtract(1.0, out, out=out)
+    np.maximum(out, 0.0, out=out)
+
+
+def _cigar_identity(query, target, query_begin, target_begin, cigar):
+    """Return the fraction of identical positions in an alignment's columns.
+
+    ``I`` operations consume the query and ``D`` operations the target, as
+    in SSW's CIGAR strings.
+
+    """
+    matches = columns = 0
+    for length, operation in _CIGAR_OPERATION.findall(cigar):
+        length = int(length)
+        columns += length
+        if operation == 'M':
+            matches += sum(
+                a == b for a, b in zip(
+                    query[query_begin:query_begin + length],
+                    target[target_begin:target_begin + length]))
+            query_begin += length
+            target_begin += length
+        elif operation == 'I':
+            query_begin += length
+        else:
+            target_begin += length
+    return matches / columns if columns else 0.0
+
+
 @deprecated(as_of="0.4.0", until="0.5.2",
             reason="Will be replaced by a SubstitutionMatrix class. To track "
                    "progress, see [#161]"
@@ -793,31 +1217,24 @@ _traceback_encoding = {'match': 1, 'vertical-gap': 2, 'horizontal-gap': 3,
 def _init_matrices_sw(aln1, aln2, gap_open_penalty, gap_extend_penalty):
     shape = (aln2.shape.position+1, aln1.shape.position+1)
     score_matrix = np.zeros(shape)
-    traceback_matrix = np.zeros(shape, dtype=np.int)
-    traceback_matrix += _traceback_encoding['uninitialized']
+    traceback_matrix = np.full(shape, _traceback_encoding['uninitialized'],
+                               dtype=np.int8)
     traceback_matrix[0, :] = _traceback_encoding['alignment-end']
     traceback_matrix[:, 0] = _traceback_encoding['alignment-end']
     return score_matrix, traceback_matrix
 
 
 def _init_matrices_nw(aln1, aln2, gap_open_penalty, gap_extend_penalty):
-    shape = (aln2.shape.position+1, aln1.shape.position+1)
-    score_matrix = np.zeros(shape)
-    traceback_matrix = np.zeros(shape, dtype=np.int)
-    traceback_matrix += _traceback_encoding['uninitialized']
-    traceback_matrix[0, 0] = _traceback_encoding['alignment-end']
-
-    # cache some values for quicker access
-    vgap = _traceback_encoding['vertical-gap']
-    hgap = _traceback_encoding['horizontal-gap']
-
-    for i in range(1, shape[0]):
-        score_matrix[i, 0] = -gap_open_penalty - ((i-1) * gap_extend_penalty)
-        traceback_matrix[i, 0] = vgap
+    score_matrix, traceback_matrix = \
+        _init_matrices_nw_no_terminal_gap_penalty(
+            aln1, aln2, gap_open_penalty, gap_extend_penalty)
 
-    for i in range(1, shape[1]):
-        score_matrix[0, i] = -gap_open_penalty - ((i-1) * gap_extend_penalty)
-        traceback_matrix[0, i] = hgap
+    score_matrix[1:, 0] = (-gap_open_penalty -
+                           np.arange(score_matrix.shape[0] - 1) *
+                           gap_extend_penalty)
+    score_matrix[0, 1:] = (-gap_open_penalty -
+                           np.arange(score_matrix.shape[1] - 1) *
+                           gap_extend_penalty)
 
     return score_matrix, traceback_matrix
 
@@ -826,48 +1243,119 @@ def _init_matrices_nw_no_terminal_gap_penalty(
         aln1, aln2, gap_open_penalty, gap_extend_penalty):
     shape = (aln2.shape.position+1, aln1.shape.position+1)
     score_matrix = np.zeros(shape)
-    traceback_matrix = np.zeros(shape, dtype=np.int)
-    traceback_matrix += _traceback_encoding['uninitialized']
+    traceback_matrix = np.full(shape, _traceback_encoding['uninitialized'],
+                               dtype=np.int8)
+    traceback_matrix[1:, 0] = _traceback_encoding['vertical-gap']
+    traceback_matrix[0, 1:] = _traceback_encoding['horizontal-gap']
     traceback_matrix[0, 0] = _traceback_encoding['alignment-end']
 
-    # cache some values for quicker access
-    vgap = _traceback_encoding['vertical-gap']
-    hgap = _traceback_encoding['horizontal-gap']
+    return score_matrix, traceback_matrix
 
-    for i in range(1, shape[0]):
-        traceback_matrix[i, 0] = vgap
 
-    for i in range(1, shape[1]):
-        traceback_matrix[0, i] = hgap
+def _encode_alignment_inputs(aln1, aln2, substitution_matrix,
+                             gap_substitution_score=0):
+    """Encode a pair of alignments for the compiled alignment engine.
 
-    return score_matrix, traceback_matrix
+    Parameters
+    ----------
+    aln1, aln2 : TabularMSA
+        The alignments to align against each other.
+    substitution_matrix : 2D dict (or similar)
+        Lookup for substitution scores of pairs of characters.
+    gap_substitution_score : int or float, optional
+        Score of aligning a gap character to any character.
 
+    Returns
+    -------
+    seq1, seq2 : 1D np.ndarray of np.intp
+        Codes of the positions of each alignment.
+    np.ndarray of float
+        Dense matrix of scores between pairs of codes.
 
-def _compute_substitution_score(aln1_chars, aln2_chars, substitution_matrix,
-                                gap_substitution_score, gap_chars):
-    substitution_score = 0
-    for aln1_char, aln2_char in product(aln1_chars, aln2_chars):
-        if aln1_char in gap_chars or aln2_char in gap_chars:
-                substitution_score += gap_substitution_score
-        else:
-            try:
-                substitution_score += \
-                    substitution_matrix[aln1_char][aln2_char]
-            except KeyError:
-                offending_chars = \
-                    [c for c in (aln1_char, aln2_char)
-                     if c not in substitution_matrix]
-                raise ValueError(
-                    "One of the sequences contains a character that is "
-                    "not contained in the substitution matrix. Are you "
-                    "using an appropriate substitution matrix for your "
-                    "sequence type (e.g., a nucleotide substitution "
-                    "matrix does not make sense for aligning protein "
-                    "sequences)? Does your sequence contain invalid "
-                    "characters? The offending character(s) is: "
-                    " %s." % ', '.join(offending_chars))
-    substitution_score /= (len(aln1_chars) * len(aln2_chars))
-    return substitution_score
+    Raises
+    ------
+    ValueError
+        If the alignments contain a (non-gap) character that is not in the
+        substitution matrix.
+
+    Notes
+    -----
+    Characters are encoded by their index in the substitution matrix, gaps
+    being encoded after them. When aligning single sequences, their codes
+    index the dense version of the substitution matrix. Otherwise, each
+    position is its own code, and the score of a pair of positions is the
+    mean score of all pairs of characters found at these positions, computed
+    at once for all pairs of positions from character counts.
+
+    """
+    chars = [c for c in substitution_matrix
+             if isinstance(c, str) and len(c) == 1 and ord(c) < 128]
+    gap_code = len(chars)
+    lookup = np.full(128, -1, dtype=np.intp)
+    lookup[[ord(c) for c in chars]] = np.arange(gap_code)
+    lookup[[ord(c) for c in aln1.dtype.gap_chars]] = gap_code
+
+    dense = np.full((gap_code + 1, gap_code + 1), np.nan)
+    for i, c1 in enumerate(chars):
+        row = substitution_matrix[c1]
+        for j, c2 in enumerate(chars):
+            if c2 in row:
+                dense[i, j] = row[c2]
+    dense[gap_code, :] = gap_substitution_score
+    dense[:, gap_code] = gap_substitution_score
+
+    codes = []
+    for aln in aln1, aln2:
+        chars_array = np.empty((aln.shape.sequence, aln.shape.position),
+                               dtype=np.uint8)
+        for i, seq in enumerate(aln):
+            chars_array[i] = seq.values.view(np.uint8)
+        aln_codes = np.where(chars_array < 128,
+                             lookup[chars_array & 127], -1)
+        if (aln_codes < 0).any():
+            offending_chars = np.unique(chars_array[aln_codes < 0])
+            _raise_missing_substitution(
+                [chr(c) for c in offending_chars])
+        codes.append(aln_codes)
+    codes1, codes2 = codes
+
+    used1 = np.unique(codes1)
+    used2 = np.unique(codes2)
+    missing = np.isnan(dense[np.ix_(used1, used2)])
+    if missing.any():
+        rows, cols = np.nonzero(missing)
+        _raise_missing_substitution(
+            sorted({chars[used1[i]] for i in rows} |
+                   {chars[used2[j]] for j in cols}))
+
+    if codes1.shape[0] == 1 and codes2.shape[0] == 1:
+        return codes1[0], codes2[0], dense
+
+    dense[np.isnan(dense)] = 0.0
+    counts = []
+    for aln_codes in codes1, codes2:
+        # the positions broadcast against the codes of each sequence
+        positions = np.arange(aln_codes.shape[1])[np.newaxis, :]
+        aln_counts = np.zeros((aln_codes.shape[1], gap_code + 1))
+        np.add.at(aln_counts, (positions, aln_codes), 1)
+        counts.append(aln_counts)
+    scores = counts[0].dot(dense).dot(counts[1].T)
+    if scores.size:
+        scores /= codes1.shape[0] * codes2.shape[0]
+    return (np.arange(codes1.shape[1], dtype=np.intp),
+            np.arange(codes2.shape[1], dtype=np.intp), scores)
+
+
+def _raise_missing_substitution(offending_chars):
+    raise ValueError(
+        "One of the sequences contains a character that is "
+        "not contained in the substitution matrix. Are you "
+        "using an appropriate substitution matrix for your "
+        "sequence type (e.g., a nucleotide substitution "
+        "matrix does not make sense for aligning protein "
+        "sequences)? Does your sequence contain invalid "
+        "characters? The offending character(s) is: "
+        " %s." % ', '.join(offending_chars))
 
 
 def _compute_score_and_traceback_matrices(
@@ -889,167 +1377,328 @@ def _compute_score_and_traceback_matrices(
     that users are most likely to be looking for.
 
     """
-    aln1_length = aln1.shape.position
-    aln2_length = aln2.shape.position
-    # cache some values for quicker/simpler access
-    aend = _traceback_encoding['alignment-end']
-    match = _traceback_encoding['match']
-    vgap = _traceback_encoding['vertical-gap']
-    hgap = _traceback_encoding['horizontal-gap']
-
-    new_alignment_score = (new_alignment_score, aend)
+    seq1, seq2, substitution_matrix = _encode_alignment_inputs(
+        aln1, aln2, substitution_matrix, gap_substitution_score)
 
     # Initialize a matrix to use for scoring the alignment and for tracing
     # back the best alignment
     score_matrix, traceback_matrix = init_matrices_f(
         aln1, aln2, gap_open_penalty, gap_extend_penalty)
 
-    # Iterate over the characters in aln2 (which corresponds to the vertical
-    # sequence in the matrix)
-    for aln2_pos, aln2_chars in enumerate(aln2.iter_positions(
-            ignore_metadata=True), 1):
-        aln2_chars = str(aln2_chars)
-
-        # Iterate over the characters in aln1 (which corresponds to the
-        # horizontal sequence in the matrix)
-        for aln1_pos, aln1_chars in enumerate(aln1.iter_positions(
-                ignore_metadata=True), 1):
-            aln1_chars = str(aln1_chars)
-
-            # compute the score for a match/mismatch
-            substitution_score = _compute_substitution_score(
-                aln1_chars, aln2_chars, substitution_matrix,
-                gap_substitution_score, aln1.dtype.gap_chars)
-
-            diag_score = \
-                (score_matrix[aln2_pos-1, aln1_pos-1] + substitution_score,
-                 match)
-
-            # compute the score for adding a gap in aln2 (vertical)
-            if not penalize_terminal_gaps and (aln1_pos == aln1_length):
-                # we've reached the end of aln1, so adding vertical gaps
-                # (which become gaps in aln1) should no longer
-                # be penalized (if penalize_terminal_gaps == False)
-                up_score = (score_matrix[aln2_pos-1, aln1_pos], vgap)
-            elif traceback_matrix[aln2_pos-1, aln1_pos] == vgap:
-                # gap extend, because the cell above was also a gap
-                up_score = \
-                    (score_matrix[aln2_pos-1, aln1_pos] - gap_extend_penalty,
-                     vgap)
-            else:
-                # gap open, because the cell above was not a gap
-                up_score = \
-                    (score_matrix[aln2_pos-1, aln1_pos] - gap_open_penalty,
-                     vgap)
-
-            # compute the score for adding a gap in aln1 (horizontal)
-            if not penalize_terminal_gaps and (aln2_pos == aln2_length):
-                # we've reached the end of aln2, so adding horizontal gaps
-                # (which become gaps in aln2) should no longer
-                # be penalized (if penalize_terminal_gaps == False)
-                left_score = (score_matrix[aln2_pos, aln1_pos-1], hgap)
-            elif traceback_matrix[aln2_pos, aln1_pos-1] == hgap:
-                # gap extend, because the cell to the left was also a gap
-                left_score = \
-                    (score_matrix[aln2_pos, aln1_pos-1] - gap_extend_penalty,
-                     hgap)
-            else:
-                # gap open, because the cell to the left was not a gap
-                left_score = \
-                    (score_matrix[aln2_pos, aln1_pos-1] - gap_open_penalty,
-                     hgap)
-
-            # identify the largest score, and use that information to populate
-            # the score and traceback matrices
-            best_score = _first_largest([new_alignment_score, left_score,
-                                         diag_score, up_score])
-            score_matrix[aln2_pos, aln1_pos] = best_score[0]
-            traceback_matrix[aln2_pos, aln1_pos] = best_score[1]
+    # Fill the matrices with the compiled engine, aln1 corresponding to the
+    # horizontal sequence in the matrix and aln2 to the vertical one
+    _fill_matrices(seq1, seq2, substitution_matrix, score_matrix,
+                   traceback_matrix, gap_open_penalty, gap_extend_penalty,
+                   new_alignment_score, penalize_terminal_gaps)
 
     return score_matrix, traceback_matrix
 
 
 def _traceback(traceback_matrix, score_matrix, aln1, aln2, start_row,
                start_col):
-    # cache some values for simpler reference
-    aend = _traceback_encoding['alignment-end']
-    match = _traceback_encoding['match']
-    vgap = _traceback_encoding['vertical-gap']
-    hgap = _traceback_encoding['horizontal-gap']
-    gap_character = aln1.dtype.default_gap_char
-
-    # initialize the result alignments
-    aln1_sequence_count = aln1.shape.sequence
-    aligned_seqs1 = [[] for e in range(aln1_sequence_count)]
-
-    aln2_sequence_count = aln2.shape.sequence
-    aligned_seqs2 = [[] for e in range(aln2_sequence_count)]
-
-    current_row = start_row
-    current_col = start_col
-
-    best_score = score_matrix[current_row, current_col]
-    current_value = None
-
-    while current_value != aend:
-        current_value = traceback_matrix[current_row, current_col]
-
-        if current_value == match:
-            for aligned_seq, input_seq in zip(aligned_seqs1, aln1):
-                aligned_seq.append(str(input_seq[current_col-1]))
-            for aligned_seq, input_seq in zip(aligned_seqs2, aln2):
-                aligned_seq.append(str(input_seq[current_row-1]))
-            current_row -= 1
-            current_col -= 1
-        elif current_value == vgap:
-            for aligned_seq in aligned_seqs1:
-                aligned_seq.append(gap_character)
-            for aligned_seq, input_seq in zip(aligned_seqs2, aln2):
-                aligned_seq.append(str(input_seq[current_row-1]))
-            current_row -= 1
-        elif current_value == hgap:
-            for aligned_seq, input_seq in zip(aligned_seqs1, aln1):
-                aligned_seq.append(str(input_seq[current_col-1]))
-            for aligned_seq in aligned_seqs2:
-                aligned_seq.append(gap_character)
-            current_col -= 1
-        elif current_value == aend:
-            continue
-        else:
-            raise ValueError(
-                "Invalid value in traceback matrix: %s" % current_value)
-
-    for i, (aligned_seq, original) in enumerate(zip(aligned_seqs1, aln1)):
-        aligned_seq = ''.join(aligned_seq)[::-1]
-        constructor = aln1.dtype
-        metadata = None
-        if original.has_metadata():
-            metadata = original.metadata
-        aligned_seqs1[i] = constructor(aligned_seq, metadata=metadata,
-                                       validate=False)
-
-    for i, (aligned_seq, original) in enumerate(zip(aligned_seqs2, aln2)):
-        aligned_seq = ''.join(aligned_seq)[::-1]
-        constructor = aln2.dtype
-        metadata = None
-        if original.has_metadata():
-            metadata = original.metadata
-        aligned_seqs2[i] = constructor(aligned_seq, metadata=metadata,
-                                       validate=False)
+    traceback_matrix = np.ascontiguousarray(traceback_matrix, dtype=np.int8)
+
+    best_score = score_matrix[start_row, start_col]
+    cols, rows, current_row, current_col = _trace_path(
+        traceback_matrix, start_row, start_col)
+    aligned_seqs1, aligned_seqs2 = _aligned_sequences(aln1, aln2, cols, rows)
 
     return aligned_seqs1, aligned_seqs2, best_score, current_col, current_row
 
 
-def _first_largest(scores):
-    """ Similar to max, but returns the first element achieving the high score
+def _aligned_sequences(aln1, aln2, cols, rows):
+    """Build the aligned sequences from the positions in each column.
+
+    Positions of ``-1`` in `cols` (`rows`) are gaps in `aln1` (`aln2`).
 
-    If max receives a tuple, it will break a tie for the highest value
-    of entry[i] with entry[i+1]. We don't want that here - to better match
-    with the results of other tools, we want to be able to define which
-    entry is returned in the case of a tie.
     """
-    result = scores[0]
-    for score, direction in scores[1:]:
-        if score > result[0]:
-            result = (score, direction)
-    return result
+    gap_character = ord(aln1.dtype.default_gap_char)
+    aligned_seqs = []
+    for aln, positions in (aln1, cols), (aln2, rows):
+        aligned = []
+        is_char = positions >= 0
+        for original in aln:
+            aligned_seq = np.full(positions.shape[0], gap_character,
+                                  dtype=np.uint8)
+            aligned_seq[is_char] = \
+                original.values.view(np.uint8)[positions[is_char]]
+            metadata = None
+            if original.has_metadata():
+                metadata = original.metadata
+            aligned.append(aln.dtype(aligned_seq, metadata=metadata,
+                                     validate=False))
+        aligned_seqs.append(aligned)
+    return aligned_seqs
+
+
+# Initial width of adaptive bands, which is doubled until the alignment does
+# not touch the edges of the band.
+_ADAPTIVE_BAND_WIDTH = 16
+
+
+def _banded_align(aln1, aln2, gap_open_penalty, gap_extend_penalty,
+                  substitution_matrix, band_width, new_alignment_score,
+                  penalize_terminal_gaps=True):
+    """Align within a band of diagonals of the dynamic programming matrices.
+
+    Parameters
+    ----------
+    aln1, aln2 : TabularMSA
+        The alignments to align against each other.
+    gap_open_penalty, gap_extend_penalty, substitution_matrix
+        As in ``_compute_score_and_traceback_matrices``.
+    band_width : int or 'adaptive'
+        Number of diagonals on each side of the diagonals from ``0`` to
+        ``len(aln1) - len(aln2)`` included in the band. With ``'adaptive'``,
+        the band is doubled until the alignment does not touch its edges
+        (other than the edges of the full matrices).
+    new_alignment_score : float
+        ``0`` for local alignment, which ends at the best cell of the band,
+        or ``-inf`` for global alignment, which ends at the last cell.
+    penalize_terminal_gaps : bool, optional
+        Whether terminal gaps are penalized in global alignment.
+
+    Returns
+    -------
+    cols, rows : 1D np.ndarray of np.intp
+        Positions of `aln1` and `aln2` in each column of the alignment, ``-1``
+        marking gaps.
+    float
+        Score of the alignment.
+    list of tuple
+        Start and end positions of each alignment.
+
+    """
+    adaptive = isinstance(band_width, str) and band_width == 'adaptive'
+    if not adaptive and (isinstance(band_width, str) or
+                         band_width != int(band_width) or band_width < 0):
+        raise ValueError("`band_width` must be a non-negative integer or "
+                         "'adaptive', not %r" % (band_width,))
+    width = _ADAPTIVE_BAND_WIDTH if adaptive else int(band_width)
+
+    seq1, seq2, substitution_matrix = _encode_alignment_inputs(
+        aln1, aln2, substitution_matrix)
+    n1, n2 = seq1.shape[0], seq2.shape[0]
+    local = new_alignment_score == 0
+
+    while True:
+        lower = max(min(0, n1 - n2) - width, -n2)
+        upper = min(max(0, n1 - n2) + width, n1)
+        score_matrix, traceback_matrix = _init_banded_matrices(
+            n1, n2, lower, upper, gap_open_penalty, gap_extend_penalty,
+            local, penalize_terminal_gaps)
+        _fill_banded_matrices(seq1, seq2, substitution_matrix, score_matrix,
+                              traceback_matrix, lower, gap_open_penalty,
+                              gap_extend_penalty, new_alignment_score,
+                              penalize_terminal_gaps)
+
+        if local:
+            # cells are in the same order as in the full matrix, so that
+            # ties are resolved in the same way
+            end_row, end_band = np.unravel_index(np.argmax(score_matrix),
+                                                 score_matrix.shape)
+            end_col = end_row + lower + end_band
+        else:
+            end_row, end_col = n2, n1
+        cols, rows, start_row, start_col, low, high = _trace_banded_path(
+            traceback_matrix, lower, end_row, end_col)
+
+        if (not adaptive or
+                ((low > lower or lower == -n2) and
+                 (high < upper or upper == n1))):
+            break
+        width *= 2
+
+    score = score_matrix[end_row, end_col - end_row - lower]
+    return cols, rows, score, [(start_col, end_col - 1),
+                               (start_row, end_row - 1)]
+
+
+def _init_banded_matrices(n1, n2, lower, upper, gap_open_penalty,
+                          gap_extend_penalty, local, penalize_terminal_gaps):
+    """Initialize banded score and traceback matrices.
+
+    Cell ``(i, j)`` of the full matrices is stored at ``(i, j - i - lower)``.
+    Cells of the first row and column are initialized as by the
+    ``_init_matrices_*`` functions, and cells outside of the full matrices
+    are ``-inf`` (uninitialized in the traceback matrix).
+
+    """
+    shape = (n2 + 1, upper - lower + 1)
+    score_matrix = np.full(shape, -np.inf)
+    traceback_matrix = np.full(shape, _traceback_encoding['uninitialized'],
+                               dtype=np.int8)
+
+    first_row = np.arange(max(0, lower), upper + 1)
+    first_col = np.arange(max(0, -upper), -lower + 1)
+    first_row_band = first_row - lower
+    first_col_band = -first_col - lower
+
+    score_matrix[0, first_row_band] = 0.0
+    score_matrix[first_col, first_col_band] = 0.0
+    if local:
+        traceback_matrix[0, first_row_band] = \
+            _traceback_encoding['alignment-end']
+        traceback_matrix[first_col, first_col_band] = \
+            _traceback_encoding['alignment-end']
+    else:
+        traceback_matrix[0, first_row_band] = \
+            _traceback_encoding['horizontal-gap']
+        traceback_matrix[first_col, first_col_band] = \
+            _traceback_encoding['vertical-gap']
+        if penalize_terminal_gaps:
+            score_matrix[0, first_row_band] = \
+                -gap_open_penalty - (first_row - 1) * gap_extend_penalty
+            score_matrix[first_col, first_col_band] = \
+                -gap_open_penalty - (first_col - 1) * gap_extend_penalty
+    score_matrix[0, -lower] = 0.0
+    traceback_matrix[0, -lower] = _traceback_encoding['alignment-end']
+    return score_matrix, traceback_matrix
+
+
+# Subproblems of linear memory alignment with at most this many cells are
+# aligned with a traceback matrix (one byte per cell).
+_LINEAR_ALIGNMENT_BASE_CELLS = 1 << 20
+
+
+def _linear_global_score(seq1, seq2, substitution_matrix, gap_open_penalty,
+                         gap_extend_penalty, penalize_terminal_gaps):
+    """Score of an optimal global alignment, in linear memory."""
+    score_row, _, score_column = _gotoh_last_rows(
+        seq1, seq2, substitution_matrix, gap_open_penalty, gap_extend_penalty,
+        free_leading_gaps=not penalize_terminal_gaps)
+    if penalize_terminal_gaps:
+        return score_row[-1]
+    # trailing gaps are free too, so the alignment can end anywhere on the
+    # last row or column
+    return max(score_row.max(), score_column.max())
+
+
+def _linear_global_align(seq1, seq2, substitution_matrix, gap_open_penalty,
+                         gap_extend_penalty, penalize_terminal_gaps):
+    """Optimal global alignment of two encoded sequences, in linear memory.
+
+    Returns
+    -------
+    cols, rows : 1D np.ndarray of np.intp
+        Positions of `seq1` and `seq2` in each column of the alignment, ``-1``
+        marking gaps.
+    float
+        Score of the alignment.
+
+    Notes
+    -----
+    Without terminal gap penalties, the best end of the alignment on the last
+    row or column is found first, then its best start on the first row or
+    column, by scoring the reversed sequences. The alignment between these
+    two cells is then computed with terminal gap penalties, and the free
+    terminal gaps are added around it.
+
+    """
+    n1, n2 = seq1.shape[0], seq2.shape[0]
+    if penalize_terminal_gaps:
+        start1, start2, end1, end2 = 0, 0, n1, n2
+    else:
+        score_row, _, score_column = _gotoh_last_rows(
+            seq1, seq2, substitution_matrix, gap_open_penalty,
+            gap_extend_penalty, free_leading_gaps=True)
+        end1, end2 = _best_terminal_cell(score_row, score_column)
+        score_row, _, score_column = _gotoh_last_rows(
+            seq1[end1 - 1::-1] if end1 else seq1[:0],
+            seq2[end2 - 1::-1] if end2 else seq2[:0],
+            substitution_matrix, gap_open_penalty, gap_extend_penalty)
+        start1, start2 = _best_terminal_cell(score_row, score_column)
+        start1, start2 = end1 - start1, end2 - start2
+
+    segments = []
+    score = _hirschberg(seq1[start1:end1], seq2[start2:end2],
+                        substitution_matrix, gap_open_penalty,
+                        gap_extend_penalty, False, False, start1, start2,
+                        segments)
+
+    # free leading and trailing gaps, at most one of each
+    leading = np.arange(max(start1, start2), dtype=np.intp)
+    trailing1 = np.arange(end1, n1, dtype=np.intp)
+    trailing2 = np.arange(end2, n2, dtype=np.intp)
+    gaps = np.full(max(start1, start2, n1 - end1, n2 - end2), -1,
+                   dtype=np.intp)
+    cols = [leading if start1 else gaps[:start2]]
+    rows = [leading if start2 else gaps[:start1]]
+    cols.extend(segment[0] for segment in segments)
+    rows.extend(segment[1] for segment in segments)
+    cols.append(trailing1 if end2 == n2 else gaps[:n2 - end2])
+    rows.append(trailing2 if end2 < n2 else gaps[:n1 - end1])
+    return np.concatenate(cols), np.concatenate(rows), score
+
+
+def _best_terminal_cell(score_row, score_column):
+    """Best cell on the last row or column, preferring the corner."""
+    n1 = score_row.shape[0] - 1
+    n2 = score_column.shape[0] - 1
+    best_col = np.argmax(score_row)
+    best_row = np.argmax(score_column)
+    if score_row[n1] >= max(score_row[best_col], score_column[best_row]):
+        return n1, n2
+    if score_row[best_col] >= score_column[best_row]:
+        return best_col, n2
+    return n1, best_row
+
+
+def _hirschberg(seq1, seq2, substitution_matrix, gap_open_penalty,
+                gap_extend_penalty, start_in_gap, end_in_gap, offset1, offset2,
+                segments):
+    """Append the columns of an optimal alignment to `segments`.
+
+    The alignment of `seq1` and `seq2` is split on the middle row of `seq2`
+    as described by Myers and Miller, and each half aligned recursively.
+    `start_in_gap` (`end_in_gap`) indicates that a vertical gap continues
+    before (after) the alignment, so that a leading (trailing) vertical gap
+    is not penalized for opening. Returns the score of the alignment.
+
+    """
+    n1, n2 = seq1.shape[0], seq2.shape[0]
+    if n2 <= 1 or (n1 + 1) * (n2 + 1) <= _LINEAR_ALIGNMENT_BASE_CELLS:
+        cols, rows, score = _gotoh_align(
+            seq1, seq2, substitution_matrix, gap_open_penalty,
+            gap_extend_penalty, start_in_gap, end_in_gap)
+        segments.append((np.where(cols >= 0, cols + offset1, -1),
+                         np.where(rows >= 0, rows + offset2, -1)))
+        return score
+
+    mid = n2 // 2
+    forward_score, forward_vertical, _ = _gotoh_last_rows(
+        seq1, seq2[:mid], substitution_matrix, gap_open_penalty,
+        gap_extend_penalty, start_in_gap=start_in_gap)
+    reverse_score, reverse_vertical, _ = _gotoh_last_rows(
+        seq1[::-1], seq2[:mid - 1:-1], substitution_matrix, gap_open_penalty,
+        gap_extend_penalty, start_in_gap=end_in_gap)
+
+    # cross the middle row at a cell, or with a vertical gap covering the
+    # last position of the first half and the first of the second half
+    through = forward_score + reverse_score[::-1]
+    across = (forward_vertical + reverse_vertical[::-1] + gap_open_penalty -
+              gap_extend_penalty)
+    through_col = np.argmax(through)
+    across_col = np.argmax(across)
+
+    if through[through_col] >= across[across_col]:
+        col = through_col
+        _hirschberg(seq1[:col], seq2[:mid], substitution_matrix,
+                    gap_open_penalty, gap_extend_penalty, start_in_gap,
+                    False, offset1, offset2, segments)
+        _hirschberg(seq1[col:], seq2[mid:], substitution_matrix,
+                    gap_open_penalty, gap_extend_penalty, False, end_in_gap,
+                    offset1 + col, offset2 + mid, segments)
+        return through[col]
+
+    col = across_col
+    _hirschberg(seq1[:col], seq2[:mid - 1], substitution_matrix,
+                gap_open_penalty, gap_extend_penalty, start_in_gap, True,
+                offset1, offset2, segments)
+    segments.append((np.array([-1, -1], dtype=np.intp),
+                     np.array([offset2 + mid - 1, offset2 + mid],
+                              dtype=np.intp)))
+    _hirschberg(seq1[col:], seq2[mid + 1:], substitution_matrix,
+                gap_open_penalty, gap_extend_penalty, True, end_in_gap,
+                offset1 + col, offset2 + mid + 1, segments)
+    return across[col]
@@ -6,7 +6,10 @@
 #  The full license is in the file COPYING.txt, distributed with this software.
 # -----------------------------------------------------------------------------
 
+from concurrent.futures import ThreadPoolExecutor
+
 from cpython cimport bool
+cimport cython
 import numpy as np
 cimport numpy as cnp
 from skbio.sequence import Protein, Sequence
@@ -43,7 +46,7 @@ cdef extern from "_lib/ssw.h":
                             const cnp.uint8_t flag,
                             const cnp.uint16_t filters,
                             const cnp.int32_t filterd,
-                            const cnp.int32_t maskLen)
+                            const cnp.int32_t maskLen) nogil
 
     cdef void align_destroy(s_align* a)
 
@@ -70,6 +73,19 @@ np_nt_table = np.array([
 mid_table = np.array(['M', 'I', 'D'])
 
 
+cdef str _cigar_to_string(const s_align* align):
+    cigar_list = []
+    for i in range(align.cigarLen):
+        # stored the same as that in BAM format,
+        # high 28 bits: length, low 4 bits: M/I/D (0/1/2)
+
+        # Length, remove first 4 bits
+        cigar_list.append(str(align.cigar[i] >> 4))
+        # M/I/D, lookup first 4 bits in the mid_table
+        cigar_list.append(mid_table[align.cigar[i] & 0xf])
+    return "".join(cigar_list)
+
+
 cdef class AlignmentStructure:
     """Wraps the result of an alignment c struct so it is accessible to Python
 
@@ -261,17 +277,8 @@ cdef class AlignmentStructure:
         # Memoization! (1/2)
         if self._cigar_string is not None:
             return self._cigar_string
-        cigar_list = []
-        for i in range(self.p.cigarLen):
-            # stored the same as that in BAM format,
-            # high 28 bits: length, low 4 bits: M/I/D (0/1/2)
-
-            # Length, remove first 4 bits
-            cigar_list.append(str(self.p.cigar[i] >> 4))
-            # M/I/D, lookup first 4 bits in the mid_table
-            cigar_list.append(mid_table[self.p.cigar[i] & 0xf])
         # Memoization! (2/2)
-        self._cigar_string = "".join(cigar_list)
+        self._cigar_string = _cigar_to_string(self.p)
         return self._cigar_string
 
     @property
@@ -650,6 +657,138 @@ cdef class StripedSmithWaterman:
         alignment.__constructor(align)  # Hack to get a pointer through
         return alignment
 
+    def align_many(self, target_sequences, n_threads=1, cigar=True):
+        """Align many target sequences to `query_sequence`
+
+        Parameters
+        ----------
+        target_sequences : iterable of str
+            The target sequences.
+        n_threads : int, optional
+            Number of threads aligning the target sequences concurrently.
+            Default is 1.
+        cigar : bool, optional
+            Whether to include the cigar string of each alignment.
+            Default is True.
+
+        Returns
+        -------
+        np.ndarray
+            Structured array with one record per target sequence. Its
+            fields are ``optimal_alignment_score``,
+            ``suboptimal_alignment_score``, ``target_begin``,
+            ``target_end_optimal``, ``target_end_suboptimal``,
+            ``query_begin``, ``query_end`` and, if `cigar` is True,
+            ``cigar``, with the same values as the corresponding attributes
+            of ``AlignmentStructure``.
+
+        Notes
+        -----
+        The target sequences are encoded at once into a single buffer, and
+        are aligned without holding the GIL, so that threads align them in
+        parallel. No ``AlignmentStructure`` is created.
+
+        Empty target sequences are not aligned: their records have scores of
+        0, positions of -1 and an empty cigar.
+
+        Examples
+        --------
+        >>> from skbio.alignment import StripedSmithWaterman
+        >>> query = StripedSmithWaterman("ACTAAGGCTCTC")
+        >>> results = query.align_many(["AAAAAACTCTCTAAACTCACTAAGGCTCTCTACCC",
+        ...                             "ACTAAGGCTCCC"])
+        >>> results['optimal_alignment_score'].tolist()
+        [24, 20]
+        >>> results['cigar'].tolist()
+        ['12M', '10M']
+
+        """
+        if n_threads < 1:
+            raise ValueError("`n_threads` must be at least 1.")
+
+        target_sequences = [str(seq) for seq in target_sequences]
+        cdef Py_ssize_t n_targets = len(target_sequences), i
+        offsets = np.zeros(n_targets + 1, dtype=np.int64)
+        np.cumsum([len(seq) for seq in target_sequences], out=offsets[1:])
+        table = np_aa_table if self.is_protein else np_nt_table
+        # characters outside of ASCII are encoded as unknown
+        chars = np.frombuffer(
+            "".join(target_sequences).encode('ascii', 'replace'),
+            dtype=np.uint8)
+        references = table.astype(np.int8)[chars]
+        if references.shape[0] == 0:
+            # keep a valid pointer to the data of empty buffers
+            references = np.zeros(1, dtype=np.int8)
+        alignments = np.zeros(n_targets, dtype=np.uintp)
+
+        if n_threads == 1 or n_targets < 2:
+            self._align_range(references, offsets, alignments, 0, n_targets)
+        else:
+            chunk = -(-n_targets // (8 * n_threads))
+            with ThreadPoolExecutor(n_threads) as executor:
+                for future in [
+                        executor.submit(self._align_range, references,
+                                        offsets, alignments, start,
+                                        min(start + chunk, n_targets))
+                        for start in range(0, n_targets, chunk)]:
+                    future.result()
+
+        fields = [('optimal_alignment_score', np.uint16),
+                  ('suboptimal_alignment_score', np.uint16),
+                  ('target_begin', np.int32),
+                  ('target_end_optimal', np.int32),
+                  ('target_end_suboptimal', np.int32),
+                  ('query_begin', np.int32),
+                  ('query_end', np.int32)]
+        if cigar:
+            fields.append(('cigar', object))
+        results = np.empty(n_targets, dtype=fields)
+        cdef cnp.uintp_t[::1] pointers = alignments
+        cdef s_align* align
+        cdef cnp.int32_t index = self.index_starts_at
+        try:
+            for i in range(n_targets):
+                if offsets[i + 1] == offsets[i]:
+                    results[i] = (0, 0, -1, -1, -1, -1, -1) + (
+                        ('',) if cigar else ())
+                    continue
+                align = <s_align*> pointers[i]
+                if align is NULL:
+                    raise MemoryError("Could not align target sequence %d."
+                                      % i)
+                results[i] = (
+                    align.score1, align.score2,
+                    align.ref_begin1 + index if align.ref_begin1 >= 0
+                    else -1,
+                    align.ref_end1 + index, align.ref_end2 + index,
+                    align.read_begin1 + index if align.read_begin1 >= 0
+                    else -1,
+                    align.read_end1 + index) + (
+                    (_cigar_to_string(align),) if cigar else ())
+        finally:
+            for i in range(n_targets):
+                if pointers[i]:
+                    align_destroy(<s_align*> pointers[i])
+        return results
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def _align_range(self, cnp.int8_t[::1] references,
+                     cnp.int64_t[::1] offsets, cnp.uintp_t[::1] alignments,
+                     Py_ssize_t start, Py_ssize_t stop):
+        cdef Py_ssize_t i
+        with nogil:
+            for i in range(start, stop):
+                if offsets[i + 1] == offsets[i]:
+                    # ssw_align is undefined for empty references
+                    continue
+                alignments[i] = <cnp.uintp_t> ssw_align(
+                    self.profile, &references[0] + offsets[i],
+                    offsets[i + 1] - offsets[i], self.gap_open_penalty,
+                    self.gap_extend_penalty, self.bit_flag,
+                    self.score_filter, self.distance_filter,
+                    self.mask_length)
+
     def __dealloc__(self):
         if self.profile is not NULL:
             init_destroy(self.profile)
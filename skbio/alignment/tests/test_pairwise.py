@@ -17,10 +17,14 @@ from skbio.alignment import (
     global_pairwise_align_nucleotide, local_pairwise_align_nucleotide,
     make_identity_substitution_matrix, local_pairwise_align,
     global_pairwise_align)
+from skbio.alignment import _pairwise
 from skbio.alignment._pairwise import (
     _init_matrices_sw, _init_matrices_nw,
-    _compute_score_and_traceback_matrices, _traceback, _first_largest,
-    _compute_substitution_score)
+    _compute_score_and_traceback_matrices, _traceback,
+    _encode_alignment_inputs)
+from skbio.alignment.__pairwise import (_fill_matrices,
+                                        _fill_banded_matrices,
+                                        _trace_banded_path)
 from skbio.sequence import GrammaredSequence
 from skbio.util import classproperty
 from skbio.util._decorator import overrides
@@ -48,6 +52,32 @@ class CustomSequence(GrammaredSequence):
         return {}
 
 
+def _affine_score(msa, substitution_matrix, gap_open_penalty,
+                  gap_extend_penalty, penalize_terminal_gaps):
+    # independent scoring of a pairwise alignment with affine gap penalties
+    seqs = [str(seq) for seq in msa]
+    ends = []
+    for seq in seqs:
+        chars = [i for i, c in enumerate(seq) if c != '-']
+        ends.append((chars[0], chars[-1]) if chars else (len(seq), -1))
+    score = 0.0
+    previous = None
+    for i, (c1, c2) in enumerate(zip(*seqs)):
+        if c1 != '-' and c2 != '-':
+            score += substitution_matrix[c1][c2]
+            previous = None
+            continue
+        gapped = 1 if c2 == '-' else 0
+        first, last = ends[gapped]
+        if not penalize_terminal_gaps and (i < first or i > last):
+            previous = None
+            continue
+        score -= (gap_extend_penalty if previous == gapped
+                  else gap_open_penalty)
+        previous = gapped
+    return score
+
+
 class PairwiseAlignmentTests(TestCase):
     """
         Note: In the high-level tests, the expected results were derived with
@@ -424,6 +454,159 @@ class PairwiseAlignmentTests(TestCase):
         self.assertRaises(TypeError, global_pairwise_align_nucleotide,
                           DNA("ACGT"), 42)
 
+    def test_global_pairwise_align_linear_memory(self):
+        obs = global_pairwise_align_protein(
+            Protein("HEAGAWGHEE"), Protein("PAWHEAE"), gap_open_penalty=10.,
+            gap_extend_penalty=5., memory='linear')
+        exp = global_pairwise_align_protein(
+            Protein("HEAGAWGHEE"), Protein("PAWHEAE"), gap_open_penalty=10.,
+            gap_extend_penalty=5.)
+        self.assertEqual(obs, exp)
+
+        seq1 = DNA("ACCGTGGACCGTTAGGATTGGACCCAAGGTTG")
+        seq2 = DNA("T"*25 + "ACCGTGGACCGTAGGATTGGACCAAGGTTA" + "A"*25)
+        substitution_matrix = make_identity_substitution_matrix(5, -4)
+        for penalize_terminal_gaps, exp_score in (False, 131.0), (True, 97.0):
+            obs_msa, obs_score, obs_start_end = \
+                global_pairwise_align_nucleotide(
+                    seq1, seq2, gap_open_penalty=5., gap_extend_penalty=0.5,
+                    match_score=5, mismatch_score=-4,
+                    penalize_terminal_gaps=penalize_terminal_gaps,
+                    memory='linear')
+            self.assertEqual(obs_score, exp_score)
+            self.assertEqual(obs_msa[0].degap(), seq1)
+            self.assertEqual(obs_msa[1].degap(), seq2)
+            self.assertEqual(obs_start_end, [(0, 31), (0, 79)])
+            self.assertEqual(
+                _affine_score(obs_msa, substitution_matrix, 5., 0.5,
+                              penalize_terminal_gaps), obs_score)
+
+    def test_global_pairwise_align_linear_memory_random(self):
+        # small subproblems are solved with a traceback matrix, so force the
+        # divide and conquer down to single rows
+        np.random.seed(0)
+        substitution_matrix = make_identity_substitution_matrix(2, -3)
+        base_cells = _pairwise._LINEAR_ALIGNMENT_BASE_CELLS
+        try:
+            for base in 0, 20:
+                _pairwise._LINEAR_ALIGNMENT_BASE_CELLS = base
+                for _ in range(50):
+                    seq1, seq2 = (
+                        DNA(''.join(np.random.choice(list('ACGT'), n)))
+                        for n in np.random.randint(1, 30, 2))
+                    gap_open, gap_extend = sorted(
+                        np.random.choice([1, 2, 5], 2), reverse=True)
+                    for penalize_terminal_gaps in False, True:
+                        kwargs = dict(
+                            gap_open_penalty=gap_open,
+                            gap_extend_penalty=gap_extend,
+                            substitution_matrix=substitution_matrix,
+                            penalize_terminal_gaps=penalize_terminal_gaps)
+                        obs_msa, obs_score, _ = \
+                            global_pairwise_align_nucleotide(
+                                seq1, seq2, memory='linear', **kwargs)
+                        self.assertEqual(obs_msa[0].degap(), seq1)
+                        self.assertEqual(obs_msa[1].degap(), seq2)
+                        self.assertAlmostEqual(
+                            _affine_score(obs_msa, substitution_matrix,
+                                          gap_open, gap_extend,
+                                          penalize_terminal_gaps),
+                            obs_score)
+                        _, score_only, _ = global_pairwise_align_nucleotide(
+                            seq1, seq2, memory='linear', score_only=True,
+                            **kwargs)
+                        self.assertAlmostEqual(score_only, obs_score)
+                        _, full_score, _ = global_pairwise_align_nucleotide(
+                            seq1, seq2, **kwargs)
+                        self.assertGreaterEqual(obs_score, full_score)
+        finally:
+            _pairwise._LINEAR_ALIGNMENT_BASE_CELLS = base_cells
+
+    def test_global_pairwise_align_score_only(self):
+        seq1 = DNA("ACCGTGGACCGTTAGGATTGGACCCAAGGTTG")
+        seq2 = DNA("ACCGTGGACCGTAGGATTGGACCAAGGTTA")
+        for penalize_terminal_gaps in False, True:
+            _, exp_score, exp_start_end = global_pairwise_align_nucleotide(
+                seq1, seq2, penalize_terminal_gaps=penalize_terminal_gaps)
+            obs_msa, obs_score, obs_start_end = \
+                global_pairwise_align_nucleotide(
+                    seq1, seq2, penalize_terminal_gaps=penalize_terminal_gaps,
+                    score_only=True)
+            self.assertIsNone(obs_msa)
+            self.assertEqual(obs_score, exp_score)
+            self.assertEqual(obs_start_end, exp_start_end)
+
+    def test_global_pairwise_align_memory_invalid(self):
+        with self.assertRaisesRegex(ValueError, "'full' or 'linear'"):
+            global_pairwise_align_nucleotide(DNA('ACGT'), DNA('ACG'),
+                                             memory='quadratic')
+        with self.assertRaisesRegex(ValueError, 'pair of sequences'):
+            global_pairwise_align_nucleotide(
+                TabularMSA([DNA('ACGT'), DNA('ACGA')]), DNA('ACG'),
+                memory='linear')
+        with self.assertRaisesRegex(ValueError, 'gap_extend_penalty'):
+            global_pairwise_align_nucleotide(
+                DNA('ACGT'), DNA('ACG'), gap_open_penalty=1,
+                gap_extend_penalty=2, memory='linear')
+
+    def test_global_pairwise_align_banded(self):
+        seq1 = DNA("ACCGTGGACCGTTAGGATTGGACCCAAGGTTG")
+        seq2 = DNA("T"*25 + "ACCGTGGACCGTAGGATTGGACCAAGGTTA" + "A"*25)
+        for penalize_terminal_gaps in False, True:
+            kwargs = dict(gap_open_penalty=5., gap_extend_penalty=0.5,
+                          match_score=5, mismatch_score=-4,
+                          penalize_terminal_gaps=penalize_terminal_gaps)
+            exp = global_pairwise_align_nucleotide(seq1, seq2, **kwargs)
+            for band_width in 25, 'adaptive':
+                obs = global_pairwise_align_nucleotide(
+                    seq1, seq2, band_width=band_width, **kwargs)
+                self.assertEqual(obs, exp)
+            _, obs_score, obs_start_end = global_pairwise_align_nucleotide(
+                seq1, seq2, band_width=25, score_only=True, **kwargs)
+            self.assertEqual(obs_score, exp[1])
+            self.assertEqual(obs_start_end, exp[2])
+
+        # without any extra diagonal, sequences of the same length can only
+        # be aligned without gaps
+        obs_msa, obs_score, _ = global_pairwise_align_nucleotide(
+            DNA("ACGTACGT"), DNA("CGTACGTA"), band_width=0)
+        self.assertEqual(obs_msa, TabularMSA([DNA("ACGTACGT"),
+                                              DNA("CGTACGTA")]))
+        self.assertEqual(obs_score, -16.0)
+        obs_msa, obs_score, _ = global_pairwise_align_nucleotide(
+            DNA("ACGTACGT"), DNA("CGTACGTA"), band_width=1)
+        self.assertEqual(obs_msa, TabularMSA([DNA("ACGTACGT-"),
+                                              DNA("-CGTACGTA")]))
+        self.assertEqual(obs_score, 7.0)
+
+    def test_global_pairwise_align_banded_random(self):
+        np.random.seed(0)
+        for _ in range(50):
+            seq1, seq2 = (DNA(''.join(np.random.choice(list('ACGT'), n)))
+                          for n in np.random.randint(1, 30, 2))
+            for penalize_terminal_gaps in False, True:
+                exp = global_pairwise_align_nucleotide(
+                    seq1, seq2, penalize_terminal_gaps=penalize_terminal_gaps)
+                obs = global_pairwise_align_nucleotide(
+                    seq1, seq2, penalize_terminal_gaps=penalize_terminal_gaps,
+                    band_width=30)
+                self.assertEqual(obs, exp)
+                obs_msa, obs_score, _ = global_pairwise_align_nucleotide(
+                    seq1, seq2, penalize_terminal_gaps=penalize_terminal_gaps,
+                    band_width=2)
+                self.assertEqual(obs_msa[0].degap(), seq1)
+                self.assertEqual(obs_msa[1].degap(), seq2)
+                self.assertLessEqual(obs_score, exp[1])
+
+    def test_global_pairwise_align_banded_invalid(self):
+        for band_width in -1, 1.5, 'wide':
+            with self.assertRaisesRegex(ValueError, 'non-negative integer'):
+                global_pairwise_align_nucleotide(DNA('ACGT'), DNA('ACG'),
+                                                 band_width=band_width)
+        with self.assertRaisesRegex(ValueError, "memory='full'"):
+            global_pairwise_align_nucleotide(DNA('ACGT'), DNA('ACG'),
+                                             band_width=2, memory='linear')
+
     def test_global_pairwise_align_nucleotide_invalid_dtype(self):
         with self.assertRaisesRegex(TypeError,
                                     "TabularMSA with DNA or RNA dtype.*dtype "
@@ -487,6 +670,26 @@ class PairwiseAlignmentTests(TestCase):
         self.assertRaises(TypeError, local_pairwise_align_nucleotide,
                           DNA("ACGT"), 42)
 
+    def test_local_pairwise_align_banded(self):
+        seq1 = DNA("GACCTTGACCAGGTACC")
+        seq2 = DNA("GAACTTTGACGTAAC")
+        exp = local_pairwise_align_nucleotide(seq1, seq2, 5, 2)
+        for band_width in 2, 'adaptive':
+            obs = local_pairwise_align_nucleotide(seq1, seq2, 5, 2,
+                                                  band_width=band_width)
+            self.assertEqual(obs, exp)
+
+        np.random.seed(0)
+        for _ in range(50):
+            seq1, seq2 = (DNA(''.join(np.random.choice(list('ACGT'), n)))
+                          for n in np.random.randint(1, 30, 2))
+            exp = local_pairwise_align_nucleotide(seq1, seq2)
+            obs = local_pairwise_align_nucleotide(seq1, seq2, band_width=30)
+            self.assertEqual(obs, exp)
+            _, obs_score, _ = local_pairwise_align_nucleotide(seq1, seq2,
+                                                              band_width=1)
+            self.assertLessEqual(obs_score, exp[1])
+
     def test_nucleotide_aligners_use_substitution_matrices(self):
         alt_sub = make_identity_substitution_matrix(10, -10)
         # alternate substitution matrix yields different alignment (the
@@ -565,42 +768,48 @@ class PairwiseAlignmentTests(TestCase):
         np.testing.assert_array_equal(actual_score_m, expected_score_m)
         np.testing.assert_array_equal(actual_tback_m, expected_tback_m)
 
-    def test_compute_substitution_score(self):
-        # these results were computed manually
+    def test_encode_alignment_inputs(self):
         subs_m = make_identity_substitution_matrix(5, -4)
-        gap_chars = set('-.')
-
-        self.assertEqual(
-            _compute_substitution_score(['A'], ['A'], subs_m, 0, gap_chars),
-            5.0)
-        self.assertEqual(
-            _compute_substitution_score(['A', 'A'], ['A'], subs_m, 0,
-                                        gap_chars),
-            5.0)
-        self.assertEqual(
-            _compute_substitution_score(['A', 'C'], ['A'], subs_m, 0,
-                                        gap_chars),
-            0.5)
-        self.assertEqual(
-            _compute_substitution_score(['A', 'C'], ['A', 'C'], subs_m, 0,
-                                        gap_chars),
-            0.5)
-        self.assertEqual(
-            _compute_substitution_score(['A', 'A'], ['A', '-'], subs_m, 0,
-                                        gap_chars),
-            2.5)
-        self.assertEqual(
-            _compute_substitution_score(['A', 'A'], ['A', '-'], subs_m, 1,
-                                        gap_chars),
-            3)
-
-        # alt subs_m
-        subs_m = make_identity_substitution_matrix(1, -2)
-
-        self.assertEqual(
-            _compute_substitution_score(['A', 'A'], ['A', '-'], subs_m, 0,
-                                        gap_chars),
-            0.5)
+        seq1, seq2, scores = _encode_alignment_inputs(
+            TabularMSA([DNA('ACG')]), TabularMSA([DNA('GA-T')]), subs_m)
+        self.assertEqual(seq1.dtype, np.intp)
+        np.testing.assert_array_equal(
+            scores[seq1[:, np.newaxis], seq2[np.newaxis, :]],
+            [[-4, 5, 0, -4],
+             [-4, -4, 0, -4],
+             [5, -4, 0, -4]])
+
+    def test_encode_alignment_inputs_profiles(self):
+        # these results were computed manually: the score of two positions
+        # is the mean score of all pairs of characters at these positions
+        subs_m = make_identity_substitution_matrix(5, -4)
+        aln1 = TabularMSA([DNA('AAA-'), DNA('ACA.')])
+        aln2 = TabularMSA([DNA('AAC'), DNA('-CC')])
+        seq1, seq2, scores = _encode_alignment_inputs(aln1, aln2, subs_m)
+        np.testing.assert_array_equal(
+            scores[seq1[:, np.newaxis], seq2[np.newaxis, :]],
+            [[2.5, 0.5, -4],
+             [0.25, 0.5, 0.5],
+             [2.5, 0.5, -4],
+             [0, 0, 0]])
+
+        seq1, seq2, scores = _encode_alignment_inputs(aln1, aln2, subs_m, 1)
+        self.assertEqual(scores[seq1[0], seq2[0]], 3)
+        self.assertEqual(scores[seq1[3], seq2[0]], 1)
+
+    def test_encode_alignment_inputs_invalid(self):
+        subs_m = make_identity_substitution_matrix(5, -4)
+        with self.assertRaisesRegex(ValueError, r'character\(s\) is:  N'):
+            _encode_alignment_inputs(TabularMSA([DNA('ACGN')]),
+                                     TabularMSA([DNA('ACG')]), subs_m)
+        # pairs of characters missing from the matrix are only an error if
+        # they need to be scored
+        del subs_m['A']['C']
+        with self.assertRaisesRegex(ValueError, r'character\(s\) is:  A, C'):
+            _encode_alignment_inputs(TabularMSA([DNA('ACG')]),
+                                     TabularMSA([DNA('CG')]), subs_m)
+        _encode_alignment_inputs(TabularMSA([DNA('ACG')]),
+                                 TabularMSA([DNA('AG')]), subs_m)
 
     def test_compute_score_and_traceback_matrices(self):
         # these results were computed manually
@@ -743,19 +952,48 @@ class PairwiseAlignmentTests(TestCase):
                             3, 3)
         self.assertEqual(actual, expected)
 
-    def test_first_largest(self):
-        l = [(5, 'a'), (5, 'b'), (5, 'c')]
-        self.assertEqual(_first_largest(l), (5, 'a'))
-        l = [(5, 'c'), (5, 'b'), (5, 'a')]
-        self.assertEqual(_first_largest(l), (5, 'c'))
-        l = [(5, 'c'), (6, 'b'), (5, 'a')]
-        self.assertEqual(_first_largest(l), (6, 'b'))
-        # works for more than three entries
-        l = [(5, 'c'), (6, 'b'), (5, 'a'), (7, 'd')]
-        self.assertEqual(_first_largest(l), (7, 'd'))
-        # Note that max([(5, 'a'), (5, 'c')]) == max([(5, 'c'), (5, 'a')])
-        # but for the purposes needed here, we want the max to be the same
-        # regardless of what the second item in the tuple is.
+    def test_fill_matrices_invalid_shape(self):
+        score_m = np.zeros((4, 4))
+        tback_m = np.zeros((4, 4), dtype=np.int8)
+        with self.assertRaises(ValueError):
+            _fill_matrices(np.zeros(3, dtype=np.intp),
+                           np.zeros(4, dtype=np.intp), np.zeros((1, 1)),
+                           score_m, tback_m, 5, 2, 0, True)
+
+    def test_fill_banded_matrices_invalid_shape(self):
+        with self.assertRaises(ValueError):
+            _fill_banded_matrices(np.zeros(3, dtype=np.intp),
+                                  np.zeros(4, dtype=np.intp),
+                                  np.zeros((1, 1)), np.zeros((5, 3)),
+                                  np.zeros((5, 2), dtype=np.int8), -1, 5, 2,
+                                  0, True)
+
+    def test_trace_banded_path_invalid(self):
+        tback_m = np.zeros((4, 3), dtype=np.int8)
+        with self.assertRaisesRegex(IndexError, 'out of the band'):
+            _trace_banded_path(tback_m, -1, 3, 1)
+        tback_m[3, 1] = 3
+        tback_m[3, 0] = 3
+        with self.assertRaisesRegex(ValueError, 'out of its bounds'):
+            _trace_banded_path(tback_m, -1, 3, 3)
+        tback_m[3, 1] = 5
+        with self.assertRaisesRegex(ValueError, 'Invalid value'):
+            _trace_banded_path(tback_m, -1, 3, 3)
+
+    def test_traceback_invalid(self):
+        aln = TabularMSA([DNA('ACG')])
+        score_m = np.zeros((4, 4))
+        tback_m = np.zeros((4, 4), dtype=np.int8)
+        tback_m[3, 3] = -1
+        with self.assertRaisesRegex(ValueError, 'Invalid value'):
+            _traceback(tback_m, score_m, aln, aln, 3, 3)
+        tback_m[3, 3] = 2
+        tback_m[2, 3] = 3
+        tback_m[2, 2] = 2
+        tback_m[1, 2] = 2
+        tback_m[0, 2] = 2
+        with self.assertRaisesRegex(ValueError, 'out of its bounds'):
+            _traceback(tback_m, score_m, aln, aln, 3, 3)
 
 
 if __name__ == "__main__":
@@ -18,9 +18,14 @@
 
 from unittest import TestCase, main
 
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+
 from skbio import (local_pairwise_align_ssw, Sequence, DNA, RNA, Protein,
                    TabularMSA)
-from skbio.alignment import StripedSmithWaterman, AlignmentStructure
+from skbio.alignment import (StripedSmithWaterman, AlignmentStructure,
+                             ssw_distances)
 from skbio.alignment._pairwise import blosum50
 
 
@@ -555,6 +560,74 @@ class TestStripedSmithWaterman(TestSSW):
         alignment = query("CGCGCGCCGCCGGGGGGCCGGCCGGCGCCGGGGGGCGCCCCGGGCGGGGC")
         self._check_alignment(alignment, expected)
 
+    def _check_align_many(self, query_sequence, target_sequences, **kwargs):
+        query = StripedSmithWaterman(query_sequence, **kwargs)
+        for n_threads in 1, 3:
+            results = query.align_many(target_sequences, n_threads=n_threads)
+            self.assertEqual(results.shape, (len(target_sequences),))
+            for result, target_sequence in zip(results, target_sequences):
+                if not target_sequence:
+                    # not aligned, see test_align_many_empty_target
+                    continue
+                alignment = query(target_sequence)
+                for attribute in results.dtype.names:
+                    self.assertEqual((target_sequence, result[attribute]),
+                                     (target_sequence, alignment[attribute]))
+
+    def test_align_many(self):
+        target_sequences = [
+            'TTATAATTTTCTTATTATTATCAATATTTATAATTTGATTTTGTTGTAAT',
+            'AGTCGAAGGGTAATATAGGCGTGTCACCTA', 'AGGGTAATTAGGCGTGTTCACCTA',
+            'NNNNNAGGG', 'A', '']
+        query_sequence = "AGGGTAATTAGGCGTGTTCACCTA"
+        self._check_align_many(query_sequence, target_sequences)
+        self._check_align_many(query_sequence, target_sequences,
+                               zero_index=False)
+        self._check_align_many(query_sequence, target_sequences,
+                               score_only=True)
+        self._check_align_many(query_sequence, target_sequences,
+                               score_filter=20)
+
+        query = StripedSmithWaterman(query_sequence)
+        results = query.align_many(iter(target_sequences), cigar=False)
+        self.assertNotIn('cigar', results.dtype.names)
+        self.assertEqual(results['optimal_alignment_score'].tolist(),
+                         [10, 36, 48, 8, 2, 0])
+        self.assertEqual(query.align_many([]).shape, (0,))
+
+    def test_align_many_protein(self):
+        self._check_align_many(
+            "VHLTPEEKSAVTALWGKVNVDEVGGEALGRLLVVYPWTQRFFESFGDLST",
+            ["PHLTPEEKSAVTALWGKVNVDEVGGEALGRLLVVYPWTQRFFESFGDLST",
+             "GKVNVDEVGGEALGR", "WKKXAA"],
+            protein=True, substitution_matrix=blosum50)
+
+    def test_align_many_random(self):
+        np.random.seed(0)
+        target_sequences = [
+            ''.join(np.random.choice(list('ACGTN'), np.random.randint(100)))
+            for _ in range(100)]
+        self._check_align_many(
+            ''.join(np.random.choice(list('ACGT'), 30)), target_sequences)
+
+    def test_align_many_empty_target(self):
+        query = StripedSmithWaterman("ACTAAGGCTCTC")
+        for n_threads in 1, 2:
+            results = query.align_many(['', 'ACTAAGGCTCCC', ''],
+                                       n_threads=n_threads)
+            self.assertEqual(results[0], results[2])
+            self.assertEqual(results[0].tolist(),
+                             (0, 0, -1, -1, -1, -1, -1, ''))
+            self.assertEqual(results[1]['cigar'], '10M')
+
+        results = query.align_many([''], cigar=False)
+        self.assertEqual(results.tolist(), [(0, 0, -1, -1, -1, -1, -1)])
+
+    def test_align_many_invalid_n_threads(self):
+        query = StripedSmithWaterman("ACGT")
+        with self.assertRaises(ValueError):
+            query.align_many(["ACGT"], n_threads=0)
+
 
 class TestAlignStripedSmithWaterman(TestSSW):
     def _check_TabularMSA_to_AlignmentStructure(self, alignment, structure,
@@ -623,6 +696,105 @@ class TestAlignStripedSmithWaterman(TestSSW):
             local_pairwise_align_ssw(DNA('ACGT'), RNA('ACGU'))
 
 
+class TestSSWDistances(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.seqs = [
+            DNA(''.join(rng.choice(list('ACGT'), rng.randint(20, 60))),
+                metadata={'id': 's%d' % i}) for i in range(8)]
+
+    def _identity_distance(self, seq1, seq2, **kwargs):
+        result = local_pairwise_align_ssw(seq1, seq2, **kwargs)
+        if result is None:
+            return 1.0
+        aligned1, aligned2 = (str(seq) for seq in result[0])
+        matches = sum(a == b for a, b in zip(aligned1, aligned2))
+        return 1.0 - matches / len(aligned1)
+
+    def _score(self, seq1, seq2, **kwargs):
+        query = StripedSmithWaterman(str(seq1), **kwargs)
+        return query(str(seq2)).optimal_alignment_score
+
+    def test_identity(self):
+        dm = ssw_distances(self.seqs)
+        self.assertEqual(dm.ids, tuple('s%d' % i for i in range(8)))
+        for i in range(8):
+            for j in range(i + 1, 8):
+                self.assertAlmostEqual(
+                    dm[i, j],
+                    self._identity_distance(self.seqs[i], self.seqs[j]))
+
+    def test_identity_same_sequences(self):
+        dm = ssw_distances([DNA('ACGTACGTTT'), DNA('ACGTACGTTT'),
+                            DNA('ACGAACGTTT')])
+        self.assertEqual(dm.ids, ('0', '1', '2'))
+        npt.assert_almost_equal(dm.condensed_form(), [0.0, 0.1, 0.1])
+
+    def test_score(self):
+        dm = ssw_distances(self.seqs, metric='score', gap_open_penalty=3)
+        for i in range(8):
+            for j in range(i + 1, 8):
+                expected = 1.0 - (
+                    self._score(self.seqs[i], self.seqs[j],
+                                gap_open_penalty=3) /
+                    max(self._score(self.seqs[i], self.seqs[i],
+                                    gap_open_penalty=3),
+                        self._score(self.seqs[j], self.seqs[j],
+                                    gap_open_penalty=3)))
+                self.assertAlmostEqual(dm[i, j], expected)
+
+    def test_protein(self):
+        seqs = [Protein('HEAGAWGHEE'), Protein('PAWHEAE'),
+                Protein('HEAGAWGHEE')]
+        dm = ssw_distances(seqs, substitution_matrix=blosum50)
+        self.assertAlmostEqual(dm['0', '2'], 0.0)
+        # AWGHE-E aligned to AW-HEAE along the cigar 2M1I2M1D1M
+        self.assertAlmostEqual(dm['0', '1'], 2 / 7)
+
+    def test_references(self):
+        queries, references = self.seqs[:3], self.seqs[3:]
+        for metric in 'identity', 'score':
+            obs = ssw_distances(queries, references, metric=metric)
+            self.assertIsInstance(obs, pd.DataFrame)
+            self.assertEqual(list(obs.index), ['s0', 's1', 's2'])
+            self.assertEqual(list(obs.columns),
+                             ['s%d' % i for i in range(3, 8)])
+            all_pairs = ssw_distances(self.seqs, metric=metric)
+            npt.assert_almost_equal(obs.values, all_pairs.data[:3, 3:])
+
+    def test_n_jobs(self):
+        for metric in 'identity', 'score':
+            expected = ssw_distances(self.seqs, metric=metric)
+            for pool in 'thread', 'process':
+                obs = ssw_distances(self.seqs, metric=metric, n_jobs=3,
+                                    pool=pool)
+                self.assertEqual(obs, expected)
+                obs = ssw_distances(self.seqs[:5], self.seqs[5:],
+                                    metric=metric, n_jobs=2, pool=pool)
+                npt.assert_array_equal(obs.values, expected.data[:5, 5:])
+
+    def test_no_alignment(self):
+        dm = ssw_distances([DNA('AAAAAAAA'), DNA('CCCCCCCC')])
+        self.assertEqual(dm['0', '1'], 1.0)
+        dm = ssw_distances([DNA('AAAAAAAA'), DNA('CCCCCCCC')],
+                           metric='score')
+        self.assertEqual(dm['0', '1'], 1.0)
+
+    def test_invalid(self):
+        with self.assertRaisesRegex(ValueError, "`metric`"):
+            ssw_distances(self.seqs, metric='hamming')
+        with self.assertRaisesRegex(ValueError, "`pool`"):
+            ssw_distances(self.seqs, pool='gpu')
+        with self.assertRaisesRegex(ValueError, "score_only"):
+            ssw_distances(self.seqs, score_only=True)
+        with self.assertRaisesRegex(ValueError, "cannot be zero"):
+            ssw_distances(self.seqs, n_jobs=0)
+        with self.assertRaisesRegex(TypeError, "not type 'Sequence'"):
+            ssw_distances([DNA('ACGT'), Sequence('ACGT')])
+        with self.assertRaisesRegex(TypeError, "same type: 'DNA' != 'RNA'"):
+            ssw_distances([DNA('ACGT')], [RNA('ACGU')])
+
+
 class TestAlignmentStructure(TestSSW):
 
     def mock_object_factory(self, dictionary):
@@ -6,9 +6,17 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import collections
+import functools
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
+import scipy.sparse
 
 from skbio.util._decorator import experimental
+from skbio.tree import TreeArray, DuplicateNodeError, MissingNodeError
 from skbio.diversity._driver import partial_beta_diversity
 from skbio.stats.distance import DistanceMatrix
 from skbio.diversity._util import _validate_counts_matrix
@@ -71,7 +79,7 @@ def _block_party(counts=None, row_ids=None, col_ids=None, **kwargs):
 
     Parameters
     ----------
-    counts : 2D array_like of ints or floats
+    counts : 2D array_like of ints or floats, or scipy.sparse matrix
         Matrix containing count/abundance data where each row contains counts
         of OTUs in a given sample.
     row_ids : 1D np.ndarray of int
@@ -82,6 +90,9 @@ def _block_party(counts=None, row_ids=None, col_ids=None, **kwargs):
         matrix.
     kwargs : dict
         Keyword arguments containing information about the block to compute.
+        If ``otu_tips`` (the index of the tip of each OTU in a ``TreeArray``
+        ``tree``) is provided, the tree is filtered by tip index rather than
+        by name.
 
     Returns
     -------
@@ -90,6 +101,8 @@ def _block_party(counts=None, row_ids=None, col_ids=None, **kwargs):
         is stored in kwargs. If applicable, a filtered ``tree`` and ``otu_ids``
         are also stored.
     """
+    otu_tips = kwargs.pop('otu_tips', None)
+
     ids_to_keep = np.unique(np.hstack([row_ids, col_ids]))
 
     # create a view of the relevant samples
@@ -97,7 +110,10 @@ def _block_party(counts=None, row_ids=None, col_ids=None, **kwargs):
 
     # remove from the block any empty observations
     # NOTE: this will perform an implicit copy
-    nonzero_cols = (counts_block != 0).any(axis=0)
+    if scipy.sparse.issparse(counts_block):
+        nonzero_cols = np.asarray(counts_block.getnnz(axis=0) > 0)
+    else:
+        nonzero_cols = (counts_block != 0).any(axis=0)
     counts_block = counts_block[:, nonzero_cols]
 
     kwargs['counts'] = counts_block
@@ -105,11 +121,46 @@ def _block_party(counts=None, row_ids=None, col_ids=None, **kwargs):
 
     if 'tree' in kwargs and 'otu_ids' in kwargs:
         kwargs['otu_ids'] = np.asarray(kwargs['otu_ids'])[nonzero_cols]
-        kwargs['tree'] = kwargs['tree'].shear(kwargs['otu_ids'])
+        if otu_tips is None:
+            kwargs['tree'] = kwargs['tree'].shear(kwargs['otu_ids'])
+        else:
+            kwargs['tree'] = kwargs['tree'].induced_subtree(
+                otu_tips[nonzero_cols])
 
     return kwargs
 
 
+def _index_otu_tips(tree, otu_ids):
+    """Convert a tree to a TreeArray and find the tip of each OTU
+
+    Notes
+    -----
+    Each block only keeps the OTUs observed in its samples, so the tree is
+    sheared once per block. Resolving the OTU IDs to tip indices once lets
+    the blocks extract their subtrees from a boolean selection of these
+    indices, rather than looking up every name again.
+
+    Returns
+    -------
+    TreeArray
+        The tree (not copied if already a ``TreeArray``).
+    1D np.ndarray of int or None
+        The index of the tip of each OTU, or ``None`` if an OTU ID is not a
+        unique tip name in the tree (in which case each block will report the
+        error when shearing the tree by name).
+    """
+    if not isinstance(tree, TreeArray):
+        tree = TreeArray.from_tree_node(tree)
+    try:
+        tips = [tree.find(otu_id) for otu_id in otu_ids]
+    except (DuplicateNodeError, MissingNodeError):
+        return tree, None
+    tips = np.array(tips, dtype=np.intp)
+    if not tree.is_tip[tips].all():
+        return tree, None
+    return tree, tips
+
+
 def _pairs_to_compute(rids, cids):
     """Determine the pairs of samples to compute distances between
 
@@ -151,8 +202,8 @@ def _block_kwargs(**kwargs):
     dict
         The parameters for the block of the distance matrix to compute.
     """
-    valid_block_keys = {'counts', 'ids', 'tree', 'otu_ids', 'metric',
-                        'id_pairs', 'validate'}
+    valid_block_keys = {'counts', 'ids', 'tree', 'otu_ids', 'otu_tips',
+                        'metric', 'id_pairs', 'validate'}
     for row_ids, col_ids in _generate_id_blocks(kwargs['ids'], kwargs['k']):
         id_pairs = _pairs_to_compute(row_ids, col_ids)
         if id_pairs:
@@ -196,7 +247,76 @@ def _map(func, kw_gen):
         yield func(**kwargs)
 
 
-def _reduce(blocks):
+def _map_chunk(func, kw_chunk):
+    """Apply a function to a chunk of kwargs (executed by pool workers)"""
+    return list(_map(func, kw_chunk))
+
+
+def _pool_map(executor_cls, func, kw_gen, n_jobs=None, chunksize=1):
+    """Map a function over arguments using a pool of workers
+
+    Parameters
+    ----------
+    executor_cls : type
+        ``concurrent.futures.ProcessPoolExecutor`` or
+        ``concurrent.futures.ThreadPoolExecutor``.
+    func : function
+        The function to apply. Must be picklable for a process pool.
+    kw_gen : Iterable of dict
+        The kwargs to apply ``func`` to.
+    n_jobs : int, optional
+        The number of workers. Defaults to the number of CPUs.
+    chunksize : int, optional
+        The number of kwargs submitted to a worker at once. For a process
+        pool, objects shared by the kwargs of a chunk (e.g., the counts
+        matrix and tree) are only pickled once per chunk.
+
+    Notes
+    -----
+    Unlike ``Executor.map``, chunks are submitted lazily, with at most
+    ``2 * n_jobs`` chunks in flight, so ``kw_gen`` is never fully
+    materialized. Results are yielded in the order of ``kw_gen``.
+    """
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+
+    kw_iter = iter(kw_gen)
+    with executor_cls(max_workers=n_jobs) as executor:
+        pending = collections.deque()
+        while True:
+            kw_chunk = list(itertools.islice(kw_iter, chunksize))
+            if not kw_chunk:
+                break
+            pending.append(executor.submit(_map_chunk, func, kw_chunk))
+            if len(pending) >= 2 * n_jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _num_blocks(n, k):
+    """Count the blocks generated by _block_kwargs for n IDs and blocksize k
+
+    All blocks of the upper triangle are computed, except for diagonal
+    blocks containing a single ID (they have no pairs to compute).
+    """
+    n_k = -(-n // k)
+    total = n_k * (n_k + 1) // 2
+    if k == 1:
+        total -= n_k
+    elif n % k == 1:
+        total -= 1
+    return total
+
+
+def _report_progress(blocks, progress, total):
+    """Call ``progress(completed, total)`` as each block is computed"""
+    for completed, block in enumerate(blocks, 1):
+        progress(completed, total)
+        yield block
+
+
+def _reduce(blocks, n_ids=None, out=None):
     """Reduce an iterable of partial distance matrices into a full matrix
 
     Note, the reduce doesn't actually care about what pairs are computed
@@ -204,38 +324,70 @@ def _reduce(blocks):
     added. as such, this reduction is only safe to perform if by
     the block_beta_diversity method which assures that distances are not
     computed multiple times.
-    """
-    all_blocks = list(blocks)
-
-    # Determine the maximum integer ID observed in the blocks. There exists a
-    # 1-1 mapping between the integer ID and a sample ID. We increment by 1
-    # as the integer ID space begins with zero, and we'll be using this value
-    # to determine the size of the resulting full distance matrix.
-    n_ids = max(map(lambda x: max(x.ids), all_blocks)) + 1
 
-    mat = np.zeros((n_ids, n_ids), dtype=float)
+    Parameters
+    ----------
+    blocks : Iterable of DistanceMatrix
+        The partial distance matrices, whose IDs are integer indices into
+        the full distance matrix.
+    n_ids : int, optional
+        The number of IDs in the full distance matrix. If not provided, it is
+        inferred from the largest ID in ``blocks`` (which requires
+        materializing ``blocks``).
+    out : 1D np.ndarray of float, optional
+        Preallocated condensed buffer of length ``n_ids * (n_ids - 1) / 2``
+        (e.g., a ``np.memmap``) into which distances are accumulated. It is
+        zeroed before use.
 
-    # TODO: something smarter.
-    for block in all_blocks:
-        n_blk_ids = len(block.ids)
+    Returns
+    -------
+    DistanceMatrix or 1D np.ndarray
+        The full distance matrix, or ``out`` if it is provided, so that the
+        square matrix is never allocated.
+    """
+    if n_ids is None:
+        blocks = list(blocks)
+
+        # Determine the maximum integer ID observed in the blocks. There
+        # exists a 1-1 mapping between the integer ID and a sample ID. We
+        # increment by 1 as the integer ID space begins with zero, and we'll
+        # be using this value to determine the size of the resulting full
+        # distance matrix.
+        n_ids = max(map(lambda x: max(x.ids), blocks)) + 1
+
+    size = n_ids * (n_ids - 1) // 2
+    condensed = out
+    if condensed is None:
+        condensed = np.zeros(size, dtype=float)
+    else:
+        if out.shape != (size,):
+            raise ValueError("`out` must be a condensed buffer of length %d."
+                             % size)
+        out[:] = 0
 
-        # get the corresponding coordinates in the master matrix
-        master_idx = [(i, j) for row, i in enumerate(block.ids)
-                      for j in block.ids[row+1:]]
+    for block in blocks:
+        block_ids = np.asarray(block.ids, dtype=np.int64)
 
-        # get the corresponding coordinates within the current block
-        block_idx = [(i, j) for row, i in enumerate(range(n_blk_ids))
-                     for j in range(row+1, n_blk_ids)]
+        # get the coordinates of the upper triangle within the current block
+        # and the corresponding coordinates in the master matrix
+        b_i, b_j = np.triu_indices(len(block_ids), k=1)
+        m_i = block_ids[b_i]
+        m_j = block_ids[b_j]
+        m_i, m_j = np.minimum(m_i, m_j), np.maximum(m_i, m_j)
 
-        for (m_i, m_j), (b_i, b_j) in zip(master_idx, block_idx):
-            mat[m_i, m_j] += block.data[b_i, b_j]
+        # scatter into the condensed form of the master matrix
+        condensed_idx = n_ids * m_i - m_i * (m_i + 1) // 2 + m_j - m_i - 1
+        condensed[condensed_idx] += block.data[b_i, b_j]
 
-    return DistanceMatrix(mat + mat.T, list(range(n_ids)))
+    if out is not None:
+        return out
+    return DistanceMatrix(condensed, list(range(n_ids)))
 
 
 @experimental(as_of="0.5.1")
 def block_beta_diversity(metric, counts, ids, validate=True, k=64,
-                         reduce_f=None, map_f=None, **kwargs):
+                         reduce_f=None, map_f=None, n_jobs=None, out=None,
+                         progress=None, **kwargs):
     """Perform a block-decomposition beta diversity calculation
 
     Parameters
@@ -244,7 +396,7 @@ def block_beta_diversity(metric, counts, ids, validate=True, k=64,
         The pairwise distance function to apply. If ``metric`` is a string, it
         must be resolvable by scikit-bio (e.g., UniFrac methods), or must be
         callable.
-    counts : 2D array_like of ints or floats
+    counts : 2D array_like of ints or floats, or scipy.sparse matrix
         Matrix containing count/abundance data where each row contains counts
         of OTUs in a given sample.
     ids : iterable of strs
@@ -258,23 +410,41 @@ def block_beta_diversity(metric, counts, ids, validate=True, k=64,
             `f(Iterable of DistanceMatrix) -> DistanceMatrix`
 
         Note, this is the reduce within a map/reduce.
-    map_f: function, optional
+    map_f: function or {'process', 'thread'}, optional
         A method that accepts a `_block_compute`. The expected signature is:
 
             `f(**kwargs) -> DistanceMatrix`
 
         NOTE: ipyparallel's `map_async` will not work here as we need to be
         able to pass around `**kwargs``.
+
+        If ``'process'`` or ``'thread'``, blocks are computed by a built-in
+        process or thread pool with ``n_jobs`` workers. With a process pool,
+        ``metric`` and any metric-specific parameters must be picklable.
     k : int, optional
         The blocksize used when computing distances
+    n_jobs : int, optional
+        The number of workers used when ``map_f`` is ``'process'`` or
+        ``'thread'``. Defaults to the number of CPUs.
+    out : 1D np.ndarray of float, optional
+        Preallocated buffer of length ``n * (n - 1) / 2``, where ``n`` is the
+        number of samples, into which the default reduce accumulates the
+        condensed distances (in the order of ``scipy.spatial.distance.pdist``).
+        If provided, ``out`` is returned instead of a ``DistanceMatrix``, so
+        that the square matrix is never allocated, and a ``np.memmap`` keeps
+        the distances on disk. Cannot be provided with ``reduce_f``.
+    progress : function, optional
+        Called as ``progress(completed, total)`` each time a block has been
+        computed, where ``total`` is the number of blocks.
     kwargs : kwargs, optional
         Metric-specific parameters.
 
     Returns
     -------
-    DistanceMatrix
+    DistanceMatrix or 1D np.ndarray
         A distance matrix relating all samples represented by counts to each
-        other.
+        other, or ``out`` filled with its condensed form if ``out`` is
+        provided.
 
     Notes
     -----
@@ -297,15 +467,36 @@ def block_beta_diversity(metric, counts, ids, validate=True, k=64,
     if validate:
         counts = _validate_counts_matrix(counts, ids=ids)
 
+    if scipy.sparse.issparse(counts):
+        n_ids = counts.shape[0]
+    else:
+        n_ids = len(counts)
+    num_blocks = _num_blocks(n_ids, k)
+
     if reduce_f is None:
-        reduce_f = _reduce
+        reduce_f = functools.partial(_reduce, n_ids=n_ids, out=out)
+    elif out is not None:
+        raise ValueError("`out` can only be used with the default reduce_f.")
 
     if map_f is None:
         map_f = _map
+    elif map_f == 'process':
+        # send the counts and tree to each worker a few times only, while
+        # leaving enough chunks for balancing the load between workers
+        n_workers = n_jobs or os.cpu_count() or 1
+        chunksize = max(1, num_blocks // (4 * n_workers))
+        map_f = functools.partial(_pool_map, ProcessPoolExecutor,
+                                  n_jobs=n_jobs, chunksize=chunksize)
+    elif map_f == 'thread':
+        map_f = functools.partial(_pool_map, ThreadPoolExecutor,
+                                  n_jobs=n_jobs)
+    elif not callable(map_f):
+        raise ValueError("Unknown map_f %r; must be callable, 'process' or "
+                         "'thread'." % (map_f,))
 
     # The block method uses numeric IDs to take advantage of fancy indexing
     # with numpy.
-    tmp_ids = np.arange(len(counts))
+    tmp_ids = np.arange(n_ids)
     kwargs['ids'] = tmp_ids
 
     kwargs['metric'] = metric
@@ -313,7 +504,17 @@ def block_beta_diversity(metric, counts, ids, validate=True, k=64,
     kwargs['k'] = k
     kwargs['validate'] = False  # we've already validated if necessary
 
-    dm = reduce_f(map_f(_block_compute, _block_kwargs(**kwargs)))
+    if 'tree' in kwargs and 'otu_ids' in kwargs:
+        kwargs['tree'], kwargs['otu_tips'] = _index_otu_tips(
+            kwargs['tree'], kwargs['otu_ids'])
+
+    blocks = map_f(_block_compute, _block_kwargs(**kwargs))
+    if progress is not None:
+        blocks = _report_progress(blocks, progress, num_blocks)
+
+    dm = reduce_f(blocks)
+    if out is not None:
+        return dm
     dm.ids = ids
 
     return dm
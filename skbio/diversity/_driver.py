@@ -6,22 +6,27 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import collections
 import functools
+import inspect
 import itertools
 
 import numpy as np
+import scipy.sparse
 import scipy.spatial.distance
 import pandas as pd
 
 import skbio
-from skbio.diversity.alpha._faith_pd import _faith_pd, _setup_faith_pd
+from skbio.diversity.alpha._faith_pd import _faith_pd_matrix
+from skbio.diversity.alpha._matrix import (_CountsSummary,
+                                           _get_matrix_metric_map)
 from skbio.diversity.beta._unifrac import (
     _setup_multiple_unweighted_unifrac, _setup_multiple_weighted_unifrac,
-    _normalize_weighted_unifrac_by_default)
+    _normalize_weighted_unifrac_by_default, _unifrac_pdist)
 from skbio.util._decorator import experimental, deprecated
 from skbio.stats.distance import DistanceMatrix
 from skbio.diversity._util import (_validate_counts_matrix,
-                                   _get_phylogenetic_kwargs)
+                                   _get_phylogenetic_kwargs, _dense_rows)
 
 
 def _get_alpha_diversity_metric_map():
@@ -117,13 +122,16 @@ def alpha_diversity(metric, counts, ids=None, validate=True, **kwargs):
 
     Parameters
     ----------
-    metric : str, callable
+    metric : str, callable, or list of str and callable
         The alpha diversity metric to apply to the sample(s). Passing metric as
         a string is preferable as this often results in an optimized version of
-        the metric being used.
-    counts : 1D or 2D array_like of ints or floats
+        the metric being used. If a list of metrics is provided, all metrics
+        are computed in a single call and intermediate values (e.g., totals,
+        singletons and doubletons) are shared between them.
+    counts : 1D or 2D array_like of ints or floats, or scipy.sparse matrix
         Vector or matrix containing count/abundance data. If a matrix, each row
-        should contain counts of OTUs in a given sample.
+        should contain counts of OTUs in a given sample. Sparse matrices are
+        never densified as a whole.
     ids : iterable of strs, optional
         Identifiers for each sample in ``counts``. By default, samples will be
         assigned integer identifiers in the order that they were provided.
@@ -136,13 +144,17 @@ def alpha_diversity(metric, counts, ids=None, validate=True, **kwargs):
         :mod:`skbio.diversity` for the description of what validation entails
         so you can determine if you can safely disable validation.
     kwargs : kwargs, optional
-        Metric-specific parameters.
+        Metric-specific parameters. If a list of metrics is provided, ``tree``,
+        ``otu_ids`` and ``n_jobs`` are only passed to ``'faith_pd'`` and all
+        other parameters are passed to every other metric.
 
     Returns
     -------
-    pd.Series
+    pd.Series or pd.DataFrame
         Values of ``metric`` for all vectors provided in ``counts``. The index
-        will be ``ids``, if provided.
+        will be ``ids``, if provided. If a list of metrics is provided, a
+        ``pd.DataFrame`` is returned with one column per metric (named after
+        the metric, or the function name for callables).
 
     Raises
     ------
@@ -158,28 +170,96 @@ def alpha_diversity(metric, counts, ids=None, validate=True, **kwargs):
     skbio.diversity.get_alpha_diversity_metrics
     skbio.diversity.beta_diversity
 
-    """
-    metric_map = _get_alpha_diversity_metric_map()
+    Notes
+    -----
+    Many metrics (e.g., ``'shannon'``, ``'simpson'``, ``'observed_otus'`` and
+    ``'chao1'``) are computed for all samples at once from the counts matrix,
+    rather than by calling the metric function once per sample. Other metrics
+    and callables are applied to each sample (row) in turn.
 
+    ``'faith_pd'`` is computed for all samples by multiplying the node
+    presence matrix with the branch lengths of the tree. Samples are processed
+    in chunks, which can be computed in multiple threads by passing ``n_jobs``
+    (``None`` uses one thread per CPU).
+
+    """
     if validate:
         counts = _validate_counts_matrix(counts, ids=ids)
 
+    if isinstance(metric, str) or callable(metric):
+        return pd.Series(_alpha_diversity(metric, counts, validate, None,
+                                          **kwargs), index=ids)
+
+    metrics = list(metric)
+    if 'faith_pd' in metrics:
+        otu_ids, tree, kwargs = _get_phylogenetic_kwargs(counts, **kwargs)
+        phylogenetic_kwargs = {'otu_ids': otu_ids, 'tree': tree,
+                               'n_jobs': kwargs.pop('n_jobs', 1)}
+    # check the parameters of all metrics before computing any of them
+    for m in metrics:
+        if isinstance(m, str) and m != 'faith_pd':
+            _check_alpha_kwargs(m, kwargs)
+    summary = _CountsSummary(counts)
+
+    results = collections.OrderedDict()
+    for m in metrics:
+        if m == 'faith_pd':
+            results[m] = _alpha_diversity(m, counts, validate, summary,
+                                          **phylogenetic_kwargs)
+        else:
+            results[getattr(m, '__name__', m)] = _alpha_diversity(
+                m, counts, validate, summary, **kwargs)
+    return pd.DataFrame(results, index=ids, columns=list(results))
+
+
+def _alpha_diversity(metric, counts, validate, summary, **kwargs):
+    """Compute a single alpha diversity metric for all samples
+
+    ``summary`` is a ``_CountsSummary`` of ``counts`` which is shared by
+    metrics computed in the same call, or ``None``.
+    """
+    metric_map = _get_alpha_diversity_metric_map()
+    matrix_metric_map = _get_matrix_metric_map()
+
     if metric == 'faith_pd':
+        n_jobs = kwargs.pop('n_jobs', 1)
         otu_ids, tree, kwargs = _get_phylogenetic_kwargs(counts, **kwargs)
-        counts_by_node, branch_lengths = _setup_faith_pd(
-            counts, otu_ids, tree, validate, single_sample=False)
-        counts = counts_by_node
-        metric = functools.partial(_faith_pd, branch_lengths=branch_lengths)
+        if kwargs:
+            raise TypeError("faith_pd() got an unexpected keyword argument %r"
+                            % sorted(kwargs)[0])
+        return _faith_pd_matrix(counts, otu_ids, tree, validate,
+                                n_jobs=n_jobs)
     elif callable(metric):
         metric = functools.partial(metric, **kwargs)
+    elif metric in matrix_metric_map:
+        _check_alpha_kwargs(metric, kwargs)
+        if summary is None:
+            summary = _CountsSummary(counts)
+        return matrix_metric_map[metric](summary, **kwargs)
     elif metric in metric_map:
         metric = functools.partial(metric_map[metric], **kwargs)
     else:
         raise ValueError('Unknown metric provided: %r.' % metric)
 
-    # kwargs is provided here so an error is raised on extra kwargs
-    results = [metric(c, **kwargs) for c in counts]
-    return pd.Series(results, index=ids)
+    # kwargs is provided here so an error is raised on extra kwargs. rows of
+    # sparse matrices are densified one at a time
+    return [metric(c, **kwargs) for c in _dense_rows(counts)]
+
+
+def _check_alpha_kwargs(metric, kwargs):
+    """Raise TypeError if the alpha diversity metric does not accept kwargs
+
+    Parameters are checked against the signature of the public metric
+    function, so that errors name it rather than the function computing the
+    metric for all samples.
+    """
+    metric_map = _get_alpha_diversity_metric_map()
+    if metric not in metric_map:
+        return
+    try:
+        inspect.signature(metric_map[metric]).bind(None, **kwargs)
+    except TypeError as e:
+        raise TypeError('%s() %s' % (metric, e)) from None
 
 
 @deprecated(as_of='0.5.0', until='0.5.2',
@@ -197,7 +277,7 @@ def partial_beta_diversity(metric, counts, ids, id_pairs, validate=True,
         The pairwise distance function to apply. If ``metric`` is a string, it
         must be resolvable by scikit-bio (e.g., UniFrac methods), or must be
         callable.
-    counts : 2D array_like of ints or floats
+    counts : 2D array_like of ints or floats, or scipy.sparse matrix
         Matrix containing count/abundance data where each row contains counts
         of OTUs in a given sample.
     ids : iterable of strs
@@ -273,8 +353,16 @@ def partial_beta_diversity(metric, counts, ids, id_pairs, validate=True,
     id_index = {id_: idx for idx, id_ in enumerate(ids)}
     id_pairs_indexed = ((id_index[u], id_index[v]) for u, v in id_pairs)
 
+    if scipy.sparse.issparse(counts):
+        counts = scipy.sparse.csr_matrix(counts)
+
+        def row(i):
+            return counts[i].toarray()[0]
+    else:
+        row = counts.__getitem__
+
     for u, v in id_pairs_indexed:
-        dm[u, v] = metric(counts[u], counts[v], **kwargs)
+        dm[u, v] = metric(row(u), row(v), **kwargs)
 
     return DistanceMatrix(dm + dm.T, ids)
 
@@ -291,9 +379,11 @@ def beta_diversity(metric, counts, ids=None, validate=True, pairwise_func=None,
         and the scikit-bio functions linked under *See Also* for available
         metrics. Passing metrics as a strings is preferable as this often
         results in an optimized version of the metric being used.
-    counts : 2D array_like of ints or floats
+    counts : 2D array_like of ints or floats, or scipy.sparse matrix
         Matrix containing count/abundance data where each row contains counts
-        of OTUs in a given sample.
+        of OTUs in a given sample. UniFrac metrics operate on sparse matrices
+        directly (see Notes). Sparse matrices are passed to ``pairwise_func``
+        for other string metrics, and are densified otherwise.
     ids : iterable of strs, optional
         Identifiers for each sample in ``counts``. By default, samples will be
         assigned integer identifiers in the order that they were provided
@@ -338,11 +428,37 @@ def beta_diversity(metric, counts, ids=None, validate=True, pairwise_func=None,
     scipy.spatial.distance.pdist
     sklearn.metrics.pairwise_distances
 
+    Notes
+    -----
+    If ``metric`` is ``'unweighted_unifrac'`` or ``'weighted_unifrac'`` and
+    ``pairwise_func`` is not provided, all pairwise distances are computed by
+    a compiled kernel. In this case, ``n_jobs`` can be passed (as a
+    metric-specific parameter) to compute the distances using multiple
+    threads. If ``n_jobs`` is ``None``, one thread per CPU is used. If
+    ``counts`` is a ``scipy.sparse`` matrix, only the nonzero counts are
+    stored and processed.
+
     """
     if validate:
         counts = _validate_counts_matrix(counts, ids=ids)
 
-    if metric == 'unweighted_unifrac':
+    if metric in ('unweighted_unifrac', 'weighted_unifrac') and \
+            pairwise_func is None:
+        # compute all pairs with the compiled UniFrac kernel instead of
+        # calling back into Python for every pair
+        weighted = metric == 'weighted_unifrac'
+        normalized = kwargs.pop('normalized',
+                                _normalize_weighted_unifrac_by_default)
+        n_jobs = kwargs.pop('n_jobs', 1)
+        otu_ids, tree, kwargs = _get_phylogenetic_kwargs(counts, **kwargs)
+        if kwargs:
+            raise TypeError("%s() got an unexpected keyword argument %r" %
+                            (metric, sorted(kwargs)[0]))
+        distances = _unifrac_pdist(counts, otu_ids=otu_ids, tree=tree,
+                                   weighted=weighted, normalized=normalized,
+                                   validate=validate, n_jobs=n_jobs)
+        return DistanceMatrix(distances, ids)
+    elif metric == 'unweighted_unifrac':
         otu_ids, tree, kwargs = _get_phylogenetic_kwargs(counts, **kwargs)
         metric, counts_by_node = _setup_multiple_unweighted_unifrac(
                 counts, otu_ids=otu_ids, tree=tree, validate=validate)
@@ -367,6 +483,11 @@ def beta_diversity(metric, counts, ids=None, validate=True, pairwise_func=None,
         # example one of the SciPy metrics
         pass
 
+    if scipy.sparse.issparse(counts) and (pairwise_func is None or
+                                          callable(metric)):
+        # scipy's pdist and metric functions operate on dense vectors
+        counts = counts.toarray()
+
     if pairwise_func is None:
         pairwise_func = scipy.spatial.distance.pdist
 
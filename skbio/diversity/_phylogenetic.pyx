@@ -16,41 +16,46 @@ ctypedef np.int64_t DTYPE_t
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-def _tip_distances(np.ndarray[np.double_t, ndim=1] a, object t,
+def _tip_distances(np.ndarray[np.double_t, ndim=1] a,
+                   DTYPE_t[:, :] child_index,
                    np.ndarray[DTYPE_t, ndim=1] tip_indices):
     """Sets each tip to its distance from the root
 
     Parameters
     ----------
     a : np.ndarray of double
-        A matrix in which each row corresponds to a node in ``t``.
-    t : skbio.tree.TreeNode
-        The tree that corresponds to the rows in ``a``.
+        A matrix in which each row corresponds to a node of the tree.
+    child_index : np.ndarray of int
+        The ``child_index`` of the indexed tree (e.g., as returned by
+        ``TreeNode.to_array``), in which parents follow their children.
     tip_indices : np.ndarray of int
-        The index positions in ``a`` of the tips in ``t``.
+        The index positions in ``a`` of the tips of the tree.
 
     Returns
     -------
     np.ndarray of double
-        A matrix in which each row corresponds to a node in ``t``, Only the
+        A matrix in which each row corresponds to a node of the tree. Only the
         rows that correspond to tips are nonzero, and the values in these rows
         are the distance from that tip to the root of the tree.
     """
     cdef:
-        object n
-        Py_ssize_t i, p_i, n_rows
+        Py_ssize_t i, j, node, n_rows
         np.ndarray[np.double_t, ndim=1] mask
+        double[::1] tip_ds_view
         np.ndarray[np.double_t, ndim=1] tip_ds = a.copy()
 
-    # preorder reduction over the tree to gather distances at the tips
-    n_rows = tip_ds.shape[0]
-    for n in t.preorder(include_self=False):
-        i = n.id
-        p_i = n.parent.id
-
-        tip_ds[i] += tip_ds[p_i]
+    # preorder reduction over the tree to gather distances at the tips: the
+    # rows of child_index are visited in reverse, so that each parent is
+    # visited before its children
+    tip_ds_view = tip_ds
+    with nogil:
+        for i in range(child_index.shape[0] - 1, -1, -1):
+            node = child_index[i, 0]
+            for j in range(child_index[i, 1], child_index[i, 2] + 1):
+                tip_ds_view[j] += tip_ds_view[node]
 
     # construct a mask that represents the locations of the tips
+    n_rows = tip_ds.shape[0]
     mask = np.zeros(n_rows, dtype=np.double)
     for i in range(tip_indices.shape[0]):
         mask[tip_indices[i]] = 1.0
@@ -65,8 +70,7 @@ def _tip_distances(np.ndarray[np.double_t, ndim=1] a, object t,
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cdef _traverse_reduce(np.ndarray[DTYPE_t, ndim=2] child_index,
-                      np.ndarray[DTYPE_t, ndim=2] a):
+cdef _traverse_reduce(DTYPE_t[:, :] child_index, DTYPE_t[:, ::1] a):
     """Apply a[k] = sum[i:j]
 
     Parameters
@@ -120,7 +124,8 @@ cdef _traverse_reduce(np.ndarray[DTYPE_t, ndim=2] child_index,
     describes the node to aggregate into, and the start and stop index
     positions of the nodes immediate descendents.
 
-    This method operates inplace on ``a``
+    This method operates inplace on ``a``. The GIL is released during the
+    reduction.
     """
     cdef:
         Py_ssize_t i, j, k
@@ -128,14 +133,15 @@ cdef _traverse_reduce(np.ndarray[DTYPE_t, ndim=2] child_index,
         DTYPE_t n_envs = a.shape[1]
 
     # possible GPGPU target
-    for i in range(child_index.shape[0]):
-        node = child_index[i, 0]
-        start = child_index[i, 1]
-        end = child_index[i, 2]
+    with nogil:
+        for i in range(child_index.shape[0]):
+            node = child_index[i, 0]
+            start = child_index[i, 1]
+            end = child_index[i, 2]
 
-        for j in range(start, end + 1):
-            for k in range(n_envs):
-                a[node, k] += a[j, k]
+            for j in range(start, end + 1):
+                for k in range(n_envs):
+                    a[node, k] += a[j, k]
 
 
 @cython.boundscheck(False)
@@ -213,3 +219,229 @@ def _nodes_by_counts(np.ndarray counts,
     _traverse_reduce(indexed['child_index'], count_array)
 
     return count_array
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _unifrac_stripe(double[:, ::1] weights,
+                          double[::1] branch_lengths,
+                          double[::1] tip_distances,
+                          int mode,
+                          Py_ssize_t start,
+                          Py_ssize_t stop,
+                          double[::1] out) nogil:
+    cdef:
+        Py_ssize_t i, j, k, first, n_samples, n_nodes
+        double u, v, diff, num, den
+
+    n_samples = weights.shape[0]
+    n_nodes = weights.shape[1]
+
+    # loop over the columns of the stripe in the outer loop so that each
+    # sample's node vector is streamed through once per stripe, while the
+    # (small) block of rows of the stripe stays in cache
+    for j in range(start + 1, n_samples):
+        for i in range(start, stop):
+            if i >= j:
+                break
+
+            num = 0.0
+            den = 0.0
+            for k in range(n_nodes):
+                u = weights[i, k]
+                v = weights[j, k]
+                diff = u - v
+                if diff < 0:
+                    diff = -diff
+                num += branch_lengths[k] * diff
+                if mode == 0:
+                    den += branch_lengths[k] * (u if u > v else v)
+                elif mode == 2:
+                    den += tip_distances[k] * (u + v)
+
+            if mode != 1:
+                if den == 0.0:
+                    num = 0.0
+                else:
+                    num = num / den
+
+            first = n_samples * i - (i * (i + 1)) // 2
+            out[first + j - i - 1] = num
+
+
+def _unifrac_pdist_stripe(double[:, ::1] weights,
+                          double[::1] branch_lengths,
+                          double[::1] tip_distances,
+                          int mode,
+                          Py_ssize_t start,
+                          Py_ssize_t stop,
+                          double[::1] out):
+    """Compute UniFrac distances for a stripe of rows of a distance matrix
+
+    Parameters
+    ----------
+    weights : np.ndarray of double
+        A C-contiguous matrix in which each row corresponds to a sample and
+        each column corresponds to a node. For unweighted UniFrac, the values
+        are 1.0 if the node is observed in the sample and 0.0 otherwise. For
+        weighted UniFrac, the values are the proportional abundances of the
+        nodes.
+    branch_lengths : np.ndarray of double
+        The branch length of each node (column) in ``weights``.
+    tip_distances : np.ndarray of double
+        The distance of each node (column) in ``weights`` to the root if the
+        node is a tip, and zero otherwise. Only used if ``mode`` is 2.
+    mode : int
+        0 for unweighted UniFrac, 1 for weighted UniFrac and 2 for normalized
+        weighted UniFrac.
+    start, stop : int
+        The range of rows of the distance matrix to compute. For each row
+        ``i``, the distances to all samples ``j > i`` are computed.
+    out : np.ndarray of double
+        A condensed distance vector (as returned by
+        ``scipy.spatial.distance.pdist``) over all samples in ``weights``.
+        The distances of the stripe are written inplace.
+
+    Notes
+    -----
+    The GIL is released while the stripe is computed, so disjoint stripes can
+    be computed concurrently from multiple threads.
+    """
+    if not 0 <= start <= stop <= weights.shape[0]:
+        raise ValueError("Invalid stripe [%d, %d) for %d samples." %
+                         (start, stop, weights.shape[0]))
+    if out.shape[0] != weights.shape[0] * (weights.shape[0] - 1) // 2:
+        raise ValueError("`out` does not match the number of samples.")
+    if branch_lengths.shape[0] != weights.shape[1] or \
+            (mode == 2 and tip_distances.shape[0] != weights.shape[1]):
+        raise ValueError("Node vectors do not match the number of nodes.")
+
+    with nogil:
+        _unifrac_stripe(weights, branch_lengths, tip_distances, mode, start,
+                        stop, out)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _sparse_unifrac_stripe(Py_ssize_t[::1] indptr,
+                                 Py_ssize_t[::1] indices,
+                                 double[::1] data,
+                                 double[::1] branch_lengths,
+                                 double[::1] tip_distances,
+                                 int mode,
+                                 Py_ssize_t start,
+                                 Py_ssize_t stop,
+                                 double[::1] out) nogil:
+    cdef:
+        Py_ssize_t i, j, k, a, a_end, b, b_end, first, n_samples
+        double u, v, diff, num, den
+
+    n_samples = indptr.shape[0] - 1
+
+    for i in range(start, stop):
+        first = n_samples * i - (i * (i + 1)) // 2
+        for j in range(i + 1, n_samples):
+            num = 0.0
+            den = 0.0
+
+            # merge the (sorted) nonzero nodes of both samples
+            a = indptr[i]
+            a_end = indptr[i + 1]
+            b = indptr[j]
+            b_end = indptr[j + 1]
+            while a < a_end or b < b_end:
+                if b >= b_end or (a < a_end and indices[a] < indices[b]):
+                    k = indices[a]
+                    u = data[a]
+                    v = 0.0
+                    a += 1
+                elif a >= a_end or indices[b] < indices[a]:
+                    k = indices[b]
+                    u = 0.0
+                    v = data[b]
+                    b += 1
+                else:
+                    k = indices[a]
+                    u = data[a]
+                    v = data[b]
+                    a += 1
+                    b += 1
+
+                diff = u - v
+                if diff < 0:
+                    diff = -diff
+                num += branch_lengths[k] * diff
+                if mode == 0:
+                    den += branch_lengths[k] * (u if u > v else v)
+                elif mode == 2:
+                    den += tip_distances[k] * (u + v)
+
+            if mode != 1:
+                if den == 0.0:
+                    num = 0.0
+                else:
+                    num = num / den
+
+            out[first + j - i - 1] = num
+
+
+def _sparse_unifrac_pdist_stripe(Py_ssize_t[::1] indptr,
+                                 Py_ssize_t[::1] indices,
+                                 double[::1] data,
+                                 double[::1] branch_lengths,
+                                 double[::1] tip_distances,
+                                 int mode,
+                                 Py_ssize_t start,
+                                 Py_ssize_t stop,
+                                 double[::1] out):
+    """Compute UniFrac distances for a stripe of rows from sparse node values
+
+    Parameters
+    ----------
+    indptr, indices, data : np.ndarray
+        The components of a CSR matrix (with sorted indices) in which each
+        row corresponds to a sample and each column corresponds to a node.
+        See ``_unifrac_pdist_stripe`` for the meaning of the values.
+    branch_lengths : np.ndarray of double
+        The branch length of each node.
+    tip_distances : np.ndarray of double
+        The distance of each node to the root if the node is a tip, and zero
+        otherwise. Only used if ``mode`` is 2.
+    mode : int
+        0 for unweighted UniFrac, 1 for weighted UniFrac and 2 for normalized
+        weighted UniFrac.
+    start, stop : int
+        The range of rows of the distance matrix to compute.
+    out : np.ndarray of double
+        A condensed distance vector over all samples. The distances of the
+        stripe are written inplace.
+
+    Notes
+    -----
+    Only the nonzero nodes of each pair of samples are visited. As with
+    ``_unifrac_pdist_stripe``, the GIL is released while the stripe is
+    computed.
+    """
+    cdef:
+        Py_ssize_t n_samples = indptr.shape[0] - 1
+        Py_ssize_t n_nodes = branch_lengths.shape[0]
+
+    if not 0 <= start <= stop <= n_samples:
+        raise ValueError("Invalid stripe [%d, %d) for %d samples." %
+                         (start, stop, n_samples))
+    if out.shape[0] != n_samples * (n_samples - 1) // 2:
+        raise ValueError("`out` does not match the number of samples.")
+    if indices.shape[0] != data.shape[0] or \
+            indptr[n_samples] > indices.shape[0]:
+        raise ValueError("Invalid sparse matrix components.")
+    if indices.shape[0] and \
+            (np.min(indices) < 0 or np.max(indices) >= n_nodes):
+        raise ValueError("Node indices do not match the number of nodes.")
+    if mode == 2 and tip_distances.shape[0] != n_nodes:
+        raise ValueError("Node vectors do not match the number of nodes.")
+
+    with nogil:
+        _sparse_unifrac_stripe(indptr, indices, data, branch_lengths,
+                               tip_distances, mode, start, stop, out)
@@ -9,8 +9,9 @@
 import collections
 
 import numpy as np
+import scipy.sparse
 
-from skbio.tree import DuplicateNodeError, MissingNodeError
+from skbio.tree import TreeArray, DuplicateNodeError, MissingNodeError
 from skbio.diversity._phylogenetic import _nodes_by_counts
 
 
@@ -34,6 +35,9 @@ def _validate_counts_vector(counts, suppress_cast=False):
 
 
 def _validate_counts_matrix(counts, ids=None, suppress_cast=False):
+    if scipy.sparse.issparse(counts):
+        return _validate_sparse_counts_matrix(counts, ids, suppress_cast)
+
     results = []
 
     # handle case of where counts is a single vector by making it a matrix.
@@ -52,6 +56,14 @@ def _validate_counts_matrix(counts, ids=None, suppress_cast=False):
             "Number of rows in ``counts`` must be equal to number of provided "
             "``ids``.")
 
+    if counts.ndim == 2 and counts.dtype != object:
+        # all rows are of equal length, so validate the matrix at once
+        if not suppress_cast:
+            counts = counts.astype(int, casting='safe', copy=False)
+        if (counts < 0).any():
+            raise ValueError("Counts vector cannot contain negative values.")
+        return counts
+
     lens = []
     for v in counts:
         results.append(_validate_counts_vector(v, suppress_cast))
@@ -62,20 +74,71 @@ def _validate_counts_matrix(counts, ids=None, suppress_cast=False):
     return np.asarray(results)
 
 
+def _validate_sparse_counts_matrix(counts, ids=None, suppress_cast=False):
+    """Validate and convert a sparse counts matrix to CSR format.
+
+    Only the stored entries are checked, so the matrix is never densified.
+    Explicitly stored zeros are removed. Note: may not always return a copy of
+    `counts`!
+
+    """
+    counts = scipy.sparse.csr_matrix(counts)
+
+    if ids is not None and counts.shape[0] != len(ids):
+        raise ValueError(
+            "Number of rows in ``counts`` must be equal to number of provided "
+            "``ids``.")
+
+    if not suppress_cast:
+        counts = counts.astype(int, casting='safe', copy=False)
+
+    if (counts.data < 0).any():
+        raise ValueError("Counts vector cannot contain negative values.")
+
+    counts.eliminate_zeros()
+    counts.sort_indices()
+
+    return counts
+
+
+def _dense_rows(counts):
+    """Iterate over the rows of a dense or sparse counts matrix as vectors.
+
+    Rows of sparse matrices are densified one at a time.
+
+    """
+    if scipy.sparse.issparse(counts):
+        counts = scipy.sparse.csr_matrix(counts)
+        for i in range(counts.shape[0]):
+            yield counts[i].toarray()[0]
+    else:
+        for row in counts:
+            yield row
+
+
 def _validate_otu_ids_and_tree(counts, otu_ids, tree):
     len_otu_ids = len(otu_ids)
     set_otu_ids = set(otu_ids)
     if len_otu_ids != len(set_otu_ids):
         raise ValueError("``otu_ids`` cannot contain duplicated ids.")
 
-    if len(counts) != len_otu_ids:
+    if scipy.sparse.issparse(counts):
+        len_counts = counts.shape[-1]
+    else:
+        len_counts = len(counts)
+    if len_counts != len_otu_ids:
         raise ValueError("``otu_ids`` must be the same length as ``counts`` "
                          "vector(s).")
 
-    if len(tree.root().children) == 0:
+    if isinstance(tree, TreeArray):
+        n_root_children = np.count_nonzero(tree.parent == 0)
+    else:
+        n_root_children = len(tree.root().children)
+
+    if n_root_children == 0:
         raise ValueError("``tree`` must contain more than just a root node.")
 
-    if len(tree.root().children) > 2:
+    if n_root_children > 2:
         # this is an imperfect check for whether the tree is rooted or not.
         # can this be improved?
         raise ValueError("``tree`` must be rooted.")
@@ -83,17 +146,22 @@ def _validate_otu_ids_and_tree(counts, otu_ids, tree):
     # all nodes (except the root node) have corresponding branch lengths
     # all tip names in tree are unique
     # all otu_ids correspond to tip names in tree
-    branch_lengths = []
-    tip_names = []
-    for e in tree.traverse():
-        if not e.is_root():
-            branch_lengths.append(e.length)
-        if e.is_tip():
-            tip_names.append(e.name)
+    if isinstance(tree, TreeArray):
+        missing_lengths = np.isnan(tree.length[1:]).any()
+        tip_names = tree.names[tree.tips].tolist()
+    else:
+        branch_lengths = []
+        tip_names = []
+        for e in tree.traverse():
+            if not e.is_root():
+                branch_lengths.append(e.length)
+            if e.is_tip():
+                tip_names.append(e.name)
+        missing_lengths = np.array([l is None for l in branch_lengths]).any()
     set_tip_names = set(tip_names)
     if len(tip_names) != len(set_tip_names):
         raise DuplicateNodeError("All tip names must be unique.")
-    if np.array([l is None for l in branch_lengths]).any():
+    if missing_lengths:
         raise ValueError("All non-root nodes in ``tree`` must have a branch "
                          "length.")
     missing_tip_names = set_otu_ids - set_tip_names
@@ -106,11 +174,21 @@ def _validate_otu_ids_and_tree(counts, otu_ids, tree):
                                 " ".join(missing_tip_names)))
 
 
-def _vectorize_counts_and_tree(counts, otu_ids, tree):
+def _vectorize_counts_and_tree(counts, otu_ids, tree, tree_index=None):
     """ Index tree and convert counts to np.array in corresponding order
+
+    ``tree`` can be a ``TreeNode`` or a ``TreeArray``. If ``counts`` is a
+    ``scipy.sparse`` matrix, the counts of all nodes are returned as a sparse
+    CSR matrix. An existing ``tree_index`` (as returned by
+    ``tree.to_array(nan_length_value=0.0)``) can be provided to avoid
+    reindexing the tree.
     """
-    tree_index = tree.to_array(nan_length_value=0.0)
+    if tree_index is None:
+        tree_index = tree.to_array(nan_length_value=0.0)
     otu_ids = np.asarray(otu_ids)
+    if scipy.sparse.issparse(counts):
+        counts_by_node = _sparse_nodes_by_counts(counts, otu_ids, tree_index)
+        return counts_by_node, tree_index, tree_index['length']
     counts = np.atleast_2d(counts)
     counts_by_node = _nodes_by_counts(counts, otu_ids, tree_index)
     branch_lengths = tree_index['length']
@@ -120,6 +198,59 @@ def _vectorize_counts_and_tree(counts, otu_ids, tree):
     return counts_by_node.T, tree_index, branch_lengths
 
 
+def _sparse_nodes_by_counts(counts, otu_ids, tree_index):
+    """Sum sparse counts over all nodes of an indexed tree.
+
+    Every OTU count is propagated to its tip and all ancestors of its tip
+    through a single sparse product with an OTU-by-node ancestry matrix, so
+    only nonzero counts are touched.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Matrix in which each row corresponds to a sample and each column to a
+        node (in the order of ``tree_index``).
+
+    """
+    n_nodes = len(tree_index['name'])
+    parents = np.full(n_nodes, -1, dtype=np.intp)
+    for node, start, end in tree_index['child_index']:
+        parents[start:end + 1] = node
+
+    tip_indices = _get_tip_indices(tree_index)
+    node_lookup = dict(zip(tree_index['name'][tip_indices].tolist(),
+                           tip_indices.tolist()))
+    otu_indices = np.arange(len(otu_ids))
+    nodes = np.array([node_lookup[otu_id] for otu_id in otu_ids],
+                     dtype=np.intp)
+
+    rows, cols = [], []
+    while len(nodes):
+        rows.append(otu_indices)
+        cols.append(nodes)
+        nodes = parents[nodes]
+        has_parent = nodes >= 0
+        otu_indices = otu_indices[has_parent]
+        nodes = nodes[has_parent]
+
+    rows = np.concatenate(rows) if rows else np.array([], dtype=np.intp)
+    cols = np.concatenate(cols) if cols else np.array([], dtype=np.intp)
+    ancestry = scipy.sparse.csr_matrix(
+        (np.ones(len(rows), dtype=counts.dtype), (rows, cols)),
+        shape=(len(otu_ids), n_nodes))
+
+    counts_by_node = scipy.sparse.csr_matrix(counts).dot(ancestry)
+    counts_by_node.sort_indices()
+    return counts_by_node
+
+
+def _get_tip_indices(tree_index):
+    """Return the indices of the tips of an indexed tree, in index order."""
+    is_tip = np.ones(len(tree_index['name']), dtype=bool)
+    is_tip[tree_index['child_index'][:, 0]] = False
+    return np.flatnonzero(is_tip)
+
+
 def _get_phylogenetic_kwargs(counts, **kwargs):
     try:
         otu_ids = kwargs.pop('otu_ids')
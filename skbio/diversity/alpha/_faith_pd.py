@@ -6,16 +6,79 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse
+
 from skbio.util._decorator import experimental
 from skbio.diversity._util import (_validate_counts_vector,
                                    _validate_otu_ids_and_tree,
                                    _vectorize_counts_and_tree)
 
+# The maximum number of node counts (i.e., number of samples times number of
+# nodes) computed at once by _faith_pd_matrix.
+_FAITH_PD_CHUNK_ELEMENTS = 2 ** 24
+
 
 def _faith_pd(counts_by_node, branch_lengths):
     return (branch_lengths * (counts_by_node > 0)).sum()
 
 
+def _faith_pd_batch(counts_by_node, branch_lengths):
+    """Compute Faith PD for all rows of a (dense or sparse) node counts matrix
+
+    The node presence matrix is multiplied by the branch lengths in a single
+    (sparse) matrix-vector product.
+    """
+    presence = counts_by_node > 0
+    if scipy.sparse.issparse(presence):
+        return np.asarray(presence.dot(branch_lengths)).ravel()
+    return presence.dot(branch_lengths)
+
+
+def _faith_pd_matrix(counts, otu_ids, tree, validate, n_jobs=1):
+    """Compute Faith PD for all samples of a (dense or sparse) counts matrix
+
+    The tree is indexed once, and node counts are computed in chunks of
+    samples to bound memory use. If ``n_jobs`` is greater than one (or
+    ``None``, one per CPU), chunks are processed in a thread pool; counts are
+    propagated up the tree and multiplied by the branch lengths without
+    holding the GIL.
+    """
+    if not scipy.sparse.issparse(counts):
+        counts = np.atleast_2d(np.asarray(counts))
+    if validate:
+        _validate_otu_ids_and_tree(counts[0], otu_ids, tree)
+
+    tree_index = tree.to_array(nan_length_value=0.0)
+    branch_lengths = tree_index['length']
+
+    def compute(chunk):
+        counts_by_node, _, _ = _vectorize_counts_and_tree(
+            chunk, otu_ids, tree, tree_index=tree_index)
+        return _faith_pd_batch(counts_by_node, branch_lengths)
+
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_samples = counts.shape[0]
+    chunk_size = max(1, _FAITH_PD_CHUNK_ELEMENTS // len(branch_lengths))
+    if n_jobs > 1:
+        chunk_size = min(chunk_size, -(-n_samples // n_jobs))
+    if chunk_size >= n_samples:
+        return compute(counts)
+
+    chunks = (counts[start:start + chunk_size]
+              for start in range(0, n_samples, chunk_size))
+    if n_jobs > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(compute, chunks))
+    else:
+        results = [compute(chunk) for chunk in chunks]
+    return np.concatenate(results)
+
+
 @experimental(as_of="0.4.1")
 def faith_pd(counts, otu_ids, tree, validate=True):
     """ Compute Faith's phylogenetic diversity metric (PD)
@@ -27,7 +90,7 @@ def faith_pd(counts, otu_ids, tree, validate=True):
     otu_ids: list, np.array
         Vector of OTU ids corresponding to tip names in ``tree``. Must be the
         same length as ``counts``.
-    tree: skbio.TreeNode
+    tree: skbio.TreeNode or skbio.tree.TreeArray
         Tree relating the OTUs in otu_ids. The set of tip names in the tree can
         be a superset of ``otu_ids``, but not a subset.
     validate: bool, optional
@@ -0,0 +1,247 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+import scipy.sparse
+from scipy.special import gammaln
+
+
+class _CountsSummary:
+    """Per-sample intermediates of a dense or sparse counts matrix.
+
+    Intermediates (e.g., totals, observed OTUs, singletons) are computed for
+    all samples at once the first time they are requested, and are shared by
+    all metrics computed from the same summary.
+
+    Parameters
+    ----------
+    counts : 2D np.ndarray or scipy.sparse matrix
+        Matrix containing count/abundance data where each row contains counts
+        of OTUs in a given sample. Counts are assumed to be valid.
+
+    """
+
+    def __init__(self, counts):
+        self.sparse = scipy.sparse.issparse(counts)
+        if self.sparse:
+            counts = scipy.sparse.csr_matrix(counts)
+            counts.eliminate_zeros()
+            self.num_samples = counts.shape[0]
+            self._rows = np.repeat(np.arange(self.num_samples),
+                                   np.diff(counts.indptr))
+        else:
+            counts = np.atleast_2d(np.asarray(counts))
+            self.num_samples = counts.shape[0]
+        self.counts = counts
+        self._cache = {}
+
+    def _cached(self, name, func):
+        if name not in self._cache:
+            self._cache[name] = func()
+        return self._cache[name]
+
+    def _values(self):
+        """Return the counts of the matrix that can be nonzero."""
+        return self.counts.data if self.sparse else self.counts
+
+    def _row_sum(self, values):
+        """Sum values of the shape returned by ``_values`` over each sample."""
+        if self.sparse:
+            return np.bincount(self._rows, weights=values,
+                               minlength=self.num_samples)
+        return values.sum(axis=1)
+
+    def _row_count(self, mask):
+        """Count true values of a mask over ``_values`` for each sample."""
+        if self.sparse:
+            return np.bincount(self._rows[mask], minlength=self.num_samples)
+        return mask.sum(axis=1)
+
+    @property
+    def totals(self):
+        return self._cached('totals', lambda: np.asarray(
+            self.counts.sum(axis=1)).ravel())
+
+    @property
+    def observed(self):
+        return self._cached('observed',
+                            lambda: self._row_count(self._values() != 0))
+
+    @property
+    def singles(self):
+        return self._cached('singles',
+                            lambda: self._row_count(self._values() == 1))
+
+    @property
+    def doubles(self):
+        return self._cached('doubles',
+                            lambda: self._row_count(self._values() == 2))
+
+    @property
+    def maxima(self):
+        def f():
+            if self.sparse:
+                return self.counts.max(axis=1).toarray().ravel()
+            return self.counts.max(axis=1)
+        return self._cached('maxima', f)
+
+    @property
+    def sum_of_squares(self):
+        def f():
+            values = self._values()
+            return self._row_sum(values * values)
+        return self._cached('sum_of_squares', f)
+
+    @property
+    def dominance(self):
+        def f():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if self.sparse:
+                    return self.sum_of_squares / self.totals ** 2
+                freqs = self.counts / self.totals[:, np.newaxis]
+                return (freqs * freqs).sum(axis=1)
+        return self._cached('dominance', f)
+
+    @property
+    def entropy(self):
+        """Shannon entropy (natural logarithm) of each sample."""
+        def f():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if self.sparse:
+                    freqs = self.counts.data / self.totals[self._rows]
+                    entropy = -self._row_sum(freqs * np.log(freqs))
+                    entropy[self.totals == 0] = np.nan
+                    return entropy
+                freqs = self.counts / self.totals[:, np.newaxis]
+                return -np.where(freqs != 0, freqs * np.log(freqs),
+                                 0.0).sum(axis=1)
+        return self._cached('entropy', f)
+
+    @property
+    def log_factorial_sums(self):
+        def f():
+            return self._row_sum(gammaln(self._values() + 1))
+        return self._cached('log_factorial_sums', f)
+
+
+# Every function below computes a metric of ``skbio.diversity.alpha`` for all
+# samples of a _CountsSummary and accepts the same metric-specific parameters.
+# Divisions by zero produce nan or inf, as in the per-sample functions.
+
+def _berger_parker_d(summary):
+    return summary.maxima / summary.totals
+
+
+def _brillouin_d(summary):
+    n = summary.totals
+    return (gammaln(n + 1) - summary.log_factorial_sums) / n
+
+
+def _chao1(summary, bias_corrected=True):
+    o = summary.observed
+    s = summary.singles
+    d = summary.doubles
+    corrected = o + s * (s - 1) / (2 * (d + 1))
+    if bias_corrected:
+        return corrected
+    uncorrected = (s != 0) & (d != 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(uncorrected, o + s ** 2 / (d * 2), corrected)
+
+
+def _dominance(summary):
+    return summary.dominance
+
+
+def _doubles(summary):
+    return summary.doubles
+
+
+def _enspie(summary):
+    return 1 / summary.dominance
+
+
+def _goods_coverage(summary):
+    return 1 - (summary.singles / summary.totals)
+
+
+def _heip_e(summary):
+    return (np.exp(summary.entropy) - 1) / (summary.observed - 1)
+
+
+def _margalef(summary):
+    return (summary.observed - 1) / np.log(summary.totals)
+
+
+def _mcintosh_d(summary):
+    u = np.sqrt(summary.sum_of_squares)
+    n = summary.totals
+    return (n - u) / (n - np.sqrt(n))
+
+
+def _mcintosh_e(summary):
+    numerator = np.sqrt(summary.sum_of_squares)
+    n = summary.totals
+    s = summary.observed
+    denominator = np.sqrt((n - s + 1) ** 2 + s - 1)
+    return numerator / denominator
+
+
+def _menhinick(summary):
+    return summary.observed / np.sqrt(summary.totals)
+
+
+def _observed_otus(summary):
+    return summary.observed
+
+
+def _pielou_e(summary):
+    return summary.entropy / np.log(summary.observed)
+
+
+def _robbins(summary):
+    return summary.singles / summary.totals
+
+
+def _shannon(summary, base=2):
+    return summary.entropy / np.log(base)
+
+
+def _simpson(summary):
+    return 1 - summary.dominance
+
+
+def _simpson_e(summary):
+    return _enspie(summary) / summary.observed
+
+
+def _singles(summary):
+    return summary.singles
+
+
+def _get_matrix_metric_map():
+    return {
+        'berger_parker_d': _berger_parker_d,
+        'brillouin_d': _brillouin_d,
+        'chao1': _chao1,
+        'dominance': _dominance,
+        'doubles': _doubles,
+        'enspie': _enspie,
+        'goods_coverage': _goods_coverage,
+        'heip_e': _heip_e,
+        'margalef': _margalef,
+        'mcintosh_d': _mcintosh_d,
+        'mcintosh_e': _mcintosh_e,
+        'menhinick': _menhinick,
+        'observed_otus': _observed_otus,
+        'pielou_e': _pielou_e,
+        'robbins': _robbins,
+        'shannon': _shannon,
+        'simpson': _simpson,
+        'simpson_e': _simpson_e,
+        'singles': _singles}
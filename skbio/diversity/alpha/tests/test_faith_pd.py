@@ -11,12 +11,16 @@ from io import StringIO
 import os
 
 import numpy as np
+import numpy.testing as npt
 import pandas as pd
+import scipy.sparse
 
 from skbio import TreeNode
 from skbio.util import get_data_path
 from skbio.tree import DuplicateNodeError, MissingNodeError
 from skbio.diversity.alpha import faith_pd
+from skbio.diversity.alpha import _faith_pd as faith_pd_module
+from skbio.diversity.alpha._faith_pd import _faith_pd_matrix
 
 
 class FaithPDTests(TestCase):
@@ -136,6 +140,27 @@ class FaithPDTests(TestCase):
         expected = 2.3
         self.assertAlmostEqual(actual, expected)
 
+    def test_faith_pd_matrix(self):
+        exp = [faith_pd(c, self.oids1, self.t1) for c in self.b1]
+        for counts in self.b1, scipy.sparse.csr_matrix(self.b1):
+            for n_jobs in 1, 3, None:
+                obs = _faith_pd_matrix(counts, self.oids1, self.t1,
+                                       validate=True, n_jobs=n_jobs)
+                npt.assert_almost_equal(obs, exp)
+
+    def test_faith_pd_matrix_chunks(self):
+        # compute one sample at a time
+        exp = [faith_pd(c, self.oids1, self.t1_w_extra_tips) for c in self.b1]
+        chunk_elements = faith_pd_module._FAITH_PD_CHUNK_ELEMENTS
+        faith_pd_module._FAITH_PD_CHUNK_ELEMENTS = 1
+        try:
+            for counts in self.b1, scipy.sparse.csr_matrix(self.b1):
+                obs = _faith_pd_matrix(counts, self.oids1,
+                                       self.t1_w_extra_tips, validate=True)
+                npt.assert_almost_equal(obs, exp)
+        finally:
+            faith_pd_module._FAITH_PD_CHUNK_ELEMENTS = chunk_elements
+
     def test_faith_pd_invalid_input(self):
         # tree has duplicated tip ids
         t = TreeNode.read(
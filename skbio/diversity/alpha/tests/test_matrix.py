@@ -0,0 +1,67 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+import warnings
+
+import numpy as np
+import numpy.testing as npt
+import scipy.sparse
+
+import skbio.diversity.alpha
+from skbio.diversity.alpha._matrix import (_CountsSummary,
+                                           _get_matrix_metric_map)
+
+
+class MatrixMetricTests(TestCase):
+    def setUp(self):
+        self.counts = np.array([[0, 1, 1, 4, 2, 5, 2, 4, 1, 2],
+                                [0, 2, 2, 4, 5, 0, 0, 0, 0, 0],
+                                [0, 1, 1, 4, 5, 0, 0, 0, 0, 0],
+                                [9, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                                [1, 2, 0, 0, 0, 0, 0, 0, 0, 0],
+                                [12, 3, 1, 1, 7, 0, 2, 2, 1, 30],
+                                [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]])
+
+    def assert_metric_equal(self, name, counts, **kwargs):
+        # results must match the per-sample functions, including samples
+        # without any counts
+        func = getattr(skbio.diversity.alpha, name)
+        matrix_func = _get_matrix_metric_map()[name]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            exp = np.array([func(c, **kwargs) for c in self.counts],
+                           dtype=float)
+            obs = matrix_func(_CountsSummary(counts), **kwargs)
+        npt.assert_almost_equal(obs, exp)
+
+    def test_metrics(self):
+        for name in _get_matrix_metric_map():
+            self.assert_metric_equal(name, self.counts)
+
+    def test_metrics_sparse(self):
+        for sparse_type in scipy.sparse.csr_matrix, scipy.sparse.csc_matrix:
+            for name in _get_matrix_metric_map():
+                self.assert_metric_equal(name, sparse_type(self.counts))
+
+    def test_metric_kwargs(self):
+        sparse = scipy.sparse.csr_matrix(self.counts)
+        for counts in self.counts, sparse:
+            self.assert_metric_equal('chao1', counts, bias_corrected=False)
+            self.assert_metric_equal('shannon', counts, base=np.e)
+
+    def test_summary_cache(self):
+        summary = _CountsSummary(self.counts)
+        self.assertIs(summary.totals, summary.totals)
+        npt.assert_equal(summary.observed, [9, 4, 4, 1, 2, 9, 0])
+        npt.assert_equal(summary.singles, [3, 0, 2, 0, 1, 3, 0])
+        npt.assert_equal(summary.doubles, [3, 2, 0, 0, 1, 2, 0])
+
+
+if __name__ == '__main__':
+    main()
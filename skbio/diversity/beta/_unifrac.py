@@ -7,14 +7,20 @@
 # ----------------------------------------------------------------------------
 
 import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
+import scipy.sparse
 
 from skbio.util._decorator import experimental
 from skbio.diversity._util import (_validate_counts_matrix,
                                    _validate_otu_ids_and_tree,
-                                   _vectorize_counts_and_tree)
-from skbio.diversity._phylogenetic import _tip_distances
+                                   _vectorize_counts_and_tree,
+                                   _get_tip_indices)
+from skbio.diversity._phylogenetic import (_tip_distances,
+                                           _unifrac_pdist_stripe,
+                                           _sparse_unifrac_pdist_stripe)
 
 
 # The default value indicating whether normalization should be applied
@@ -23,6 +29,10 @@ from skbio.diversity._phylogenetic import _tip_distances
 # change in this default value.
 _normalize_weighted_unifrac_by_default = False
 
+# The number of node values of the samples in a stripe that are kept in cache
+# while the distances of the stripe are computed (i.e., 256KiB of doubles).
+_UNIFRAC_STRIPE_ELEMENTS = 2 ** 15
+
 
 @experimental(as_of="0.4.1")
 def unweighted_unifrac(u_counts, v_counts, otu_ids, tree, validate=True):
@@ -36,7 +46,7 @@ def unweighted_unifrac(u_counts, v_counts, otu_ids, tree, validate=True):
     otu_ids: list, np.array
         Vector of OTU ids corresponding to tip names in ``tree``. Must be the
         same length as ``u_counts`` and ``v_counts``.
-    tree: skbio.TreeNode
+    tree: skbio.TreeNode or skbio.tree.TreeArray
         Tree relating the OTUs in otu_ids. The set of tip names in the tree can
         be a superset of ``otu_ids``, but not a subset.
     validate: bool, optional
@@ -163,7 +173,7 @@ def weighted_unifrac(u_counts, v_counts, otu_ids, tree,
     otu_ids: list, np.array
         Vector of OTU ids corresponding to tip names in ``tree``. Must be the
         same length as ``u_counts`` and ``v_counts``.
-    tree: skbio.TreeNode
+    tree: skbio.TreeNode or skbio.tree.TreeArray
         Tree relating the OTUs in otu_ids. The set of tip names in the tree can
         be a superset of ``otu_ids``, but not a subset.
     normalized: boolean, optional
@@ -283,8 +293,8 @@ def weighted_unifrac(u_counts, v_counts, otu_ids, tree,
 
     if normalized:
         tip_indices = _get_tip_indices(tree_index)
-        node_to_root_distances = _tip_distances(branch_lengths, tree,
-                                                tip_indices)
+        node_to_root_distances = _tip_distances(
+            branch_lengths, tree_index['child_index'], tip_indices)
         return _weighted_unifrac_normalized(u_node_counts, v_node_counts,
                                             u_total_count, v_total_count,
                                             branch_lengths,
@@ -418,7 +428,7 @@ def _weighted_unifrac_normalized(u_node_counts, v_node_counts, u_total_count,
          respectively. This could be computed internally, but since this is a
          private method and the calling function has already generated these
          values, this saves an iteration over each of these vectors.
-    tree: skbio.TreeNode
+    tree: skbio.TreeNode or skbio.tree.TreeArray
          Tree relating the OTUs.
 
     Returns
@@ -466,7 +476,7 @@ def _setup_multiple_unweighted_unifrac(counts, otu_ids, tree, validate):
         Vector of OTU ids corresponding to tip names in ``tree``. Must be the
         same length as ``u_counts`` and ``v_counts``. These IDs do not need to
         be in tip order with respect to the tree.
-    tree: skbio.TreeNode
+    tree: skbio.TreeNode or skbio.tree.TreeArray
         Tree relating the OTUs in otu_ids. The set of tip names in the tree can
         be a superset of ``otu_ids``, but not a subset.
     validate: bool, optional
@@ -502,7 +512,7 @@ def _setup_multiple_weighted_unifrac(counts, otu_ids, tree, normalized,
         Vector of OTU ids corresponding to tip names in ``tree``. Must be the
         same length as ``u_counts`` and ``v_counts``. These IDs do not need to
         be in tip order with respect to the tree.
-    tree: skbio.TreeNode
+    tree: skbio.TreeNode or skbio.tree.TreeArray
         Tree relating the OTUs in otu_ids. The set of tip names in the tree can
         be a superset of ``otu_ids``, but not a subset.
     validate: bool, optional
@@ -522,8 +532,8 @@ def _setup_multiple_weighted_unifrac(counts, otu_ids, tree, normalized,
     tip_indices = _get_tip_indices(tree_index)
 
     if normalized:
-        node_to_root_distances = _tip_distances(branch_lengths, tree,
-                                                tip_indices)
+        node_to_root_distances = _tip_distances(
+            branch_lengths, tree_index['child_index'], tip_indices)
 
         def f(u_node_counts, v_node_counts):
             u_total_count = np.take(u_node_counts, tip_indices).sum()
@@ -545,10 +555,127 @@ def _setup_multiple_weighted_unifrac(counts, otu_ids, tree, normalized,
     return f, counts_by_node
 
 
-def _get_tip_indices(tree_index):
-    tip_indices = np.array([n.id for n in tree_index['id_index'].values()
-                            if n.is_tip()])
-    return tip_indices
+def _unifrac_pdist(counts, otu_ids, tree, weighted, normalized, validate,
+                   n_jobs=1):
+    """ Compute UniFrac distances between all pairs of samples
+
+    Parameters
+    ----------
+    counts : 2D array_like of ints or floats or scipy.sparse matrix
+        Matrix containing count/abundance data where each row contains counts
+        of observations in a given sample.
+    otu_ids: list, np.array
+        Vector of OTU ids corresponding to tip names in ``tree``. These IDs do
+        not need to be in tip order with respect to the tree.
+    tree: skbio.TreeNode or skbio.tree.TreeArray
+        Tree relating the OTUs in otu_ids. The set of tip names in the tree can
+        be a superset of ``otu_ids``, but not a subset.
+    weighted : bool
+        If `True`, compute weighted UniFrac, otherwise unweighted UniFrac.
+    normalized : bool
+        If `True`, normalize weighted UniFrac distances. Ignored for
+        unweighted UniFrac.
+    validate: bool, optional
+        If `False`, validation of the input won't be performed.
+    n_jobs : int, optional
+        Number of threads used to compute the distances. If `None`, one thread
+        per CPU is used.
+
+    Returns
+    -------
+    np.array of floats
+        Condensed distance vector, as returned by
+        ``scipy.spatial.distance.pdist``.
+
+    Notes
+    -----
+    The node-by-sample matrix is reduced to the nodes that contribute to any
+    distance (i.e., observed nodes with a nonzero branch length) and the
+    distances are computed by a compiled kernel in stripes of rows of the
+    distance matrix. If ``counts`` is sparse, the node-by-sample matrix is
+    kept sparse and only the nonzero nodes of each pair of samples are
+    visited. The kernel releases the GIL, so stripes are computed
+    concurrently if ``n_jobs`` is greater than one.
+
+    """
+    counts_by_node, tree_index, branch_lengths = \
+        _setup_multiple_unifrac(counts, otu_ids, tree, validate)
+    counts_by_node = counts_by_node.astype(float)
+    tip_distances = np.zeros_like(branch_lengths)
+    sparse = scipy.sparse.issparse(counts_by_node)
+    if sparse:
+        counts_by_node.eliminate_zeros()
+
+    if weighted:
+        tip_indices = _get_tip_indices(tree_index)
+        total_counts = np.asarray(
+            counts_by_node[:, tip_indices].sum(axis=1)).ravel()
+        observed = total_counts > 0
+        if sparse:
+            scale = np.ones_like(total_counts)
+            scale[observed] = total_counts[observed]
+            counts_by_node.data /= np.repeat(scale,
+                                             np.diff(counts_by_node.indptr))
+        else:
+            counts_by_node[observed] /= total_counts[observed, np.newaxis]
+        mode = 1
+        if normalized:
+            tip_distances = _tip_distances(
+                branch_lengths, tree_index['child_index'], tip_indices)
+            mode = 2
+    elif sparse:
+        counts_by_node.data[:] = 1.0
+        mode = 0
+    else:
+        counts_by_node = (counts_by_node > 0).astype(float)
+        mode = 0
+
+    n_samples = counts_by_node.shape[0]
+    distances = np.zeros(n_samples * (n_samples - 1) // 2)
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+
+    if sparse:
+        # only the nonzero nodes of each sample are stored and visited
+        compute = functools.partial(
+            _sparse_unifrac_pdist_stripe,
+            counts_by_node.indptr.astype(np.intp),
+            counts_by_node.indices.astype(np.intp),
+            counts_by_node.data, np.asarray(branch_lengths, dtype=float),
+            np.asarray(tip_distances, dtype=float), mode)
+        stripe_size = max(1, n_samples)
+    else:
+        keep = ((branch_lengths != 0) | (tip_distances != 0)) & \
+            counts_by_node.any(axis=0)
+        weights = np.ascontiguousarray(counts_by_node[:, keep])
+        if weights.shape[1] == 0:
+            # no observed branches, so all distances are zero
+            return distances
+        compute = functools.partial(
+            _unifrac_pdist_stripe, weights,
+            np.ascontiguousarray(branch_lengths[keep], dtype=float),
+            np.ascontiguousarray(tip_distances[keep], dtype=float), mode)
+        stripe_size = max(1, _UNIFRAC_STRIPE_ELEMENTS // weights.shape[1])
+
+    if n_jobs > 1:
+        # the first stripes hold the most pairs, so use enough stripes to
+        # balance the work across the threads
+        stripe_size = min(stripe_size, -(-n_samples // (4 * n_jobs)))
+    stripes = range(0, n_samples, stripe_size)
+
+    if n_jobs > 1 and len(stripes) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(compute, start,
+                                       min(start + stripe_size, n_samples),
+                                       distances)
+                       for start in stripes]
+            for future in futures:
+                future.result()
+    else:
+        for start in stripes:
+            compute(start, min(start + stripe_size, n_samples), distances)
+
+    return distances
 
 
 def _weighted_unifrac_branch_correction(node_to_root_distances,
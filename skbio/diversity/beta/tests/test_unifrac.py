@@ -6,17 +6,21 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import functools
 from io import StringIO
 from unittest import main, TestCase
 
 import numpy as np
+import numpy.testing as npt
 
 from skbio import TreeNode
-from skbio.tree import DuplicateNodeError, MissingNodeError
+from skbio.tree import TreeArray, DuplicateNodeError, MissingNodeError
 from skbio.diversity.beta import unweighted_unifrac, weighted_unifrac
 from skbio.diversity.beta._unifrac import (_unweighted_unifrac,
                                            _weighted_unifrac,
-                                           _weighted_unifrac_branch_correction)
+                                           _weighted_unifrac_branch_correction,
+                                           _unifrac_pdist)
+from skbio.diversity._phylogenetic import _unifrac_pdist_stripe
 
 
 class UnifracTests(TestCase):
@@ -98,6 +102,39 @@ class UnifracTests(TestCase):
                     self.b1[i], self.b1[j], self.oids1, self.t1)
                 self.assertAlmostEqual(actual, expected)
 
+    def test_tree_array(self):
+        # UniFrac values are the same for the array representation of a tree
+        tree = TreeArray.from_tree_node(self.t1_w_extra_tips)
+        for i in range(len(self.b1)):
+            for j in range(len(self.b1)):
+                for metric in unweighted_unifrac, weighted_unifrac:
+                    actual = metric(
+                        self.b1[i], self.b1[j], self.oids1, tree)
+                    expected = metric(
+                        self.b1[i], self.b1[j], self.oids1, self.t1)
+                    self.assertAlmostEqual(actual, expected)
+
+    def test_tree_array_invalid_input(self):
+        u_counts = [1, 2, 3]
+        v_counts = [1, 1, 1]
+        otu_ids = ['OTU1', 'OTU2', 'OTU3']
+        for newick, error in [
+                # duplicated tip ids
+                ('((OTU1:0.5,OTU2:0.5):0.5,(OTU3:1.0,OTU2:0.5):0.5)root;',
+                 DuplicateNodeError),
+                # unrooted tree
+                ('((OTU1:0.1,OTU2:0.2):0.3,OTU3:0.5,OTU4:0.7);', ValueError),
+                # missing branch length
+                ('((OTU1:0.5,OTU2:0.5),OTU3:1.0)root;', ValueError),
+                # missing tips
+                ('((OTU1:0.5,OTU2:0.5):0.5,OTU4:1.0)root;',
+                 MissingNodeError)]:
+            t = TreeArray.from_tree_node(TreeNode.read(StringIO(newick)))
+            self.assertRaises(error, unweighted_unifrac, u_counts,
+                              v_counts, otu_ids, t)
+            self.assertRaises(error, weighted_unifrac, u_counts,
+                              v_counts, otu_ids, t)
+
     def test_unweighted_minimal_trees(self):
         # two tips
         tree = TreeNode.read(StringIO('(OTU1:0.25, OTU2:0.25)root;'))
@@ -683,6 +720,48 @@ class UnifracTests(TestCase):
         self.assertAlmostEqual(
             _weighted_unifrac(m[:, 1], m[:, 2], m1s, m2s, bl)[0], 4.5)
 
+    def test_unifrac_pdist(self):
+        # compare all pairs computed by the compiled kernel against the
+        # pairwise functions, including samples without any counts
+        rs = np.random.RandomState(0)
+        tree = TreeNode.read(StringIO(
+            '((((OTU1:0.5,OTU2:0.5):0.5,OTU3:1.0):1.0,(OTU4:0.75,(OTU5:0.25,'
+            '(OTU6:0.5,OTU7:0.5):0.5):0.5):1.25):0.0,OTU8:0.1)root;'))
+        oids = ['OTU%d' % i for i in range(1, 9)]
+        counts = rs.randint(0, 3, size=(23, 8))
+        counts[5] = 0
+        counts[17] = 0
+
+        for weighted, normalized in [(False, False), (True, False),
+                                     (True, True)]:
+            if weighted:
+                func = functools.partial(weighted_unifrac,
+                                         normalized=normalized)
+            else:
+                func = unweighted_unifrac
+            exp = [func(counts[i], counts[j], oids, tree)
+                   for i in range(len(counts))
+                   for j in range(i + 1, len(counts))]
+
+            for n_jobs in 1, 3, None:
+                obs = _unifrac_pdist(counts, oids, tree, weighted=weighted,
+                                     normalized=normalized, validate=True,
+                                     n_jobs=n_jobs)
+                npt.assert_almost_equal(obs, exp)
+
+    def test_unifrac_pdist_stripe_invalid_input(self):
+        weights = np.ones((3, 2))
+        lengths = np.ones(2)
+        with self.assertRaises(ValueError):
+            _unifrac_pdist_stripe(weights, lengths, lengths, 0, 2, 4,
+                                  np.zeros(3))
+        with self.assertRaises(ValueError):
+            _unifrac_pdist_stripe(weights, lengths, lengths, 0, 0, 3,
+                                  np.zeros(2))
+        with self.assertRaises(ValueError):
+            _unifrac_pdist_stripe(weights, np.ones(3), lengths, 0, 0, 3,
+                                  np.zeros(3))
+
 
 if __name__ == '__main__':
     main()
@@ -6,16 +6,23 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from unittest import TestCase, main
+import os
+import tempfile
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import TestCase, main, mock
 
 import numpy as np
 import numpy.testing as npt
+import scipy.sparse
 
 from skbio import TreeNode, DistanceMatrix
+from skbio.tree import TreeArray
 from skbio.diversity import beta_diversity, block_beta_diversity
 from skbio.diversity._block import (_block_party, _generate_id_blocks,
                                     _pairs_to_compute, _block_compute,
-                                    _block_kwargs, _map, _reduce)
+                                    _block_kwargs, _map, _reduce, _pool_map,
+                                    _num_blocks, _index_otu_tips)
 
 
 class ParallelBetaDiversity(TestCase):
@@ -114,6 +121,123 @@ class ParallelBetaDiversity(TestCase):
         npt.assert_equal(obs.data, exp.data)
         self.assertEqual(obs.ids, exp.ids)
 
+    def test_pool_map(self):
+        kwargs = [{'a': i, 'b': i * 2} for i in range(10)]
+        exp = list(_map(_add, kwargs))
+        for executor_cls in ProcessPoolExecutor, ThreadPoolExecutor:
+            for chunksize in 1, 3, 20:
+                obs = list(_pool_map(executor_cls, _add, iter(kwargs),
+                                     n_jobs=2, chunksize=chunksize))
+                self.assertEqual(obs, exp)
+
+    def test_num_blocks(self):
+        for n in range(1, 12):
+            for k in range(1, 6):
+                exp = len(list(_block_kwargs(ids=list(range(n)), k=k)))
+                self.assertEqual(_num_blocks(n, k), exp)
+
+    def test_reduce_n_ids(self):
+        dm1 = DistanceMatrix(np.array([[0, 44],
+                                       [44, 0]]), (2, 4))
+        exp = DistanceMatrix(np.array([[0, 0, 0, 0, 0],
+                                       [0, 0, 0, 0, 0],
+                                       [0, 0, 0, 0, 44],
+                                       [0, 0, 0, 0, 0],
+                                       [0, 0, 44, 0, 0]]), list(range(5)))
+
+        obs = _reduce(iter([dm1]), n_ids=5)
+        npt.assert_equal(obs.data, exp.data)
+        self.assertEqual(obs.ids, exp.ids)
+
+    def test_reduce_out(self):
+        dm1 = DistanceMatrix(np.array([[0, 1, 2],
+                                       [1, 0, 3],
+                                       [2, 3, 0]]), (0, 1, 2))
+        out = np.full(3, 42.0)
+        obs = _reduce([dm1], n_ids=3, out=out)
+        self.assertIs(obs, out)
+        npt.assert_equal(out, [1, 2, 3])
+
+        with self.assertRaises(ValueError):
+            _reduce([dm1], n_ids=3, out=np.zeros(4))
+
+    def test_block_beta_diversity_map_backends(self):
+        counts = np.random.RandomState(0).randint(0, 5, size=(9, 2))
+        sids = list('ABCDEFGHI')
+        exp = beta_diversity('unweighted_unifrac', counts, sids,
+                             tree=self.tree1, otu_ids=self.oids1)
+        for map_f in 'process', 'thread':
+            obs = block_beta_diversity('unweighted_unifrac', counts, sids,
+                                       otu_ids=self.oids1, tree=self.tree1,
+                                       k=2, map_f=map_f, n_jobs=2)
+            npt.assert_almost_equal(obs.data, exp.data)
+            self.assertEqual(obs.ids, exp.ids)
+
+        with self.assertRaisesRegex(ValueError, 'not-a-backend'):
+            block_beta_diversity('unweighted_unifrac', counts, sids,
+                                 otu_ids=self.oids1, tree=self.tree1,
+                                 map_f='not-a-backend')
+
+    def test_block_beta_diversity_memmap_out(self):
+        exp = beta_diversity('unweighted_unifrac', self.table1, self.sids1,
+                             tree=self.tree1, otu_ids=self.oids1)
+        with tempfile.TemporaryDirectory() as tmp:
+            out = np.memmap(os.path.join(tmp, 'dm.dat'), dtype=float,
+                            mode='w+', shape=(3,))
+            obs = block_beta_diversity('unweighted_unifrac', self.table1,
+                                       self.sids1, otu_ids=self.oids1,
+                                       tree=self.tree1, k=2, out=out)
+            self.assertIs(obs, out)
+            npt.assert_equal(obs, exp.condensed_form())
+            del obs, out
+
+        with self.assertRaises(ValueError):
+            block_beta_diversity('unweighted_unifrac', self.table1,
+                                 self.sids1, otu_ids=self.oids1,
+                                 tree=self.tree1, reduce_f=_reduce,
+                                 out=np.zeros(3))
+
+    def test_block_beta_diversity_out_no_square_matrix(self):
+        n = 600
+        counts = np.random.RandomState(0).randint(0, 5, size=(n, 2))
+        sids = [str(i) for i in range(n)]
+        exp = beta_diversity('unweighted_unifrac', counts, sids,
+                             tree=self.tree1, otu_ids=self.oids1)
+        out = np.empty(n * (n - 1) // 2)
+
+        tracemalloc.start()
+        try:
+            with mock.patch('skbio.diversity._block.DistanceMatrix',
+                            side_effect=AssertionError('square matrix')):
+                obs = block_beta_diversity(
+                    'unweighted_unifrac', counts, sids, otu_ids=self.oids1,
+                    tree=self.tree1, k=30, out=out)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.assertIs(obs, out)
+        npt.assert_almost_equal(out, exp.condensed_form())
+        # the square matrix alone would take n * n * 8 bytes
+        self.assertLess(peak, n * n * 8 // 4)
+
+    def test_block_beta_diversity_sparse(self):
+        exp = beta_diversity('unweighted_unifrac', self.table1, self.sids1,
+                             tree=self.tree1, otu_ids=self.oids1)
+        obs = block_beta_diversity('unweighted_unifrac',
+                                   scipy.sparse.csr_matrix(self.table1),
+                                   self.sids1, otu_ids=self.oids1,
+                                   tree=self.tree1, k=2)
+        npt.assert_almost_equal(obs.data, exp.data)
+        self.assertEqual(obs.ids, exp.ids)
+
+    def test_block_beta_diversity_progress(self):
+        calls = []
+        block_beta_diversity('unweighted_unifrac', self.table1, self.sids1,
+                             otu_ids=self.oids1, tree=self.tree1, k=2,
+                             progress=lambda *args: calls.append(args))
+        self.assertEqual(calls, [(1, 2), (2, 2)])
+
     def test_block_beta_diversity(self):
         exp = beta_diversity('unweighted_unifrac', self.table1, self.sids1,
                              tree=self.tree1, otu_ids=self.oids1)
@@ -123,6 +247,16 @@ class ParallelBetaDiversity(TestCase):
         npt.assert_equal(obs.data, exp.data)
         self.assertEqual(obs.ids, exp.ids)
 
+    def test_block_beta_diversity_tree_array(self):
+        exp = beta_diversity('unweighted_unifrac', self.table1, self.sids1,
+                             tree=self.tree1, otu_ids=self.oids1)
+        obs = block_beta_diversity('unweighted_unifrac', self.table1,
+                                   self.sids1, otu_ids=self.oids1,
+                                   tree=TreeArray.from_tree_node(self.tree1),
+                                   k=2)
+        npt.assert_almost_equal(obs.data, exp.data)
+        self.assertEqual(obs.ids, exp.ids)
+
     def test_generate_id_blocks(self):
         ids = [1, 2, 3, 4, 5]
         exp = [(np.array((0, 1)), np.array((0, 1))),
@@ -183,6 +317,29 @@ class ParallelBetaDiversity(TestCase):
             npt.assert_equal(okw['otu_ids'], ekw['otu_ids'])
             self.assertEqual(str(okw['tree']), str(ekw['tree']))
 
+    def test_block_party_otu_tips(self):
+        counts = np.array([[1, 0, 1],
+                           [0, 0, 1],
+                           [0, 1, 1]])
+        tree = TreeArray.from_tree_node(
+            TreeNode.read(['((a:1,b:2)x:4,c:3);']))
+        otu_ids = ['a', 'b', 'c']
+        tree, otu_tips = _index_otu_tips(tree, otu_ids)
+        npt.assert_equal(otu_tips, [2, 3, 4])
+
+        obs = _block_party(counts, np.array([0]), np.array([1]), tree=tree,
+                           otu_ids=otu_ids, otu_tips=otu_tips)
+        self.assertNotIn('otu_tips', obs)
+        npt.assert_equal(obs['otu_ids'], ['a', 'c'])
+        self.assertEqual(str(obs['tree']), str(tree.shear(['a', 'c'])))
+
+    def test_index_otu_tips(self):
+        tree, otu_tips = _index_otu_tips(self.tree1, self.oids1)
+        self.assertIsInstance(tree, TreeArray)
+        npt.assert_equal(tree.names[otu_tips], self.oids1)
+        for otu_ids in (['O1', 'missing'], ['O1', 'root']):
+            self.assertIsNone(_index_otu_tips(tree, otu_ids)[1])
+
     def test_pairs_to_compute_rids_are_cids(self):
         rids = np.array([0, 1, 2, 10])
         cids = rids
@@ -203,5 +360,9 @@ class ParallelBetaDiversity(TestCase):
             _pairs_to_compute(rids, cids)
 
 
+def _add(a, b):
+    return a + b
+
+
 if __name__ == "__main__":
     main()
@@ -12,6 +12,7 @@ from unittest import TestCase, main
 import pandas as pd
 import numpy as np
 import numpy.testing as npt
+import scipy.sparse
 
 from skbio import DistanceMatrix, TreeNode
 from skbio.util._testing import assert_series_almost_equal
@@ -21,7 +22,7 @@ from skbio.diversity import (alpha_diversity, beta_diversity,
                              get_beta_diversity_metrics)
 from skbio.diversity.alpha import faith_pd, observed_otus
 from skbio.diversity.beta import unweighted_unifrac, weighted_unifrac
-from skbio.tree import DuplicateNodeError, MissingNodeError
+from skbio.tree import TreeArray, DuplicateNodeError, MissingNodeError
 
 
 class AlphaDiversityTests(TestCase):
@@ -65,6 +66,9 @@ class AlphaDiversityTests(TestCase):
         # additional kwargs
         self.assertRaises(TypeError, alpha_diversity, 'observed_otus',
                           [0, 1], not_a_real_kwarg=42.0)
+        with self.assertRaisesRegex(TypeError, r"^shannon\(\) got an "
+                                    "unexpected keyword argument 'bse'"):
+            alpha_diversity('shannon', [0, 1], bse=2)
         self.assertRaises(TypeError, alpha_diversity, 'faith_pd',
                           [0, 1], tree=self.tree1, otu_ids=['OTU1', 'OTU2'],
                           not_a_real_kwarg=42.0)
@@ -247,6 +251,29 @@ class AlphaDiversityTests(TestCase):
                                  otu_ids=self.oids2)
         assert_series_almost_equal(actual, expected)
 
+    def test_faith_pd_tree_array(self):
+        tree = TreeArray.from_tree_node(self.tree1)
+        for counts in self.table1, scipy.sparse.csr_matrix(self.table1):
+            expected = alpha_diversity('faith_pd', counts, tree=self.tree1,
+                                       otu_ids=self.oids1)
+            actual = alpha_diversity('faith_pd', counts, tree=tree,
+                                     otu_ids=self.oids1)
+            assert_series_almost_equal(actual, expected)
+        self.assertAlmostEqual(
+            faith_pd(self.table1[0], tree=tree, otu_ids=self.oids1),
+            faith_pd(self.table1[0], tree=self.tree1, otu_ids=self.oids1))
+
+    def test_faith_pd_n_jobs(self):
+        expected = alpha_diversity('faith_pd', self.table1, tree=self.tree1,
+                                   otu_ids=self.oids1)
+        actual = alpha_diversity('faith_pd', self.table1, tree=self.tree1,
+                                 otu_ids=self.oids1, n_jobs=2)
+        assert_series_almost_equal(actual, expected)
+
+        with self.assertRaises(TypeError):
+            alpha_diversity('faith_pd', self.table1, tree=self.tree1,
+                            otu_ids=self.oids1, not_a_real_kwarg=42)
+
     def test_no_ids(self):
         # expected values hand-calculated
         expected = pd.Series([3, 3, 3, 3])
@@ -262,6 +289,42 @@ class AlphaDiversityTests(TestCase):
                                       otu_ids=self.oids1)
         assert_series_almost_equal(optimized, unoptimized)
 
+    def test_multiple_metrics(self):
+        metrics = ['shannon', 'faith_pd', observed_otus, 'chao1', 'strong']
+        obs = alpha_diversity(metrics, self.table1, self.sids1,
+                              tree=self.tree1, otu_ids=self.oids1)
+        self.assertEqual(list(obs.columns),
+                         ['shannon', 'faith_pd', 'observed_otus', 'chao1',
+                          'strong'])
+        for metric, column in zip(metrics, obs.columns):
+            kwargs = {}
+            if metric == 'faith_pd':
+                kwargs = {'tree': self.tree1, 'otu_ids': self.oids1}
+            exp = alpha_diversity(metric, self.table1, self.sids1, **kwargs)
+            exp.name = column
+            assert_series_almost_equal(obs[column], exp)
+
+        # metric-specific parameters are passed to all metrics
+        obs = alpha_diversity(['shannon'], self.table1, base=np.e)
+        exp = alpha_diversity('shannon', self.table1, base=np.e)
+        npt.assert_almost_equal(obs['shannon'].values, exp.values)
+        with self.assertRaisesRegex(TypeError, r"^simpson\(\) got an "
+                                    "unexpected keyword argument 'base'"):
+            alpha_diversity(['shannon', 'simpson'], self.table1, base=np.e)
+
+    def test_sparse(self):
+        for sparse_type in scipy.sparse.csr_matrix, scipy.sparse.csc_matrix:
+            counts = sparse_type(self.table1)
+            for metric in 'observed_otus', 'shannon', 'dominance':
+                assert_series_almost_equal(
+                    alpha_diversity(metric, counts, ids=self.sids1),
+                    alpha_diversity(metric, self.table1, ids=self.sids1))
+            assert_series_almost_equal(
+                alpha_diversity('faith_pd', counts, ids=self.sids1,
+                                tree=self.tree1, otu_ids=self.oids1),
+                alpha_diversity('faith_pd', self.table1, ids=self.sids1,
+                                tree=self.tree1, otu_ids=self.oids1))
+
 
 class BetaDiversityTests(TestCase):
     def setUp(self):
@@ -550,6 +613,21 @@ class BetaDiversityTests(TestCase):
                 npt.assert_almost_equal(dm1[id1, id2],
                                         expected_dm[id1, id2], 6)
 
+    def test_unifrac_tree_array(self):
+        tree = TreeArray.from_tree_node(self.tree1)
+        for counts in self.table1, scipy.sparse.csr_matrix(self.table1):
+            for metric, kwargs in [('unweighted_unifrac', {}),
+                                   ('weighted_unifrac', {}),
+                                   ('weighted_unifrac', {'normalized': True}),
+                                   (weighted_unifrac, {})]:
+                exp = beta_diversity(metric, counts, self.sids1,
+                                     otu_ids=self.oids1, tree=self.tree1,
+                                     **kwargs)
+                obs = beta_diversity(metric, counts, self.sids1,
+                                     otu_ids=self.oids1, tree=tree, **kwargs)
+                npt.assert_almost_equal(obs.data, exp.data)
+                self.assertEqual(obs.ids, exp.ids)
+
     def test_weighted_unifrac_normalized(self):
         # TODO: update npt.assert_almost_equal calls to use DistanceMatrix
         # near-equality testing when that support is available
@@ -611,6 +689,39 @@ class BetaDiversityTests(TestCase):
         expected = DistanceMatrix([[0.0, 42.0], [42.0, 0.0]])
         self.assertEqual(dm1, expected)
 
+    def test_unifrac_n_jobs(self):
+        for metric, kwargs in [('unweighted_unifrac', {}),
+                               ('weighted_unifrac', {}),
+                               ('weighted_unifrac', {'normalized': True})]:
+            exp = beta_diversity(metric, self.table1, self.sids1,
+                                 otu_ids=self.oids1, tree=self.tree1,
+                                 **kwargs)
+            obs = beta_diversity(metric, self.table1, self.sids1,
+                                 otu_ids=self.oids1, tree=self.tree1,
+                                 n_jobs=2, **kwargs)
+            self.assertEqual(obs, exp)
+
+    def test_sparse(self):
+        for sparse_type in scipy.sparse.csr_matrix, scipy.sparse.csc_matrix:
+            counts = sparse_type(self.table1)
+            for metric, kwargs in [('unweighted_unifrac', {}),
+                                   ('weighted_unifrac', {}),
+                                   ('weighted_unifrac', {'normalized': True}),
+                                   (unweighted_unifrac, {})]:
+                exp = beta_diversity(metric, self.table1, self.sids1,
+                                     otu_ids=self.oids1, tree=self.tree1,
+                                     **kwargs)
+                obs = beta_diversity(metric, counts, self.sids1,
+                                     otu_ids=self.oids1, tree=self.tree1,
+                                     **kwargs)
+                npt.assert_almost_equal(obs.data, exp.data)
+                self.assertEqual(obs.ids, exp.ids)
+
+            exp = beta_diversity('braycurtis', self.table2, self.sids2)
+            obs = beta_diversity('braycurtis', sparse_type(self.table2),
+                                 self.sids2)
+            npt.assert_almost_equal(obs.data, exp.data)
+
 
 class MetricGetters(TestCase):
 
@@ -655,6 +766,17 @@ class TestPartialBetaDiversity(TestCase):
                        [0, 0, 25, 35, 0, 19, 0]]
         self.sids2 = list('ABCDEF')
 
+    def test_sparse(self):
+        id_pairs = [('A', 'B'), ('B', 'C')]
+        exp = partial_beta_diversity('unweighted_unifrac', self.table1,
+                                     self.sids1, id_pairs=id_pairs,
+                                     otu_ids=self.oids1, tree=self.tree1)
+        obs = partial_beta_diversity('unweighted_unifrac',
+                                     scipy.sparse.csr_matrix(self.table1),
+                                     self.sids1, id_pairs=id_pairs,
+                                     otu_ids=self.oids1, tree=self.tree1)
+        self.assertEqual(obs, exp)
+
     def test_id_pairs_as_iterable(self):
         id_pairs = iter([('B', 'C'), ])
         dm = partial_beta_diversity('unweighted_unifrac', self.table1,
@@ -11,6 +11,7 @@ from unittest import TestCase, main
 
 import numpy as np
 import numpy.testing as npt
+import scipy.sparse
 
 from skbio import TreeNode
 from skbio.diversity._util import (_validate_counts_vector,
@@ -110,6 +111,26 @@ class ValidationTests(TestCase):
         with self.assertRaises(ValueError):
             _validate_counts_matrix([[0, 0, 2, -1, 3], [0, 1, 1, 0, 2]])
 
+    def test_validate_counts_matrix_sparse(self):
+        counts = scipy.sparse.csc_matrix([[0, 1, 1, 0, 2], [0, 0, 2, 1, 3]])
+        # explicitly stored zeros are removed
+        counts.data[0] = 0
+        obs = _validate_counts_matrix(counts, ids=['a', 'b'])
+        self.assertTrue(scipy.sparse.isspmatrix_csr(obs))
+        self.assertEqual(obs.nnz, 5)
+        npt.assert_array_equal(obs.toarray(),
+                               [[0, 0, 1, 0, 2], [0, 0, 2, 1, 3]])
+
+        with self.assertRaises(ValueError):
+            _validate_counts_matrix(scipy.sparse.csr_matrix([[0, -1]]))
+        with self.assertRaises(ValueError):
+            _validate_counts_matrix(counts, ids=['a'])
+        with self.assertRaises(TypeError):
+            _validate_counts_matrix(scipy.sparse.csr_matrix([[0.5, 1]]))
+        obs = _validate_counts_matrix(scipy.sparse.csr_matrix([[0.5, 1]]),
+                                      suppress_cast=True)
+        npt.assert_array_equal(obs.toarray(), [[0.5, 1]])
+
     def test_validate_counts_matrix_unequal_lengths(self):
         # len of vectors not equal
         with self.assertRaises(ValueError):
@@ -156,6 +177,14 @@ class ValidationTests(TestCase):
         otu_ids = ['OTU1', 'OTU2', 'OTU3', 'OTU4', 'OTU5']
         self.assertTrue(_validate_otu_ids_and_tree(counts, otu_ids, t) is None)
 
+    def test_validate_otu_ids_and_tree_sparse(self):
+        t = TreeNode.read(io.StringIO("((a:1, b:2)c:3)root;"))
+        counts = scipy.sparse.csr_matrix([[0, 1], [1, 5]])
+        self.assertTrue(_validate_otu_ids_and_tree(counts[0], ['a', 'b'], t)
+                        is None)
+        with self.assertRaises(ValueError):
+            _validate_otu_ids_and_tree(counts[0], ['a'], t)
+
     def test_validate_otu_ids_and_tree_invalid_input(self):
         # tree has duplicated tip ids
         t = TreeNode.read(
@@ -242,6 +271,22 @@ class ValidationTests(TestCase):
         exp_counts = np.array([[0, 1, 10], [1, 5, 1], [1, 6, 11], [1, 6, 11]])
         npt.assert_equal(count_array, exp_counts.T)
 
+    def test_vectorize_counts_and_tree_sparse(self):
+        t = TreeNode.read(io.StringIO(
+            "(((a:1, b:2)c:3, d:1)e:1, (f:2, g:1)h:1)root;"))
+        otu_ids = np.array(['g', 'a', 'd', 'b'])
+        counts = np.array([[0, 1, 0, 0], [1, 5, 0, 2], [0, 0, 0, 0],
+                           [3, 0, 4, 0]])
+        exp, exp_indexed, exp_lengths = \
+            _vectorize_counts_and_tree(counts, otu_ids, t)
+
+        for sparse_type in scipy.sparse.csr_matrix, scipy.sparse.csc_matrix:
+            obs, indexed, branch_lengths = _vectorize_counts_and_tree(
+                sparse_type(counts), otu_ids, t)
+            self.assertTrue(scipy.sparse.isspmatrix_csr(obs))
+            npt.assert_equal(obs.toarray(), exp)
+            npt.assert_equal(branch_lengths, exp_lengths)
+
 
 if __name__ == "__main__":
     main()
@@ -18,6 +18,11 @@ Format Support
 +======+======+===============================================================+
 |Yes   |Yes   |:mod:`skbio.tree.TreeNode`                                     |
 +------+------+---------------------------------------------------------------+
+|Yes   |No    |:mod:`skbio.tree.TreeArray`                                    |
++------+------+---------------------------------------------------------------+
+|Yes   |No    |generator of :mod:`skbio.tree.TreeNode` or                     |
+|      |      |:mod:`skbio.tree.TreeArray` objects                            |
++------+------+---------------------------------------------------------------+
 
 Format Specification
 --------------------
@@ -160,15 +165,30 @@ the assumption that when a trifurcated root exists in an otherwise bifurcated
 tree that the tree must be unrooted. In scikit-bio, ``skbio.tree.TreeNode``
 will always be rooted at the ``newick`` root (``;``).
 
+Multiple Trees
+~~~~~~~~~~~~~~
+A Newick file can contain several trees, each terminated by a ``;`` (e.g.,
+the bootstrap replicates or posterior samples of a phylogenetic analysis,
+usually one tree per line). Reading into ``TreeNode`` or ``TreeArray`` returns
+the first tree. Reading without specifying an object class returns a
+generator of all the trees of the file, which are parsed one at a time as the
+generator is consumed, so that files of many trees can be processed in
+constant memory.
+
 Format Parameters
 -----------------
-The only supported format parameter is `convert_underscores`. This is `True` by
+The supported format parameter is `convert_underscores`. This is `True` by
 default. When `False`, underscores found in unescaped labels will not be
 converted to spaces. This is useful when reading the output of an external
 program in which the underscores were not escaped. This parameter only affects
 `read` operations. It does not exist for `write` operations; they will always
 properly escape underscores.
 
+When reading a generator of trees, `constructor` can also be provided to
+specify the type of the trees: ``skbio.tree.TreeNode`` (the default) or
+``skbio.tree.TreeArray``. ``TreeArray`` trees are parsed directly into arrays
+of node attributes, without creating ``TreeNode`` objects.
+
 Examples
 --------
 This is a simple Newick string.
@@ -205,6 +225,16 @@ This is a complex Newick string.
 Notice that the node originally labeled ``d_d`` became ``d d``. Additionally
 ``'b_b'''`` became ``b_b'``. Note that the underscore was preserved in `b_b'`.
 
+This file contains several trees, which are read one at a time.
+
+>>> from skbio.tree import TreeArray
+>>> f = StringIO("((a:1,b:2):1,c:3);\\n((a:1,c:3):1,b:2);\\n")
+>>> for tree in read(f, format="newick", constructor=TreeArray):
+...     print(tree.names[tree.tips])
+['a' 'b' 'c']
+['a' 'c' 'b']
+>>> f.close()
+
 References
 ----------
 .. [1] http://evolution.genetics.washington.edu/phylip/newick_doc.html
@@ -220,8 +250,12 @@ References
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import re
+
+import numpy as np
+
 from skbio.io import create_format, NewickFormatError
-from skbio.tree import TreeNode
+from skbio.tree import TreeNode, TreeArray
 
 newick = create_format('newick')
 
@@ -254,7 +288,7 @@ def _newick_sniffer(fh):
                 pass
             elif token == ')' and last_token != ':':
                 indent -= 1
-            elif token == '(' and (last_token == '(' or last_token == ','):
+            elif token == '(' and last_token in ('(', ',', ';'):
                 indent += 1
             else:
                 raise NewickFormatError()
@@ -267,15 +301,56 @@ def _newick_sniffer(fh):
     return not empty, {}
 
 
+@newick.reader(None)
+def _newick_to_generator(fh, convert_underscores=True, constructor=TreeNode):
+    if constructor is TreeNode:
+        parse = _parse_tree_node
+    elif constructor is TreeArray:
+        parse = _parse_tree_array
+    else:
+        raise ValueError("`constructor` must be TreeNode or TreeArray, not "
+                         "%r." % (constructor,))
+    tokens = _tokenize_newick(fh, convert_underscores=convert_underscores)
+    while True:
+        tree = parse(tokens)
+        if tree is None:
+            return
+        yield tree
+
+
 @newick.reader(TreeNode)
 def _newick_to_tree_node(fh, convert_underscores=True):
+    root = _parse_tree_node(_tokenize_newick(
+        fh, convert_underscores=convert_underscores))
+    if root is None:
+        raise _unbalanced_error()
+    return root
+
+
+@newick.reader(TreeArray)
+def _newick_to_tree_array(fh, convert_underscores=True):
+    tree = _parse_tree_array(_tokenize_newick(
+        fh, convert_underscores=convert_underscores))
+    if tree is None:
+        raise _unbalanced_error()
+    return tree
+
+
+def _parse_tree_node(tokens):
+    """Build a TreeNode from tokens, up to the next ``;``.
+
+    Returns ``None`` if there are no tokens left.
+
+    """
     tree_stack = []
     current_depth = 0
     last_token = ''
     next_is_distance = False
     root = TreeNode()
     tree_stack.append((root, current_depth))
-    for token in _tokenize_newick(fh, convert_underscores=convert_underscores):
+    empty = True
+    for token in tokens:
+        empty = False
         # Check for a label
         if last_token not in '(,):':
             if not next_is_distance:
@@ -323,10 +398,88 @@ def _newick_to_tree_node(fh, convert_underscores=True):
 
         last_token = token
 
-    raise NewickFormatError("Could not parse file as newick."
-                            " `(Parenthesis)`, `'single-quotes'`,"
-                            " `[comments]` may be unbalanced, or tree may be"
-                            " missing its root.")
+    if empty:
+        return None
+    raise _unbalanced_error()
+
+
+def _parse_tree_array(tokens):
+    """Build a TreeArray from tokens, up to the next ``;``.
+
+    Nodes are created in the order in which their subtrees start, i.e., in
+    preorder, so the tree is described directly by the parent, length and
+    name of each node. Returns ``None`` if there are no tokens left.
+
+    """
+    parent = [-1]
+    length = [np.nan]
+    names = [None]
+    # whether the children of each node have been closed
+    closed = [False]
+    # path from the root to the current node
+    path = [0]
+    last_token = ''
+    next_is_distance = False
+    empty = True
+    for token in tokens:
+        empty = False
+        # Check for a label
+        if last_token not in '(,):':
+            if not next_is_distance:
+                names[path[-1]] = last_token if last_token else None
+            else:
+                next_is_distance = False
+        # Check for a distance
+        if token == ':':
+            next_is_distance = True
+        elif last_token == ':':
+            try:
+                length[path[-1]] = float(token)
+            except ValueError:
+                raise NewickFormatError("Could not read length as numeric type"
+                                        ": %s." % token)
+
+        elif token == '(' or token == ',':
+            if token == ',':
+                if len(path) < 2:
+                    # nodes cannot be siblings of the root, but read up to
+                    # the end of the tree to report any other error first
+                    for token in tokens:
+                        if token == ';':
+                            break
+                    raise _unbalanced_error()
+                path.pop()
+            elif closed[path[-1]]:
+                raise NewickFormatError("Could not parse file as newick."
+                                        " Contains unnested children.")
+            path.append(len(parent))
+            parent.append(path[-2])
+            length.append(np.nan)
+            names.append(None)
+            closed.append(False)
+        elif token == ')':
+            if len(path) < 2:
+                raise NewickFormatError("Could not parse file as newick."
+                                        " Parenthesis are unbalanced.")
+            path.pop()
+            closed[path[-1]] = True
+        elif token == ';':
+            if len(path) == 1:
+                return TreeArray(parent, length, names)
+            break
+
+        last_token = token
+
+    if empty:
+        return None
+    raise _unbalanced_error()
+
+
+def _unbalanced_error():
+    return NewickFormatError("Could not parse file as newick."
+                             " `(Parenthesis)`, `'single-quotes'`,"
+                             " `[comments]` may be unbalanced, or tree may be"
+                             " missing its root.")
 
 
 @newick.writer(TreeNode)
@@ -368,6 +521,47 @@ def _tree_node_to_newick(obj, fh):
     fh.write(';\n')
 
 
+# A structure token, an escaped literal (with surrounding whitespace), or an
+# unescaped label (with whitespace)
+_LINE_TOKENS = re.compile(
+    r"([(),;:])|\s*'((?:'')*[^'](?:[^']|'')*)'\s*|([^(),;:']+)")
+
+
+def _split_simple_line(line, label_start):
+    """Split a line of structure tokens and labels, if simple enough.
+
+    A line is simple if it contains no comments, and if each of its labels is
+    either unescaped or a single escaped literal that does not only contain
+    (escaped) single-quotes. Returns a list
+    of regex matches (structure token, escaped literal or unescaped label),
+    or ``None`` if the line is not simple and must be read by character.
+
+    """
+    if '[' in line:
+        return None
+    matches = []
+    end = 0
+    previous = None
+    for match in _LINE_TOKENS.finditer(line):
+        if match.start() != end:
+            # an unmatched single-quote was skipped
+            return None
+        end = match.end()
+        kind = match.lastindex
+        # labels next to escaped literals (including an escaped literal
+        # continuing a label from the previous line) combine quirkily, so
+        # leave them to the character-based tokenizer
+        if kind != 1 and previous is not None and previous != 1:
+            return None
+        if kind == 2 and previous is None and label_start:
+            return None
+        previous = kind
+        matches.append(match)
+    if end != len(line):
+        return None
+    return matches
+
+
 def _tokenize_newick(fh, convert_underscores=True):
     structure_tokens = set('(),;:')
     not_escaped = True
@@ -391,6 +585,46 @@ def _tokenize_newick(fh, convert_underscores=True):
     # We use ' to indicate a literal string. It has the highest precedence of
     # any operator.
     for line in fh:
+        # Simple lines (see _split_simple_line) outside of comments and
+        # escaped literals are split with a regex rather than iterated by
+        # character. The state is updated exactly as the loop below would.
+        if comment_depth == 0 and not_escaped:
+            matches = _split_simple_line(line, label_start)
+        else:
+            matches = None
+        if matches is not None:
+            for match in matches:
+                segment = match.group()
+                kind = match.lastindex
+                if kind == 1:
+                    label_start = False
+                    metadata = ''.join(metadata_buffer)
+                    if last_non_ws_char == "'" or not convert_underscores:
+                        yield metadata
+                    elif metadata:
+                        yield metadata.replace('_', ' ')
+                    metadata_buffer = []
+                    yield segment
+                    last_char = last_non_ws_char = segment
+                    continue
+                elif kind == 2:
+                    metadata_buffer.append(match.group(2).replace("''", "'"))
+                    label_start = True
+                    last_non_ws_char = "'"
+                else:
+                    label = segment.strip()
+                    if label:
+                        if len(label.split()) > 1 or label_start and (
+                                segment[0].isspace() or last_char.isspace()):
+                            raise NewickFormatError(
+                                "Newick files cannot have unescaped"
+                                " whitespace in their labels.")
+                        metadata_buffer.append(label)
+                        label_start = True
+                        last_non_ws_char = label[-1]
+                last_char = segment[-1]
+            continue
+
         for character in line:
             # We will start by handling the comment case.
             # This code branch will probably never execute in practice.
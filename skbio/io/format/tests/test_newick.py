@@ -9,10 +9,14 @@
 import io
 import unittest
 
+import numpy.testing as npt
+
 from skbio import TreeNode
+from skbio.tree import TreeArray
 from skbio.io import NewickFormatError
 from skbio.io.format.newick import (
-    _newick_to_tree_node, _tree_node_to_newick, _newick_sniffer)
+    _newick_to_tree_node, _newick_to_tree_array, _newick_to_generator,
+    _tree_node_to_newick, _newick_sniffer)
 
 
 class TestNewick(unittest.TestCase):
@@ -33,6 +37,11 @@ class TestNewick(unittest.TestCase):
             self.assertTrue(c2.parent is n2)
             self._assert_equal(c1, c2)
 
+    def _assert_array_equal(self, a1, a2):
+        npt.assert_equal(a1.parent, a2.parent)
+        npt.assert_equal(a1.length, a2.length)
+        self.assertEqual(a1.names.tolist(), a2.names.tolist())
+
     def _setup_tree(self, kwargs_list):
         trees = []
         for kwargs in kwargs_list:
@@ -316,6 +325,65 @@ class TestNewick(unittest.TestCase):
                 self.assertIn(frag, str(cm.exception))
             fh.close()
 
+    def test_newick_to_tree_array_valid_files(self):
+        for _, newicks in self.trees_newick_lists:
+            for newick in newicks:
+                exp = TreeArray.from_tree_node(
+                    _newick_to_tree_node(io.StringIO(newick)))
+                obs = _newick_to_tree_array(io.StringIO(newick))
+                self._assert_array_equal(obs, exp)
+
+    def test_newick_to_tree_array_invalid_files(self):
+        for invalid, error_fragments in self.invalid_newicks:
+            with self.assertRaises(NewickFormatError) as cm:
+                _newick_to_tree_array(io.StringIO(invalid))
+            for frag in error_fragments:
+                self.assertIn(frag, str(cm.exception))
+
+    def test_newick_to_generator(self):
+        newicks = [newicks[0] for _, newicks in self.trees_newick_lists]
+        exp = [_newick_to_tree_node(io.StringIO(n)) for n in newicks]
+        # trees may share a line or span several lines
+        text = ''.join(newicks) + ' ((a,b)c,d);' + ' \n(e,\n f);\n\n'
+        exp += [_newick_to_tree_node(io.StringIO(n))
+                for n in ('((a,b)c,d);', '(e,f);')]
+
+        obs = list(_newick_to_generator(io.StringIO(text)))
+        self.assertEqual(len(obs), len(exp))
+        for o, e in zip(obs, exp):
+            self._assert_equal(o, e)
+
+        obs = list(_newick_to_generator(io.StringIO(text),
+                                        constructor=TreeArray))
+        self.assertEqual(len(obs), len(exp))
+        for o, e in zip(obs, exp):
+            self._assert_array_equal(o, TreeArray.from_tree_node(e))
+
+    def test_newick_to_generator_convert_underscores(self):
+        text = "(_a,'_b');\n(c_,d);\n"
+        for constructor in TreeNode, TreeArray:
+            trees = list(_newick_to_generator(io.StringIO(text),
+                                              convert_underscores=False,
+                                              constructor=constructor))
+            self.assertEqual(str(trees[0]), "('_a','_b');\n")
+            trees = list(_newick_to_generator(io.StringIO(text),
+                                              constructor=constructor))
+            self.assertEqual(str(trees[0]), "(_a,'_b');\n")
+            self.assertEqual(str(trees[1]), "(c_,d);\n")
+
+    def test_newick_to_generator_invalid(self):
+        for constructor in TreeNode, TreeArray:
+            trees = _newick_to_generator(io.StringIO("(a,b);\n(c,d"),
+                                         constructor=constructor)
+            next(trees)
+            with self.assertRaises(NewickFormatError):
+                next(trees)
+            self.assertEqual(list(_newick_to_generator(
+                io.StringIO(" \n"), constructor=constructor)), [])
+        with self.assertRaises(ValueError):
+            next(_newick_to_generator(io.StringIO("(a,b);"),
+                                      constructor=dict))
+
     def test_tree_node_to_newick(self):
         for tree, newicks in self.trees_newick_lists:
             newick = newicks[0]
@@ -358,6 +426,10 @@ class TestNewick(unittest.TestCase):
                 self.assertEqual(_newick_sniffer(fh), (True, {}))
                 fh.close()
 
+    def test_newick_sniffer_multiple_trees(self):
+        fh = io.StringIO("((a,b),c);\n((a,c),b);\n")
+        self.assertEqual(_newick_sniffer(fh), (True, {}))
+
     def test_newick_sniffer_invalid_files(self):
         for invalid, _ in self.invalid_newicks:
             fh = io.StringIO(invalid)
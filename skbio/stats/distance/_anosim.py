@@ -9,14 +9,17 @@
 from functools import partial
 
 import numpy as np
+from scipy.spatial.distance import squareform
 from scipy.stats import rankdata
 
-from ._base import (_preprocess_input, _run_monte_carlo_stats, _build_results)
+from ._base import (_preprocess_input, _run_monte_carlo_stats, _build_results,
+                    _default_batch_size, _within_group_sums)
 from skbio.util._decorator import experimental
 
 
 @experimental(as_of="0.4.0")
-def anosim(distance_matrix, grouping, column=None, permutations=999):
+def anosim(distance_matrix, grouping, column=None, permutations=999,
+           seed=None, n_jobs=1, batch_size=None):
     """Test for significant differences between groups using ANOSIM.
 
     Analysis of Similarities (ANOSIM) is a non-parametric method that tests
@@ -58,6 +61,20 @@ def anosim(distance_matrix, grouping, column=None, permutations=999):
         significance. Must be greater than or equal to zero. If zero,
         statistical significance calculations will be skipped and the p-value
         will be ``np.nan``.
+    seed : int, optional
+        Seed used to generate the permutations. If provided, results are
+        reproducible regardless of `n_jobs`. If not provided, permutations
+        are drawn from the global ``numpy.random`` state.
+    n_jobs : int, optional
+        Number of processes used to evaluate the permutations in parallel. If
+        negative, ``cpu_count() + 1 + n_jobs`` processes are used (e.g., -1
+        uses all CPUs).
+    batch_size : int, optional
+        Number of permutations to evaluate together. Larger batches are
+        faster but require more memory (the R statistics of a batch are
+        computed from an ``n x (batch_size * num_groups)`` group indicator
+        matrix). If not provided, a batch size is chosen so that this matrix
+        holds at most roughly four million elements.
 
     Returns
     -------
@@ -77,6 +94,12 @@ def anosim(distance_matrix, grouping, column=None, permutations=999):
 
     The p-value will be ``np.nan`` if `permutations` is zero.
 
+    The distances are ranked a single time, as the ranks do not depend on the
+    grouping. The R statistics of a batch of permuted grouping vectors are
+    computed with matrix products between the ranks and group indicator
+    matrices (as in ``permanova``), rather than by extracting within- and
+    between-group ranks for each permutation.
+
     References
     ----------
     .. [1] Clarke, KR. "Non-parametric multivariate analyses of changes in
@@ -170,35 +193,45 @@ def anosim(distance_matrix, grouping, column=None, permutations=999):
     sample_size, num_groups, grouping, tri_idxs, distances = _preprocess_input(
         distance_matrix, grouping, column)
 
+    if batch_size is None:
+        batch_size = _default_batch_size(sample_size, num_groups)
+
     divisor = sample_size * ((sample_size - 1) / 4)
     ranked_dists = rankdata(distances, method='average')
 
-    test_stat_function = partial(_compute_r_stat, tri_idxs, ranked_dists,
-                                 divisor)
+    # The number of within-group distances does not depend on the order of
+    # the grouping vector.
+    group_sizes = np.bincount(grouping)
+    num_within = (group_sizes * (group_sizes - 1) // 2).sum()
+    num_between = len(ranked_dists) - num_within
+
+    test_stat_function = partial(
+        _compute_r_stat, squareform(ranked_dists, checks=False),
+        ranked_dists.sum(), num_within, num_between, num_groups, divisor)
     stat, p_value = _run_monte_carlo_stats(test_stat_function, grouping,
-                                           permutations)
+                                           permutations,
+                                           batch_size=batch_size, seed=seed,
+                                           n_jobs=n_jobs)
 
     return _build_results('ANOSIM', 'R', sample_size, num_groups, stat,
                           p_value, permutations)
 
 
-def _compute_r_stat(tri_idxs, ranked_dists, divisor, grouping):
-    """Compute ANOSIM R statistic (between -1 and +1)."""
-    # Create a matrix where True means that the two objects are in the same
-    # group. This ufunc requires that grouping is a numeric vector (e.g., it
-    # won't work with a grouping vector of strings).
-    grouping_matrix = np.equal.outer(grouping, grouping)
+def _compute_r_stat(ranks, ranks_sum, num_within, num_between, num_groups,
+                    divisor, groupings):
+    """Compute ANOSIM R statistics (between -1 and +1) for a batch of groupings.
 
-    # Extract upper triangle from the grouping matrix. It is important to
-    # extract the values in the same order that the distances are extracted
-    # from the distance matrix (see ranked_dists). Extracting the upper
-    # triangle (excluding the diagonal) preserves this order.
-    grouping_tri = grouping_matrix[tri_idxs]
+    `groupings` is a 2-D array of integer grouping vectors (one per row) and
+    `ranks` is the full (redundant) matrix of ranked distances. One R
+    statistic is returned per grouping vector.
+
+    """
+    within = _within_group_sums(ranks, num_groups, groupings).sum(axis=1)
 
     # within
-    r_W = np.mean(ranked_dists[grouping_tri])
+    r_W = within / num_within
 
     # between
-    r_B = np.mean(ranked_dists[np.invert(grouping_tri)])
+    r_B = (ranks_sum - within) / num_between
 
     return (r_B - r_W) / divisor
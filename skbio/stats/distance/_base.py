@@ -7,6 +7,8 @@
 # ----------------------------------------------------------------------------
 
 import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 
 from IPython.core.pylabtools import print_figure
@@ -1076,25 +1078,208 @@ def _df_to_vector(distance_matrix, df, column):
     return grouping.tolist()
 
 
-def _run_monte_carlo_stats(test_stat_function, grouping, permutations):
-    """Run stat test and compute significance with Monte Carlo permutations."""
+def _run_monte_carlo_stats(test_stat_function, grouping, permutations,
+                           batch_size=None, seed=None, n_jobs=1,
+                           executor=None):
+    """Run stat test and compute significance with Monte Carlo permutations.
+
+    See ``_run_permutations`` for a description of the parameters.
+
+    """
+    stat, perm_stats = _run_permutations(
+        test_stat_function, grouping, permutations, batch_size=batch_size,
+        seed=seed, n_jobs=n_jobs, executor=executor)
+
+    p_value = np.nan
+    if permutations > 0:
+        p_value = ((perm_stats >= stat).sum() + 1) / (permutations + 1)
+
+    return stat, p_value
+
+
+def _run_permutations(test_stat_function, grouping, permutations,
+                      batch_size=None, seed=None, n_jobs=1, executor=None):
+    """Compute test statistics of `grouping` and of random permutations of it.
+
+    If `batch_size` is provided, `test_stat_function` must be vectorized: it
+    accepts a 2-D array of grouping vectors (one per row) and returns a 1-D
+    array containing the test statistic for each row. Permutations are then
+    evaluated in batches of at most `batch_size` grouping vectors. The
+    permuted grouping vectors do not depend on `batch_size`.
+
+    If `seed`, `executor` and `n_jobs` are not provided, permutations are
+    drawn from the global ``numpy.random`` state. Otherwise, permutations are
+    split into fixed-size chunks that each draw from an independent random
+    stream derived from `seed`, and groups of chunks are evaluated by
+    `n_jobs` parallel tasks. Because the streams are tied to chunks rather
+    than to tasks, results are identical regardless of `n_jobs`. If `seed` is
+    not provided, it is drawn from the global ``numpy.random`` state.
+
+    `test_stat_function` and `grouping` must be picklable if they are
+    evaluated in other processes (e.g., a ``functools.partial`` of a
+    module-level function).
+
+    Returns the test statistic of `grouping` and a 1-D array containing the
+    test statistic of each permutation.
+
+    """
     if permutations < 0:
         raise ValueError(
             "Number of permutations must be greater than or equal to zero.")
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("Batch size must be greater than or equal to one.")
+    n_jobs = _resolve_n_jobs(n_jobs)
 
-    stat = test_stat_function(grouping)
+    grouping = np.asarray(grouping)
+    stat = _compute_stats(test_stat_function, grouping[np.newaxis, :],
+                          batch_size)[0]
 
-    p_value = np.nan
-    if permutations > 0:
+    if permutations == 0:
+        perm_stats = np.empty(0, dtype=np.float64)
+    elif seed is None and n_jobs == 1 and executor is None:
         perm_stats = np.empty(permutations, dtype=np.float64)
+        step = batch_size or 1
+        for start in range(0, permutations, step):
+            stop = min(start + step, permutations)
+            perm_groupings = np.empty((stop - start, len(grouping)),
+                                      dtype=grouping.dtype)
+            for i in range(stop - start):
+                perm_groupings[i] = np.random.permutation(grouping)
+            perm_stats[start:stop] = _compute_stats(
+                test_stat_function, perm_groupings, batch_size)
+    else:
+        perm_stats = _run_permutation_chunks(
+            test_stat_function, grouping, permutations, batch_size, seed,
+            n_jobs, executor)
+
+    return stat, perm_stats
+
+
+# Number of permutations drawn from each independent random stream. This is
+# fixed (i.e., it does not depend on the number of jobs) so that permutation
+# results are reproducible given a seed.
+_PERMUTATIONS_PER_STREAM = 32
+
+
+def _resolve_n_jobs(n_jobs):
+    """Return number of jobs, where negative values count back from CPUs."""
+    if n_jobs == 0:
+        raise ValueError("Number of jobs cannot be zero.")
+    if n_jobs < 0:
+        n_jobs = max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+
+def _random_streams(seed, num_streams):
+    """Return independent ``RandomState`` objects derived from `seed`."""
+    if hasattr(np.random, 'SeedSequence'):
+        return [np.random.RandomState(np.random.MT19937(child))
+                for child in np.random.SeedSequence(seed).spawn(num_streams)]
+    # SeedSequence is only available in numpy >= 1.17. Fall back to seeding
+    # each stream with the (seed, stream index) pair.
+    return [np.random.RandomState([seed, i]) for i in range(num_streams)]
+
+
+def _compute_stats(test_stat_function, groupings, batch_size):
+    """Compute test statistics for each row of a 2-D array of groupings."""
+    if batch_size is None:
+        return np.array([test_stat_function(g) for g in groupings],
+                        dtype=np.float64)
+
+    stats = np.empty(len(groupings), dtype=np.float64)
+    for start in range(0, len(groupings), batch_size):
+        stop = start + batch_size
+        stats[start:stop] = test_stat_function(groupings[start:stop])
+    return stats
+
+
+def _permutation_chunk_stats(test_stat_function, grouping, chunks,
+                             batch_size):
+    """Compute test statistics of chunks of permutations.
+
+    Each chunk is a ``(RandomState, num_permutations)`` pair. This function
+    is executed by each parallel task.
 
-        for i in range(permutations):
-            perm_grouping = np.random.permutation(grouping)
-            perm_stats[i] = test_stat_function(perm_grouping)
-
-        p_value = ((perm_stats >= stat).sum() + 1) / (permutations + 1)
+    """
+    num_perms = sum(size for _, size in chunks)
+    perm_groupings = np.empty((num_perms, len(grouping)), dtype=grouping.dtype)
+    i = 0
+    for random_state, size in chunks:
+        for _ in range(size):
+            perm_groupings[i] = random_state.permutation(grouping)
+            i += 1
+    return _compute_stats(test_stat_function, perm_groupings, batch_size)
+
+
+def _run_permutation_chunks(test_stat_function, grouping, permutations,
+                            batch_size, seed, n_jobs, executor):
+    """Compute permuted test statistics from seeded chunks of permutations."""
+    if seed is None:
+        seed = np.random.randint(2 ** 31)
+
+    sizes = [min(_PERMUTATIONS_PER_STREAM, permutations - start)
+             for start in range(0, permutations, _PERMUTATIONS_PER_STREAM)]
+    chunks = list(zip(_random_streams(seed, len(sizes)), sizes))
+
+    num_tasks = min(n_jobs, len(chunks))
+    if num_tasks == 1 and executor is None:
+        return _permutation_chunk_stats(test_stat_function, grouping, chunks,
+                                        batch_size)
+
+    # Split the chunks into contiguous groups, one per task, so that the
+    # inputs are sent to each worker a single time.
+    bounds = np.linspace(0, len(chunks), num_tasks + 1).astype(int)
+    task_chunks = [chunks[start:stop]
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=num_tasks) as pool:
+            return _submit_chunks(pool, test_stat_function, grouping,
+                                  task_chunks, batch_size)
+    return _submit_chunks(executor, test_stat_function, grouping, task_chunks,
+                          batch_size)
+
+
+def _submit_chunks(executor, test_stat_function, grouping, task_chunks,
+                   batch_size):
+    futures = [executor.submit(_permutation_chunk_stats, test_stat_function,
+                               grouping, chunks, batch_size)
+               for chunks in task_chunks]
+    return np.concatenate([future.result() for future in futures])
+
+
+def _default_batch_size(sample_size, num_groups, max_elements=2 ** 22):
+    """Return batch size bounding the size of the group indicator matrix."""
+    return max(1, max_elements // (sample_size * num_groups))
+
+
+def _within_group_sums(matrix, num_groups, groupings):
+    """Sum the entries of `matrix` between objects in the same group.
+
+    `matrix` is a symmetric, hollow ``n x n`` matrix (e.g., distances or
+    ranked distances in redundant form) and `groupings` is a 2-D array of
+    integer grouping vectors (one per row). Returns a ``(len(groupings),
+    num_groups)`` array containing, for each grouping vector and group, the
+    sum over each pair of objects in that group.
+
+    Rather than extracting within-group entries for each grouping vector,
+    the sums of a batch of grouping vectors are computed with a single matrix
+    product against their group indicator matrices.
 
-    return stat, p_value
+    """
+    num_batch, sample_size = groupings.shape
+
+    # Build a group indicator matrix with one column per (grouping vector,
+    # group) pair: entry (i, b * num_groups + g) is 1 if object i belongs to
+    # group g in grouping vector b.
+    columns = groupings + (np.arange(num_batch) * num_groups)[:, np.newaxis]
+    indicators = np.zeros((sample_size, num_batch * num_groups))
+    indicators[np.tile(np.arange(sample_size), num_batch),
+               columns.ravel()] = 1
+
+    # Each pair of objects is counted twice because the matrix is symmetric.
+    within = (indicators * matrix.dot(indicators)).sum(axis=0)
+    return within.reshape(num_batch, num_groups) / 2
 
 
 def _build_results(method_name, test_stat_name, sample_size, num_groups, stat,
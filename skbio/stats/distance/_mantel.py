@@ -6,20 +6,23 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+from functools import partial
 from itertools import combinations
 
 import numpy as np
 import pandas as pd
 import scipy.misc
-from scipy.stats import pearsonr, spearmanr
+from scipy.spatial.distance import squareform
+from scipy.stats import pearsonr, spearmanr, rankdata
 
 from skbio.stats.distance import DistanceMatrix
 from skbio.util._decorator import experimental
+from ._base import _run_permutations
 
 
 @experimental(as_of="0.4.0")
 def mantel(x, y, method='pearson', permutations=999, alternative='two-sided',
-           strict=True, lookup=None):
+           strict=True, lookup=None, seed=None, n_jobs=1, batch_size=None):
     """Compute correlation between distance matrices using the Mantel test.
 
     The Mantel test compares two distance matrices by computing the correlation
@@ -102,6 +105,19 @@ def mantel(x, y, method='pearson', permutations=999, alternative='two-sided',
         already match between the distance matrices, this parameter is not
         necessary. This parameter is disallowed if `x` and `y` are
         ``array_like``.
+    seed : int, optional
+        Seed used to generate the permutations. If provided, results are
+        reproducible regardless of `n_jobs`. If not provided, permutations
+        are drawn from the global ``numpy.random`` state.
+    n_jobs : int, optional
+        Number of processes used to evaluate the permutations in parallel. If
+        negative, ``cpu_count() + 1 + n_jobs`` processes are used (e.g., -1
+        uses all CPUs).
+    batch_size : int, optional
+        Number of permutations to evaluate together. Larger batches are
+        faster but require more memory (``batch_size * n * n`` elements). If
+        not provided, a batch size is chosen so that each batch holds at most
+        roughly four million elements.
 
     Returns
     -------
@@ -144,6 +160,13 @@ def mantel(x, y, method='pearson', permutations=999, alternative='two-sided',
     be ``np.nan`` if one or both of the inputs does not have any variation
     (i.e. the distances are all constant) and ``method='spearman'``.
 
+    The distances of `x` and `y` are ranked (if ``method='spearman'``) and
+    centered a single time. The correlation coefficient of each permutation
+    is then the dot product of the permuted centered distances of `x` with
+    the centered distances of `y`, scaled by their (permutation-invariant)
+    norms. Thus no permuted distance matrices are created and no data are
+    re-ranked.
+
     References
     ----------
     .. [1] Legendre, P. and Legendre, L. (2012) Numerical Ecology. 3rd English
@@ -250,54 +273,139 @@ def mantel(x, y, method='pearson', permutations=999, alternative='two-sided',
     ``array_like`` because there is no notion of IDs.
 
     """
-    if method == 'pearson':
-        corr_func = pearsonr
-    elif method == 'spearman':
-        corr_func = spearmanr
-    else:
-        raise ValueError("Invalid correlation method '%s'." % method)
+    _check_mantel_params(method, permutations, alternative)
+
+    x, y = _order_dms(x, y, strict=strict, lookup=lookup)
+    n = _check_size(x)
+
+    x_flat = x.condensed_form()
+    y_flat = y.condensed_form()
+
+    stat, p_value = _mantel(n, x_flat, y_flat, _center(x_flat, method),
+                            _center(y_flat, method), method,
+                            permutations, alternative, seed, n_jobs,
+                            batch_size)
+    return stat, p_value, n
+
 
+def _check_mantel_params(method, permutations, alternative):
+    """Validate Mantel test parameters shared by mantel and pwmantel."""
+    if method not in ('pearson', 'spearman'):
+        raise ValueError("Invalid correlation method '%s'." % method)
     if permutations < 0:
         raise ValueError("Number of permutations must be greater than or "
                          "equal to zero.")
     if alternative not in ('two-sided', 'greater', 'less'):
         raise ValueError("Invalid alternative hypothesis '%s'." % alternative)
 
-    x, y = _order_dms(x, y, strict=strict, lookup=lookup)
 
-    n = x.shape[0]
+def _check_size(dm):
+    """Return number of IDs in `dm`, ensuring it is large enough to test."""
+    n = dm.shape[0]
     if n < 3:
         raise ValueError("Distance matrices must have at least 3 matching IDs "
                          "between them (i.e., minimum 3x3 in size).")
+    return n
 
-    x_flat = x.condensed_form()
-    y_flat = y.condensed_form()
 
-    orig_stat = corr_func(x_flat, y_flat)[0]
+def _center(distances, method):
+    """Return ranked (if spearman) and centered condensed distances.
+
+    ``None`` is returned if the distances do not have any variation.
+
+    """
+    if np.ptp(distances) == 0:
+        return None
+    if method == 'spearman':
+        distances = rankdata(distances, method='average')
+    return distances - distances.mean()
+
+
+def _mantel(n, x_flat, y_flat, x_centered, y_centered, method, permutations,
+            alternative, seed, n_jobs, batch_size):
+    """Run the Mantel test on precomputed centered distances.
+
+    `x_flat` and `y_flat` are condensed distances between `n` objects and
+    `x_centered` and `y_centered` are their centered forms (see
+    ``_center``).
 
-    if permutations == 0 or np.isnan(orig_stat):
-        p_value = np.nan
+    """
+    if batch_size is None:
+        batch_size = max(1, 2 ** 22 // (n * n))
+
+    if x_centered is None or y_centered is None:
+        # At least one input has no variation, so every permutation has the
+        # same correlation coefficient. Defer to scipy to define it.
+        corr_func = pearsonr if method == 'pearson' else spearmanr
+        stat = corr_func(x_flat, y_flat)[0]
+        if np.isnan(stat):
+            return stat, np.nan
+        test_stat_function = partial(_constant_stats, stat)
+    else:
+        x_centered = squareform(x_centered, force='tomatrix', checks=False)
+        y_centered = squareform(y_centered, force='tomatrix', checks=False)
+        denominator = np.sqrt(
+            _sum_of_products(x_centered[np.newaxis], x_centered)[0] *
+            _sum_of_products(y_centered[np.newaxis], y_centered)[0])
+        test_stat_function = partial(_compute_mantel_stats, x_centered,
+                                     y_centered, denominator)
+
+    stat, permuted_stats = _run_permutations(
+        test_stat_function, np.arange(n), permutations, batch_size=batch_size,
+        seed=seed, n_jobs=n_jobs)
+
+    if permutations == 0:
+        return stat, np.nan
+
+    if alternative == 'two-sided':
+        count_better = (np.absolute(permuted_stats) >=
+                        np.absolute(stat)).sum()
+    elif alternative == 'greater':
+        count_better = (permuted_stats >= stat).sum()
     else:
-        perm_gen = (corr_func(x.permute(condensed=True), y_flat)[0]
-                    for _ in range(permutations))
-        permuted_stats = np.fromiter(perm_gen, np.float, count=permutations)
+        count_better = (permuted_stats <= stat).sum()
+
+    p_value = (count_better + 1) / (permutations + 1)
+
+    return stat, p_value
+
 
-        if alternative == 'two-sided':
-            count_better = (np.absolute(permuted_stats) >=
-                            np.absolute(orig_stat)).sum()
-        elif alternative == 'greater':
-            count_better = (permuted_stats >= orig_stat).sum()
-        else:
-            count_better = (permuted_stats <= orig_stat).sum()
+def _constant_stats(stat, orders):
+    """Return `stat` for each permutation in a batch."""
+    return np.full(len(orders), stat, dtype=np.float64)
+
+
+def _sum_of_products(batch, matrix):
+    """Return the sum of the elementwise product of each matrix in `batch`
+    with `matrix`, halved to count each pair of objects once.
+
+    Each sum is computed in the same order regardless of the batch size, so
+    identical inputs yield identical results.
+
+    """
+    products = batch * matrix
+    return products.reshape(len(batch), -1).sum(axis=1) / 2
 
-        p_value = (count_better + 1) / (permutations + 1)
 
-    return orig_stat, p_value, n
+def _compute_mantel_stats(x_centered, y_centered, denominator, orders):
+    """Compute correlation coefficients for a batch of permutations of `x`.
+
+    `x_centered` and `y_centered` are the redundant forms of the centered
+    distances (with zeros on the diagonal), `denominator` is the product of
+    their norms, and `orders` is a 2-D array of permuted object indices (one
+    permutation per row). Coefficients are clipped to [-1, 1] to guard
+    against rounding errors, as is done by ``scipy.stats.pearsonr``.
+
+    """
+    permuted = x_centered[orders[:, :, np.newaxis], orders[:, np.newaxis, :]]
+    stats = _sum_of_products(permuted, y_centered) / denominator
+    return np.clip(stats, -1, 1)
 
 
 @experimental(as_of="0.4.0")
 def pwmantel(dms, labels=None, method='pearson', permutations=999,
-             alternative='two-sided', strict=True, lookup=None):
+             alternative='two-sided', strict=True, lookup=None, seed=None,
+             n_jobs=1, batch_size=None):
     """Run Mantel tests for every pair of given distance matrices.
 
     Runs a Mantel test for each pair of distance matrices and collates the
@@ -328,6 +436,15 @@ def pwmantel(dms, labels=None, method='pearson', permutations=999,
         Handling of nonmatching IDs. See ``mantel`` function for more details.
     lookup : dict, optional
         Map existing IDs to new IDs. See ``mantel`` function for more details.
+    seed : int, optional
+        Seed used to generate the permutations. See ``mantel`` function for
+        more details.
+    n_jobs : int, optional
+        Number of parallel processes. See ``mantel`` function for more
+        details.
+    batch_size : int, optional
+        Number of permutations to evaluate together. See ``mantel`` function
+        for more details.
 
     Returns
     -------
@@ -350,6 +467,10 @@ def pwmantel(dms, labels=None, method='pearson', permutations=999,
     of memory consumption as it only loads two matrices at a time as opposed to
     loading all distance matrices into memory.
 
+    If distance matrices (rather than filepaths) are provided, the ranked and
+    centered distances of each distance matrix are computed a single time
+    and reused across all pairs in which its IDs are unchanged by matching.
+
     Examples
     --------
     Import the functionality we'll use in the following examples:
@@ -404,16 +525,38 @@ def pwmantel(dms, labels=None, method='pearson', permutations=999,
                      ('permutations', int), ('alternative', object)]
     results = np.empty(num_combs, dtype=results_dtype)
 
-    for i, pair in enumerate(combinations(zip(labels, dms), 2)):
-        (xlabel, x), (ylabel, y) = pair
+    _check_mantel_params(method, permutations, alternative)
+
+    # Centered distances are cached by distance matrix index and (matched)
+    # IDs, as they only depend on those.
+    centered = {}
+
+    def _get_centered(idx, dm, flat):
+        if isinstance(dms[idx], str):
+            return _center(flat, method)
+
+        key = (idx, dm.ids)
+        if key not in centered:
+            centered[key] = _center(flat, method)
+        return centered[key]
+
+    for i, pair in enumerate(combinations(enumerate(zip(labels, dms)), 2)):
+        (xidx, (xlabel, x)), (yidx, (ylabel, y)) = pair
         if isinstance(x, str):
             x = DistanceMatrix.read(x)
         if isinstance(y, str):
             y = DistanceMatrix.read(y)
 
-        stat, p_val, n = mantel(x, y, method=method, permutations=permutations,
-                                alternative=alternative, strict=strict,
-                                lookup=lookup)
+        x, y = _order_dms(x, y, strict=strict, lookup=lookup)
+        n = _check_size(x)
+
+        x_flat = x.condensed_form()
+        y_flat = y.condensed_form()
+        stat, p_val = _mantel(n, x_flat, y_flat,
+                              _get_centered(xidx, x, x_flat),
+                              _get_centered(yidx, y, y_flat), method,
+                              permutations, alternative, seed, n_jobs,
+                              batch_size)
 
         results[i] = (xlabel, ylabel, stat, p_val, n, method, permutations,
                       alternative)
@@ -10,12 +10,14 @@ from functools import partial
 
 import numpy as np
 
-from ._base import (_preprocess_input, _run_monte_carlo_stats, _build_results)
+from ._base import (_preprocess_input, _run_monte_carlo_stats, _build_results,
+                    _default_batch_size, _within_group_sums)
 from skbio.util._decorator import experimental
 
 
 @experimental(as_of="0.4.0")
-def permanova(distance_matrix, grouping, column=None, permutations=999):
+def permanova(distance_matrix, grouping, column=None, permutations=999,
+              batch_size=None, seed=None, n_jobs=1):
     """Test for significant differences between groups using PERMANOVA.
 
     Permutational Multivariate Analysis of Variance (PERMANOVA) is a
@@ -58,6 +60,20 @@ def permanova(distance_matrix, grouping, column=None, permutations=999):
         significance. Must be greater than or equal to zero. If zero,
         statistical significance calculations will be skipped and the p-value
         will be ``np.nan``.
+    batch_size : int, optional
+        Number of permutations to evaluate together. Larger batches are
+        faster but require more memory (the pseudo-F statistics of a batch are
+        computed from an ``n x (batch_size * num_groups)`` group indicator
+        matrix). If not provided, a batch size is chosen so that this matrix
+        holds at most roughly four million elements.
+    seed : int, optional
+        Seed used to generate the permutations. If provided, results are
+        reproducible regardless of `n_jobs`. If not provided, permutations
+        are drawn from the global ``numpy.random`` state.
+    n_jobs : int, optional
+        Number of processes used to evaluate the permutations in parallel. If
+        negative, ``cpu_count() + 1 + n_jobs`` processes are used (e.g., -1
+        uses all CPUs).
 
     Returns
     -------
@@ -76,6 +92,11 @@ def permanova(distance_matrix, grouping, column=None, permutations=999):
 
     The p-value will be ``np.nan`` if `permutations` is zero.
 
+    The squared distances are computed a single time and the pseudo-F
+    statistics of a batch of permuted grouping vectors are computed with
+    matrix products against group indicator matrices, rather than rebuilding
+    a grouping matrix for each permutation.
+
     References
     ----------
     .. [1] Anderson, Marti J. "A new method for non-parametric multivariate
@@ -92,44 +113,39 @@ def permanova(distance_matrix, grouping, column=None, permutations=999):
     sample_size, num_groups, grouping, tri_idxs, distances = _preprocess_input(
         distance_matrix, grouping, column)
 
+    if batch_size is None:
+        batch_size = _default_batch_size(sample_size, num_groups)
+
     # Calculate number of objects in each group.
     group_sizes = np.bincount(grouping)
     s_T = (distances ** 2).sum() / sample_size
+    distances_sq = distance_matrix.data ** 2
 
     test_stat_function = partial(_compute_f_stat, sample_size, num_groups,
-                                 tri_idxs, distances, group_sizes, s_T)
+                                 distances_sq, group_sizes, s_T)
     stat, p_value = _run_monte_carlo_stats(test_stat_function, grouping,
-                                           permutations)
+                                           permutations,
+                                           batch_size=batch_size, seed=seed,
+                                           n_jobs=n_jobs)
 
     return _build_results('PERMANOVA', 'pseudo-F', sample_size, num_groups,
                           stat, p_value, permutations)
 
 
-def _compute_f_stat(sample_size, num_groups, tri_idxs, distances, group_sizes,
-                    s_T, grouping):
-    """Compute PERMANOVA pseudo-F statistic."""
-    # Create a matrix where objects in the same group are marked with the group
-    # index (e.g. 0, 1, 2, etc.). objects that are not in the same group are
-    # marked with -1.
-    grouping_matrix = -1 * np.ones((sample_size, sample_size), dtype=int)
-    for group_idx in range(num_groups):
-        within_indices = _index_combinations(
-            np.where(grouping == group_idx)[0])
-        grouping_matrix[within_indices] = group_idx
+def _compute_f_stat(sample_size, num_groups, distances_sq, group_sizes, s_T,
+                    groupings):
+    """Compute PERMANOVA pseudo-F statistics for a batch of groupings.
+
+    `groupings` is a 2-D array of integer grouping vectors (one per row) and
+    `distances_sq` is the full (redundant) matrix of squared distances. One
+    pseudo-F statistic is returned per grouping vector.
 
-    # Extract upper triangle (in same order as distances were extracted
-    # from full distance matrix).
-    grouping_tri = grouping_matrix[tri_idxs]
+    """
+    within = _within_group_sums(distances_sq, num_groups, groupings)
 
-    # Calculate s_W for each group, accounting for different group sizes.
-    s_W = 0
-    for i in range(num_groups):
-        s_W += (distances[grouping_tri == i] ** 2).sum() / group_sizes[i]
+    # Calculate s_W for each grouping vector, accounting for different group
+    # sizes.
+    s_W = (within / group_sizes).sum(axis=1)
 
     s_A = s_T - s_W
     return (s_A / (num_groups - 1)) / (s_W / (sample_size - num_groups))
-
-
-def _index_combinations(indices):
-    # Modified from http://stackoverflow.com/a/11144716
-    return np.tile(indices, len(indices)), np.repeat(indices, len(indices))
@@ -11,11 +11,15 @@ from functools import partial
 from unittest import TestCase, main
 
 import numpy as np
+import numpy.testing as npt
 import pandas as pd
 from pandas.util.testing import assert_series_equal
+from scipy.spatial.distance import squareform
+from scipy.stats import rankdata
 
 from skbio import DistanceMatrix
 from skbio.stats.distance import anosim
+from skbio.stats.distance._anosim import _compute_r_stat
 
 
 class TestANOSIM(TestCase):
@@ -114,6 +118,51 @@ class TestANOSIM(TestCase):
         obs = anosim(self.dm_unequal, self.grouping_unequal_relabeled)
         self.assert_series_equal(obs, exp)
 
+    def test_batch_size(self):
+        # Results should not depend on how permutations are batched.
+        exp = pd.Series(index=self.exp_index,
+                        data=['ANOSIM', 'R', 6, 3, -0.363636, 0.878, 999],
+                        name='ANOSIM results')
+
+        for batch_size in 1, 7, 999, 5000:
+            np.random.seed(0)
+            obs = anosim(self.dm_unequal, self.grouping_unequal,
+                         batch_size=batch_size)
+            self.assert_series_equal(obs, exp)
+
+    def test_compute_r_stat(self):
+        # Compare batched R statistics against a direct computation using
+        # within- and between-group masks.
+        ranked_dists = rankdata(self.dm_unequal.condensed_form())
+        ranks = squareform(ranked_dists)
+        groupings = np.array([[0, 1, 2, 1, 0, 0],
+                              [1, 0, 0, 0, 1, 2],
+                              [0, 0, 1, 1, 2, 0]])
+        divisor = 6 * (5 / 4)
+
+        obs = _compute_r_stat(ranks, ranked_dists.sum(), 4, 11, 3, divisor,
+                              groupings)
+
+        exp = []
+        for grouping in groupings:
+            grouping_tri = np.equal.outer(grouping, grouping)[
+                np.triu_indices(6, k=1)]
+            r_W = np.mean(ranked_dists[grouping_tri])
+            r_B = np.mean(ranked_dists[np.invert(grouping_tri)])
+            exp.append((r_B - r_W) / divisor)
+
+        npt.assert_almost_equal(obs, exp)
+        npt.assert_almost_equal(obs[0], -0.363636, decimal=6)
+
+    def test_seed(self):
+        obs = anosim(self.dm_unequal, self.grouping_unequal, seed=42)
+        self.assertAlmostEqual(obs['test statistic'], -0.363636, places=6)
+        for n_jobs in 2, -1:
+            self.assert_series_equal(
+                anosim(self.dm_unequal, self.grouping_unequal, seed=42,
+                       n_jobs=n_jobs),
+                obs)
+
 
 if __name__ == '__main__':
     main()
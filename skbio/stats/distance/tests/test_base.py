@@ -7,6 +7,8 @@
 # ----------------------------------------------------------------------------
 
 import io
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from unittest import TestCase, main
 
 import matplotlib as mpl
@@ -971,6 +973,76 @@ class CategoricalStatsHelperFunctionTests(TestCase):
         with self.assertRaises(ValueError):
             _run_monte_carlo_stats(lambda e: 42, self.grouping, -1)
 
+    def test_run_monte_carlo_stats_batched(self):
+        def stat_function(groupings):
+            return np.array([42] * len(groupings))
+
+        for batch_size in 1, 3, 50, 100:
+            obs = _run_monte_carlo_stats(stat_function, self.grouping, 50,
+                                         batch_size=batch_size)
+            npt.assert_equal(obs, (42, 1.0))
+
+    def test_run_monte_carlo_stats_batched_same_permutations(self):
+        def stat_function(grouping):
+            return grouping[0] * 3 + grouping[1]
+
+        def batched_stat_function(groupings):
+            return groupings[:, 0] * 3 + groupings[:, 1]
+
+        grouping = np.array([0, 1, 2, 1, 2, 0])
+        np.random.seed(0)
+        exp = _run_monte_carlo_stats(stat_function, grouping, 99)
+        np.random.seed(0)
+        obs = _run_monte_carlo_stats(batched_stat_function, grouping, 99,
+                                     batch_size=10)
+        npt.assert_equal(obs, exp)
+
+    def test_run_monte_carlo_stats_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            _run_monte_carlo_stats(lambda e: 42, self.grouping, 10,
+                                   batch_size=0)
+
+    def test_run_monte_carlo_stats_seed_independent_of_n_jobs(self):
+        stat_function = partial(_first_elements_stat, 2)
+        grouping = np.arange(10)[::-1]
+
+        exp = _run_monte_carlo_stats(stat_function, grouping, 199, seed=42)
+        for n_jobs in 2, 3:
+            obs = _run_monte_carlo_stats(stat_function, grouping, 199,
+                                         seed=42, n_jobs=n_jobs)
+            npt.assert_equal(obs, exp)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            obs = _run_monte_carlo_stats(stat_function, grouping, 199,
+                                         seed=42, n_jobs=4, executor=executor)
+        npt.assert_equal(obs, exp)
+
+        obs = _run_monte_carlo_stats(stat_function, grouping, 199, seed=42,
+                                     batch_size=7)
+        npt.assert_equal(obs, exp)
+
+        obs = _run_monte_carlo_stats(stat_function, grouping, 199, seed=45)
+        self.assertNotEqual(obs[1], exp[1])
+
+    def test_run_monte_carlo_stats_n_jobs_global_random_state(self):
+        stat_function = partial(_first_elements_stat, 2)
+        grouping = np.arange(10)
+
+        np.random.seed(0)
+        exp = _run_monte_carlo_stats(stat_function, grouping, 99, n_jobs=2)
+        np.random.seed(0)
+        obs = _run_monte_carlo_stats(stat_function, grouping, 99, n_jobs=-1)
+        npt.assert_equal(obs, exp)
+
+    def test_run_monte_carlo_stats_invalid_n_jobs(self):
+        with self.assertRaises(ValueError):
+            _run_monte_carlo_stats(lambda e: 42, self.grouping, 10, n_jobs=0)
+
+
+def _first_elements_stat(n, grouping):
+    # Supports both a single grouping vector and a batch of grouping vectors.
+    return grouping[..., :n].sum(axis=-1)
+
 
 if __name__ == '__main__':
     main()
@@ -11,11 +11,14 @@ from unittest import TestCase, main
 import numpy as np
 import numpy.testing as npt
 import pandas as pd
+from scipy.spatial.distance import squareform
+from scipy.stats import pearsonr, spearmanr
 
 from skbio import DistanceMatrix
 from skbio.stats.distance import (DissimilarityMatrixError,
                                   DistanceMatrixError, mantel, pwmantel)
-from skbio.stats.distance._mantel import _order_dms
+from skbio.stats.distance._mantel import (_order_dms, _center,
+                                          _compute_mantel_stats)
 from skbio.util import get_data_path, assert_data_frame_almost_equal
 
 
@@ -272,6 +275,56 @@ class MantelTests(MantelTestData):
                          method='spearman', alternative=alt)
             npt.assert_equal(obs, exp)
 
+    def test_permuted_statistics_match_scipy(self):
+        # Permuted correlation coefficients computed from the centered
+        # distances should match those computed by scipy on permuted
+        # distance matrices.
+        x = DistanceMatrix(self.veg_dm_vegan)
+        y = DistanceMatrix(self.env_dm_vegan)
+        x_flat = x.condensed_form()
+        y_flat = y.condensed_form()
+        n = x.shape[0]
+
+        np.random.seed(0)
+        orders = np.array([np.random.permutation(n) for _ in range(5)])
+
+        for method, corr_func in (('pearson', pearsonr),
+                                  ('spearman', spearmanr)):
+            x_centered = squareform(_center(x_flat, method))
+            y_centered = squareform(_center(y_flat, method))
+            denominator = np.sqrt((x_centered ** 2).sum() *
+                                  (y_centered ** 2).sum()) / 2
+
+            obs = _compute_mantel_stats(x_centered, y_centered, denominator,
+                                        orders)
+            exp = [corr_func(squareform(x.data[order][:, order]),
+                             y_flat)[0] for order in orders]
+            npt.assert_almost_equal(obs, exp)
+
+    def test_seed(self):
+        for method in self.methods:
+            exp = mantel(self.veg_dm_vegan, self.env_dm_vegan, method=method,
+                         alternative='greater', seed=42)
+            self.assertAlmostEqual(
+                exp[0], 0.3047454 if method == 'pearson' else 0.283791)
+
+            for n_jobs in 2, -1:
+                for batch_size in 1, 10:
+                    obs = mantel(self.veg_dm_vegan, self.env_dm_vegan,
+                                 method=method, alternative='greater',
+                                 seed=42, n_jobs=n_jobs,
+                                 batch_size=batch_size)
+                    self.assertEqual(obs, exp)
+
+    def test_batch_size(self):
+        for batch_size in 1, 7, 999, 5000:
+            np.random.seed(0)
+            obs = mantel(self.veg_dm_vegan, self.env_dm_vegan,
+                         alternative='greater', batch_size=batch_size)
+            self.assertAlmostEqual(obs[0], 0.3047454)
+            self.assertAlmostEqual(obs[1], 0.002)
+            self.assertEqual(obs[2], 24)
+
     def test_no_side_effects(self):
         minx = np.asarray(self.minx, dtype='float')
         miny = np.asarray(self.miny, dtype='float')
@@ -376,6 +429,25 @@ class PairwiseMantelTests(MantelTestData):
                        alternative='less')
         assert_data_frame_almost_equal(obs, self.exp_results_duplicate_dms)
 
+    def test_seed(self):
+        exp = pwmantel((self.minx_dm, self.miny_dm, self.minz_dm),
+                       alternative='greater', seed=42)
+        obs = pwmantel((self.minx_dm, self.miny_dm, self.minz_dm),
+                       alternative='greater', seed=42, n_jobs=2)
+        assert_data_frame_almost_equal(obs, exp)
+
+    def test_matches_mantel(self):
+        # Reusing centered distances across pairs shouldn't change results.
+        dms = (self.minx_dm_extra, self.minx_dm, self.minz_dm_extra)
+        obs = pwmantel(dms, method='spearman', strict=False, seed=42)
+
+        for (i, j), row in zip(((0, 1), (0, 2), (1, 2)), obs.itertuples()):
+            exp = mantel(dms[i], dms[j], method='spearman', strict=False,
+                         seed=42)
+            self.assertAlmostEqual(row.statistic, exp[0])
+            self.assertAlmostEqual(row[2], exp[1])
+            self.assertEqual(row.n, exp[2])
+
     def test_na_p_value(self):
         obs = pwmantel((self.miny_dm, self.minx_dm), method='spearman',
                        permutations=0)
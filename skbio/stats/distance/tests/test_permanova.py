@@ -11,11 +11,13 @@ from functools import partial
 from unittest import TestCase, main
 
 import numpy as np
+import numpy.testing as npt
 import pandas as pd
 from pandas.util.testing import assert_series_equal
 
 from skbio import DistanceMatrix
 from skbio.stats.distance import permanova
+from skbio.stats.distance._permanova import _compute_f_stat
 
 
 class TestPERMANOVA(TestCase):
@@ -114,6 +116,57 @@ class TestPERMANOVA(TestCase):
         obs = permanova(self.dm_unequal, self.grouping_unequal_relabeled)
         self.assert_series_equal(obs, exp)
 
+    def test_call_batch_size(self):
+        # Results should not depend on how permutations are batched.
+        exp = pd.Series(
+            index=self.exp_index,
+            data=['PERMANOVA', 'pseudo-F', 6, 3, 0.578848, 0.645, 999],
+            name='PERMANOVA results')
+
+        for batch_size in 1, 7, 999, 5000:
+            np.random.seed(0)
+            obs = permanova(self.dm_unequal, self.grouping_unequal,
+                            batch_size=batch_size)
+            self.assert_series_equal(obs, exp)
+
+    def test_call_seed(self):
+        obs = permanova(self.dm_unequal, self.grouping_unequal, seed=42)
+        self.assertAlmostEqual(obs['test statistic'], 0.578848, places=6)
+        for n_jobs in 2, -1:
+            for batch_size in 1, 10:
+                self.assert_series_equal(
+                    permanova(self.dm_unequal, self.grouping_unequal,
+                              seed=42, n_jobs=n_jobs, batch_size=batch_size),
+                    obs)
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(ValueError):
+            permanova(self.dm_unequal, self.grouping_unequal, batch_size=0)
+
+    def test_compute_f_stat(self):
+        # Compare batched pseudo-F statistics against a direct computation.
+        distances_sq = self.dm_unequal.data ** 2
+        groupings = np.array([[0, 1, 2, 1, 0, 0],
+                              [1, 0, 0, 0, 1, 2],
+                              [0, 0, 1, 1, 2, 0]])
+        group_sizes = np.array([3, 2, 1])
+        s_T = distances_sq.sum() / 2 / 6
+
+        obs = _compute_f_stat(6, 3, distances_sq, group_sizes, s_T,
+                              groupings)
+
+        exp = []
+        for grouping in groupings:
+            s_W = 0
+            for i in range(3):
+                members = np.where(grouping == i)[0]
+                s_W += (distances_sq[np.ix_(members, members)].sum() / 2 /
+                        len(members))
+            exp.append(((s_T - s_W) / 2) / (s_W / 3))
+
+        npt.assert_almost_equal(obs, exp)
+        npt.assert_almost_equal(obs[0], 0.578848, decimal=6)
+
 
 if __name__ == '__main__':
     main()
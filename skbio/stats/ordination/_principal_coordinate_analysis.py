@@ -15,7 +15,7 @@ from scipy.linalg import eigh
 from skbio.stats.distance import DistanceMatrix
 from skbio.util._decorator import experimental
 from ._ordination_results import OrdinationResults
-from ._utils import e_matrix, f_matrix
+from ._utils import center_distance_matrix
 
 # - In cogent, after computing eigenvalues/vectors, the imaginary part
 #   is dropped, if any. We know for a fact that the eigenvalues are
@@ -27,7 +27,8 @@ from ._utils import e_matrix, f_matrix
 
 
 @experimental(as_of="0.4.0")
-def pcoa(distance_matrix):
+def pcoa(distance_matrix, method='eigh', number_of_dimensions=0,
+         inplace=False):
     r"""Perform Principal Coordinate Analysis.
 
     Principal Coordinate Analysis (PCoA) is a method similar to PCA
@@ -48,6 +49,22 @@ def pcoa(distance_matrix):
     ----------
     distance_matrix : DistanceMatrix
         A distance matrix.
+    method : str, optional
+        Eigendecomposition method to use in performing PCoA. By default, uses
+        SciPy's ``eigh``, which computes exact eigenvectors and eigenvalues
+        for all dimensions (or for the leading `number_of_dimensions` only).
+        The alternate method, ``fsvd``, uses a faster heuristic
+        eigendecomposition but loses accuracy. The magnitude of accuracy lost
+        is dependent on dataset.
+    number_of_dimensions : int, optional
+        Number of leading dimensions (axes) to compute. If 0 (the default),
+        all dimensions are computed. Computing only the leading dimensions of
+        a large distance matrix is considerably faster, in particular with
+        ``fsvd``.
+    inplace : bool, optional
+        If ``True``, the centered matrix is computed in place of the data of
+        `distance_matrix`, so that no copy of the matrix is made. The
+        distance matrix should not be used afterwards.
 
     Returns
     -------
@@ -56,6 +73,12 @@ def pcoa(distance_matrix):
         proportion explained by each of them, and transformed sample
         coordinates.
 
+    Raises
+    ------
+    ValueError
+        If `method` is not recognized, or if `number_of_dimensions` is
+        negative or larger than the number of samples.
+
     See Also
     --------
     OrdinationResults
@@ -76,20 +99,69 @@ def pcoa(distance_matrix):
        However, a warning is raised whenever negative eigenvalues
        appear, allowing the user to decide if they can be safely
        ignored.
+
+    The proportion explained by each axis is its eigenvalue divided by the
+    sum of all eigenvalues, i.e., the trace of the centered matrix. The trace
+    is obtained without computing the eigenvalues, so that the proportions
+    of the leading axes are the same whatever `number_of_dimensions` is. As
+    negative eigenvalues are included in the trace (and the corresponding
+    axes are set to zero), the proportions of the positive axes sum to more
+    than 1 when there are negative eigenvalues.
+
+    The ``fsvd`` method is based on the randomized range finder of [1]_: the
+    leading eigenvectors are approximated from the projection of the
+    centered matrix on a random subspace refined by a few power
+    iterations. Results depend on the state of ``numpy.random``.
+
+    References
+    ----------
+    .. [1] Halko, N., Martinsson, P.G., and Tropp, J.A. "Finding structure
+       with randomness: Probabilistic algorithms for constructing
+       approximate matrix decompositions." SIAM review 53.2 (2011): 217-288.
     """
     distance_matrix = DistanceMatrix(distance_matrix)
+    num_samples = distance_matrix.shape[0]
 
-    E_matrix = e_matrix(distance_matrix.data)
+    if method not in ('eigh', 'fsvd'):
+        raise ValueError("PCoA eigendecomposition method %r not supported."
+                         % method)
+    if number_of_dimensions < 0:
+        raise ValueError("Invalid operation: cannot reduce distance matrix "
+                         "to negative dimensions using PCoA. Did you intend "
+                         "to specify the default value (0), which sets the "
+                         "number_of_dimensions equal to the number of "
+                         "samples in the distance matrix?")
+    if number_of_dimensions > num_samples:
+        raise ValueError("Invalid operation: cannot extend distance matrix "
+                         "size (%d) to a higher number of dimensions (%d)."
+                         % (num_samples, number_of_dimensions))
+    if number_of_dimensions == 0:
+        if method == 'fsvd':
+            warn("FSVD: since no value for number_of_dimensions is "
+                 "specified, PCoA for all dimensions will be computed, "
+                 "which may result in long computation time if the original "
+                 "distance matrix is large.", RuntimeWarning)
+        number_of_dimensions = num_samples
 
     # If the used distance was euclidean, pairwise distances
-    # needn't be computed from the data table Y because F_matrix =
-    # Y.dot(Y.T) (if Y has been centred).
-    F_matrix = f_matrix(E_matrix)
+    # needn't be computed from the data table Y because the
+    # centered matrix = Y.dot(Y.T) (if Y has been centred).
+    centered = center_distance_matrix(distance_matrix.data, inplace=inplace)
 
-    # If the eigendecomposition ever became a bottleneck, it could
-    # be replaced with an iterative version that computes the
-    # largest k eigenvectors.
-    eigvals, eigvecs = eigh(F_matrix)
+    # The centered matrix is no longer needed after the decomposition (it is
+    # either a copy or was explicitly allowed to be overwritten), so eigh can
+    # work in its memory. The sum of all eigenvalues is its trace, which is
+    # used to compute the proportions explained whether or not all the
+    # eigenvalues are computed.
+    trace = np.trace(centered)
+    if method == 'fsvd':
+        eigvals, eigvecs = _fsvd(centered, number_of_dimensions)
+    elif number_of_dimensions < num_samples:
+        eigvals, eigvecs = eigh(
+            centered, overwrite_a=True,
+            eigvals=(num_samples - number_of_dimensions, num_samples - 1))
+    else:
+        eigvals, eigvecs = eigh(centered, overwrite_a=True)
 
     # eigvals might not be ordered, so we order them (at least one
     # is zero). cogent makes eigenvalues positive by taking the
@@ -131,14 +203,65 @@ def pcoa(distance_matrix):
     eigvals[num_positive:] = np.zeros(eigvals[num_positive:].shape)
 
     coordinates = eigvecs * np.sqrt(eigvals)
-    proportion_explained = eigvals / eigvals.sum()
+    proportion_explained = eigvals / trace
+
+    if method == 'fsvd':
+        long_method_name = 'Approximate Principal Coordinate Analysis ' \
+                           'using FSVD'
+    else:
+        long_method_name = 'Principal Coordinate Analysis'
 
     axis_labels = ['PC%d' % i for i in range(1, eigvals.size + 1)]
     return OrdinationResults(
         short_method_name='PCoA',
-        long_method_name='Principal Coordinate Analysis',
+        long_method_name=long_method_name,
         eigvals=pd.Series(eigvals, index=axis_labels),
         samples=pd.DataFrame(coordinates, index=distance_matrix.ids,
                              columns=axis_labels),
         proportion_explained=pd.Series(proportion_explained,
                                        index=axis_labels))
+
+
+def _fsvd(centered_distance_matrix, number_of_dimensions, oversampling=10,
+          num_iterations=4):
+    """Approximate the leading eigenpairs of a centered distance matrix.
+
+    Parameters
+    ----------
+    centered_distance_matrix : np.ndarray
+        Symmetric (centered) matrix to decompose.
+    number_of_dimensions : int
+        Number of leading eigenpairs to compute.
+    oversampling : int, optional
+        Number of extra random vectors used to capture the range of the
+        matrix. More vectors improve accuracy at the cost of speed.
+    num_iterations : int, optional
+        Number of power iterations used to refine the random subspace.
+
+    Returns
+    -------
+    eigvals : np.ndarray
+        Approximate leading eigenvalues, in descending order.
+    eigvecs : np.ndarray
+        Corresponding approximate eigenvectors (one per column).
+
+    Notes
+    -----
+    Only products of the matrix with ``n x (number_of_dimensions +
+    oversampling)`` blocks are computed, followed by an exact decomposition of
+    the matrix projected on the resulting orthonormal basis (Rayleigh-Ritz).
+
+    """
+    matrix = centered_distance_matrix
+    num_samples = matrix.shape[0]
+    num_vectors = min(num_samples, number_of_dimensions + oversampling)
+
+    basis = np.random.standard_normal(size=(num_samples, num_vectors))
+    basis, _ = np.linalg.qr(matrix.dot(basis))
+    for _ in range(num_iterations):
+        basis, _ = np.linalg.qr(matrix.dot(basis))
+
+    projected = basis.T.dot(matrix.dot(basis))
+    eigvals, eigvecs = eigh(projected)
+    idxs = eigvals.argsort()[::-1][:number_of_dimensions]
+    return eigvals[idxs], basis.dot(eigvecs[:, idxs])
@@ -196,3 +196,60 @@ def f_matrix(E_matrix):
     col_means = E_matrix.mean(axis=0, keepdims=True)
     matrix_mean = E_matrix.mean()
     return E_matrix - row_means - col_means + matrix_mean
+
+
+@experimental(as_of="0.5.1")
+def center_distance_matrix(distance_matrix, inplace=False):
+    """Compute the centered (F) matrix of a distance matrix.
+
+    Equivalent to ``f_matrix(e_matrix(distance_matrix))``, but computed
+    without intermediate copies of the matrix.
+
+    Parameters
+    ----------
+    distance_matrix : 2D array_like
+        Square, symmetric matrix of distances.
+    inplace : bool, optional
+        If ``True``, ``distance_matrix`` (which must then be a writeable
+        C-contiguous ``np.ndarray`` of floats) is overwritten by the centered
+        matrix. Otherwise, a single copy of the matrix is made.
+
+    Returns
+    -------
+    np.ndarray
+        The centered matrix.
+
+    Raises
+    ------
+    ValueError
+        If ``inplace`` is ``True`` and ``distance_matrix`` cannot be centered
+        in place.
+
+    See Also
+    --------
+    e_matrix
+    f_matrix
+
+    """
+    if inplace:
+        if not (isinstance(distance_matrix, np.ndarray) and
+                distance_matrix.dtype == np.float64 and
+                distance_matrix.flags.c_contiguous and
+                distance_matrix.flags.writeable):
+            raise ValueError("Only writeable C-contiguous arrays of floats "
+                             "can be centered in place.")
+        centered = distance_matrix
+    else:
+        centered = np.array(distance_matrix, dtype=np.float64, order='C')
+
+    # E matrix
+    np.multiply(centered, centered, out=centered)
+    centered *= -0.5
+
+    # as the matrix is symmetric, the column means are the row means
+    row_means = centered.mean(axis=1)
+    matrix_mean = row_means.mean()
+    centered -= row_means[:, np.newaxis]
+    centered -= row_means[np.newaxis, :]
+    centered += matrix_mean
+    return centered
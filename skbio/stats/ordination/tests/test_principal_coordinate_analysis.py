@@ -98,8 +98,9 @@ class TestPCoA(TestCase):
         eigvals = [0.73599103, 0.26260032, 0.14926222, 0.06990457,
                    0.02956972, 0.01931184, 0., 0., 0., 0., 0., 0., 0.,
                    0.]
-        proportion_explained = [0.58105792, 0.20732046, 0.1178411,
-                                0.05518899, 0.02334502, 0.01524651, 0.,
+        # relative to the sum of all eigenvalues, including negative ones
+        proportion_explained = [0.78712587, 0.28084514, 0.15963259,
+                                0.07476136, 0.03162416, 0.02065358, 0.,
                                 0., 0., 0., 0., 0., 0., 0.]
         sample_ids = [str(i) for i in range(14)]
         axis_labels = ['PC%d' % i for i in range(1, 15)]
@@ -125,6 +126,88 @@ class TestPCoA(TestCase):
         with npt.assert_raises(DissimilarityMatrixError):
             pcoa([[1, 2], [3, 4]])
 
+    def test_invalid_method_and_dimensions(self):
+        with self.assertRaisesRegex(ValueError, 'not supported'):
+            pcoa(self.dm, method='svd')
+        with self.assertRaisesRegex(ValueError, 'negative dimensions'):
+            pcoa(self.dm, number_of_dimensions=-1)
+        with self.assertRaisesRegex(ValueError, 'higher number'):
+            pcoa(self.dm, number_of_dimensions=15)
+
+    def test_number_of_dimensions(self):
+        dm = DistanceMatrix.read(get_data_path('PCoA_sample_data_3'))
+        expected = pcoa(dm)
+        for method in 'eigh', 'fsvd':
+            np.random.seed(0)
+            results = pcoa(dm, method=method, number_of_dimensions=3)
+            self.assertEqual(results.samples.shape, (9, 3))
+            npt.assert_almost_equal(results.eigvals.values,
+                                    expected.eigvals.values[:3])
+            npt.assert_almost_equal(
+                results.proportion_explained.values,
+                expected.proportion_explained.values[:3])
+            npt.assert_almost_equal(np.abs(results.samples.values),
+                                    np.abs(expected.samples.values[:, :3]))
+
+        results = pcoa(dm, number_of_dimensions=9)
+        assert_ordination_results_equal(results, expected,
+                                        ignore_directionality=True)
+
+    def test_number_of_dimensions_negative_eigenvalues(self):
+        # the proportions explained are relative to the same total whether
+        # or not all eigenvalues (including negative ones) are computed
+        expected = npt.assert_warns(RuntimeWarning, pcoa, self.dm)
+        num_samples = self.dm.shape[0]
+        for number_of_dimensions in 1, 3, num_samples - 1, num_samples:
+            results = pcoa(self.dm, number_of_dimensions=number_of_dimensions)
+            npt.assert_almost_equal(
+                results.proportion_explained.values,
+                expected.proportion_explained.values[:number_of_dimensions])
+
+        np.random.seed(0)
+        results = pcoa(self.dm, method='fsvd', number_of_dimensions=3)
+        npt.assert_almost_equal(results.proportion_explained.values,
+                                expected.proportion_explained.values[:3])
+
+    def test_fsvd_large(self):
+        # points in 3 dimensions with some noise: the leading axes are well
+        # separated from the rest and must be recovered by FSVD
+        np.random.seed(0)
+        points = np.random.normal(size=(200, 3)) * [10, 5, 2]
+        points = np.hstack([points, np.random.normal(size=(200, 5)) * 0.1])
+        dm = DistanceMatrix(np.sqrt(
+            ((points[:, np.newaxis] - points[np.newaxis]) ** 2).sum(axis=2)))
+
+        expected = pcoa(dm, number_of_dimensions=3)
+        results = pcoa(dm, method='fsvd', number_of_dimensions=3)
+        self.assertEqual(
+            results.long_method_name,
+            'Approximate Principal Coordinate Analysis using FSVD')
+        npt.assert_almost_equal(results.eigvals.values,
+                                expected.eigvals.values)
+        npt.assert_almost_equal(results.proportion_explained.values,
+                                expected.proportion_explained.values)
+        npt.assert_almost_equal(np.abs(results.samples.values),
+                                np.abs(expected.samples.values))
+
+    def test_fsvd_all_dimensions(self):
+        dm = DistanceMatrix.read(get_data_path('PCoA_sample_data_3'))
+        expected = pcoa(dm)
+        results = npt.assert_warns(RuntimeWarning, pcoa, dm, method='fsvd')
+        assert_ordination_results_equal(results, expected,
+                                        ignore_method_names=True,
+                                        ignore_directionality=True)
+
+    def test_inplace(self):
+        dm = DistanceMatrix.read(get_data_path('PCoA_sample_data_3'))
+        expected = pcoa(dm)
+        dm_copy = dm.copy()
+        results = pcoa(dm_copy, inplace=True)
+        assert_ordination_results_equal(results, expected,
+                                        ignore_directionality=True)
+        # the data was replaced by the centered matrix
+        npt.assert_almost_equal(dm_copy.data.sum(axis=0), 0)
+
 
 if __name__ == "__main__":
     main()
@@ -11,7 +11,8 @@ import numpy.testing as npt
 
 from unittest import TestCase, main
 
-from skbio.stats.ordination import corr, mean_and_std, e_matrix, f_matrix
+from skbio.stats.ordination import (corr, mean_and_std, e_matrix, f_matrix,
+                                    center_distance_matrix)
 
 
 class TestUtils(TestCase):
@@ -61,6 +62,31 @@ class TestUtils(TestCase):
         # Note that `test_make_F_matrix` in cogent is wrong
         npt.assert_almost_equal(F, expected_F)
 
+    def test_center_distance_matrix(self):
+        dm = np.array([[0, 1, 4, 3],
+                       [1, 0, 2, 5],
+                       [4, 2, 0, 1],
+                       [3, 5, 1, 0]], dtype=float)
+        expected = f_matrix(e_matrix(dm))
+
+        centered = center_distance_matrix(dm)
+        npt.assert_almost_equal(centered, expected)
+        self.assertIsNot(centered, dm)
+        self.assertEqual(dm[0, 1], 1)
+
+        centered = center_distance_matrix(dm.tolist())
+        npt.assert_almost_equal(centered, expected)
+
+        centered = center_distance_matrix(dm, inplace=True)
+        self.assertIs(centered, dm)
+        npt.assert_almost_equal(dm, expected)
+
+    def test_center_distance_matrix_inplace_invalid(self):
+        for dm in ([[0, 1], [1, 0]], np.array([[0, 1], [1, 0]]),
+                   np.zeros((3, 3)).T[::2, ::2]):
+            with self.assertRaises(ValueError):
+                center_distance_matrix(dm, inplace=True)
+
 
 if __name__ == '__main__':
     main()
@@ -17,6 +17,7 @@ Classes
    :toctree: generated/
 
     TreeNode
+    TreeArray
 
 Phylogenetic Reconstruction
 ---------------------------
@@ -33,6 +34,7 @@ Utility Functions
    :toctree: generated/
 
     majority_rule
+    rf_dists
 
 Exceptions
 ----------
@@ -184,12 +186,15 @@ pairwise tip-to-tip distances between trees:
 from skbio.util import TestRunner
 
 from ._tree import TreeNode
+from ._tree_array import TreeArray
 from ._nj import nj
 from ._majority_rule import majority_rule
+from ._compare import rf_dists
 from ._exception import (TreeError, NoLengthError, DuplicateNodeError,
                          MissingNodeError, NoParentError)
 
-__all__ = ['TreeNode', 'nj', 'majority_rule', 'TreeError', 'NoLengthError',
-           'DuplicateNodeError', 'MissingNodeError', 'NoParentError']
+__all__ = ['TreeNode', 'TreeArray', 'nj', 'majority_rule', 'rf_dists',
+           'TreeError', 'NoLengthError', 'DuplicateNodeError',
+           'MissingNodeError', 'NoParentError']
 
 test = TestRunner(__file__).test
@@ -0,0 +1,366 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+cimport numpy as cnp
+cimport cython
+from libc.math cimport INFINITY
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline bint _precedes(Py_ssize_t[::1] pos, Py_ssize_t a, Py_ssize_t b,
+                           Py_ssize_t best_a, Py_ssize_t best_b) nogil:
+    """Whether pair (a, b) wins a Q tie against pair (best_a, best_b).
+
+    Pairs are compared by the positions of their members in the current
+    (collapsed) distance matrix: the pair closest to the top-left corner of
+    the matrix wins, and remaining ties go to the pair with the lowest row.
+
+    """
+    cdef Py_ssize_t p, q, bp, bq, key, best_key
+    if best_a < 0:
+        return True
+    p = pos[a]
+    q = pos[b]
+    if p < q:
+        p, q = q, p
+    bp = pos[best_a]
+    bq = pos[best_b]
+    if bp < bq:
+        bp, bq = bq, bp
+    key = p * p + q * q
+    best_key = bp * bp + bq * bq
+    return key < best_key or (key == best_key and p < bp)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _exact_min_q(double[:, ::1] dm, double[::1] sums,
+                       cnp.uint8_t[::1] active, Py_ssize_t[::1] pos,
+                       double scale, Py_ssize_t *best_a,
+                       Py_ssize_t *best_b) nogil:
+    """Find the pair of active nodes with the lowest Q value.
+
+    All pairs are scanned. Inactive nodes have a sum of -inf, so that their Q
+    values are +inf and never selected.
+
+    """
+    cdef:
+        Py_ssize_t n = dm.shape[0], a, b
+        double best = INFINITY, q, s
+
+    best_a[0] = -1
+    best_b[0] = -1
+    for a in range(n):
+        if not active[a]:
+            continue
+        s = sums[a]
+        for b in range(a):
+            q = scale * dm[a, b] - (s + sums[b])
+            if q < best:
+                best = q
+                best_a[0] = a
+                best_b[0] = b
+            elif (q == best and active[b] and
+                  _precedes(pos, a, b, best_a[0], best_b[0])):
+                best_a[0] = a
+                best_b[0] = b
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fast_min_q(double[:, ::1] dm, double[::1] sums,
+                      cnp.uint8_t[::1] active, Py_ssize_t[::1] pos,
+                      double scale, cnp.int32_t[:, ::1] sorted_cols,
+                      cnp.float32_t[:, ::1] sorted_dists,
+                      Py_ssize_t[::1] row_start, Py_ssize_t[::1] row_stop,
+                      Py_ssize_t[::1] built, Py_ssize_t[::1] birth,
+                      Py_ssize_t *best_a, Py_ssize_t *best_b) nogil:
+    """Find the pair of active nodes with the lowest Q value (pruned search).
+
+    Each row lists the other nodes by increasing distance, along with these
+    distances rounded down to single precision (so that rows can be scanned
+    without accessing ``dm``). The entries of a row are valid as long as the
+    node they refer to is active and has not been replaced since the row was
+    sorted. As the Q value of an entry is bounded from below by
+    ``scale * d - (s + max_sum)``, the scan of a row stops at the first entry
+    whose bound exceeds the lowest Q value found so far. Every pair is listed
+    (and valid) in the row of its newest member, so all pairs with the lowest
+    Q value are found, and ties are broken as in ``_exact_min_q``.
+
+    """
+    cdef:
+        Py_ssize_t n = dm.shape[0], a, b, e
+        double best = INFINITY, max_sum = -INFINITY, q, s
+
+    for a in range(n):
+        if active[a] and sums[a] > max_sum:
+            max_sum = sums[a]
+
+    best_a[0] = -1
+    best_b[0] = -1
+    for a in range(n):
+        if not active[a]:
+            continue
+        s = sums[a]
+        for e in range(row_start[a], row_stop[a]):
+            b = sorted_cols[a, e]
+            if not active[b] or birth[b] > built[a]:
+                # stale entries never become valid again
+                if e == row_start[a]:
+                    row_start[a] = e + 1
+                continue
+            if scale * sorted_dists[a, e] - (s + max_sum) > best:
+                break
+            q = scale * dm[a, b] - (s + sums[b])
+            if q < best:
+                best = q
+                best_a[0] = a
+                best_b[0] = b
+            elif q == best and _precedes(pos, a, b, best_a[0], best_b[0]):
+                best_a[0] = a
+                best_b[0] = b
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _last_min_q(double[:, ::1] dm, cnp.uint8_t[::1] active,
+                      Py_ssize_t[::1] pos, Py_ssize_t *best_a,
+                      Py_ssize_t *best_b) nogil:
+    """Find the pair of the four remaining nodes with the lowest Q value.
+
+    With four nodes, the two pairs of each split of the nodes have equal Q
+    values in exact arithmetic, so that the pair which is joined (and hence
+    which branch lengths are clipped) depends on rounding. The Q values are
+    computed as from the collapsed distance matrix, with the row sums
+    recomputed in the order of the positions of the nodes, so that this tie
+    is broken as when collapsing the distance matrix at each join.
+
+    """
+    cdef:
+        Py_ssize_t k, x, y, e
+        Py_ssize_t nodes[4]
+        double sums[4]
+        double best = INFINITY, q
+
+    for k in range(dm.shape[0]):
+        if active[k]:
+            nodes[pos[k]] = k
+    for x in range(4):
+        sums[x] = 0
+        for k in range(4):
+            sums[x] += dm[nodes[x], nodes[k]]
+
+    # pairs are visited in the order in which they win ties (see _precedes)
+    for e in range(6):
+        x = 1 + (e > 0) + (e > 2)
+        y = e - (x * (x - 1)) // 2
+        q = 2 * dm[nodes[x], nodes[y]] - (sums[y] + sums[x])
+        if q < best:
+            best = q
+            best_a[0] = nodes[x]
+            best_b[0] = nodes[y]
+
+
+def _sort_rows(dm, active, sorted_cols, sorted_dists, row_start, row_stop,
+               built, rows, time):
+    """Sort the given rows of ``dm`` by distance to the other active nodes."""
+    cols = np.flatnonzero(active)
+    for a in rows:
+        order = cols[np.argsort(dm[a, cols], kind='mergesort')]
+        order = order[order != a]
+        dists = dm[a, order]
+        # round down, so that the bounds computed from them remain valid
+        dists32 = dists.astype(np.float32)
+        rounded_up = dists32 > dists
+        dists32[rounded_up] = np.nextafter(dists32[rounded_up],
+                                           np.float32(-np.inf))
+        sorted_cols[a, :len(order)] = order
+        sorted_dists[a, :len(order)] = dists32
+        row_start[a] = 0
+        row_stop[a] = len(order)
+        built[a] = time
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _nj(double[:, ::1] dm, bint disallow_negative_branch_length, bint fast):
+    """Compute the neighbor joining steps of a distance matrix in place.
+
+    Parameters
+    ----------
+    dm : 2D np.ndarray of double
+        Symmetric distance matrix with at least 3 rows. It is overwritten:
+        the distances of each new node are stored in the row and column of
+        its member with the lowest index.
+    disallow_negative_branch_length : bool
+        If ``True``, negative branch lengths (and distances to new nodes) are
+        set to zero.
+    fast : bool
+        If ``True``, the pair with the lowest Q value is found with a pruned
+        search over rows sorted by distance.
+
+    Returns
+    -------
+    joins : np.ndarray of int
+        One row per join with the indices of the two joined nodes (in the
+        order used in the newick output) and of the new node.
+    lengths : np.ndarray of double
+        The branch lengths of the two joined nodes of each join.
+    final : np.ndarray of int
+        The indices of the three remaining nodes, in the order used in the
+        newick output.
+    final_lengths : np.ndarray of double
+        The branch lengths of the three remaining nodes.
+
+    """
+    cdef:
+        Py_ssize_t n = dm.shape[0], m = n, t, k, a = -1, b = -1, i, j, u, x
+        Py_ssize_t p1, p2, other, rebuild_at = 0
+        double d_ij, d_ku, li, lj, sum_u, scale
+        double[::1] sums
+        cnp.uint8_t[::1] active
+        Py_ssize_t[::1] pos, row_start, row_stop, built, birth
+        cnp.int32_t[:, ::1] sorted_cols
+        cnp.float32_t[:, ::1] sorted_dists
+        Py_ssize_t[:, ::1] joins
+        double[:, ::1] lengths
+        Py_ssize_t[::1] final
+        double[::1] final_lengths
+
+    if n < 3 or dm.shape[1] != n:
+        raise ValueError("Distance matrix must be square and at least 3x3.")
+
+    dm_arr = np.asarray(dm)
+    sums = dm_arr.sum(axis=1)
+    active_arr = np.ones(n, dtype=np.uint8)
+    active = active_arr
+    pos_arr = np.arange(n, dtype=np.intp)
+    pos = pos_arr
+    joins = np.empty((n - 3, 3), dtype=np.intp)
+    lengths = np.empty((n - 3, 2), dtype=np.double)
+
+    if fast:
+        sorted_arr = np.empty((n, n - 1), dtype=np.int32)
+        sorted_cols = sorted_arr
+        dists_arr = np.empty((n, n - 1), dtype=np.float32)
+        sorted_dists = dists_arr
+        row_start = np.zeros(n, dtype=np.intp)
+        row_stop = np.zeros(n, dtype=np.intp)
+        built = np.zeros(n, dtype=np.intp)
+        birth = np.zeros(n, dtype=np.intp)
+        _sort_rows(dm_arr, active_arr, sorted_arr, dists_arr, row_start,
+                   row_stop, built, range(n), 0)
+        rebuild_at = n // 2
+
+    for t in range(n - 3):
+        scale = m - 2
+        with nogil:
+            if m == 4:
+                _last_min_q(dm, active, pos, &a, &b)
+            elif fast:
+                _fast_min_q(dm, sums, active, pos, scale, sorted_cols,
+                            sorted_dists, row_start, row_stop, built, birth,
+                            &a, &b)
+            else:
+                _exact_min_q(dm, sums, active, pos, scale, &a, &b)
+
+        # the member with the larger position comes first
+        if pos[a] > pos[b]:
+            i, j = a, b
+        else:
+            i, j = b, a
+        p1 = pos[i]
+        p2 = pos[j]
+
+        # the branch lengths use row sums recomputed in the order of the
+        # positions, as from the collapsed distance matrix, rather than the
+        # incrementally updated sums (whose rounding differs)
+        cols = np.flatnonzero(active_arr)
+        order = np.empty(m, dtype=np.intp)
+        order[pos_arr[cols]] = cols
+        d_ij = dm[i, j]
+        li = 0.5 * d_ij + ((dm_arr[i, order].sum() - dm_arr[j, order].sum()) /
+                           (2 * (m - 2)))
+        if disallow_negative_branch_length and li < 0:
+            li = 0
+        lj = d_ij - li
+        if disallow_negative_branch_length and lj < 0:
+            lj = 0
+
+        # the new node replaces its member with the lowest index, and takes
+        # the first position in the collapsed matrix
+        u = min(i, j)
+        other = max(i, j)
+        sum_u = 0
+        with nogil:
+            for k in range(n):
+                if not active[k] or k == i or k == j:
+                    continue
+                d_ku = 0.5 * (dm[i, k] + dm[j, k] - d_ij)
+                if disallow_negative_branch_length and d_ku < 0:
+                    d_ku = 0
+                sums[k] += d_ku - dm[i, k] - dm[j, k]
+                dm[u, k] = d_ku
+                dm[k, u] = d_ku
+                sum_u += d_ku
+                x = pos[k]
+                pos[k] = x + 1 - (x > p2) - (x > p1)
+        dm[u, u] = 0
+        sums[u] = sum_u
+        pos[u] = 0
+        active[other] = 0
+        sums[other] = -INFINITY
+        m -= 1
+
+        joins[t, 0] = i
+        joins[t, 1] = j
+        joins[t, 2] = u
+        lengths[t, 0] = li
+        lengths[t, 1] = lj
+
+        if fast:
+            birth[u] = t + 1
+            if m <= rebuild_at:
+                _sort_rows(dm_arr, active_arr, sorted_arr, dists_arr,
+                           row_start, row_stop, built,
+                           np.flatnonzero(active_arr), t + 1)
+                rebuild_at = m // 2
+            else:
+                _sort_rows(dm_arr, active_arr, sorted_arr, dists_arr,
+                           row_start, row_stop, built, [u], t + 1)
+
+    # the three remaining nodes, by position
+    final = np.empty(3, dtype=np.intp)
+    for k in range(n):
+        if active[k]:
+            final[pos[k]] = k
+    final_lengths = np.empty(3, dtype=np.double)
+
+    # join the last two nodes in a pair, then connect them to the remaining
+    # node (the most recent new node, if any)
+    i, u, j = final[1], final[0], final[2]
+    d_ij = dm[i, j]
+    li = 0.5 * d_ij + ((dm[i, u] + d_ij) - (dm[j, u] + d_ij)) / 2
+    if disallow_negative_branch_length and li < 0:
+        li = 0
+    lj = d_ij - li
+    if disallow_negative_branch_length and lj < 0:
+        lj = 0
+    d_ku = 0.5 * (dm[i, u] + dm[j, u] - d_ij)
+    if disallow_negative_branch_length and d_ku < 0:
+        d_ku = 0
+
+    final[0], final[1], final[2] = i, u, j
+    final_lengths[0] = li
+    final_lengths[1] = d_ku
+    final_lengths[2] = lj
+
+    return (np.asarray(joins), np.asarray(lengths), np.asarray(final),
+            np.asarray(final_lengths))
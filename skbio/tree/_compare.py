@@ -0,0 +1,111 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import numpy as np
+import scipy.sparse
+
+from skbio.stats.distance import DistanceMatrix
+from skbio.util._decorator import experimental
+from ._tree import _rooted_clades
+
+
+@experimental(as_of="0.5.1")
+def rf_dists(trees, ids=None, proportion=False):
+    r"""Compute Robinson-Foulds distances between all pairs of trees.
+
+    Parameters
+    ----------
+    trees : Iterable of TreeNode or TreeArray
+        The trees to compare. They must all have the same tip names. Trees
+        are only iterated over once, so a generator (e.g., reading trees from
+        a file one at a time) can be provided to avoid holding all of them in
+        memory.
+    ids : list of str, optional
+        IDs of the trees in the resulting distance matrix. If not provided,
+        trees are identified by their position, starting at ``'0'``.
+    proportion : bool, optional
+        Return proportional differences, i.e., divide the distance between
+        two trees by their total number of clades.
+
+    Returns
+    -------
+    DistanceMatrix
+        Robinson-Foulds distances between the trees.
+
+    Raises
+    ------
+    ValueError
+        If the trees do not all have the same tip names.
+
+    See Also
+    --------
+    TreeNode.compare_rfd
+
+    Notes
+    -----
+    As in ``TreeNode.compare_rfd``, the distance between two trees is the
+    number of clades (sets of at least two tips descending from a non-root
+    node) found in only one of them [1]_.
+
+    Clades are represented as bitsets over an index of the tip names shared
+    by all trees, and each distinct clade is stored once. The number of
+    clades shared by every pair of trees is then obtained at once, as the
+    product of the sparse tree-by-clade incidence matrix with its transpose.
+
+    References
+    ----------
+    .. [1] Comparison of phylogenetic trees. Robinson and Foulds.
+       Mathematical Biosciences. 1981. 53:131-141
+
+    Examples
+    --------
+    >>> from skbio import TreeNode
+    >>> from skbio.tree import rf_dists
+    >>> trees = [TreeNode.read([newick]) for newick in (
+    ...     "((a,b),(c,d));", "(((a,b),c),d);", "(((a,c),b),d);")]
+    >>> dm = rf_dists(trees, ids=['t1', 't2', 't3'])
+    >>> print(dm)
+    3x3 distance matrix
+    IDs:
+    't1', 't2', 't3'
+    Data:
+    [[ 0.  2.  4.]
+     [ 2.  0.  2.]
+     [ 4.  2.  0.]]
+
+    """
+    tip_index = {}
+    clade_ids = {}
+    indices = []
+    all_tips = None
+    for tree in trees:
+        bits = tree._clade_bits(tip_index)[0]
+        if all_tips is None:
+            all_tips = bits[-1]
+        elif bits[-1] != all_tips:
+            raise ValueError("All trees must have the same tip names.")
+        indices.append(np.array(
+            [clade_ids.setdefault(clade, len(clade_ids))
+             for clade in _rooted_clades(bits[:-1])], dtype=np.intp))
+
+    n_trees = len(indices)
+    sizes = np.array([i.shape[0] for i in indices], dtype=np.intp)
+    indptr = np.concatenate([[0], np.cumsum(sizes)])
+    indices = np.concatenate(indices) if indices else indptr[:0]
+    incidence = scipy.sparse.csr_matrix(
+        (np.ones(indices.shape[0], dtype=np.int32), indices, indptr),
+        shape=(n_trees, len(clade_ids)))
+    shared = incidence.dot(incidence.T).toarray()
+
+    total = sizes[:, np.newaxis] + sizes[np.newaxis, :]
+    dists = (total - 2 * shared).astype(float)
+    if proportion:
+        has_clades = total > 0
+        dists[has_clades] /= total[has_clades]
+
+    return DistanceMatrix(dists, ids)
@@ -19,52 +19,74 @@ def _walk_clades(trees, weights):
 
     Parameters
     ----------
-    trees : list of TreeNode
-        The trees to walk
-    weights : np.array
-        Tree weights
+    trees : Iterable of TreeNode or TreeArray
+        The trees to walk. Trees are walked one at a time, so this can be a
+        generator.
+    weights : np.array or None
+        Tree weights. If ``None``, each tree has a weight of 1.
 
     Returns
     -------
     list of tuple
-        The clades and support values sorted by support value such that the
-        most supported clade is index 0. The tuples are of the form:
-        (frozenset, float).
-    defaultdict(float)
-        The edge lengths, keyed by frozenset of the clade, and valued by the
+        The clades and support values sorted by clade size such that the
+        largest clade is index 0. The tuples are of the form: (int, float),
+        where the clade is a bitset of tips (see ``tip_names``).
+    dict
+        The edge lengths, keyed by the bitset of the clade, and valued by the
         weighted average length of the clade by the trees the clade was
-        observed in.
+        observed in (``None`` if the clade has no length in any tree).
+    list of str
+        The name of the tip of each bit of the clades.
+    float
+        The total weight of the trees.
+
+    Raises
+    ------
+    ValueError
+        If the number of weights and trees differ.
 
     """
     clade_counts = defaultdict(float)
     edge_lengths = defaultdict(float)
-    total = weights.sum()
+    tip_index = {}
+    total = 0.0
+
+    n_trees = 0
+    for n_trees, tree in enumerate(trees, 1):
+        if weights is None:
+            weight = 1.0
+        elif n_trees > len(weights):
+            raise ValueError("Number of weights and trees differ.")
+        else:
+            weight = weights[n_trees - 1]
+        total += weight
 
-    # get clade counts
-    def tipnames_f(n):
-        return [n.name] if n.is_tip() else []
+        for clade, length in zip(*tree._clade_bits(tip_index)):
+            clade_counts[clade] += weight
 
-    for tree, weight in zip(trees, weights):
-        tree.cache_attr(tipnames_f, 'tip_names', frozenset)
+            if length is None:
+                edge_lengths[clade] = None
+            elif edge_lengths[clade] is not None:
+                edge_lengths[clade] += length * weight
 
-        for node in tree.postorder():
-            tip_names = node.tip_names
+    if weights is not None and n_trees != len(weights):
+        raise ValueError("Number of weights and trees differ.")
 
-            # if node.length is not None, fetch it and weight it
-            length = node.length * weight if node.length is not None else None
+    for clade, length in edge_lengths.items():
+        if length is not None:
+            edge_lengths[clade] = length / total
 
-            clade_counts[tip_names] += weight
+    # sort clades by number of tips
+    clade_counts = sorted(clade_counts.items(),
+                          key=lambda x: _popcount(x[0]), reverse=True)
+    tip_names = sorted(tip_index, key=tip_index.get)
 
-            if length is None:
-                edge_lengths[tip_names] = None
-            else:
-                edge_lengths[tip_names] += length / total
+    return clade_counts, dict(edge_lengths), tip_names, total
 
-    # sort clades by number times observed
-    clade_counts = sorted(clade_counts.items(), key=lambda x: len(x[0]),
-                          reverse=True)
 
-    return clade_counts, edge_lengths
+def _popcount(clade):
+    """Number of tips in a clade bitset"""
+    return bin(clade).count('1')
 
 
 def _filter_clades(clade_counts, cutoff_threshold):
@@ -73,9 +95,9 @@ def _filter_clades(clade_counts, cutoff_threshold):
     Parameters
     ----------
     clade_counts : list of tuple
-        Where the first element in each tuple is the frozenset of the clade,
-        and the second element is the support value. It is expected that this
-        list is sorted by descending order by support.
+        Where the first element in each tuple is the bitset of the clade, and
+        the second element is the support value. It is expected that this
+        list is sorted by descending order by clade size.
     cutoff_threshold : float
         The minimum weighted observation count that a clade must have to be
         considered supported.
@@ -83,29 +105,28 @@ def _filter_clades(clade_counts, cutoff_threshold):
     Returns
     -------
     dict
-        A dict of the accepted clades, keyed by the frozenset of the clade and
+        A dict of the accepted clades, keyed by the bitset of the clade and
         valued by the support value.
     """
     accepted_clades = {}
 
     for clade, count in clade_counts:
-        conflict = False
-
         if count <= cutoff_threshold:
             continue
 
-        if len(clade) > 1:
-            # check the current clade against all the accepted clades to see if
-            # it conflicts. A conflict is defined as:
-            # 1. the clades are not disjoint
-            # 2. neither clade is a subset of the other
+        # check the current clade against all the accepted clades to see if
+        # it conflicts. A conflict is defined as:
+        # 1. the clades are not disjoint
+        # 2. neither clade is a subset of the other
+        # A single tip cannot conflict with any clade.
+        conflict = False
+        if clade & (clade - 1):
             for accepted_clade in accepted_clades:
-                intersect = clade.intersection(accepted_clade)
-                subset = clade.issubset(accepted_clade)
-                superset = clade.issuperset(accepted_clade)
-
-                if intersect and not (subset or superset):
+                intersect = clade & accepted_clade
+                if intersect and intersect != clade and \
+                        intersect != accepted_clade:
                     conflict = True
+                    break
 
         if conflict is False:
             accepted_clades[clade] = count
@@ -113,69 +134,48 @@ def _filter_clades(clade_counts, cutoff_threshold):
     return accepted_clades
 
 
-def _build_trees(clade_counts, edge_lengths, support_attr, tree_node_class):
+def _build_trees(clade_counts, edge_lengths, support_attr, tree_node_class,
+                 tip_names):
     """Construct the trees with support
 
     Parameters
     ----------
     clade_counts : dict
-        Keyed by the frozenset of the clade and valued by the support
+        Keyed by the bitset of the clade and valued by the support
     edge_lengths : dict
-        Keyed by the frozenset of the clade and valued by the weighted length
+        Keyed by the bitset of the clade and valued by the weighted length
     support_attr : str
         The name of the attribute to hold the support value
     tree_node_class : type
         Specifies type of consensus trees that are returned. Either
         ``TreeNode`` or a type that implements the same interface (most
         usefully, a subclass of ``TreeNode``).
+    tip_names : list of str
+        The name of the tip of each bit of the clades
 
     Returns
     -------
     list of tree_node_class instances
         A list of the constructed trees
     """
+    # accepted clades are either nested or disjoint, so when clades are built
+    # from the smallest to the largest, the children of a clade are the
+    # largest clades built so far that it contains
     nodes = {}
-    queue = [(len(clade), clade) for clade in clade_counts]
-    while queue:
-        # The values within the queue are updated on each iteration, so it
-        # doesn't look like an insertion sort will make sense unfortunately
-        queue.sort()
-        (clade_size, clade) = queue.pop(0)
-        new_queue = []
-
-        # search for ancestors of clade
-        for (_, ancestor) in queue:
-            if clade.issubset(ancestor):
-                # update ancestor such that, in the following example:
-                # ancestor == {1, 2, 3, 4}
-                # clade == {2, 3}
-                # new_ancestor == {1, {2, 3}, 4}
-                new_ancestor = (ancestor - clade) | frozenset([clade])
-
-                # update references for counts and lengths
-                clade_counts[new_ancestor] = clade_counts.pop(ancestor)
-                edge_lengths[new_ancestor] = edge_lengths.pop(ancestor)
-
-                ancestor = new_ancestor
-
-            new_queue.append((len(ancestor), ancestor))
+    for clade in sorted(clade_counts, key=_popcount):
+        children = [nodes.pop(c) for c in list(nodes) if c & clade == c]
 
         # if the clade is a tip, then we have a name
-        if clade_size == 1:
-            name = list(clade)[0]
-        else:
+        if clade & (clade - 1):
             name = None
+        else:
+            name = tip_names[clade.bit_length() - 1]
 
-        # the clade will not be in nodes if it is a tip
-        children = [nodes.pop(c) for c in clade if c in nodes]
-        length = edge_lengths[clade]
-
-        node = tree_node_class(children=children, length=length, name=name)
+        node = tree_node_class(children=children, length=edge_lengths[clade],
+                               name=name)
         setattr(node, support_attr, clade_counts[clade])
         nodes[clade] = node
 
-        queue = new_queue
-
     return list(nodes.values())
 
 
@@ -186,8 +186,10 @@ def majority_rule(trees, weights=None, cutoff=0.5, support_attr='support',
 
     Parameters
     ----------
-    trees : list of TreeNode
-        The trees to operate on
+    trees : Iterable of TreeNode or TreeArray
+        The trees to operate on. Trees are only iterated over once, so a
+        generator (e.g., reading trees from a file one at a time) can be
+        provided to avoid holding all of them in memory.
     weights : list or np.array of {int, float}, optional
         If provided, the list must be in index order with `trees`. Each tree
         will receive the corresponding weight. If omitted, all trees will be
@@ -223,6 +225,10 @@ def majority_rule(trees, weights=None, cutoff=0.5, support_attr='support',
     clade was observed in. For instance, if {A, B, C} was observed in 5 trees
     all with a weight of 1, its support would then be 5.
 
+    Clades are represented as bitsets over an index of the tip names shared
+    by all trees, so counting clades over many trees does not build a set of
+    names per node.
+
     References
     ----------
     .. [1] Margush T, McMorris FR. (1981) "Consensus n-trees." Bulletin for
@@ -274,18 +280,16 @@ def majority_rule(trees, weights=None, cutoff=0.5, support_attr='support',
     4
 
     """
-    if weights is None:
-        weights = np.ones(len(trees), dtype=float)
-    else:
+    if weights is not None:
         weights = np.asarray(weights)
-        if len(weights) != len(trees):
+        if hasattr(trees, '__len__') and len(weights) != len(trees):
             raise ValueError("Number of weights and trees differ.")
 
-    cutoff_threshold = cutoff * weights.sum()
-
-    clade_counts, edge_lengths = _walk_clades(trees, weights)
+    clade_counts, edge_lengths, tip_names, total = _walk_clades(trees,
+                                                                weights)
+    cutoff_threshold = cutoff * total
     clade_counts = _filter_clades(clade_counts, cutoff_threshold)
     trees = _build_trees(clade_counts, edge_lengths, support_attr,
-                         tree_node_class)
+                         tree_node_class, tip_names)
 
     return trees
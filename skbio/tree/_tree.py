@@ -6,10 +6,11 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import gc
 import warnings
-from operator import or_, itemgetter
+from contextlib import contextmanager
+from operator import or_
 from copy import deepcopy
-from itertools import combinations
 from functools import reduce
 from collections import defaultdict
 
@@ -24,6 +25,10 @@ from skbio.util import RepresentationWarning
 from skbio.util._decorator import experimental, classonlymethod
 
 
+# types whose values are immutable, and shared rather than deep copied
+_ATOMIC_TYPES = frozenset([type(None), bool, int, float, complex, str, bytes])
+
+
 def distance_from_r(m1, m2):
     r"""Estimates distance as (1-r)/2: neg correl = max distance
 
@@ -78,7 +83,9 @@ class TreeNode(SkbioObject):
     """
     default_write_format = 'newick'
     _exclude_from_copy = set(['parent', 'children', '_tip_cache',
-                              '_non_tip_cache'])
+                              '_non_tip_cache', '_caches_built',
+                              '_caches_patched', '_tip_count',
+                              '_node_count'])
 
     @experimental(as_of="0.4.0")
     def __init__(self, name=None, length=None, parent=None, children=None):
@@ -87,6 +94,10 @@ class TreeNode(SkbioObject):
         self.parent = parent
         self._tip_cache = {}
         self._non_tip_cache = {}
+        self._caches_built = False
+        self._caches_patched = False
+        self._tip_count = None
+        self._node_count = None
         self._registered_caches = set()
 
         self.children = []
@@ -167,9 +178,11 @@ class TreeNode(SkbioObject):
     @experimental(as_of="0.4.0")
     def _adopt(self, node):
         r"""Update `parent` references but does NOT update `children`."""
-        self.invalidate_caches()
         if node.parent is not None:
             node.parent.remove(node)
+        else:
+            # the lookup caches of the node only apply while it is a root
+            node.invalidate_caches(attr=False)
         node.parent = self
         return node
 
@@ -177,9 +190,9 @@ class TreeNode(SkbioObject):
     def append(self, node):
         r"""Appends a node to `children`, in-place, cleaning up refs
 
-        `append` will invalidate any node lookup caches, remove an existing
-        parent on `node` if one exists, set the parent of `node` to self
-        and add the `node` to `self` `children`.
+        `append` will remove an existing parent on `node` if one exists, set
+        the parent of `node` to self, add the `node` to `self` `children` and
+        add the nodes of its subtree to the node lookup caches.
 
         Parameters
         ----------
@@ -203,15 +216,18 @@ class TreeNode(SkbioObject):
         <BLANKLINE>
 
         """
-        self.children.append(self._adopt(node))
+        node = self._adopt(node)
+        was_tip = not self.children
+        self.children.append(node)
+        self._update_caches_on_add([node], was_tip)
 
     @experimental(as_of="0.4.0")
     def extend(self, nodes):
         r"""Append a `list` of `TreeNode` to `self`.
 
-        `extend` will invalidate any node lookup caches, remove existing
-        parents of the `nodes` if they have any, set their parents to self
-        and add the nodes to `self` `children`.
+        `extend` will remove existing parents of the `nodes` if they have any,
+        set their parents to self, add the nodes to `self` `children` and add
+        the nodes of their subtrees to the node lookup caches.
 
         Parameters
         ----------
@@ -232,15 +248,18 @@ class TreeNode(SkbioObject):
         <BLANKLINE>
 
         """
-        self.children.extend([self._adopt(n) for n in nodes[:]])
+        nodes = [self._adopt(n) for n in nodes[:]]
+        was_tip = not self.children
+        self.children.extend(nodes)
+        self._update_caches_on_add(nodes, was_tip)
 
     @experimental(as_of="0.4.0")
     def pop(self, index=-1):
         r"""Remove a `TreeNode` from `self`.
 
-        Remove a child node by its index position. All node lookup caches
-        are invalidated, and the parent reference for the popped node will be
-        set to `None`.
+        Remove a child node by its index position. The nodes of its subtree
+        are removed from the node lookup caches, and the parent reference for
+        the popped node will be set to `None`.
 
         Parameters
         ----------
@@ -270,11 +289,106 @@ class TreeNode(SkbioObject):
 
     def _remove_node(self, idx):
         r"""The actual (and only) method that performs node removal"""
-        self.invalidate_caches()
+        root = self.root()
+        if root._registered_caches:
+            root.invalidate_caches()
         node = self.children.pop(idx)
         node.parent = None
+        node.invalidate_caches(attr=False)
+        self._update_caches_on_remove(root, node)
         return node
 
+    def _update_caches_on_add(self, nodes, was_tip):
+        r"""Add the subtrees of newly adopted children to lookup caches
+
+        The caches of the root are updated in time proportional to the size
+        of the subtrees. They are invalidated instead when attributes are
+        cached, or when a name is duplicated, so that `create_caches`
+        rebuilds them (and raises on duplicated tip names).
+        """
+        root = self.root()
+        if root._registered_caches:
+            root.invalidate_caches()
+            return
+        if not root._caches_built:
+            return
+        root._caches_patched = True
+
+        if was_tip:
+            root._tip_count -= 1
+            if self.name is not None:
+                if root._tip_cache.get(self.name) is self:
+                    del root._tip_cache[self.name]
+                if not root._add_to_lookup_caches(self):
+                    return
+
+        for node in nodes:
+            for n in node.postorder(include_self=True):
+                root._node_count += 1
+                if not n.children:
+                    root._tip_count += 1
+                if n.name is not None and not root._add_to_lookup_caches(n):
+                    return
+
+    def _update_caches_on_remove(self, root, node):
+        r"""Remove the subtree of a removed child from lookup caches
+
+        See Also
+        --------
+        _update_caches_on_add
+        """
+        if not root._caches_built:
+            return
+        root._caches_patched = True
+
+        for n in node.postorder(include_self=True):
+            root._node_count -= 1
+            if not n.children:
+                root._tip_count -= 1
+            if n.name is not None:
+                root._remove_from_lookup_caches(n)
+
+        if not self.children:
+            # self is now a tip
+            root._tip_count += 1
+            if self.name is not None:
+                root._remove_from_lookup_caches(self, is_tip=False)
+                root._add_to_lookup_caches(self)
+
+    def _add_to_lookup_caches(self, node):
+        r"""Add a named node to the lookup caches of self (the root)
+
+        Returns ``False`` (after invalidating the caches) if the name is
+        already cached, as the caches must then be rebuilt: tip names must be
+        unique, and internal nodes with the same name are ordered.
+        """
+        name = node.name
+        if node.children:
+            cache = self._non_tip_cache
+        else:
+            cache = self._tip_cache
+        if name in cache:
+            self.invalidate_caches(attr=False)
+            return False
+        cache[name] = [node] if node.children else node
+        return True
+
+    def _remove_from_lookup_caches(self, node, is_tip=None):
+        r"""Remove a named node from the lookup caches of self (the root)"""
+        name = node.name
+        if is_tip is None:
+            is_tip = not node.children
+        if is_tip:
+            if self._tip_cache.get(name) is node:
+                del self._tip_cache[name]
+        else:
+            nodes = [n for n in self._non_tip_cache.get(name, [])
+                     if n is not node]
+            if nodes:
+                self._non_tip_cache[name] = nodes
+            else:
+                self._non_tip_cache.pop(name, None)
+
     @experimental(as_of="0.4.0")
     def remove(self, node):
         r"""Remove a node from self
@@ -407,6 +521,8 @@ class TreeNode(SkbioObject):
             for key in node_to_copy.__dict__:
                 if key not in efc:
                     self.__dict__[key] = deepcopy(node_to_copy.__dict__[key])
+            # self was renamed, which the lookup caches cannot follow
+            self.invalidate_caches(attr=False)
             self.remove(node_to_copy)
             self.extend(node_to_copy.children)
 
@@ -472,13 +588,20 @@ class TreeNode(SkbioObject):
         return tcopy
 
     @experimental(as_of="0.4.0")
-    def copy(self):
+    def copy(self, deep=True):
         r"""Returns a copy of self using an iterative approach
 
         Perform an iterative deepcopy of self. It is not assured that the copy
         of node attributes will be performed iteratively as that depends on
         the copy method of the types being copied
 
+        Parameters
+        ----------
+        deep : bool, optional
+            If ``False``, the attributes of the nodes (e.g., names, lengths and
+            cached attributes) are shared with the original nodes instead of
+            being deep copied. The structure of the tree is always copied.
+
         Returns
         -------
         TreeNode
@@ -489,6 +612,12 @@ class TreeNode(SkbioObject):
         unrooted_deepcopy
         unrooted_copy
 
+        Notes
+        -----
+        The nodes are copied in a single preorder pass, and each copy is
+        linked to the copy of its parent directly, as the new tree has no
+        lookup caches to update.
+
         Examples
         --------
         >>> from skbio import TreeNode
@@ -500,40 +629,47 @@ class TreeNode(SkbioObject):
         0
 
         """
-        def __copy_node(node_to_copy):
-            r"""Helper method to copy a node"""
-            # this is _possibly_ dangerous, we're assuming the node to copy is
-            # of the same class as self, and has the same exclusion criteria.
-            # however, it is potentially dangerous to mix TreeNode subclasses
-            # within a tree, so...
-            result = self.__class__()
-            efc = self._exclude_from_copy
-            for key in node_to_copy.__dict__:
-                if key not in efc:
-                    result.__dict__[key] = deepcopy(node_to_copy.__dict__[key])
-            return result
+        # this is _possibly_ dangerous, we're assuming the nodes to copy are
+        # of the same class as self, and have the same exclusion criteria.
+        # however, it is potentially dangerous to mix TreeNode subclasses
+        # within a tree, so...
+        cls = self.__class__
+        efc = self._exclude_from_copy
+        atomic = _ATOMIC_TYPES
+
+        root = None
+        stack = [(self, None)]
+        with _gc_paused():
+            while stack:
+                old_node, new_parent = stack.pop()
+                new_node = cls()
+                new_dict = new_node.__dict__
+                for key, value in old_node.__dict__.items():
+                    if key in efc:
+                        continue
+                    if key == '_registered_caches':
+                        # a set of attribute names, owned by each node
+                        value = set(value)
+                    elif deep and type(value) not in atomic:
+                        value = deepcopy(value)
+                    new_dict[key] = value
+
+                if new_parent is None:
+                    root = new_node
+                else:
+                    new_node.parent = new_parent
+                    new_parent.children.append(new_node)
 
-        root = __copy_node(self)
-        nodes_stack = [[root, self, len(self.children)]]
-
-        while nodes_stack:
-            # check the top node, any children left unvisited?
-            top = nodes_stack[-1]
-            new_top_node, old_top_node, unvisited_children = top
-
-            if unvisited_children:
-                top[2] -= 1
-                old_child = old_top_node.children[-unvisited_children]
-                new_child = __copy_node(old_child)
-                new_top_node.append(new_child)
-                nodes_stack.append([new_child, old_child,
-                                    len(old_child.children)])
-            else:  # no unvisited children
-                nodes_stack.pop()
+                # children are pushed in reverse so they are copied in order
+                stack.extend([(child, new_node)
+                              for child in reversed(old_node.children)])
         return root
 
     __copy__ = copy
-    __deepcopy__ = deepcopy = copy
+    deepcopy = copy
+
+    def __deepcopy__(self, memo):
+        return self.copy()
 
     @experimental(as_of="0.4.0")
     def unrooted_deepcopy(self, parent=None):
@@ -543,8 +679,6 @@ class TreeNode(SkbioObject):
         unrooted copy. This is useful for defining new roots of the tree as
         the `TreeNode`.
 
-        This method calls `TreeNode.unrooted_copy` which is recursive.
-
         Parameters
         ----------
         parent : TreeNode or None
@@ -571,14 +705,7 @@ class TreeNode(SkbioObject):
         <BLANKLINE>
 
         """
-        root = self.root()
-        root.assign_ids()
-
-        new_tree = root.copy()
-        new_tree.assign_ids()
-
-        new_tree_self = new_tree.find_by_id(self.id)
-        return new_tree_self.unrooted_copy(parent)
+        return self._unrooted_copy(parent, deep=True)
 
     @experimental(as_of="0.4.0")
     def unrooted_copy(self, parent=None):
@@ -588,8 +715,6 @@ class TreeNode(SkbioObject):
         unrooted copy. This is useful for defining new roots of the tree as
         the `TreeNode`.
 
-        This method is recursive.
-
         Warning, this is _NOT_ a deepcopy
 
         Parameters
@@ -618,30 +743,49 @@ class TreeNode(SkbioObject):
         <BLANKLINE>
 
         """
-        neighbors = self.neighbors(ignore=parent)
-        children = [c.unrooted_copy(parent=self) for c in neighbors]
-
-        # we might be walking UP the tree, so:
-        if parent is None:
-            # base edge
-            edgename = None
-            length = None
-        elif parent.parent is self:
-            # self's parent is becoming self's child
-            edgename = parent.name
-            length = parent.length
-        else:
-            assert parent is self.parent
-            edgename = self.name
-            length = self.length
+        return self._unrooted_copy(parent, deep=False)
+
+    def _unrooted_copy(self, parent, deep):
+        r"""Iteratively copy the tree unrooted-style, starting from self"""
+        cls = self.__class__
+        root = None
+        # each entry is a node to copy, the neighbor it is reached from and
+        # the copy of that neighbor
+        stack = [(self, parent, None)]
+        with _gc_paused():
+            while stack:
+                node, came_from, new_parent = stack.pop()
+
+                # we might be walking UP the tree, so:
+                if came_from is None:
+                    # base edge
+                    edgename = None
+                    length = None
+                elif came_from.parent is node:
+                    # node's parent is becoming node's child
+                    edgename = came_from.name
+                    length = came_from.length
+                else:
+                    assert came_from is node.parent
+                    edgename = node.name
+                    length = node.length
+
+                if deep:
+                    edgename, length = deepcopy(edgename), deepcopy(length)
+                result = cls(name=edgename, length=length)
+                if new_parent is None:
+                    root = result
+                else:
+                    result.parent = new_parent
+                    new_parent.children.append(result)
 
-        result = self.__class__(name=edgename, children=children,
-                                length=length)
+                neighbors = node.neighbors(ignore=came_from)
+                stack.extend([(n, node, result) for n in reversed(neighbors)])
 
         if parent is None:
-            result.name = "root"
+            root.name = "root"
 
-        return result
+        return root
 
     @experimental(as_of="0.4.0")
     def count(self, tips=False):
@@ -667,6 +811,9 @@ class TreeNode(SkbioObject):
         5
 
         """
+        if self.is_root() and self._caches_built:
+            # counts are maintained along with the lookup caches
+            return self._tip_count if tips else self._node_count
         if tips:
             return len(list(self.tips()))
         else:
@@ -779,6 +926,49 @@ class TreeNode(SkbioObject):
                 i.__leaf_set = leaf_set
         return frozenset(sets)
 
+    def _clade_bits(self, tip_index):
+        """Return the tips under each node as a bitset, in postorder.
+
+        Clades are encoded as integers in which bit ``tip_index[name]`` is set
+        for each tip name under the node, so that clades of trees sharing a
+        ``tip_index`` can be hashed and compared without building sets of
+        names.
+
+        Parameters
+        ----------
+        tip_index : dict
+            Bit position of each tip name. Names missing from it are added.
+
+        Returns
+        -------
+        list of int
+            Bitset of the tip names under each node, in postorder (so `self`
+            is last).
+        list of float
+            Length of each node, in postorder.
+
+        """
+        bits = []
+        lengths = []
+        # in postorder, the children of a node are the last nodes on the stack
+        stack = []
+        for node in self.postorder(include_self=True):
+            n_children = len(node.children)
+            if n_children:
+                clade = 0
+                for child_clade in stack[-n_children:]:
+                    clade |= child_clade
+                del stack[-n_children:]
+            else:
+                position = tip_index.get(node.name)
+                if position is None:
+                    position = tip_index[node.name] = len(tip_index)
+                clade = 1 << position
+            stack.append(clade)
+            bits.append(clade)
+            lengths.append(node.length)
+        return bits, lengths
+
     @experimental(as_of="0.4.0")
     def root_at(self, node):
         r"""Return a new tree rooted at the provided node.
@@ -828,8 +1018,10 @@ class TreeNode(SkbioObject):
         r"""Return a new tree rooted at midpoint of the two tips farthest apart
 
         This method doesn't preserve the internal node naming or structure,
-        but does keep tip to tip distances correct. Uses `unrooted_copy` but
-        operates on a full copy of the tree.
+        but does keep tip to tip distances correct. The two tips farthest
+        apart are found with `get_max_distance`, and the rerooted tree is
+        built in a single pass with `unrooted_copy`, leaving this tree
+        unmodified.
 
         Raises
         ------
@@ -858,16 +1050,14 @@ class TreeNode(SkbioObject):
         <BLANKLINE>
 
         """
-        tree = self.copy()
-        max_dist, tips = tree.get_max_distance()
+        max_dist, tips = self.get_max_distance()
         half_max_dist = max_dist / 2.0
 
         if max_dist == 0.0:  # only pathological cases with no lengths
-            return tree
+            return self.copy()
 
-        tip1 = tree.find(tips[0])
-        tip2 = tree.find(tips[1])
-        lca = tree.lowest_common_ancestor([tip1, tip2])
+        tip1, tip2 = tips
+        lca = self.lowest_common_ancestor(tips)
 
         if tip1.accumulate_to_ancestor(lca) > half_max_dist:
             climb_node = tip1
@@ -890,17 +1080,18 @@ class TreeNode(SkbioObject):
                 return climb_node.unrooted_copy()
 
         else:
-            # make a new node on climb_node's branch to its parent
-            old_br_len = climb_node.length
+            # make a new root on climb_node's branch to its parent, copying
+            # each side of the branch away from it
+            below = climb_node._unrooted_copy(climb_node.parent, deep=False)
+            above = climb_node.parent._unrooted_copy(climb_node, deep=False)
 
-            new_root = tree.__class__()
-            climb_node.parent.append(new_root)
-            new_root.append(climb_node)
+            below.length = half_max_dist - dist_climbed
+            above.name = None
+            above.length = climb_node.length - below.length
 
-            climb_node.length = half_max_dist - dist_climbed
-            new_root.length = old_br_len - climb_node.length
-
-            return new_root.unrooted_copy()
+            new_root = self.__class__(name="root")
+            new_root.extend([below, above])
+            return new_root
 
     @experimental(as_of="0.4.0")
     def is_tip(self):
@@ -1382,6 +1573,10 @@ class TreeNode(SkbioObject):
         else:
             self._tip_cache = {}
             self._non_tip_cache = {}
+            self._caches_built = False
+            self._caches_patched = False
+            self._tip_count = None
+            self._node_count = None
 
             if self._registered_caches and attr:
                 for n in self.traverse():
@@ -1415,15 +1610,20 @@ class TreeNode(SkbioObject):
         if not self.is_root():
             self.root().create_caches()
         else:
-            if self._tip_cache and self._non_tip_cache:
+            if self._caches_built:
                 return
 
             self.invalidate_caches(attr=False)
 
             tip_cache = {}
             non_tip_cache = defaultdict(list)
+            tip_count = node_count = 0
 
             for node in self.postorder():
+                node_count += 1
+                if not node.children:
+                    tip_count += 1
+
                 name = node.name
 
                 if name is None:
@@ -1440,6 +1640,31 @@ class TreeNode(SkbioObject):
 
             self._tip_cache = tip_cache
             self._non_tip_cache = non_tip_cache
+            self._tip_count = tip_count
+            self._node_count = node_count
+            self._caches_built = True
+            self._caches_patched = False
+
+    def _lookup(self, name):
+        r"""Return the cached tip and internal nodes named `name`
+
+        Must be called on the root. The caches are built if needed. If they
+        have been updated in place since they were built, nodes may have been
+        renamed in the meantime: the caches are then rebuilt if the name is
+        not found, or if a node found was renamed or is no longer in the tree.
+        """
+        self.create_caches()
+        tip = self._tip_cache.get(name, None)
+        nodes = self._non_tip_cache.get(name, [])
+        if self._caches_patched:
+            found = nodes if tip is None else nodes + [tip]
+            if not found or any(n.name != name or n.root() is not self
+                                for n in found):
+                self.invalidate_caches(attr=False)
+                self.create_caches()
+                tip = self._tip_cache.get(name, None)
+                nodes = self._non_tip_cache.get(name, [])
+        return tip, nodes
 
     @experimental(as_of="0.4.0")
     def find_all(self, name):
@@ -1491,12 +1716,10 @@ class TreeNode(SkbioObject):
         if isinstance(name, root.__class__):
             return [name]
 
-        root.create_caches()
-
-        tip = root._tip_cache.get(name, None)
-        nodes = root._non_tip_cache.get(name, [])
+        tip, nodes = root._lookup(name)
 
-        nodes.append(tip) if tip is not None else None
+        # copy, so that the cached list of internal nodes is not modified
+        nodes = nodes + [tip] if tip is not None else list(nodes)
 
         if not nodes:
             raise MissingNodeError("Node %s is not in self" % name)
@@ -1552,11 +1775,10 @@ class TreeNode(SkbioObject):
         if isinstance(name, root.__class__):
             return name
 
-        root.create_caches()
-        node = root._tip_cache.get(name, None)
+        node, nodes = root._lookup(name)
 
-        if node is None:
-            node = root._non_tip_cache.get(name, [None])[0]
+        if node is None and nodes:
+            node = nodes[0]
 
         if node is None:
             raise MissingNodeError("Node %s is not in self" % name)
@@ -2290,6 +2512,7 @@ class TreeNode(SkbioObject):
 
         This method can be used to compute the distances between two tips,
         however, it is not optimized for computing pairwise tip distances.
+        ``TreeArray.distance`` computes many distances in constant time each.
 
         Parameters
         ----------
@@ -2341,43 +2564,6 @@ class TreeNode(SkbioObject):
 
             return accum
 
-    def _set_max_distance(self):
-        """Propagate tip distance information up the tree
-
-        This method was originally implemented by Julia Goodrich with the
-        intent of being able to determine max tip to tip distances between
-        nodes on large trees efficiently. The code has been modified to track
-        the specific tips the distance is between
-        """
-        maxkey = itemgetter(0)
-
-        for n in self.postorder():
-            if n.is_tip():
-                n.MaxDistTips = ((0.0, n), (0.0, n))
-            else:
-                if len(n.children) == 1:
-                    raise TreeError("No support for single descedent nodes")
-                else:
-                    tip_info = [(max(c.MaxDistTips, key=maxkey), c)
-                                for c in n.children]
-
-                    dists = [i[0][0] for i in tip_info]
-                    best_idx = np.argsort(dists)[-2:]
-                    (tip_a_d, tip_a), child_a = tip_info[best_idx[0]]
-                    (tip_b_d, tip_b), child_b = tip_info[best_idx[1]]
-                    tip_a_d += child_a.length or 0.0
-                    tip_b_d += child_b.length or 0.0
-                n.MaxDistTips = ((tip_a_d, tip_a), (tip_b_d, tip_b))
-
-    def _get_max_distance_singledesc(self):
-        """returns the max distance between any pair of tips
-
-        Also returns the tip names  that it is between as a tuple"""
-        distmtx = self.tip_tip_distances()
-        idx_max = divmod(distmtx.data.argmax(), distmtx.shape[1])
-        max_pair = (distmtx.ids[idx_max[0]], distmtx.ids[idx_max[1]])
-        return distmtx[idx_max], max_pair
-
     @experimental(as_of="0.4.0")
     def get_max_distance(self):
         """Returns the max tip tip distance between any pair of tips
@@ -2386,21 +2572,23 @@ class TreeNode(SkbioObject):
         -------
         float
             The distance between the two most distant tips in the tree
-        tuple of TreeNode
+        list of TreeNode
             The two most distant tips in the tree
 
-        Raises
-        ------
-        NoLengthError
-            A NoLengthError will be thrown if a node without length is
-            encountered
-
         See Also
         --------
         distance
         tip_tip_distances
         compare_tip_distances
 
+        Notes
+        -----
+        Missing branch lengths are treated as zero. The longest path through
+        each node joins the tips farthest from the root in two of its
+        subtrees, which are found at once for all nodes from distances to
+        the root, as subtrees are contiguous ranges of the preorder. Nodes
+        with a single child are supported.
+
         Examples
         --------
         >>> from skbio import TreeNode
@@ -2411,27 +2599,22 @@ class TreeNode(SkbioObject):
         >>> [n.name for n in tips]
         ['b', 'e']
         """
-        if not hasattr(self, 'MaxDistTips'):
-            # _set_max_distance will throw a TreeError if a node with a single
-            # child is encountered
-            try:
-                self._set_max_distance()
-            except TreeError:  #
-                return self._get_max_distance_singledesc()
-
-        longest = 0.0
-        tips = [None, None]
-        for n in self.non_tips(include_self=True):
-            tip_a, tip_b = n.MaxDistTips
-            dist = (tip_a[0] + tip_b[0])
-
-            if dist > longest:
-                longest = dist
-                tips = [tip_a[1], tip_b[1]]
-        return longest, tips
+        nodes, parent, length = _preorder_arrays(self)
+        farthest = _max_tip_distance(np.array(parent, dtype=np.intp),
+                                     np.array(length, dtype=float))
+        if farthest is None:
+            return 0.0, [None, None]
+
+        tip_a, tip_b, lca = [nodes[i] for i in farthest]
+        longest = (_length_to_ancestor(tip_a, lca) +
+                   _length_to_ancestor(tip_b, lca))
+        if longest <= 0.0:
+            return 0.0, [None, None]
+        return longest, [tip_a, tip_b]
 
     @experimental(as_of="0.4.0")
-    def tip_tip_distances(self, endpoints=None):
+    def tip_tip_distances(self, endpoints=None, condensed=False,
+                          dtype=np.float64):
         """Returns distance matrix between pairs of tips, and a tip order.
 
         By default, all pairwise distances are calculated in the tree. If
@@ -2442,16 +2625,29 @@ class TreeNode(SkbioObject):
         ----------
         endpoints : list of TreeNode or str, or None
             A list of TreeNode objects or names of TreeNode objects
+        condensed : bool, optional
+            If ``True``, return the condensed distance matrix (the upper
+            triangle of the matrix, as defined by
+            ``scipy.spatial.distance.squareform``), with tips in the order of
+            `endpoints` (or of ``self.tips()`` if `endpoints` is not
+            provided), instead of a ``DistanceMatrix``.
+        dtype : np.dtype, optional
+            Data type of the condensed distance matrix. ``np.float32`` halves
+            the memory of the result. Only supported with
+            ``condensed=True``.
 
         Returns
         -------
-        DistanceMatrix
-            The distance matrix
+        DistanceMatrix or np.ndarray
+            The distance matrix, or the condensed distance matrix if
+            `condensed` is ``True``
 
         Raises
         ------
         ValueError
             If any of the specified `endpoints` are not tips
+        ValueError
+            If `dtype` is specified without `condensed`
 
         See Also
         --------
@@ -2463,6 +2659,10 @@ class TreeNode(SkbioObject):
         If a node does not have an associated length, 0.0 will be used and a
         ``RepresentationWarning`` will be raised.
 
+        The distances between the tips of each pair of children of a node are
+        filled as a block, from the distances of the tips of each child to the
+        node.
+
         Examples
         --------
         >>> from skbio import TreeNode
@@ -2478,7 +2678,18 @@ class TreeNode(SkbioObject):
          [ 14.  15.   0.   9.]
          [ 15.  16.   9.   0.]]
 
+        The condensed matrix can be computed in single precision to save
+        memory:
+
+        >>> import numpy as np
+        >>> tree.tip_tip_distances(condensed=True, dtype=np.float32)
+        array([  3.,  14.,  15.,  15.,  16.,   9.], dtype=float32)
+
         """
+        if not condensed and np.dtype(dtype) != np.float64:
+            raise ValueError("``dtype`` can only be specified for condensed "
+                             "output.")
+
         all_tips = list(self.tips())
         if endpoints is None:
             tip_order = all_tips
@@ -2490,56 +2701,34 @@ class TreeNode(SkbioObject):
                                      n.name)
 
         # linearize all tips in postorder
-        # .__start, .__stop compose the slice in tip_order.
+        # .__start, .__stop compose the slice in all_tips.
         for i, node in enumerate(all_tips):
             node.__start, node.__stop = i, i + 1
+        selected = np.array([n.__start for n in tip_order], dtype=np.intp)
 
-        # the result map provides index in the result matrix
-        result_map = {n.__start: i for i, n in enumerate(tip_order)}
-        num_all_tips = len(all_tips)  # total number of tips
-        num_tips = len(tip_order)  # total number of tips in result
-        result = np.zeros((num_tips, num_tips), float)  # tip by tip matrix
-        distances = np.zeros((num_all_tips), float)  # dist from tip to tip
-
-        def update_result():
-            # set tip_tip distance between tips of different child
-            for child1, child2 in combinations(node.children, 2):
-                for tip1 in range(child1.__start, child1.__stop):
-                    if tip1 not in result_map:
-                        continue
-                    t1idx = result_map[tip1]
-                    for tip2 in range(child2.__start, child2.__stop):
-                        if tip2 not in result_map:
-                            continue
-                        t2idx = result_map[tip2]
-                        result[t1idx, t2idx] = distances[
-                            tip1] + distances[tip2]
-
-        for node in self.postorder():
-            if not node.children:
-                continue
-            # subtree with solved child wedges
-            # can possibly use np.zeros
-            starts, stops = [], []  # to calc ._start and ._stop for curr node
-            for child in node.children:
-                length = child.length
-                if length is None:
-                    warnings.warn(
-                        "`TreeNode.tip_tip_distances`: Node with name %r does "
-                        "not have an associated length, so a length of 0.0 "
-                        "will be used." % child.name, RepresentationWarning)
-                    length = 0.0
-                distances[child.__start:child.__stop] += length
-
-                starts.append(child.__start)
-                stops.append(child.__stop)
-
-            node.__start, node.__stop = min(starts), max(stops)
-
-            if len(node.children) > 1:
-                update_result()
-
-        return DistanceMatrix(result + result.T, [n.name for n in tip_order])
+        def node_children():
+            for node in self.postorder():
+                if not node.children:
+                    continue
+                children = []
+                for child in node.children:
+                    length = child.length
+                    if length is None:
+                        warnings.warn(
+                            "`TreeNode.tip_tip_distances`: Node with name %r "
+                            "does not have an associated length, so a length "
+                            "of 0.0 will be used." % child.name,
+                            RepresentationWarning)
+                        length = 0.0
+                    children.append((child.__start, child.__stop, length))
+                node.__start, node.__stop = children[0][0], children[-1][1]
+                yield children
+
+        result = _tip_distances_by_blocks(selected, len(all_tips),
+                                          node_children(), condensed, dtype)
+        if condensed:
+            return result
+        return DistanceMatrix(result, [n.name for n in tip_order])
 
     @experimental(as_of="0.4.0")
     def compare_rfd(self, other, proportion=False):
@@ -2600,8 +2789,9 @@ class TreeNode(SkbioObject):
             tree1 = self
             tree2 = other
 
-        tree1_sets = tree1.subsets()
-        tree2_sets = tree2.subsets()
+        tip_index = {}
+        tree1_sets = _rooted_clades(tree1._clade_bits(tip_index)[0][:-1])
+        tree2_sets = _rooted_clades(tree2._clade_bits(tip_index)[0][:-1])
 
         not_in_both = tree1_sets.symmetric_difference(tree2_sets)
 
@@ -2647,14 +2837,16 @@ class TreeNode(SkbioObject):
         0.5
 
         """
-        self_sets, other_sets = self.subsets(), other.subsets()
+        tip_index = {}
+        self_bits = self._clade_bits(tip_index)[0]
+        other_bits = other._clade_bits(tip_index)[0]
+        self_sets = _rooted_clades(self_bits[:-1])
+        other_sets = _rooted_clades(other_bits[:-1])
 
         if exclude_absent_taxa:
-            in_both = self.subset() & other.subset()
-            self_sets = (i & in_both for i in self_sets)
-            self_sets = frozenset({i for i in self_sets if len(i) > 1})
-            other_sets = (i & in_both for i in other_sets)
-            other_sets = frozenset({i for i in other_sets if len(i) > 1})
+            in_both = self_bits[-1] & other_bits[-1]
+            self_sets = _rooted_clades(i & in_both for i in self_sets)
+            other_sets = _rooted_clades(i & in_both for i in other_sets)
 
         total_subsets = len(self_sets) + len(other_sets)
         intersection_length = len(self_sets & other_sets)
@@ -3098,3 +3290,237 @@ class TreeNode(SkbioObject):
 
             yield self
             counter += 1
+
+
+def _tip_distances_by_blocks(selected, n_tips, node_children,
+                             condensed=False, dtype=np.float64):
+    """Fill the tip-to-tip distance matrix one child block at a time.
+
+    Parameters
+    ----------
+    selected : 1D np.ndarray of int
+        Position (in tip order) of each tip of the result, in result order.
+    n_tips : int
+        Number of tips in the tree.
+    node_children : iterable of list of tuple
+        For each internal node, in postorder, the ``(start, stop, length)``
+        of each of its children, in order. ``start`` and ``stop`` delimit the
+        tips of the child in tip order, and ``length`` is its branch length.
+    condensed : bool, optional
+        Return the condensed (upper triangular) matrix instead of the square
+        matrix.
+    dtype : np.dtype, optional
+        Data type of the result.
+
+    Returns
+    -------
+    np.ndarray
+        The square or condensed distance matrix.
+
+    Notes
+    -----
+    The selected tips are processed in tip order, where the tips of each
+    node form a contiguous range, so that the distances between the tips of
+    a child and those of its following siblings are filled as a single block
+    (the sum of the distances of both sets of tips to the node).
+
+    """
+    n = selected.shape[0]
+    order = np.argsort(selected, kind='mergesort')
+    is_sorted = (order == np.arange(n)).all()
+    # number of selected tips before each position in tip order, which maps
+    # ranges of tips to ranges of the sorted selected tips
+    rank = np.concatenate([[0], np.cumsum(
+        np.bincount(selected, minlength=n_tips))]).tolist()
+    # distances of the selected tips to the node being visited
+    distances = np.zeros(n)
+
+    if condensed:
+        result = np.zeros(n * (n - 1) // 2, dtype=dtype)
+        # position in the result of each sorted tip, and offset of each row in
+        # the condensed matrix, shifted so that the distance between positions
+        # i < j is at offsets[i] + j
+        positions = order
+        rows = np.arange(n)
+        offsets = rows * (n - 1) - rows * (rows + 1) // 2 - 1
+    else:
+        result = np.zeros((n, n), dtype=dtype)
+
+    for children in node_children:
+        ranges = []
+        for start, stop, length in children:
+            start, stop = rank[start], rank[stop]
+            distances[start:stop] += length
+            ranges.append((start, stop))
+        stop = ranges[-1][1]
+        for start, middle in ranges[:-1]:
+            if start == middle or middle == stop:
+                continue
+            if not condensed:
+                block = distances[start:middle, np.newaxis] + \
+                    distances[np.newaxis, middle:stop]
+                result[start:middle, middle:stop] = block
+                result[middle:stop, start:middle] = block.T
+            elif middle - start <= stop - middle:
+                # vectorize over the larger side of the block, to bound the
+                # number of iterations by the size of the smaller one
+                others = positions[middle:stop]
+                for i in range(start, middle):
+                    lo = np.minimum(positions[i], others)
+                    hi = np.maximum(positions[i], others)
+                    result[offsets[lo] + hi] = \
+                        distances[i] + distances[middle:stop]
+            else:
+                others = positions[start:middle]
+                for j in range(middle, stop):
+                    lo = np.minimum(positions[j], others)
+                    hi = np.maximum(positions[j], others)
+                    result[offsets[lo] + hi] = \
+                        distances[j] + distances[start:middle]
+
+    if not condensed and not is_sorted:
+        inverse = np.argsort(order, kind='mergesort')
+        result = result[inverse][:, inverse]
+    return result
+
+
+def _subtree_sizes(parent):
+    """Number of nodes in the subtree of each node of a preordered tree."""
+    size = [1] * len(parent)
+    parent = parent.tolist()
+    for node in range(len(parent) - 1, 0, -1):
+        size[parent[node]] += size[node]
+    return np.array(size, dtype=np.intp)
+
+
+def _range_min_table(values):
+    """Sparse table of the positions of lowest value over ranges.
+
+    Row ``k`` holds, for each position ``i``, the position of lowest value
+    among positions ``i`` to ``i + 2 ** k - 1`` (where these exist). Ties are
+    resolved in favor of the first position.
+
+    """
+    n = values.shape[0]
+    dtype = np.int32 if n < 2 ** 31 else np.intp
+    levels = max(int(n - 1).bit_length(), 1)
+    table = np.zeros((levels, n), dtype=dtype)
+    table[0] = np.arange(n)
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        first = table[k - 1, :n - half]
+        second = table[k - 1, half:]
+        table[k, :n - half] = np.where(values[first] <= values[second], first,
+                                       second)
+    return table
+
+
+def _root_distances(parent, length):
+    """Distance of each node to the root, and number of missing lengths."""
+    parent = parent.tolist()
+    length = length.tolist()
+    distance = [0.0] * len(parent)
+    missing = [0] * len(parent)
+    for node in range(1, len(parent)):
+        p = parent[node]
+        node_length = length[node]
+        if node_length != node_length:
+            distance[node] = distance[p]
+            missing[node] = missing[p] + 1
+        else:
+            distance[node] = distance[p] + node_length
+            missing[node] = missing[p]
+    return np.array(distance), np.array(missing, dtype=np.intp)
+
+
+def _preorder_arrays(tree):
+    """Nodes of a tree in preorder, with parent indices and lengths."""
+    nodes = list(tree.preorder(include_self=True))
+    index = {id(node): i for i, node in enumerate(nodes)}
+    parent = [-1]
+    parent.extend(index[id(node.parent)] for node in nodes[1:])
+    length = [np.nan if node.length is None else node.length
+              for node in nodes]
+    return nodes, parent, length
+
+
+def _max_tip_distance(parent, length):
+    """Two tips farthest apart in a preordered tree, and their ancestor.
+
+    Missing lengths (NaN) count as zero. Returns ``(a, b, lca)``, with ``b``
+    the tip farthest from their lowest common ancestor ``lca``, or ``None``
+    if the tree has fewer than two tips.
+
+    """
+    size = _subtree_sizes(parent)
+    distance = _root_distances(parent, length)[0]
+    nodes = np.arange(1, parent.shape[0])
+    if not nodes.shape[0]:
+        return None
+
+    # the tip farthest from the root in the subtree of each node is found
+    # with a range minimum query over the preorder, as subtrees are
+    # contiguous in it
+    values = np.where(size == 1, -distance, np.inf)
+    table = _range_min_table(values)
+    level = np.floor(np.log2(size[nodes])).astype(np.intp)
+    first = table[level, nodes]
+    second = table[level, nodes + size[nodes] - (1 << level)]
+    farthest = np.where(values[first] <= values[second], first, second)
+    reach = distance[farthest]
+
+    # the longest path through each node joins its two children reaching
+    # farthest, which come first when sorting children by decreasing reach
+    order = np.lexsort((-reach, parent[nodes]))
+    grouped = parent[nodes][order]
+    new_group = np.ones(grouped.shape[0] + 1, dtype=bool)
+    new_group[1:-1] = grouped[1:] != grouped[:-1]
+    runner_up = np.flatnonzero(new_group[:-2] & ~new_group[1:-1]) + 1
+    if not runner_up.shape[0]:
+        return None
+    a = order[runner_up]
+    b = order[runner_up - 1]
+    lca = grouped[runner_up]
+    longest = np.argmax(reach[a] + reach[b] - 2 * distance[lca])
+    return (int(farthest[a[longest]]), int(farthest[b[longest]]),
+            int(lca[longest]))
+
+
+def _length_to_ancestor(node, ancestor):
+    """Sum of lengths from a node up to an ancestor, missing ones as zero."""
+    accum = 0.0
+    while node is not ancestor:
+        accum += node.length or 0.0
+        node = node.parent
+    return accum
+
+
+def _rooted_clades(bits):
+    """Return the distinct clades of at least two tips among tip bitsets.
+
+    With the bitsets of the non-root nodes of a tree (e.g., all but the last
+    bitset returned by ``TreeNode._clade_bits``), these are the clades of
+    ``TreeNode.subsets``.
+
+    """
+    # clade & (clade - 1) clears the lowest bit, leaving 0 for single tips
+    return {clade for clade in bits if clade & (clade - 1)}
+
+
+@contextmanager
+def _gc_paused():
+    """Pause the cyclic garbage collector while many nodes are created.
+
+    Each node references its parent and children, so creating nodes in bulk
+    triggers collections of the youngest generations, and eventually full
+    collections, which all traverse the nodes being created without freeing
+    any of them.
+
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
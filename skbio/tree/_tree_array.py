@@ -0,0 +1,872 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import warnings
+
+import numpy as np
+
+from skbio._base import SkbioObject
+from skbio.stats.distance import DistanceMatrix
+from skbio.util import RepresentationWarning
+from skbio.util._decorator import experimental, classonlymethod
+from ._exception import DuplicateNodeError, MissingNodeError, NoLengthError
+from ._tree import (TreeNode, _tip_distances_by_blocks, _gc_paused,
+                    _subtree_sizes, _range_min_table, _root_distances,
+                    _preorder_arrays)
+
+
+class TreeArray(SkbioObject):
+    r"""Immutable, array-based representation of a rooted tree.
+
+    Nodes are identified by their index in a preorder traversal of the tree:
+    the root is node 0, and the descendants of node ``i`` are the nodes
+    ``i + 1`` to ``i + size[i] - 1``. The structure of the tree is described
+    by arrays of node indices, so that algorithms can traverse or summarize
+    the tree with NumPy operations rather than through ``TreeNode`` objects.
+
+    Parameters
+    ----------
+    parent : 1D array_like of int
+        Index of the parent of each node, in preorder. The root must be the
+        first node, with a parent of -1, and each node must come after its
+        parent and before the nodes following its parent's descendants.
+    length : 1D array_like of float, optional
+        Length of the branch of each node to its parent. Missing lengths are
+        represented by ``nan``. If not provided, all lengths are missing.
+    names : 1D array_like, optional
+        Name of each node (``None`` if unnamed). If not provided, nodes are
+        unnamed.
+
+    Raises
+    ------
+    ValueError
+        If `parent` does not describe a tree in preorder, or if `length` or
+        `names` do not have one value per node.
+
+    See Also
+    --------
+    TreeNode
+
+    Notes
+    -----
+    All arrays are read-only. ``TreeArray.from_tree_node`` and
+    ``TreeArray.to_tree_node`` convert from and to ``TreeNode`` objects, and
+    ``TreeArray.to_array`` returns the index used by the phylogenetic
+    diversity metrics in ``skbio.diversity``, which accept a ``TreeArray`` in
+    place of a ``TreeNode``.
+
+    Examples
+    --------
+    >>> from skbio import TreeNode
+    >>> from skbio.tree import TreeArray
+    >>> tree = TreeNode.read(["((a:1,b:2)c:3,(d:4,e:5)f:6)root;"])
+    >>> array = TreeArray.from_tree_node(tree)
+    >>> array
+    <TreeArray, internal node count: 2, tips count: 4>
+    >>> array.parent
+    array([-1,  0,  1,  1,  0,  4,  4])
+    >>> array.names[array.postorder]
+    array(['a', 'b', 'c', 'd', 'e', 'f', 'root'], dtype=object)
+    >>> print(array.tip_tip_distances())
+    4x4 distance matrix
+    IDs:
+    'a', 'b', 'd', 'e'
+    Data:
+    [[  0.   3.  14.  15.]
+     [  3.   0.  15.  16.]
+     [ 14.  15.   0.   9.]
+     [ 15.  16.   9.   0.]]
+
+    """
+
+    @experimental(as_of="0.5.1")
+    def __init__(self, parent, length=None, names=None):
+        parent = np.array(parent, dtype=np.intp)
+        if parent.ndim != 1 or parent.shape[0] == 0:
+            raise ValueError("``parent`` must be a non-empty 1-D array.")
+        n = parent.shape[0]
+        nodes = np.arange(n)
+
+        preorder_error = ("Nodes must be in preorder: the root must be the "
+                          "first node (with a parent of -1), and all other "
+                          "nodes must follow their parent and precede the "
+                          "nodes following their parent's descendants.")
+        if parent[0] != -1 or (parent[1:] < 0).any() or \
+                (parent[1:] >= nodes[1:]).any():
+            raise ValueError(preorder_error)
+        size = _subtree_sizes(parent)
+        if (nodes[1:] >= parent[1:] + size[parent[1:]]).any():
+            raise ValueError(preorder_error)
+
+        if length is None:
+            length = np.full(n, np.nan)
+        else:
+            length = np.array(length, dtype=float)
+            if length.shape != (n,):
+                raise ValueError("``length`` must have one value per node.")
+        if names is None:
+            names = np.full(n, None, dtype=object)
+        else:
+            names = np.array(names, dtype=object)
+            if names.shape != (n,):
+                raise ValueError("``names`` must have one value per node.")
+
+        # each node adds one to the depth of all of its descendants, which
+        # directly follow it
+        ends = nodes + size
+        depth = np.cumsum(np.bincount(nodes[1:], minlength=n + 1) -
+                          np.bincount(ends[1:], minlength=n + 1))[:n]
+
+        first_child = np.where(size > 1, nodes + 1, -1)
+        next_sibling = np.full(n, -1, dtype=np.intp)
+        has_sibling = ends[1:] < ends[parent[1:]]
+        next_sibling[1:][has_sibling] = ends[1:][has_sibling]
+
+        # the postorder position of a node is its preorder position, plus its
+        # descendants (which come before it), minus its ancestors (which come
+        # after it)
+        postorder = np.empty(n, dtype=np.intp)
+        postorder[nodes + size - 1 - depth] = nodes
+
+        self._parent = parent
+        self._length = length
+        self._names = names
+        self._size = size
+        self._depth = depth
+        self._first_child = first_child
+        self._next_sibling = next_sibling
+        self._postorder = postorder
+        self._is_tip = size == 1
+        self._tips = np.flatnonzero(self._is_tip)
+        for array in (parent, length, names, size, depth, first_child,
+                      next_sibling, postorder, self._is_tip, self._tips):
+            array.flags.writeable = False
+        self._tip_cache = None
+        self._non_tip_cache = None
+        self._lca_table = None
+        self._root_distance = None
+        self._root_missing = None
+
+    @classonlymethod
+    @experimental(as_of="0.5.1")
+    def from_tree_node(cls, tree):
+        """Create an array representation of a ``TreeNode`` and descendants.
+
+        Parameters
+        ----------
+        tree : TreeNode
+            The tree (or subtree) to represent. Its node is the root.
+
+        Returns
+        -------
+        TreeArray
+            The array representation of `tree`.
+
+        """
+        nodes, parent, length = _preorder_arrays(tree)
+        names = np.empty(len(nodes), dtype=object)
+        names[:] = [node.name for node in nodes]
+        return cls(parent, length, names)
+
+    @experimental(as_of="0.5.1")
+    def to_tree_node(self):
+        """Create a ``TreeNode`` tree from this array representation.
+
+        Returns
+        -------
+        TreeNode
+            The root of the new tree.
+
+        """
+        with _gc_paused():
+            nodes = [TreeNode(name=name, length=None if np.isnan(length)
+                              else length)
+                     for name, length in zip(self._names.tolist(),
+                                             self._length.tolist())]
+            # nodes are created without parents, so they can be attached
+            # directly
+            for node, parent in zip(nodes[1:], self._parent[1:].tolist()):
+                node.parent = nodes[parent]
+                nodes[parent].children.append(node)
+        return nodes[0]
+
+    @property
+    def parent(self):
+        """Index of the parent of each node (-1 for the root)."""
+        return self._parent
+
+    @property
+    def length(self):
+        """Branch length of each node (``nan`` if missing)."""
+        return self._length
+
+    @property
+    def names(self):
+        """Name of each node (``None`` if unnamed)."""
+        return self._names
+
+    @property
+    def size(self):
+        """Number of nodes in the subtree of each node (including itself)."""
+        return self._size
+
+    @property
+    def depth(self):
+        """Number of branches between each node and the root."""
+        return self._depth
+
+    @property
+    def first_child(self):
+        """Index of the first child of each node (-1 for tips)."""
+        return self._first_child
+
+    @property
+    def next_sibling(self):
+        """Index of the next sibling of each node (-1 for last children)."""
+        return self._next_sibling
+
+    @property
+    def is_tip(self):
+        """Whether each node is a tip."""
+        return self._is_tip
+
+    @property
+    def tips(self):
+        """Indices of the tips, in preorder."""
+        return self._tips
+
+    @property
+    def preorder(self):
+        """Indices of the nodes in preorder."""
+        return np.arange(self._parent.shape[0])
+
+    @property
+    def postorder(self):
+        """Indices of the nodes in postorder."""
+        return self._postorder
+
+    @experimental(as_of="0.5.1")
+    def __repr__(self):
+        """Return a summary of the tree."""
+        n_tips = self._tips.shape[0]
+        if self._parent.shape[0] == 1:
+            n_tips = 0
+        n_nontips = self._parent.shape[0] - 1 - n_tips
+        return "<%s, internal node count: %d, tips count: %d>" % (
+            self.__class__.__name__, n_nontips, n_tips)
+
+    @experimental(as_of="0.5.1")
+    def __str__(self):
+        """Return the newick representation of the tree."""
+        return str(self.to_tree_node())
+
+    @experimental(as_of="0.5.1")
+    def count(self, tips=False):
+        """Return the number of nodes (or tips) in the tree.
+
+        Parameters
+        ----------
+        tips : bool, optional
+            Count only tips.
+
+        Returns
+        -------
+        int
+            The number of nodes or tips.
+
+        """
+        if tips:
+            return self._tips.shape[0]
+        return self._parent.shape[0]
+
+    @experimental(as_of="0.5.1")
+    def children(self, node):
+        """Return the indices of the children of a node.
+
+        Parameters
+        ----------
+        node : int
+            Index of the node.
+
+        Returns
+        -------
+        np.ndarray of int
+            Indices of the children of `node`, in order.
+
+        """
+        descendants = self._parent[node + 1:node + self._size[node]]
+        return np.flatnonzero(descendants == node) + node + 1
+
+    @experimental(as_of="0.5.1")
+    def find(self, name):
+        """Find the index of a node by name.
+
+        As with ``TreeNode.find``, tips are searched first. If no tip has the
+        name, the first internal node with the name in postorder is returned.
+
+        Parameters
+        ----------
+        name : str
+            The name of the node to find.
+
+        Returns
+        -------
+        int
+            The index of the node.
+
+        Raises
+        ------
+        DuplicateNodeError
+            If tip names are not unique.
+        MissingNodeError
+            If no node has the name.
+
+        """
+        self._create_caches()
+        node = self._tip_cache.get(name, self._non_tip_cache.get(name))
+        if node is None:
+            raise MissingNodeError("Node %s is not in self" % name)
+        return node
+
+    def _create_caches(self):
+        """Build the lookups of nodes by name, if not built yet."""
+        if self._tip_cache is not None:
+            return
+        tip_cache = {}
+        non_tip_cache = {}
+        for node in self._postorder.tolist():
+            node_name = self._names[node]
+            if node_name is None:
+                continue
+            if self._is_tip[node]:
+                if node_name in tip_cache:
+                    raise DuplicateNodeError("Tip with name '%s' already "
+                                             "exists." % node_name)
+                tip_cache[node_name] = node
+            else:
+                non_tip_cache.setdefault(node_name, node)
+        self._tip_cache = tip_cache
+        self._non_tip_cache = non_tip_cache
+
+    @experimental(as_of="0.5.1")
+    def lowest_common_ancestor(self, names):
+        """Find the index of the lowest common ancestor of a set of nodes.
+
+        Parameters
+        ----------
+        names : list of str
+            Names of the nodes.
+
+        Returns
+        -------
+        int
+            Index of the lowest common ancestor.
+
+        Raises
+        ------
+        ValueError
+            If no names are provided.
+
+        """
+        if len(names) == 0:
+            raise ValueError("No tips found.")
+        nodes = [self.find(name) for name in names]
+        # the lowest common ancestor of the first and last nodes in preorder
+        # is an ancestor of all nodes in between
+        return self.lca(min(nodes), max(nodes))
+
+    @experimental(as_of="0.5.1")
+    def lca(self, a, b):
+        """Return the lowest common ancestors of pairs of nodes.
+
+        Parameters
+        ----------
+        a, b : int or array_like of int
+            Indices of the nodes of each pair. Arrays of pairs are broadcast
+            against each other.
+
+        Returns
+        -------
+        int or np.ndarray of int
+            Index of the lowest common ancestor of each pair.
+
+        See Also
+        --------
+        distance
+        lowest_common_ancestor
+
+        Notes
+        -----
+        Each query takes constant time, using a sparse table of the nodes of
+        lowest depth over ranges of the preorder, which is built with
+        :math:`O(n \\log n)` time and memory on the first query. For
+        :math:`a < b`, the lowest common ancestor is the parent of the node
+        of lowest depth in :math:`(a, b]`, i.e. the child of the lowest
+        common ancestor whose subtree contains :math:`b`.
+
+        Examples
+        --------
+        >>> from skbio import TreeNode
+        >>> from skbio.tree import TreeArray
+        >>> tree = TreeNode.read(["((a:1,b:2)c:3,(d:4,e:5)f:6)root;"])
+        >>> array = TreeArray.from_tree_node(tree)
+        >>> a, b, d = array.find('a'), array.find('b'), array.find('d')
+        >>> array.names[array.lca(a, b)]
+        'c'
+        >>> array.names[array.lca([a, a], [b, d])]
+        array(['c', 'root'], dtype=object)
+
+        """
+        a, b = self._validate_node_pairs(a, b)
+        result = self._lca(np.minimum(a, b), np.maximum(a, b))
+        return int(result) if result.ndim == 0 else result
+
+    @experimental(as_of="0.5.1")
+    def distance(self, a, b):
+        """Return the patristic distances between pairs of nodes.
+
+        Parameters
+        ----------
+        a, b : int or array_like of int
+            Indices of the nodes of each pair. Arrays of pairs are broadcast
+            against each other.
+
+        Returns
+        -------
+        float or np.ndarray of float
+            Sum of the branch lengths on the path between the nodes of each
+            pair.
+
+        Raises
+        ------
+        NoLengthError
+            If a node on the path between the nodes of a pair does not have a
+            branch length.
+
+        See Also
+        --------
+        lca
+        tip_tip_distances
+
+        Notes
+        -----
+        The distance is computed from the distances of both nodes and of
+        their lowest common ancestor to the root, so each query takes
+        constant time.
+
+        Examples
+        --------
+        >>> from skbio import TreeNode
+        >>> from skbio.tree import TreeArray
+        >>> tree = TreeNode.read(["((a:1,b:2)c:3,(d:4,e:5)f:6)root;"])
+        >>> array = TreeArray.from_tree_node(tree)
+        >>> a, b, d = array.find('a'), array.find('b'), array.find('d')
+        >>> array.distance(a, d)
+        14.0
+        >>> array.distance([a, a, b], [b, d, d])
+        array([  3.,  14.,  15.])
+
+        """
+        a, b = self._validate_node_pairs(a, b)
+        lca = self._lca(np.minimum(a, b), np.maximum(a, b))
+        if self._root_distance is None:
+            self._root_distance, self._root_missing = _root_distances(
+                self._parent, self._length)
+        missing = self._root_missing
+        if (missing[a] + missing[b] - 2 * missing[lca] > 0).any():
+            raise NoLengthError("Not all nodes on the path between the nodes "
+                                "have a branch length.")
+        root_distance = self._root_distance
+        result = root_distance[a] + root_distance[b] - 2 * root_distance[lca]
+        return float(result) if result.ndim == 0 else result
+
+    def _validate_node_pairs(self, a, b):
+        a, b = np.broadcast_arrays(np.asarray(a, dtype=np.intp),
+                                   np.asarray(b, dtype=np.intp))
+        n = self._parent.shape[0]
+        if ((a < 0) | (a >= n) | (b < 0) | (b >= n)).any():
+            raise IndexError("Node indices must be between 0 and %d." %
+                             (n - 1))
+        return a, b
+
+    def _lca(self, a, b):
+        """Lowest common ancestors of pairs of nodes with ``a <= b``."""
+        if self._lca_table is None:
+            self._lca_table = _range_min_table(self._depth)
+        table = self._lca_table
+        # the nodes of lowest depth over (a, b] are found in two overlapping
+        # ranges of a power of two length
+        same = a == b
+        start = np.where(same, a, a + 1)
+        span = b - start + 1
+        level = np.floor(np.log2(span)).astype(np.intp)
+        first = table[level, start]
+        second = table[level, b - (1 << level) + 1]
+        lowest = np.where(self._depth[first] <= self._depth[second], first,
+                          second)
+        return np.where(same, a, self._parent[lowest])
+
+    @experimental(as_of="0.5.1")
+    def tip_tip_distances(self, endpoints=None, condensed=False,
+                          dtype=np.float64):
+        """Return the distance matrix between pairs of tips.
+
+        Parameters
+        ----------
+        endpoints : list of str, optional
+            Names of the tips between which distances are computed, in the
+            order of the result. If not provided, all tips are used, in
+            preorder.
+        condensed : bool, optional
+            If ``True``, return the condensed distance matrix (as defined by
+            ``scipy.spatial.distance.squareform``) instead of a
+            ``DistanceMatrix``.
+        dtype : np.dtype, optional
+            Data type of the condensed distance matrix. Only supported with
+            ``condensed=True``.
+
+        Returns
+        -------
+        DistanceMatrix or np.ndarray
+            The distance matrix, or the condensed distance matrix if
+            `condensed` is ``True``.
+
+        Raises
+        ------
+        ValueError
+            If any of the specified `endpoints` are not tips, or if `dtype` is
+            specified without `condensed`.
+
+        See Also
+        --------
+        TreeNode.tip_tip_distances
+
+        Notes
+        -----
+        If a node does not have an associated length, 0.0 will be used and a
+        ``RepresentationWarning`` will be raised.
+
+        The distances of the tips to each internal node are accumulated in a
+        postorder pass, and the distances between the tips of different
+        children of the node are filled in blocks, as by
+        ``TreeNode.tip_tip_distances``.
+
+        """
+        if not condensed and np.dtype(dtype) != np.float64:
+            raise ValueError("``dtype`` can only be specified for condensed "
+                             "output.")
+
+        n_tips = self._tips.shape[0]
+        if endpoints is None:
+            selected = np.arange(n_tips)
+        else:
+            nodes = np.array([self.find(name) for name in endpoints],
+                             dtype=np.intp)
+            for node in nodes:
+                if not self._is_tip[node]:
+                    raise ValueError("Node with name '%s' is not a tip." %
+                                     self._names[node])
+            selected = np.searchsorted(self._tips, nodes)
+        ids = [self._names[self._tips[i]] for i in selected]
+
+        missing = np.isnan(self._length)
+        missing[0] = False
+        if missing.any():
+            warnings.warn(
+                "`TreeArray.tip_tip_distances`: %d node(s) do not have an "
+                "associated length, so a length of 0.0 will be used." %
+                missing.sum(), RepresentationWarning)
+        lengths = np.where(missing, 0.0, self._length)
+
+        # the tips of the subtree of each node form a contiguous range of tip
+        # positions
+        tip_counts = np.concatenate([[0], np.cumsum(self._is_tip)]).tolist()
+        size = self._size.tolist()
+        first_child = self._first_child.tolist()
+        next_sibling = self._next_sibling.tolist()
+        lengths = lengths.tolist()
+
+        def node_children():
+            internal = self._postorder[~self._is_tip[self._postorder]]
+            for node in internal.tolist():
+                children = []
+                child = first_child[node]
+                while child != -1:
+                    children.append((tip_counts[child],
+                                     tip_counts[child + size[child]],
+                                     lengths[child]))
+                    child = next_sibling[child]
+                yield children
+
+        result = _tip_distances_by_blocks(selected, n_tips, node_children(),
+                                          condensed, dtype)
+        if condensed:
+            return result
+        return DistanceMatrix(result, ids)
+
+    @experimental(as_of="0.5.1")
+    def shear(self, names):
+        """Return the tree induced by a subset of tips.
+
+        Nodes without any of the tips are removed, and internal nodes left
+        with a single child are merged with it (summing the branch lengths).
+        If the root is left with a single child, the first node with several
+        children (or the only tip) below it becomes the root.
+
+        Parameters
+        ----------
+        names : Iterable of str
+            Names of the tips to keep.
+
+        Returns
+        -------
+        TreeArray
+            The induced tree.
+
+        Raises
+        ------
+        ValueError
+            If the names are not tip names of the tree.
+
+        See Also
+        --------
+        induced_subtree
+        TreeNode.shear
+
+        Notes
+        -----
+        Unlike ``TreeNode.shear``, the remaining nodes keep their relative
+        order.
+
+        """
+        self._create_caches()
+        tip_cache = self._tip_cache
+        try:
+            tips = [tip_cache[name] for name in set(names)]
+        except KeyError:
+            raise ValueError("ids are not a subset of the tree.")
+        if not tips:
+            raise ValueError("ids are not a subset of the tree.")
+        return self.induced_subtree(np.array(tips, dtype=np.intp))
+
+    @experimental(as_of="0.5.1")
+    def induced_subtree(self, tips, return_nodes=False):
+        """Return the tree induced by a subset of tips, selected by index.
+
+        As with `shear`, nodes without any of the tips are removed, and
+        internal nodes left with a single child are merged with it (summing
+        the branch lengths).
+
+        Parameters
+        ----------
+        tips : 1D array_like of bool or int
+            Either a mask of the tips to keep, with one value per tip (in the
+            order of ``tips``), or the indices of the tips to keep.
+        return_nodes : bool, optional
+            If ``True``, also return the index of each node of the induced
+            tree in this tree.
+
+        Returns
+        -------
+        TreeArray
+            The induced tree.
+        np.ndarray of int, optional
+            Index in this tree of each node of the induced tree (for merged
+            nodes, the index of the lowest node). Only provided if
+            `return_nodes` is ``True``.
+
+        Raises
+        ------
+        ValueError
+            If the mask does not have one value per tip, if the indices are
+            not indices of tips, or if no tips are selected.
+
+        See Also
+        --------
+        shear
+
+        Notes
+        -----
+        Each kept node is linked to its nearest remaining ancestor (and the
+        lengths of the merged nodes in between are summed) by pointer
+        jumping, so the induced tree is built with a logarithmic number of
+        array operations in the length of the merged paths.
+
+        Examples
+        --------
+        >>> from skbio import TreeNode
+        >>> from skbio.tree import TreeArray
+        >>> tree = TreeNode.read(["((a:1,b:2)c:3,(d:4,e:5)f:6)root;"])
+        >>> array = TreeArray.from_tree_node(tree)
+        >>> subtree, nodes = array.induced_subtree([True, False, True, True],
+        ...                                        return_nodes=True)
+        >>> print(subtree)
+        (a:4.0,(d:4.0,e:5.0)f:6.0)root;
+        <BLANKLINE>
+        >>> array.names[nodes]
+        array(['root', 'a', 'f', 'd', 'e'], dtype=object)
+
+        """
+        n = self._parent.shape[0]
+        tips = np.asarray(tips)
+        if tips.size == 0:
+            raise ValueError("At least one tip must be selected.")
+        if tips.dtype == bool:
+            if tips.shape != self._tips.shape:
+                raise ValueError("A mask of ``tips`` must have one value per "
+                                 "tip.")
+            selected = self._tips[tips]
+        else:
+            selected = tips.astype(np.intp, casting='safe').ravel()
+            if ((selected < 0) | (selected >= n)).any() or \
+                    not self._is_tip[selected].all():
+                raise ValueError("``tips`` must be indices of tips.")
+        if selected.shape[0] == 0:
+            raise ValueError("At least one tip must be selected.")
+
+        # a node is kept if any of its tips is kept, and remains (rather than
+        # being merged into its child) unless it has a single kept child
+        keep_tip = np.zeros(n, dtype=np.intp)
+        keep_tip[selected] = 1
+        kept_before = np.concatenate([[0], np.cumsum(keep_tip)])
+        nodes = np.arange(n)
+        kept = kept_before[nodes + self._size] > kept_before[nodes]
+        kept_nodes = np.flatnonzero(kept)
+        kept_children = np.bincount(self._parent[kept_nodes[1:]],
+                                    minlength=n)
+        remains = kept & (kept_children != 1)
+
+        # jump from each kept node to its nearest remaining ancestor, while
+        # summing the (non-missing) lengths from the node up to the target of
+        # its jump. The root does not carry its length to its child.
+        jump = self._parent.copy()
+        present = ~np.isnan(self._length)
+        total = np.where(present, self._length, 0.0)
+        count = present.astype(np.intp)
+        total[0] = count[0] = 0
+        active = kept_nodes[1:]
+        while active.shape[0]:
+            targets = jump[active]
+            unresolved = targets != -1
+            unresolved[unresolved] = ~remains[targets[unresolved]]
+            active = active[unresolved]
+            targets = targets[unresolved]
+            total[active] += total[targets]
+            count[active] += count[targets]
+            jump[active] = jump[targets]
+
+        new_nodes = np.flatnonzero(remains)
+        rank = np.cumsum(remains) - 1
+        new_parent = jump[new_nodes]
+        has_parent = new_parent != -1
+        new_parent[has_parent] = rank[new_parent[has_parent]]
+        new_length = np.where(count[new_nodes] > 0, total[new_nodes], np.nan)
+        if remains[0]:
+            new_length[0] = self._length[0]
+        result = TreeArray(new_parent, new_length, self._names[new_nodes])
+        if return_nodes:
+            return result, new_nodes
+        return result
+
+    def _clade_bits(self, tip_index):
+        """Return the tips under each node as a bitset, in postorder.
+
+        Parameters
+        ----------
+        tip_index : dict
+            Bit position of each tip name. Names missing from it are added.
+
+        Returns
+        -------
+        list of int
+            Bitset of the tip names under each node, in postorder (so the
+            root is last).
+        list of float
+            Length of each node, in postorder (``None`` if missing).
+
+        See Also
+        --------
+        TreeNode._clade_bits
+
+        """
+        parent = self._parent.tolist()
+        bits = [0] * len(parent)
+        names = self._names
+        for tip in self._tips.tolist():
+            name = names[tip]
+            position = tip_index.get(name)
+            if position is None:
+                position = tip_index[name] = len(tip_index)
+            bits[tip] = 1 << position
+        # children come after their parents in preorder
+        for node in range(len(parent) - 1, 0, -1):
+            bits[parent[node]] |= bits[node]
+        postorder = self._postorder.tolist()
+        lengths = self._length[self._postorder]
+        missing = np.isnan(lengths).tolist()
+        lengths = [None if m else length
+                   for length, m in zip(lengths.tolist(), missing)]
+        return [bits[node] for node in postorder], lengths
+
+    @experimental(as_of="0.5.1")
+    def to_array(self, nan_length_value=None):
+        """Return the node index used by phylogenetic diversity metrics.
+
+        Nodes are numbered as by ``TreeNode.assign_ids`` (children of each
+        node are numbered consecutively, in postorder of their parents), so
+        that the result matches ``TreeNode.to_array`` for the same tree.
+
+        Parameters
+        ----------
+        nan_length_value : float, optional
+            If provided, replaces any `nan` in the branch length vector
+            (i.e., ``result['length']``) with this value.
+
+        Returns
+        -------
+        dict of array
+            {child_index: ((node_id, left_child_id, right_child_id)),
+             name: array(...),
+             length: array(...),
+             id: array(...)}
+
+        Notes
+        -----
+        Unlike ``TreeNode.to_array``, the result does not contain an
+        ``id_index``, as there are no node objects to index.
+
+        """
+        n = self._parent.shape[0]
+        nonroot = np.arange(1, n)
+        post_rank = np.empty(n, dtype=np.intp)
+        post_rank[self._postorder] = np.arange(n)
+        order = nonroot[np.lexsort((nonroot,
+                                    post_rank[self._parent[nonroot]]))]
+        ids = np.empty(n, dtype=np.int64)
+        ids[order] = np.arange(n - 1)
+        ids[0] = n - 1
+
+        if n > 1:
+            last_child = np.empty(n, dtype=np.intp)
+            is_last = self._next_sibling[nonroot] == -1
+            last_child[self._parent[nonroot][is_last]] = nonroot[is_last]
+            internal = np.concatenate([order[self._size[order] > 1], [0]])
+            child_index = np.column_stack([
+                ids[internal], ids[self._first_child[internal]],
+                ids[last_child[internal]]])
+        else:
+            child_index = np.atleast_2d(np.asarray([]))
+
+        name = np.empty(n, dtype=object)
+        name[ids] = self._names
+        length = np.empty(n, dtype=float)
+        length[ids] = self._length
+        if nan_length_value is not None:
+            length[np.isnan(length)] = nan_length_value
+        return {'child_index': child_index, 'name': name, 'length': length,
+                'id': np.arange(n)}
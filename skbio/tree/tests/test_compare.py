@@ -0,0 +1,69 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import TestCase, main
+
+import numpy as np
+import numpy.testing as npt
+
+from skbio import TreeNode
+from skbio.tree import TreeArray, rf_dists
+
+
+class RFDistsTests(TestCase):
+    def setUp(self):
+        self.trees = [TreeNode.read([newick]) for newick in (
+            "((a,b),(c,d),e);",
+            "(((a,b),c),(d,e));",
+            "(((a,c),b),d,e);",
+            "((((a,b)),(c,d)),e);",
+            "(a,b,c,d,e);")]
+
+    def test_rf_dists(self):
+        obs = rf_dists(self.trees)
+        self.assertEqual(obs.ids, ('0', '1', '2', '3', '4'))
+        for i, tree1 in enumerate(self.trees):
+            for j, tree2 in enumerate(self.trees):
+                self.assertEqual(obs[i, j], tree1.compare_rfd(tree2))
+
+    def test_rf_dists_proportion(self):
+        obs = rf_dists(self.trees, proportion=True)
+        for i, tree1 in enumerate(self.trees[:-1]):
+            for j, tree2 in enumerate(self.trees[:-1]):
+                self.assertAlmostEqual(obs[i, j],
+                                       tree1.compare_rfd(tree2, True))
+        # the star tree has no clades
+        npt.assert_equal(obs[4], [1, 1, 1, 1, 0])
+
+    def test_rf_dists_random(self):
+        np.random.seed(0)
+        names = [str(i) for i in range(30)]
+        trees = []
+        for _ in range(10):
+            np.random.shuffle(names)
+            trees.append(TreeNode.from_taxonomy(
+                (name, [str(np.random.randint(3)),
+                        str(np.random.randint(6))]) for name in names))
+        obs = rf_dists(trees)
+        exp = [[t1.compare_rfd(t2) for t2 in trees] for t1 in trees]
+        npt.assert_equal(obs.data, exp)
+
+    def test_rf_dists_iterable(self):
+        exp = rf_dists(self.trees, ids=list('abcde'))
+        obs = rf_dists((TreeArray.from_tree_node(t) for t in self.trees),
+                       ids=list('abcde'))
+        self.assertEqual(obs, exp)
+
+    def test_rf_dists_different_tips(self):
+        trees = self.trees + [TreeNode.read(["((a,b),(c,f),e);"])]
+        with self.assertRaises(ValueError):
+            rf_dists(trees)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,7 @@ from unittest import TestCase, main
 import numpy as np
 
 from skbio import TreeNode
-from skbio.tree import majority_rule
+from skbio.tree import TreeArray, majority_rule
 from skbio.tree._majority_rule import (_walk_clades, _filter_clades,
                                        _build_trees)
 
@@ -149,57 +149,107 @@ class MajorityRuleTests(TestCase):
             frozenset(['D', 'E', 'X']): 1.0,
             frozenset(['A', 'B', 'D', 'E', 'X']): 1.0}
 
-        obs_clades, obs_lengths = _walk_clades(trees, np.ones(len(trees)))
-        self.assertEqual(set(obs_clades), set(exp_clades))
-        self.assertEqual(obs_lengths, exp_lengths_nolength)
+        obs_clades, obs_lengths, tip_names, total = _walk_clades(
+            trees, np.ones(len(trees)))
+        self.assertEqual(total, 2.0)
+        self.assertEqual(_named_clades(obs_clades, tip_names),
+                         set(exp_clades))
+        self.assertEqual(_named_lengths(obs_lengths, tip_names),
+                         exp_lengths_nolength)
+        sizes = [bin(clade).count('1') for clade, _ in obs_clades]
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
 
         for t in trees:
             for n in t.traverse(include_self=True):
                 n.length = 2.0
 
-        obs_clades, obs_lengths = _walk_clades(trees, np.ones(len(trees)))
+        obs_clades, obs_lengths, tip_names, _ = _walk_clades(
+            trees, np.ones(len(trees)))
 
-        self.assertEqual(set(obs_clades), set(exp_clades))
-        self.assertEqual(obs_lengths, exp_lengths)
+        self.assertEqual(_named_clades(obs_clades, tip_names),
+                         set(exp_clades))
+        self.assertEqual(_named_lengths(obs_lengths, tip_names), exp_lengths)
+
+        # trees are walked once, with or without weights
+        obs_clades, _, tip_names, total = _walk_clades(iter(trees), None)
+        self.assertEqual(total, 2.0)
+        self.assertEqual(_named_clades(obs_clades, tip_names),
+                         set(exp_clades))
+        with self.assertRaises(ValueError):
+            _walk_clades(iter(trees), np.ones(3))
+        with self.assertRaises(ValueError):
+            _walk_clades(iter(trees), np.ones(1))
 
     def test_filter_clades(self):
-        clade_counts = [(frozenset(['A', 'B']), 8),
-                        (frozenset(['A', 'C']), 7),
-                        (frozenset(['A']), 6),
-                        (frozenset(['B']), 5)]
+        tip_names = ['A', 'B', 'C', 'D']
+        clade_counts = [(_bits('AB'), 8),
+                        (_bits('AC'), 7),
+                        (_bits('A'), 6),
+                        (_bits('B'), 5)]
         obs = _filter_clades(clade_counts, 2)
         exp = {frozenset(['A', 'B']): 8,
                frozenset(['A']): 6,
                frozenset(['B']): 5}
-        self.assertEqual(obs, exp)
-
-        clade_counts = [(frozenset(['A']), 8),
-                        (frozenset(['B']), 7),
-                        (frozenset(['C']), 7),
-                        (frozenset(['A', 'B']), 6),
-                        (frozenset(['A', 'B', 'C']), 5),
-                        (frozenset(['D']), 2)]
+        self.assertEqual(_named_lengths(obs, tip_names), exp)
+
+        clade_counts = [(_bits('A'), 8),
+                        (_bits('B'), 7),
+                        (_bits('C'), 7),
+                        (_bits('AB'), 6),
+                        (_bits('ABC'), 5),
+                        (_bits('D'), 2)]
         obs = _filter_clades(clade_counts, 4)
         exp = {frozenset(['A']): 8,
                frozenset(['B']): 7,
                frozenset(['C']): 7,
                frozenset(['A', 'B']): 6,
                frozenset(['A', 'B', 'C']): 5}
-        self.assertEqual(obs, exp)
+        self.assertEqual(_named_lengths(obs, tip_names), exp)
 
     def test_build_trees(self):
-        clade_counts = {frozenset(['A', 'B']): 6,
-                        frozenset(['A']): 7,
-                        frozenset(['B']): 8}
-        edge_lengths = {frozenset(['A', 'B']): 1,
-                        frozenset(['A']): 2,
-                        frozenset(['B']): 3}
-        tree = _build_trees(clade_counts, edge_lengths, 'foo', TreeNode)[0]
+        clade_counts = {_bits('AB'): 6,
+                        _bits('A'): 7,
+                        _bits('B'): 8}
+        edge_lengths = {_bits('AB'): 1,
+                        _bits('A'): 2,
+                        _bits('B'): 3}
+        tree = _build_trees(clade_counts, edge_lengths, 'foo', TreeNode,
+                            ['A', 'B'])[0]
         self.assertEqual(tree.foo, 6)
         tree_foos = set([c.foo for c in tree.children])
         tree_lens = set([c.length for c in tree.children])
+        tree_names = set([c.name for c in tree.children])
         self.assertEqual(tree_foos, set([7, 8]))
         self.assertEqual(tree_lens, set([2, 3]))
+        self.assertEqual(tree_names, set(['A', 'B']))
+
+    def test_majority_rule_tree_array(self):
+        trees = [TreeNode.read(io.StringIO(newick)) for newick in (
+            "((a:1,b:2):1,(c:3,d:4):2);", "((a:2,b:2):3,c:1,d:1);",
+            "((a:3,b:4):2,(c:2,d:1):1);")]
+        exp = majority_rule(trees)
+        obs = majority_rule(TreeArray.from_tree_node(t) for t in trees)
+        self.assertEqual(len(obs), 1)
+        self.assertEqual(exp[0].compare_subsets(obs[0]), 0.0)
+        self.assertEqual(obs[0].find('a').length, 2.0)
+        self.assertEqual(obs[0].find('a').parent.support, 3.0)
+
+
+def _bits(names, tip_names='ABCD'):
+    """Return the bitset of a clade of tip names"""
+    return sum(1 << tip_names.index(name) for name in names)
+
+
+def _named_clades(clade_counts, tip_names):
+    """Replace the clade bitsets of (clade, value) pairs by sets of names"""
+    return {(frozenset(name for i, name in enumerate(tip_names)
+                       if clade >> i & 1), value)
+            for clade, value in clade_counts}
+
+
+def _named_lengths(edge_lengths, tip_names):
+    """Replace the clade bitsets keying a dict by sets of names"""
+    return dict(_named_clades(edge_lengths.items(), tip_names))
 
 
 if __name__ == '__main__':
@@ -9,10 +9,145 @@
 import io
 from unittest import TestCase, main
 
+import numpy as np
+
 from skbio import DistanceMatrix, TreeNode, nj
-from skbio.tree._nj import (
-    _compute_q, _compute_collapsed_dm, _lowest_index,
-    _pair_members_to_new_node)
+
+
+def _compute_q(dm):
+    """Compute Q matrix, used to identify the next pair of nodes to join.
+
+    """
+    q = np.zeros(dm.shape)
+    n = dm.shape[0]
+    big_sum = np.array([dm.data.sum(1)] * dm.shape[0])
+    big_sum_diffs = big_sum + big_sum.T
+    q = (n - 2) * dm.data - big_sum_diffs
+    np.fill_diagonal(q, 0)
+    return DistanceMatrix(q, dm.ids)
+
+
+def _compute_collapsed_dm(dm, i, j, disallow_negative_branch_length,
+                          new_node_id):
+    """Return the distance matrix resulting from joining ids i and j in a node.
+
+    If the input distance matrix has shape ``(n, n)``, the result will have
+    shape ``(n-1, n-1)`` as the ids `i` and `j` are collapsed to a single new
+    ids.
+
+    """
+    in_n = dm.shape[0]
+    out_n = in_n - 1
+    out_ids = [new_node_id]
+    out_ids.extend([e for e in dm.ids if e not in (i, j)])
+    result = np.zeros((out_n, out_n))
+    # pre-populate the result array with known distances
+    ij_indexes = [dm.index(i), dm.index(j)]
+    result[1:, 1:] = np.delete(np.delete(dm.data, ij_indexes, axis=0),
+                               ij_indexes, axis=1)
+    # calculate the new distances from the current DistanceMatrix
+    k_to_u = 0.5 * (dm[i] + dm[j] - dm[i, j])
+    # set negative branches to 0 if specified
+    if disallow_negative_branch_length:
+        k_to_u[k_to_u < 0] = 0
+    # drop nodes being joined
+    k_to_u = np.delete(k_to_u, ij_indexes)
+    # assign the distances to the result array
+    result[0] = result[:, 0] = np.concatenate([[0], k_to_u])
+    return DistanceMatrix(result, out_ids)
+
+
+def _lowest_index(dm):
+    """Return the index of the lowest value in the input distance matrix.
+
+    If there are ties for the lowest value, the index of top-left most
+    occurrence of that value will be returned.
+
+    This should be ultimately be replaced with a new DistanceMatrix object
+    method (#228).
+
+    """
+    # get the positions of the lowest value
+    results = np.vstack(np.where(dm.data == np.amin(dm.condensed_form()))).T
+    # select results in the bottom-left of the array
+    results = results[results[:, 0] > results[:, 1]]
+    # calculate the distances of the results to [0, 0]
+    res_distances = np.sqrt(results[:, 0]**2 + results[:, 1]**2)
+    # detect distance ties & return the point which would have
+    # been produced by the original function
+    if np.count_nonzero(res_distances == np.amin(res_distances)) > 1:
+        eqdistres = results[res_distances == np.amin(res_distances)]
+        res_coords = eqdistres[np.argmin([r[0] for r in eqdistres])]
+    else:
+        res_coords = results[np.argmin(res_distances)]
+
+    return tuple([res_coords[0], res_coords[1]])
+
+
+def _pair_members_to_new_node(dm, i, j, disallow_negative_branch_length):
+    """Return the distance between a new node and decendants of that new node.
+
+    Parameters
+    ----------
+    dm : skbio.DistanceMatrix
+        The input distance matrix.
+    i, j : str
+        Identifiers of entries in the distance matrix to be collapsed (i.e.,
+        the descendents of the new node, which is internally represented as
+        `u`).
+    disallow_negative_branch_length : bool
+        Neighbor joining can result in negative branch lengths, which don't
+        make sense in an evolutionary context. If `True`, negative branch
+        lengths will be returned as zero, a common strategy for handling this
+        issue that was proposed by the original developers of the algorithm.
+
+    """
+    n = dm.shape[0]
+    i_to_j = dm[i, j]
+    i_to_u = (0.5 * i_to_j) + ((dm[i].sum() - dm[j].sum()) / (2 * (n - 2)))
+
+    if disallow_negative_branch_length and i_to_u < 0:
+        i_to_u = 0
+
+    j_to_u = i_to_j - i_to_u
+
+    if disallow_negative_branch_length and j_to_u < 0:
+        j_to_u = 0
+
+    return i_to_u, j_to_u
+
+
+def _reference_nj(dm, disallow_negative_branch_length):
+    """Neighbor joining newick string, one collapsed DistanceMatrix per join.
+    """
+    node_definition = None
+    while dm.shape[0] > 3:
+        idx1, idx2 = _lowest_index(_compute_q(dm))
+        pair_member_1 = dm.ids[idx1]
+        pair_member_2 = dm.ids[idx2]
+        pair_member_1_len, pair_member_2_len = _pair_members_to_new_node(
+            dm, idx1, idx2, disallow_negative_branch_length)
+        node_definition = "(%s:%f, %s:%f)" % (pair_member_1,
+                                              pair_member_1_len,
+                                              pair_member_2,
+                                              pair_member_2_len)
+        dm = _compute_collapsed_dm(
+            dm, pair_member_1, pair_member_2,
+            disallow_negative_branch_length=disallow_negative_branch_length,
+            new_node_id=node_definition)
+    pair_member_1 = dm.ids[1]
+    pair_member_2 = dm.ids[2]
+    pair_member_1_len, pair_member_2_len = _pair_members_to_new_node(
+        dm, pair_member_1, pair_member_2, disallow_negative_branch_length)
+    node_definition = node_definition or dm.ids[0]
+    internal_len = 0.5 * (dm[pair_member_1, node_definition] +
+                          dm[pair_member_2, node_definition] -
+                          dm[pair_member_1, pair_member_2])
+    if disallow_negative_branch_length and internal_len < 0:
+        internal_len = 0
+    return "(%s:%f, %s:%f, %s:%f);" % (pair_member_1, pair_member_1_len,
+                                       node_definition, internal_len,
+                                       pair_member_2, pair_member_2_len)
 
 
 class NjTests(TestCase):
@@ -117,6 +252,87 @@ class NjTests(TestCase):
         expected_str = "(b:2.000000, a:1.000000, c:1.000000);"
         self.assertEqual(nj(dm, result_constructor=str), expected_str)
 
+    def test_nj_fast(self):
+        for dm in self.dm1, self.dm2, self.dm3, self.dm4:
+            for disallow in True, False:
+                self.assertEqual(
+                    nj(dm, disallow, result_constructor=str, fast=True),
+                    nj(dm, disallow, result_constructor=str))
+
+    def test_nj_ties(self):
+        # small integer distances have many ties between Q values, which must
+        # be broken as when collapsing the distance matrix at each join
+        rs = np.random.RandomState(0)
+        for _ in range(20):
+            n = rs.randint(3, 20)
+            data = rs.randint(1, 5, (n, n))
+            data = data + data.T
+            np.fill_diagonal(data, 0)
+            dm = DistanceMatrix(data, [str(i) for i in range(n)])
+            for disallow in True, False:
+                expected = _reference_nj(dm, disallow)
+                self.assertEqual(
+                    nj(dm, disallow, result_constructor=str), expected)
+                self.assertEqual(
+                    nj(dm, disallow, result_constructor=str, fast=True),
+                    expected)
+
+    def test_nj_float_last_join(self):
+        # the two pairs of each split of the last four nodes have equal Q
+        # values in exact arithmetic, and only one side of the joined pair is
+        # clipped, so that the pair chosen through rounding changes the tree
+        data = [[0, 2.70417, 2.446611, 1.195142],
+                [2.70417, 0, 0.924337, 0.543369],
+                [2.446611, 0.924337, 0, 1.80151],
+                [1.195142, 0.543369, 1.80151, 0]]
+        dm = DistanceMatrix(data, list('abcd'))
+        expected = ("(b:0.212023, (d:0.000000, a:1.195142):0.814175, "
+                    "c:0.712314);")
+        self.assertEqual(_reference_nj(dm, True), expected)
+        for fast in False, True:
+            self.assertEqual(nj(dm, result_constructor=str, fast=fast),
+                             expected)
+            self.assertEqual(
+                nj(dm, False, result_constructor=str, fast=fast),
+                _reference_nj(dm, False))
+
+    def test_nj_floats(self):
+        rs = np.random.RandomState(0)
+        for k in range(40):
+            n = rs.randint(4, 12)
+            data = rs.rand(n, n)
+            data = data + data.T
+            if k % 2:
+                # rounded distances have many ties in exact arithmetic
+                data = np.round(data, 3)
+            np.fill_diagonal(data, 0)
+            dm = DistanceMatrix(data, [str(i) for i in range(n)])
+            for disallow in True, False:
+                expected = _reference_nj(dm, disallow)
+                for fast in False, True:
+                    self.assertEqual(
+                        nj(dm, disallow, result_constructor=str, fast=fast),
+                        expected)
+
+    def test_nj_fast_large(self):
+        rs = np.random.RandomState(0)
+        points = rs.normal(size=(100, 5))
+        data = np.sqrt(((points[:, np.newaxis] - points) ** 2).sum(axis=2))
+        dm = DistanceMatrix(data, [str(i) for i in range(100)])
+        self.assertEqual(nj(dm, result_constructor=str, fast=True),
+                         nj(dm, result_constructor=str))
+
+    def test_nj_inplace(self):
+        dm = self.dm2.copy()
+        self.assertEqual(nj(dm, result_constructor=str, inplace=True),
+                         nj(self.dm2, result_constructor=str))
+        self.assertFalse(np.array_equal(dm.data, self.dm2.data))
+
+        # the input is not modified by default
+        dm = self.dm2.copy()
+        nj(dm)
+        self.assertEqual(dm, self.dm2)
+
     def test_nj_error(self):
         data = [[0, 3],
                 [3, 0]]
@@ -6,7 +6,9 @@
 # The full license is in the file COPYING.txt, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import copy
 import io
+import sys
 from unittest import TestCase, main
 from collections import defaultdict
 
@@ -180,6 +182,50 @@ class TreeTests(TestCase):
             self.assertEqual(a.name, b.name)
             self.assertEqual(a.length, b.length)
 
+    def test_copy_attributes(self):
+        t = TreeNode.read(io.StringIO("((a:1,b:2)c:3,d:4)root;"))
+        t.cache_attr(lambda n: [n.name] if n.is_tip() else [], 'tip_names')
+        t.children[0].metadata = {'x': [1, 2]}
+
+        deep = t.copy()
+        self.assertEqual(str(deep), str(t))
+        self.assertEqual(deep.children[0].metadata, {'x': [1, 2]})
+        self.assertIsNot(deep.children[0].metadata, t.children[0].metadata)
+        self.assertEqual(deep.tip_names, t.tip_names)
+        self.assertIsNot(deep.tip_names, t.tip_names)
+
+        shallow = t.copy(deep=False)
+        self.assertEqual(str(shallow), str(t))
+        self.assertIs(shallow.children[0].metadata, t.children[0].metadata)
+        self.assertIs(shallow.tip_names, t.tip_names)
+        self.assertIsNot(shallow._registered_caches, t._registered_caches)
+        for a, b in zip(shallow.traverse(include_self=True),
+                        t.traverse(include_self=True)):
+            self.assertIsNot(a, b)
+            if a.parent is not None:
+                self.assertIn(a, a.parent.children)
+
+    def test_copy_module(self):
+        t = TreeNode.read(io.StringIO("((a:1,b:2)c:3,d:4)root;"))
+        for obs in copy.copy(t), copy.deepcopy(t):
+            self.assertEqual(str(obs), str(t))
+            self.assertIsNot(obs.children[0], t.children[0])
+
+    def test_copy_deep_tree(self):
+        # a caterpillar tree deeper than the recursion limit
+        t = TreeNode('root')
+        node = t
+        for i in range(sys.getrecursionlimit() + 100):
+            node.extend([TreeNode(str(i), length=1.0), TreeNode(length=1.0)])
+            node = node.children[1]
+
+        obs = t.copy()
+        self.assertEqual(obs.count(), t.count())
+        obs = node.unrooted_copy()
+        self.assertEqual(obs.count(), t.count())
+        obs = node.unrooted_deepcopy()
+        self.assertEqual(obs.count(), t.count())
+
     def test_append(self):
         """Append a node to a tree"""
         second_tree = TreeNode.read(io.StringIO("(x,y)z;"))
@@ -439,6 +485,139 @@ class TreeTests(TestCase):
         for n in tree.traverse(include_self=True):
             self.assertFalse(hasattr(n, 'tip_names'))
 
+    def assert_caches_equal_rebuilt(self, tree):
+        tip_cache = tree._tip_cache.copy()
+        non_tip_cache = {k: v for k, v in tree._non_tip_cache.items() if v}
+        counts = tree.count(), tree.count(tips=True)
+        tree.invalidate_caches()
+        tree.create_caches()
+        self.assertEqual(tip_cache, tree._tip_cache)
+        self.assertEqual(non_tip_cache, tree._non_tip_cache)
+        self.assertEqual(counts, (tree.count(), tree.count(tips=True)))
+
+    def test_caches_updated_on_edit(self):
+        tree = TreeNode.read(io.StringIO("((a,b,(c,d)e)f,(g,h)i)root;"))
+        tree.create_caches()
+
+        # a tip becomes an internal node
+        a = tree.find('a')
+        a.append(TreeNode('x'))
+        self.assertTrue(tree._caches_built)
+        self.assertIs(tree.find('a'), a)
+        self.assertNotIn('a', tree._tip_cache)
+        self.assertIs(tree.find('x'), a.children[0])
+        self.assert_caches_equal_rebuilt(tree)
+
+        # a subtree moves within the tree
+        e = tree.find('e')
+        tree.find('i').append(e)
+        self.assertTrue(tree._caches_built)
+        self.assertIs(tree.find('c').parent, e)
+        self.assert_caches_equal_rebuilt(tree)
+
+        # an internal node becomes a tip
+        g, h = tree.find('g'), tree.find('h')
+        i = tree.find('i')
+        for node in g, h, e:
+            i.remove(node)
+        self.assertTrue(tree._caches_built)
+        self.assertIs(tree.find('i'), i)
+        self.assertIn('i', tree._tip_cache)
+        with self.assertRaises(MissingNodeError):
+            tree.find('c')
+        self.assert_caches_equal_rebuilt(tree)
+
+        # a subtree from another tree, whose caches must be dropped
+        other = TreeNode.read(io.StringIO("((y,z)w)v;"))
+        other.create_caches()
+        w = other.find('w')
+        tree.extend([w, TreeNode('q')])
+        self.assertTrue(tree._caches_built)
+        self.assertFalse(w._caches_built)
+        self.assertIs(tree.find('z').parent, w)
+        with self.assertRaises(MissingNodeError):
+            other.find('z')
+        self.assertEqual(other.count(tips=True), 1)
+        self.assert_caches_equal_rebuilt(tree)
+        self.assert_caches_equal_rebuilt(other)
+
+    def test_caches_updated_on_edit_random(self):
+        rng = np.random.RandomState(0)
+        tree = TreeNode.read(io.StringIO(
+            "((((a,b)c,(d,e)f)g,((h,i)j,k)l)m,(n,(o,(p,q)r)s)t)root;"))
+        tree.create_caches()
+        for _ in range(50):
+            nodes = list(tree.non_tips(include_self=True))
+            parent = nodes[rng.randint(len(nodes))]
+            candidates = [n for n in tree.traverse()
+                          if n is not parent and
+                          parent not in n.traverse(include_self=True)]
+            if not candidates:
+                continue
+            child = candidates[rng.randint(len(candidates))]
+            parent.append(child)
+            self.assertTrue(tree._caches_built)
+            self.assert_caches_equal_rebuilt(tree)
+
+    def test_caches_duplicate_name_on_edit(self):
+        tree = TreeNode.read(io.StringIO("((a,b)c,(d,e)f)root;"))
+        tree.create_caches()
+        tree.find('f').append(TreeNode('a'))
+        with self.assertRaises(DuplicateNodeError):
+            tree.find('a')
+
+        # duplicated internal names are found in postorder
+        tree = TreeNode.read(io.StringIO("((a,b)c,(d,e)f)root;"))
+        tree.create_caches()
+        c = tree.find('c')
+        tree.find('f').append(TreeNode.read(io.StringIO("(x,y)c;")))
+        self.assertIs(tree.find('c'), c)
+        self.assertEqual(len(tree.find_all('c')), 2)
+
+    def test_caches_rename_then_edit(self):
+        tree = TreeNode.read(io.StringIO("((a,b)c,(d,e)f)r;"))
+        node = tree.find('a')
+        node.name = 'z'
+        tree.find('f').append(TreeNode('g'))
+        self.assertIs(tree.find('z'), node)
+        with self.assertRaises(MissingNodeError):
+            tree.find('a')
+        self.assertEqual(tree.find('g').parent.name, 'f')
+
+        # renamed internal node
+        c = tree.find('c')
+        c.name = 'y'
+        tree.find('f').remove(tree.find('g'))
+        self.assertIs(tree.find('y'), c)
+        self.assertEqual(tree.find_all('y'), [c])
+        with self.assertRaises(MissingNodeError):
+            tree.find_all('c')
+
+        # a renamed node that is removed is no longer found, even after it
+        # takes its cached name back
+        node = tree.find('d')
+        node.name = 'x'
+        tree.find('f').remove(node)
+        node.name = 'd'
+        with self.assertRaises(MissingNodeError):
+            tree.find('d')
+        self.assertEqual(tree.count(tips=True), 3)
+
+    def test_find_all_does_not_modify_caches(self):
+        tree = TreeNode.read(io.StringIO("((a,b)c,(d,e)f,c)r;"))
+        self.assertEqual(len(tree.find_all('c')), 2)
+        self.assertEqual(len(tree.find_all('c')), 2)
+        self.assertIs(tree.find('c'), tree.children[2])
+
+    def test_caches_with_cached_attr_on_edit(self):
+        tree = TreeNode.read(io.StringIO("((a,b)c,(d,e)f)root;"))
+        tree.cache_attr(lambda n: [n.name] if n.is_tip() else [], 'names')
+        tree.create_caches()
+        tree.find('f').append(TreeNode('g'))
+        for node in tree.traverse(include_self=True):
+            self.assertFalse(hasattr(node, 'names'))
+        self.assertEqual(tree.find('g').parent.name, 'f')
+
     def test_create_caches_duplicate_tip_names(self):
         with self.assertRaises(DuplicateNodeError):
             TreeNode.read(io.StringIO('(a, a);')).create_caches()
@@ -662,47 +841,37 @@ class TreeTests(TestCase):
         npt.assert_almost_equal(dist, 1.6)
         self.assertEqual(sorted([n.name for n in nodes]), ['b', 'e'])
 
-    def test_set_max_distance(self):
-        """set_max_distance sets MaxDistTips across tree"""
-        tree = TreeNode.read(io.StringIO(
-            "((a:0.1,b:0.2)c:0.3,(d:0.4,e:0.5)f:0.6)root;"))
-        tree._set_max_distance()
-        tip_a, tip_b = tree.MaxDistTips
-        self.assertEqual(tip_a[0] + tip_b[0], 1.6)
-        self.assertEqual(sorted([tip_a[1].name, tip_b[1].name]), ['b', 'e'])
-
-    def test_set_max_distance_tie_bug(self):
-        """Corresponds to #1077"""
-        s = io.StringIO("((a:1,b:1)c:2,(d:3,e:4)f:5)root;")
-        t = TreeNode.read(s)
-
-        exp = ((3.0, t.find('a')), (9.0, t.find('e')))
-
-        # the above tree would trigger an exception in max. The central issue
-        # was that the data being passed to max were a tuple of tuple:
-        # ((left_d, left_n), (right_d, right_n))
-        # the call to max would break in this scenario as it would fall onto
-        # idx 1 of each tuple to assess the "max".
-        t._set_max_distance()
-
-        self.assertEqual(t.MaxDistTips, exp)
-
-    def test_set_max_distance_inplace_modification_bug(self):
-        """Corresponds to #1223"""
-        s = io.StringIO("((a:1,b:1)c:2,(d:3,e:4)f:5)root;")
-        t = TreeNode.read(s)
-
-        exp = [((0.0, t.find('a')), (0.0, t.find('a'))),
-               ((0.0, t.find('b')), (0.0, t.find('b'))),
-               ((1.0, t.find('a')), (1.0, t.find('b'))),
-               ((0.0, t.find('d')), (0.0, t.find('d'))),
-               ((0.0, t.find('e')), (0.0, t.find('e'))),
-               ((3.0, t.find('d')), (4.0, t.find('e'))),
-               ((3.0, t.find('a')), (9.0, t.find('e')))]
-
-        t._set_max_distance()
-
-        self.assertEqual([n.MaxDistTips for n in t.postorder()], exp)
+    def test_get_max_distance_tie(self):
+        """Corresponds to #1077 and #1223"""
+        t = TreeNode.read(io.StringIO("((a:1,b:1)c:2,(d:3,e:4)f:5)root;"))
+        dist, nodes = t.get_max_distance()
+        self.assertEqual(dist, 12.0)
+        self.assertEqual(nodes, [t.find('a'), t.find('e')])
+        self.assertFalse(hasattr(t, 'MaxDistTips'))
+
+    def test_get_max_distance_single_descendant(self):
+        t = TreeNode.read(io.StringIO("(((a:1,b:3)c:2)d:4,(e:1)f:2)root;"))
+        dist, nodes = t.get_max_distance()
+        self.assertEqual(dist, 12.0)
+        self.assertEqual(nodes, [t.find('e'), t.find('b')])
+
+    def test_get_max_distance_no_lengths(self):
+        for nwk in ("(a,b)c;", "((a)b)c;", "a;"):
+            t = TreeNode.read(io.StringIO(nwk))
+            self.assertEqual(t.get_max_distance(), (0.0, [None, None]))
+
+    def test_get_max_distance_random(self):
+        np.random.seed(0)
+        for _ in range(10):
+            t = TreeNode.from_taxonomy(
+                (str(i), [str(np.random.randint(3)),
+                          str(np.random.randint(5))]) for i in range(20))
+            for n in t.traverse():
+                n.length = np.random.rand()
+            dm = t.tip_tip_distances()
+            dist, nodes = t.get_max_distance()
+            npt.assert_almost_equal(dist, dm.data.max())
+            self.assertAlmostEqual(dm[nodes[0].name, nodes[1].name], dist)
 
     def test_shear(self):
         """Shear the nodes"""
@@ -767,6 +936,26 @@ class TreeTests(TestCase):
         obs = t.tip_tip_distances(endpoints=nodes)
         self.assertEqual(obs, exp)
 
+    def test_tip_tip_distances_condensed(self):
+        t = TreeNode.read(io.StringIO(
+            '(((H:1,G:1):2,(R:0.5,M:0.7,Q:5):3):1,(X:4,(Y:1,Z:2):0.5):2);'))
+        for endpoints in (None, ['Q', 'H', 'Z', 'M', 'X'], ['G', 'Y'],
+                          ['M', 'R', 'Q', 'H', 'G', 'X', 'Y', 'Z']):
+            exp = t.tip_tip_distances(endpoints).condensed_form()
+            obs = t.tip_tip_distances(endpoints, condensed=True)
+            self.assertEqual(obs.dtype, np.float64)
+            npt.assert_almost_equal(obs, exp)
+
+            obs = t.tip_tip_distances(endpoints, condensed=True,
+                                      dtype=np.float32)
+            self.assertEqual(obs.dtype, np.float32)
+            npt.assert_almost_equal(obs, exp, decimal=5)
+
+    def test_tip_tip_distances_dtype_not_condensed(self):
+        t = TreeNode.read(io.StringIO('((H:1,G:1):2,(R:0.5,M:0.7):3);'))
+        with self.assertRaises(ValueError):
+            t.tip_tip_distances(dtype=np.float32)
+
     def test_tip_tip_distances_non_tip_endpoints(self):
         t = TreeNode.read(io.StringIO('((H:1,G:1)foo:2,(R:0.5,M:0.7):3);'))
         with self.assertRaises(ValueError):
@@ -970,6 +1159,33 @@ class TreeTests(TestCase):
             self.assertEqual(o.name, e.name)
             self.assertEqual(o.length, e.length)
 
+    def test_root_at_midpoint_unmodified(self):
+        nwk = "(((d:1.0,e:1.0,(g:1.0)f:1.0)c:1.0)b:1.0,h:1.0)a:1.0;\n"
+        t = TreeNode.read(io.StringIO(nwk))
+        obs = t.root_at_midpoint()
+        self.assertEqual(str(t), nwk)
+        self.assertEqual(str(obs), "((d:1.0,e:1.0,(g:1.0)f:1.0)c:0.5,"
+                                   "((h:1.0)b:1.0):0.5)root;\n")
+        self.assertTrue(all(n not in set(t.traverse(include_self=True))
+                            for n in obs.traverse(include_self=True)))
+
+    def test_root_at_midpoint_random(self):
+        np.random.seed(0)
+        for _ in range(20):
+            t = TreeNode.from_taxonomy(
+                (str(i), [str(np.random.randint(3)),
+                          str(np.random.randint(4))]) for i in range(20))
+            for n in t.traverse():
+                n.length = np.random.rand()
+            obs = t.root_at_midpoint()
+            exp = t.tip_tip_distances()
+            npt.assert_almost_equal(
+                obs.tip_tip_distances().filter(exp.ids).data, exp.data)
+            # the farthest tips on both sides are equally distant
+            dists = [max(tip.accumulate_to_ancestor(obs) for tip in c.tips())
+                     for c in obs.children]
+            npt.assert_almost_equal(dists[0], dists[1])
+
     def test_compare_subsets(self):
         """compare_subsets should return the fraction of shared subsets"""
         t = TreeNode.read(io.StringIO('((H,G),(R,M));'))
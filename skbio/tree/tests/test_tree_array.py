@@ -0,0 +1,259 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2013--, scikit-bio development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import io
+from unittest import TestCase, main
+
+import numpy as np
+import numpy.testing as npt
+
+from skbio import TreeNode
+from skbio.tree import (TreeArray, DuplicateNodeError, MissingNodeError,
+                        NoLengthError)
+from skbio.util import RepresentationWarning
+
+
+class TreeArrayTests(TestCase):
+    def setUp(self):
+        self.newick = ("(((a:1.0,b:2.5)c:6.0,d:8.0,(e)f:2.0)g:1.0,"
+                       "(h:3.0,i:4.0)j:2.0)root;\n")
+        self.tree = TreeNode.read(io.StringIO(self.newick))
+        self.array = TreeArray.from_tree_node(self.tree)
+
+    def test_init(self):
+        array = TreeArray([-1, 0, 1, 1, 0], [np.nan, 1, 2, 3, 4],
+                          ['r', 'x', 'a', 'b', 'c'])
+        npt.assert_equal(array.size, [5, 3, 1, 1, 1])
+        npt.assert_equal(array.depth, [0, 1, 2, 2, 1])
+        npt.assert_equal(array.first_child, [1, 2, -1, -1, -1])
+        npt.assert_equal(array.next_sibling, [-1, 4, 3, -1, -1])
+        npt.assert_equal(array.tips, [2, 3, 4])
+        npt.assert_equal(array.postorder, [2, 3, 1, 4, 0])
+
+    def test_init_defaults(self):
+        array = TreeArray([-1, 0, 0])
+        self.assertTrue(np.isnan(array.length).all())
+        self.assertEqual(array.names.tolist(), [None, None, None])
+
+    def test_init_invalid(self):
+        for parent in ([], [[-1, 0]], [0, 0], [-1, -1], [-1, 1],
+                       [-1, 0, 0, 1]):
+            with self.assertRaises(ValueError):
+                TreeArray(parent)
+        with self.assertRaises(ValueError):
+            TreeArray([-1, 0], length=[1.0])
+        with self.assertRaises(ValueError):
+            TreeArray([-1, 0], names=['a', 'b', 'c'])
+
+    def test_read_only(self):
+        for array in (self.array.parent, self.array.length, self.array.names,
+                      self.array.size, self.array.postorder):
+            with self.assertRaises(ValueError):
+                array[0] = 1
+
+    def test_orders(self):
+        self.assertEqual(
+            self.array.names[self.array.preorder].tolist(),
+            [n.name for n in self.tree.preorder()])
+        self.assertEqual(
+            self.array.names[self.array.postorder].tolist(),
+            [n.name for n in self.tree.postorder()])
+        self.assertEqual(self.array.names[self.array.tips].tolist(),
+                         [n.name for n in self.tree.tips()])
+        self.assertEqual(self.array.names[self.array.children(1)].tolist(),
+                         ['c', 'd', 'f'])
+
+    def test_to_tree_node(self):
+        self.assertEqual(str(self.array.to_tree_node()), self.newick)
+        self.assertEqual(str(self.array), self.newick)
+
+    def test_repr(self):
+        self.assertEqual(repr(self.array),
+                         "<TreeArray, internal node count: 4, tips count: 6>")
+        self.assertEqual(repr(TreeArray([-1])),
+                         "<TreeArray, internal node count: 0, tips count: 0>")
+
+    def test_count(self):
+        self.assertEqual(self.array.count(), self.tree.count())
+        self.assertEqual(self.array.count(tips=True),
+                         self.tree.count(tips=True))
+
+    def test_find(self):
+        self.assertEqual(self.array.names[self.array.find('e')], 'e')
+        self.assertEqual(self.array.find('g'), 1)
+        with self.assertRaises(MissingNodeError):
+            self.array.find('missing')
+        array = TreeArray([-1, 0, 0], names=['r', 'a', 'a'])
+        with self.assertRaises(DuplicateNodeError):
+            array.find('a')
+
+    def test_lowest_common_ancestor(self):
+        for names in (['a', 'b'], ['a', 'e'], ['e'], ['a', 'i']):
+            exp = self.tree.lowest_common_ancestor(names).name
+            obs = self.array.lowest_common_ancestor(names)
+            self.assertEqual(self.array.names[obs], exp)
+        with self.assertRaises(ValueError):
+            self.array.lowest_common_ancestor([])
+
+    def test_lca(self):
+        nodes = list(self.tree.preorder())
+        for a in range(len(nodes)):
+            for b in range(len(nodes)):
+                ancestors = {id(n) for n in nodes[a].ancestors()}
+                ancestors.add(id(nodes[a]))
+                exp = nodes[b]
+                while id(exp) not in ancestors:
+                    exp = exp.parent
+                obs = self.array.lca(a, b)
+                self.assertIsInstance(obs, int)
+                self.assertIs(nodes[obs], exp)
+
+    def test_lca_batch(self):
+        a = np.array([2, 2, 3, 7, 0])
+        b = np.array([3, 5, 9, 8, 6])
+        exp = [self.array.lca(x, y) for x, y in zip(a, b)]
+        npt.assert_equal(self.array.lca(a, b), exp)
+        npt.assert_equal(self.array.lca(b, a), exp)
+        npt.assert_equal(self.array.lca(2, b), [2, 1, 0, 0, 1])
+        with self.assertRaises(IndexError):
+            self.array.lca(0, 11)
+        with self.assertRaises(IndexError):
+            self.array.lca([-1], [2])
+
+    def test_distance(self):
+        tree = TreeNode.read(io.StringIO(
+            "(((a:1,b:2.5)c:6,d:8,(e:1)f:2)g:1,(h:3,i:4)j:2)root;"))
+        nodes = list(tree.preorder())
+        array = TreeArray.from_tree_node(tree)
+        for a in range(len(nodes)):
+            for b in range(len(nodes)):
+                obs = array.distance(a, b)
+                self.assertIsInstance(obs, float)
+                self.assertAlmostEqual(obs, nodes[a].distance(nodes[b]))
+        tips = array.tips
+        obs = array.distance(tips[:, np.newaxis], tips[np.newaxis, :])
+        npt.assert_almost_equal(obs, array.tip_tip_distances().data)
+
+    def test_distance_missing_length(self):
+        e = self.array.find('e')
+        a = self.array.find('a')
+        b = self.array.find('b')
+        self.assertEqual(self.array.distance(a, b), 3.5)
+        with self.assertRaises(NoLengthError):
+            self.array.distance(a, e)
+        with self.assertRaises(NoLengthError):
+            self.array.distance([a, a], [b, e])
+        # the missing length of the root is not on any path
+        self.assertEqual(self.array.distance(0, a), 8.0)
+
+    def test_tip_tip_distances(self):
+        exp = self.tree.tip_tip_distances()
+        obs = self.array.tip_tip_distances()
+        self.assertEqual(obs.ids, exp.ids)
+        npt.assert_almost_equal(obs.data, exp.data)
+
+    def test_tip_tip_distances_endpoints(self):
+        endpoints = ['i', 'a', 'e', 'd']
+        exp = self.tree.tip_tip_distances(endpoints)
+        obs = self.array.tip_tip_distances(endpoints)
+        self.assertEqual(obs.ids, tuple(endpoints))
+        npt.assert_almost_equal(obs.data, exp.data)
+        with self.assertRaises(ValueError):
+            self.array.tip_tip_distances(['a', 'c'])
+
+    def test_tip_tip_distances_condensed(self):
+        for endpoints in None, ['i', 'a', 'e', 'd']:
+            exp = self.tree.tip_tip_distances(endpoints, condensed=True,
+                                              dtype=np.float32)
+            obs = self.array.tip_tip_distances(endpoints, condensed=True,
+                                               dtype=np.float32)
+            self.assertEqual(obs.dtype, np.float32)
+            npt.assert_equal(obs, exp)
+        with self.assertRaises(ValueError):
+            self.array.tip_tip_distances(dtype=np.float32)
+
+    def test_tip_tip_distances_missing_length(self):
+        with self.assertWarns(RepresentationWarning):
+            obs = self.array.tip_tip_distances(['e', 'h'])
+        npt.assert_almost_equal(obs['e', 'h'], 8.0)
+
+    def test_shear(self):
+        for names in (['a', 'e', 'i'], ['a', 'b'], ['d', 'h', 'i'],
+                      ['a', 'b', 'd', 'e', 'h', 'i']):
+            exp = self.tree.shear(names)
+            obs = self.array.shear(names)
+            self.assertEqual(sorted(obs.names[obs.tips].tolist()),
+                             sorted(names))
+            exp_dm = exp.tip_tip_distances(names)
+            obs_dm = obs.tip_tip_distances(names)
+            npt.assert_almost_equal(obs_dm.data, exp_dm.data)
+
+    def test_shear_single(self):
+        obs = self.array.shear(['d'])
+        self.assertEqual(obs.count(), 1)
+        self.assertEqual(obs.names.tolist(), ['d'])
+        self.assertEqual(obs.length.tolist(), [9.0])
+
+    def test_shear_invalid(self):
+        with self.assertRaises(ValueError):
+            self.array.shear(['a', 'missing'])
+
+    def test_induced_subtree(self):
+        names = self.array.names
+        for selected in (['a', 'e', 'i'], ['a', 'b'], ['d', 'h', 'i']):
+            mask = np.in1d(names[self.array.tips], selected)
+            indices = np.array([self.array.find(n) for n in selected])
+            exp = self.array.shear(selected)
+            obs = self.array.induced_subtree(mask)
+            self.assertEqual(str(obs), str(exp))
+            obs, nodes = self.array.induced_subtree(indices[::-1],
+                                                    return_nodes=True)
+            self.assertEqual(str(obs), str(exp))
+            npt.assert_equal(names[nodes], obs.names)
+            self.assertEqual(sorted(names[nodes[obs.tips]]), sorted(selected))
+
+    def test_induced_subtree_merged_lengths(self):
+        obs, nodes = self.array.induced_subtree(
+            [self.array.find('a'), self.array.find('h')], return_nodes=True)
+        self.assertEqual(obs.names.tolist(), ['root', 'a', 'h'])
+        npt.assert_equal(obs.parent, [-1, 0, 0])
+        npt.assert_equal(obs.length[1:], [8.0, 5.0])
+        npt.assert_equal(nodes, [0, 3, 9])
+        # missing lengths are skipped, or kept missing if all are missing
+        obs = self.array.induced_subtree([self.array.find('e'),
+                                          self.array.find('h')])
+        self.assertEqual(obs.names.tolist(), ['root', 'e', 'h'])
+        npt.assert_equal(obs.length[1:], [3.0, 5.0])
+        array = TreeArray([-1, 0, 1, 0], names=['r', 'x', 'a', 'b'])
+        self.assertTrue(np.isnan(array.induced_subtree([2, 3])
+                                 .length[1:]).all())
+
+    def test_induced_subtree_invalid(self):
+        with self.assertRaises(ValueError):
+            self.array.induced_subtree([True, False])
+        with self.assertRaises(ValueError):
+            self.array.induced_subtree([False] * 6)
+        with self.assertRaises(ValueError):
+            self.array.induced_subtree([self.array.find('c')])
+        with self.assertRaises(ValueError):
+            self.array.induced_subtree([11])
+        with self.assertRaises(ValueError):
+            self.array.induced_subtree([])
+
+    def test_to_array(self):
+        exp = self.tree.to_array(nan_length_value=0.0)
+        obs = self.array.to_array(nan_length_value=0.0)
+        npt.assert_equal(obs['child_index'], exp['child_index'])
+        npt.assert_equal(obs['name'], exp['name'])
+        npt.assert_equal(obs['length'], exp['length'])
+        npt.assert_equal(obs['id'], exp['id'])
+        self.assertNotIn('id_index', obs)
+
+
+if __name__ == '__main__':
+    main()